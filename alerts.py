@@ -14,6 +14,7 @@ from typing import Dict, List, Optional
 import requests
 
 from logger import get_logger
+from serialization import dumps_report
 
 
 class AlertLevel(Enum):
@@ -190,7 +191,7 @@ class AlertManager:
             }
             
             with open(alert_file, 'a', encoding='utf-8') as f:
-                f.write(json.dumps(alert_data, ensure_ascii=False) + '\n')
+                f.write(dumps_report(alert_data) + '\n')
             
             return True
             
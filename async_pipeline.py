@@ -2,16 +2,60 @@
 from __future__ import annotations
 
 import asyncio
-import json
-import random
+import functools
 import time
+from contextlib import nullcontext
 from typing import List
 
 import aiohttp
 
+from balancer import EndpointPool
+from batching import MicroBatcher
+from cache import get_llm_cache
+from concurrency import ServiceLimiter, get_concurrency_controller
 from config import Config
-from exceptions import RetryExhaustedError
+from deadline import (
+    MIN_STAGE_SEC,
+    check_deadline,
+    current_deadline,
+    deadline_scope,
+    no_deadline,
+    timeout_for,
+)
+from exceptions import (
+    ClientRequestError,
+    DeadlineExceededError,
+    ExternalServiceError,
+    LLMBudgetExhaustedError,
+    LLMError,
+    NotFoundError,
+    RetryExhaustedError,
+)
+from gn_vn_mapping import SOURCE_LLM, SOURCE_MAPPING, get_gn_vn_mapping
+from latency import AdaptiveTimeouts
+from llm_budget import LLM_BUDGET_REASON, LLMBudget, prioritize
+from llm_client import chunk_by_budget, estimate_tokens
 from logger import get_logger
+from metrics import get_runtime_counters
+from part_family import SOURCE_FAMILY, PartFamilyCache
+from partnumbers import SearchSelector, order_exact_first
+from pipeline import (
+    CATALOG_SEARCH_FIELDS,
+    DEADLINE_REASON,
+    GN_CANDIDATES,
+    VN_CANDIDATES,
+    catalog_error_reason,
+)
+from retry import SERVICES, RetryPolicy, reset_retry_budget
+from scheduler import get_scheduler
+from serialization import dumps_report
+from taxonomy import get_taxonomy
+from transport import async_request, async_stream_search, open_async_session
+
+try:
+    from mocks.llm_mock import LLMMock
+except ImportError:  # pragma: no cover - mocks are optional in production installs
+    LLMMock = None  # type: ignore
 
 
 class AsyncProcessingPipeline:
@@ -19,51 +63,112 @@ class AsyncProcessingPipeline:
     
     def __init__(self, cfg: Config, max_concurrent: int = 10):
         self.cfg = cfg
+        # Лимит по умолчанию для сервисов, чей лимит не задан в конфигурации
         self.max_concurrent = max_concurrent
+        self.http_transport = getattr(cfg, "http_transport", "http1")
         self.log = get_logger("async_pipeline")
-        self.semaphore = asyncio.Semaphore(max_concurrent)
+        # Отдельные лимиты на сервис: строка занимает слот только на время своего этапа
+        self.retry_policies = {service: RetryPolicy.from_config(cfg, service) for service in SERVICES}
+        self.retry_policies["default"] = RetryPolicy.from_config(cfg)
+        # С ADAPTIVE_CONCURRENCY лимит подбирается по задержке и перегрузке (AIMD, см. concurrency.py)
+        self.limiters = {}
+        for service in ("catalog", "lcsc", "llm"):
+            limit = getattr(cfg, f"{service}_concurrency", max_concurrent)
+            self.limiters[service] = ServiceLimiter(
+                service, limit, controller=get_concurrency_controller(cfg, service, limit)
+            )
+        # Таймауты по наблюдаемым задержкам (ADAPTIVE_TIMEOUTS), верхняя граница — <service>_timeout_sec
+        self.timeouts = {service: AdaptiveTimeouts.from_config(cfg, service) for service in SERVICES}
+        # Пулы реплик (LLM-прокси): создаются при первом реальном запросе
+        self.pools: dict[str, EndpointPool] = {}
+        # Сборщики поштучных вызовов в пакеты (CATALOG_BATCH_SIZE > 1); живут в пределах сессии
+        self.batchers: dict[str, MicroBatcher] = {}
+        # Кэш ответов LLM (LLM_CACHE): общий с синхронным пайплайном, ключи совпадают
+        self.llm_cache = get_llm_cache(cfg) if getattr(cfg, "llm_cache", False) else None
+        # Таблица «категория → ГН/ВН» (GN_VN_MAPPING); категория берется из входной строки (этапа LCSC нет)
+        self.gn_vn_mapping = get_gn_vn_mapping(cfg)
+        # Справочник ГН/ВН каталога (TAXONOMY): загружается один раз за запуск, кандидаты — top-K на строку
+        self.taxonomy = get_taxonomy(cfg, (GN_CANDIDATES, VN_CANDIDATES))
+        self.taxonomy_top_k = getattr(cfg, "taxonomy_top_k", 10)
+        # Бюджет LLM на запуск (LLM_BUDGET_*): ценные строки запускаются первыми
+        self.llm_budget = LLMBudget.from_config(cfg)
+        # ГН/ВН семейств партномеров (PART_FAMILY); одновременно запущенные члены семейства могут промахнуться оба
+        self.part_families = PartFamilyCache.from_config(cfg)
         
-    async def _async_retry(self, coro_func, *args, attempts: int = 3, errors_list: list | None = None, tag: str = ""):
-        """Асинхронная функция retry с exponential backoff."""
-        last_exc = None
-        for i in range(1, attempts + 1):
-            try:
-                return await coro_func(*args)
-            except Exception as e:
-                last_exc = e
-                if errors_list is not None:
-                    errors_list.append(f"{tag}:{type(e).__name__}:attempt{i}")
-                if i < attempts:
-                    base = getattr(self.cfg, "backoff_base_ms", 100)
-                    max_ms = getattr(self.cfg, "backoff_max_ms", 2000)
-                    jitter = getattr(self.cfg, "backoff_jitter_ms", 100)
-                    delay_ms = min(max_ms, base * (2 ** (i - 1)))
-                    delay_ms += random.randint(0, jitter) if jitter > 0 else 0
-                    await asyncio.sleep(delay_ms / 1000.0)
-        if last_exc:
-            raise RetryExhaustedError(tag, attempts, last_exc) from last_exc
+    async def _async_retry(self, coro_func, *args, attempts: int | None = None, errors_list: list | None = None, tag: str = ""):
+        """Асинхронный вызов с повторами по политике сервиса (общая с синхронным пайплайном, см. retry.py)."""
+        check_deadline(tag, MIN_STAGE_SEC)
+        policy = self.retry_policies.get(tag.split("_", 1)[0], self.retry_policies["default"])
+        return await policy.call_async(coro_func, *args, attempts=attempts, errors_list=errors_list, tag=tag)
     
-    async def _async_http_request(self, session: aiohttp.ClientSession, method: str, url: str, 
-                                 headers: dict = None, json_data: dict = None, params: dict = None) -> dict:
-        """Выполнение HTTP запроса с обработкой ошибок."""
-        timeout = aiohttp.ClientTimeout(total=self.cfg.catalog_timeout_sec)
-        
-        async with session.request(
-            method, url, 
-            headers=headers or {}, 
-            json=json_data, 
-            params=params,
-            timeout=timeout
-        ) as response:
-            if response.status == 200:
-                return await response.json()
-            elif response.status in (201, 204):
-                return {"status": "success"}
-            else:
-                response.raise_for_status()
+    async def _async_http_request(self, session, method: str, url: str, 
+                                 headers: dict = None, json_data: dict = None, params: dict = None,
+                                 service: str = "http", endpoint: str = "") -> dict:
+        """Выполнение HTTP запроса (aiohttp или httpx, см. transport.py).
+
+        Неуспешный статус — ServiceHTTPError по классу статуса; повторяются только временные.
+        """
+        # Квота сервиса делится между полосами interactive/batch (см. scheduler.py)
+        scheduler = get_scheduler(self.cfg, service) if service in SERVICES else None
+        if scheduler is not None:
+            await scheduler.acquire_async()
+        timeouts = self.timeouts.get(service, self.timeouts["catalog"])
+        endpoint = endpoint or url.rstrip("/").rsplit("/", 1)[-1]
+        limiter = self.limiters.get(service)
+        with timeouts.observe(endpoint), limiter.observe() if limiter else nullcontext():
+            status, data = await async_request(
+                session, method, url,
+                headers=headers,
+                json_data=json_data,
+                params=params,
+                timeout_sec=timeout_for(timeouts.current(endpoint), f"{service}_{endpoint}"),
+                service=service,
+            )
+        if status == 200:
+            return data
+        if status in (201, 204):
+            return {"status": "success"}
+        return None
     
+    def _pool(self, service: str) -> EndpointPool:
+        pool = self.pools.get(service)
+        if pool is None:
+            urls = getattr(self.cfg, {"llm": "coze_api_url", "lcsc": "lcsc_api_url"}[service], "")
+            pool = self.pools[service] = EndpointPool.from_config(self.cfg, service, urls)
+        return pool
+
+    async def _async_pooled_request(self, session, method: str, path: str,
+                                    headers: dict = None, json_data: dict = None, params: dict = None,
+                                    service: str = "llm") -> dict:
+        """Запрос к реплике сервиса, выбранной пулом; каждая попытка выбирает реплику заново."""
+        with self._pool(service).use() as ep:
+            return await self._async_http_request(
+                session, method, f"{ep.url}{path}", headers, json_data, params,
+                service=service, endpoint=path.strip("/"),
+            )
+
+    async def _async_stream_search(self, session, url: str, headers: dict, params: dict) -> list | None:
+        """Потоковый поиск: чтение тела прекращается на точном партномере или по лимиту."""
+        selector = SearchSelector(params.get("partnumber", ""), getattr(self.cfg, "stream_search_max_items", 0))
+        scheduler = get_scheduler(self.cfg, "catalog")
+        if scheduler is not None:
+            await scheduler.acquire_async()
+        timeouts = self.timeouts["catalog"]
+        with timeouts.observe("search"), self.limiters["catalog"].observe():
+            status, data = await async_stream_search(
+                session, url, selector,
+                headers=headers,
+                params=params,
+                timeout_sec=timeout_for(timeouts.current("search"), "catalog_search"),
+                service="catalog",
+            )
+        return data if status == 200 else None
+
     async def _search_catalog_async(self, session: aiohttp.ClientSession, partnumber: str, errors: list[str]) -> tuple[list, bool]:
-        """Асинхронный поиск в каталоге."""
+        """Асинхронный поиск в каталоге.
+
+        404 — товар не найден; прочие сбои (RetryExhaustedError, ServiceHTTPError) уходят наружу.
+        """
         if self.cfg.use_mocks:
             # Имитация задержки для мока
             await asyncio.sleep(0.1)
@@ -72,54 +177,189 @@ class AsyncProcessingPipeline:
         try:
             url = f"{self.cfg.catalog_api_url}/products"
             params = {"partnumber": partnumber}
+            if getattr(self.cfg, "field_projection", False):
+                params["fields"] = ",".join(CATALOG_SEARCH_FIELDS)
             headers = {"Authorization": f"Bearer {self.cfg.catalog_api_key}"}
             
-            result = await self._async_retry(
-                self._async_http_request,
-                session, "GET", url, headers, None, params,
-                attempts=3, errors_list=errors, tag="catalog_search"
-            )
+            if "catalog" in self.batchers:
+                # Заявка уходит в общий пакетный поиск вместе с соседними строками
+                result = await self._submit_batched("catalog", (partnumber, errors), "catalog_search")
+            elif getattr(self.cfg, "stream_search", False):
+                result = await self._async_retry(
+                    self._async_stream_search,
+                    session, url, headers, params,
+                    errors_list=errors, tag="catalog_search"
+                )
+            else:
+                result = await self._async_retry(
+                    functools.partial(self._async_http_request, service="catalog", endpoint="search"),
+                    session, "GET", url, headers, None, params,
+                    errors_list=errors, tag="catalog_search"
+                )
             
-            found = result if isinstance(result, list) else []
+            found = order_exact_first(result, partnumber) if isinstance(result, list) else []
             return found, bool(found)
             
-        except RetryExhaustedError:
+        except NotFoundError:
             return [], False
     
-    async def _classify_llm_async(self, session: aiohttp.ClientSession, text: str, errors: list[str]) -> tuple[dict, dict, float | None]:
-        """Асинхронная классификация через LLM."""
+    async def _submit_batched(self, name: str, item, stage: str):
+        """Поставить заявку строки в сборщик ``name`` и дождаться результата.
+
+        Пакет идет без дедлайна строки, поэтому собственный дедлайн строка соблюдает при ожидании.
+        """
+        check_deadline(stage, MIN_STAGE_SEC)
+        wait = self.batchers[name].submit(item)
+        deadline = current_deadline()
+        if deadline is None:
+            return await wait
+        try:
+            return await asyncio.wait_for(wait, deadline.remaining())
+        except asyncio.TimeoutError:
+            raise DeadlineExceededError(stage, deadline.scope) from None
+    
+    async def _search_catalog_batch_async(self, session, items: list[tuple[str, list[str]]]) -> list[list]:
+        """Пакетный поиск в каталоге (POST /products/search, см. CatalogAPI.search_products).
+
+        Заявка — (партномер, errors строки): сбои пакетного вызова попадают в errors каждой строки.
+        Пакет выполняется вне дедлайна строки, начавшей его: он общий для всех строк пакета.
+        """
+        partnumbers = [pn for pn, _ in items]
+        body: dict = {"partnumbers": partnumbers}
+        if getattr(self.cfg, "field_projection", False):
+            body["fields"] = list(CATALOG_SEARCH_FIELDS)
+        headers = {"Authorization": f"Bearer {self.cfg.catalog_api_key}"}
+        batch_errors: list[str] = []
+        try:
+            with no_deadline():
+                data = await self._async_retry(
+                    functools.partial(self._async_http_request, service="catalog", endpoint="search_batch"),
+                    session, "POST", f"{self.cfg.catalog_api_url}/products/search", headers, body,
+                    errors_list=batch_errors, tag="catalog_search_batch",
+                )
+        except NotFoundError as e:
+            # 404 на пакетный эндпоинт (например, сервер его не поддерживает) — не «товара нет»:
+            # иначе все строки пакета ушли бы в LLM и создание
+            batch_errors.append("catalog_search_batch:endpoint_not_found")
+            raise ClientRequestError("catalog", 404, "batch search endpoint not found") from e
+        finally:
+            for _, errors in items:
+                errors.extend(batch_errors)
+        data = data if isinstance(data, dict) else {}
+        return [data.get(pn) or [] for pn in partnumbers]
+
+    async def _llm_request(self, session, path: str, headers: dict, payload: dict, errors: list[str], tag: str) -> dict:
+        """Запрос к LLM с повторами; при включенном кэше время вызова учитывается в ``llm_cache.llm_ms``."""
+        started = time.perf_counter()
+        try:
+            return await self._async_retry(
+                functools.partial(self._async_pooled_request, service="llm"),
+                session, "POST", path, headers, payload,
+                errors_list=errors, tag=tag
+            )
+        finally:
+            if self.llm_cache is not None:
+                self.llm_cache.counters.incr("llm_cache.llm_ms", (time.perf_counter() - started) * 1000.0)
+
+    async def _llm_batch_async(self, session, operation: str, items: list[tuple]) -> list:
+        """Пакетный вызов LLM (POST /<operation>/batch, см. LLMClientReal.normalize_batch/classify_batch).
+
+        Заявка — (текст, кандидаты ГН/ВН или None, errors строки). Заявки с одинаковыми кандидатами
+        уходят одним запросом (с разбиением по LLM_BATCH_MAX_TOKENS); сбой запроса или элемента —
+        исключение в позиции затронутых заявок, сбои пакетного вызова попадают в errors каждой строки.
+        """
+        results: list = [LLMError("not processed")] * len(items)
+        groups: dict[tuple, list[int]] = {}
+        for i, (_, candidates, _) in enumerate(items):
+            key = (tuple(candidates[0]), tuple(candidates[1])) if candidates else ()
+            groups.setdefault(key, []).append(i)
+        for key, indexes in groups.items():
+            candidates = {"gn_candidates": list(key[0]), "vn_candidates": list(key[1])} if key else {}
+            overhead = sum(estimate_tokens(c) for c in [*key[0], *key[1]]) if key else 0
+            texts = [items[i][0] for i in indexes]
+            max_tokens = getattr(self.cfg, "llm_batch_max_tokens", 4000)
+            for chunk in chunk_by_budget(texts, len(texts), max_tokens, overhead):
+                positions = [indexes[j] for j in chunk]
+                batch_errors: list[str] = []
+                try:
+                    with no_deadline():
+                        data = await self._llm_request(
+                            session, f"/{operation}/batch", self._llm_headers(),
+                            {"texts": [texts[j] for j in chunk], **candidates}, batch_errors, f"llm_{operation}_batch",
+                        )
+                    answers = data.get("results") if isinstance(data, dict) else None
+                    if not isinstance(answers, list) or len(answers) != len(chunk):
+                        raise LLMError(f"/{operation}/batch: expected {len(chunk)} results")
+                except (RetryExhaustedError, ExternalServiceError) as e:
+                    for i in positions:
+                        results[i] = e
+                    continue
+                finally:
+                    for i in positions:
+                        items[i][2].extend(batch_errors)
+                for i, answer in zip(positions, answers, strict=True):
+                    if isinstance(answer, dict) and "error" not in answer:
+                        results[i] = answer
+                    else:
+                        error = answer.get("error") if isinstance(answer, dict) else "malformed result"
+                        results[i] = LLMError(f"/{operation}/batch: {error}")
+        return results
+    
+    def _llm_headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.cfg.coze_api_key}", "Content-Type": "application/json"}
+
+    def _candidates(self, text: str, category: str) -> tuple[list[str], list[str]]:
+        if self.taxonomy is None:
+            return GN_CANDIDATES, VN_CANDIDATES
+        return self.taxonomy.candidates(text, category, self.taxonomy_top_k)
+    
+    async def _classify_llm_async(
+        self, session: aiohttp.ClientSession, text: str, errors: list[str], category: str = ""
+    ) -> tuple[dict, dict | None, float | None]:
+        """Асинхронная классификация через LLM: (enriched, attrs_norm, confidence).
+
+        Нормализация откладывается до пути создания (``attrs_norm`` — None, см.
+        ``_normalize_llm_async``); в режиме analyze атрибуты приходят тем же ответом.
+        """
+        gn_candidates, vn_candidates = self._candidates(text, category)
         if self.cfg.use_mocks:
+            self._spend_llm(text, gn_candidates, vn_candidates)
             # Имитация задержки для мока
             await asyncio.sleep(0.2)
             return {"gn": "ГН1", "vn": "ВН1"}, {"category": "test"}, 0.85
             
         try:
-            # Нормализация
-            norm_url = f"{self.cfg.coze_api_url}/normalize"
-            norm_payload = {"text": text}
-            headers = {"Authorization": f"Bearer {self.cfg.coze_api_key}", "Content-Type": "application/json"}
-            
-            norm_result = await self._async_retry(
-                self._async_http_request,
-                session, "POST", norm_url, headers, norm_payload,
-                attempts=3, errors_list=errors, tag="llm_normalize"
-            )
+            candidates = {"gn_candidates": gn_candidates, "vn_candidates": vn_candidates}
+            cache = self.llm_cache
+            attrs_norm = None
             
-            attrs_norm = norm_result.get("attrs", {})
-            
-            # Классификация
-            classif_url = f"{self.cfg.coze_api_url}/classify"
-            classif_payload = {
-                "text": text,
-                "gn_candidates": ["ГН1", "ГН2", "ГН3"],
-                "vn_candidates": ["ВН1", "ВН2", "ВН3"]
-            }
-            
-            classif_result = await self._async_retry(
-                self._async_http_request,
-                session, "POST", classif_url, headers, classif_payload,
-                attempts=3, errors_list=errors, tag="llm_classify"
-            )
+            if getattr(self.cfg, "llm_analyze", False):
+                # Нормализация и классификация одним запросом
+                classif_result = cache.get_analysis(text, gn_candidates, vn_candidates) if cache else None
+                if classif_result is None:
+                    self._spend_llm(text, gn_candidates, vn_candidates)
+                    classif_result = await self._llm_request(
+                        session, "/analyze", self._llm_headers(), {"text": text, **candidates}, errors, "llm_analyze"
+                    )
+                    if cache:
+                        cache.put_analysis(text, classif_result, gn_candidates, vn_candidates)
+                attrs_norm = classif_result.get("attrs", {})
+            else:
+                classif_result = cache.get_classification(text, gn_candidates, vn_candidates) if cache else None
+                if classif_result is None and "llm_classify" in self.batchers:
+                    self._spend_llm(text, gn_candidates, vn_candidates)
+                    classif_result = await self._submit_batched(
+                        "llm_classify", (text, (gn_candidates, vn_candidates), errors), "llm_classify"
+                    )
+                    if cache:
+                        cache.put_classification(text, classif_result, gn_candidates, vn_candidates)
+                elif classif_result is None:
+                    self._spend_llm(text, gn_candidates, vn_candidates)
+                    classif_result = await self._llm_request(
+                        session, "/classify", self._llm_headers(), {"text": text, **candidates}, errors, "llm_classify"
+                    )
+                    if cache:
+                        cache.put_classification(text, classif_result, gn_candidates, vn_candidates)
             
             confidence = classif_result.get("confidence", 0.0)
             
@@ -134,76 +374,177 @@ class AsyncProcessingPipeline:
             
             return enriched, attrs_norm, confidence
             
-        except RetryExhaustedError as e:
+        except (RetryExhaustedError, ExternalServiceError) as e:
             errors.append(f"llm:{type(e).__name__}")
-            return {}, {}, None
+            return {}, None, None
+    
+    def _spend_llm(self, text: str, *candidates: list[str]) -> None:
+        """Списать запрос к LLM из бюджета запуска (только промахи кэша; LLMBudgetExhaustedError — исчерпан)."""
+        if self.llm_budget is not None:
+            self.llm_budget.spend(text, *candidates)
+    
+    async def _normalize_llm_async(self, session, text: str, errors: list[str]) -> dict:
+        """Нормализация через LLM — только для строк, которые будут созданы."""
+        if self.cfg.use_mocks:
+            self._spend_llm(text)
+            # Имитация задержки для мока; строки из таблицы категорий и семейств тоже доходят сюда
+            await asyncio.sleep(0.1)
+            return LLMMock(seed=getattr(self.cfg, "seed", 42)).normalize(text).get("attrs", {}) if LLMMock else {}
+        cache = self.llm_cache
+        try:
+            norm_result = cache.get_normalization(text) if cache else None
+            if norm_result is None:
+                self._spend_llm(text)
+                if "llm_normalize" in self.batchers:
+                    norm_result = await self._submit_batched("llm_normalize", (text, None, errors), "llm_normalize")
+                else:
+                    norm_result = await self._llm_request(
+                        session, "/normalize", self._llm_headers(), {"text": text}, errors, "llm_normalize"
+                    )
+                if cache:
+                    cache.put_normalization(text, norm_result)
+            return norm_result.get("attrs", {})
+        except (RetryExhaustedError, ExternalServiceError) as e:
+            errors.append(f"llm:{type(e).__name__}")
+            return {}
     
     async def _process_single_row_async(self, session: aiohttp.ClientSession, row: dict) -> dict:
         """Асинхронная обработка одной строки данных."""
-        async with self.semaphore:  # Ограничение параллельных запросов
-            part = str(row.get("partnumber", "")).strip()
-            brand = str(row.get("brand", "")).strip()
-            
-            if not part:
-                row.update({"status": "skip", "reason": "no_partnumber"})
-                return row
-            
-            decision = {"action": "skip", "reason": "no_partnumber"}
-            enriched = {}
-            found_flag = False
-            confidence_val = None
-            attrs_norm: dict = {}
-            errors: list[str] = []
-            
-            # 1. Поиск в каталоге
-            found, found_flag = await self._search_catalog_async(session, part, errors)
-            
-            if found:
-                # Товар найден в каталоге
-                decision = {"action": "skip", "reason": "already_present"}
-            else:
-                # 2. Классификация LLM
-                text = f"{part} {brand}".strip()
-                enriched, attrs_norm, confidence_val = await self._classify_llm_async(session, text, errors)
-                
-                if confidence_val is not None and confidence_val < self.cfg.confidence_threshold:
-                    decision = {"action": "skip", "reason": "low_confidence"}
-                else:
-                    decision = {"action": "create", "reason": "not_found"}
-            
-            # Формирование результата
-            row.update({
-                "status": decision["action"],
-                "action": decision["action"],
-                "reason": decision["reason"],
-                "found_in_catalog": found_flag,
-                "confidence": confidence_val if confidence_val is not None else "",
-                "attrs_norm": json.dumps(attrs_norm, ensure_ascii=False) if attrs_norm else "",
-                "errors": ";".join(errors) if errors else "",
-                **enriched,
-            })
-            
+        part = str(row.get("partnumber", "")).strip()
+        brand = str(row.get("brand", "")).strip()
+        
+        if not part:
+            row.update({"status": "skip", "reason": "no_partnumber"})
             return row
-    
+        
+        decision = {"action": "skip", "reason": "no_partnumber"}
+        enriched = {}
+        found_flag = False
+        confidence_val = None
+        attrs_norm: dict = {}
+        category = str(row.get("category", "")).strip()
+        gn_vn_source = family_key = ""
+        errors: list[str] = []
+        
+        # Дедлайн строки задается внутри задачи: у каждой задачи gather свой контекст
+        with deadline_scope(getattr(self.cfg, "row_deadline_sec", 0)):
+            try:
+                # 1. Поиск в каталоге
+                lookup_error = None
+                try:
+                    async with self.limiters["catalog"].slot():
+                        found, found_flag = await self._search_catalog_async(session, part, errors)
+                except (RetryExhaustedError, ExternalServiceError) as e:
+                    found, lookup_error = [], e
+
+                if lookup_error is not None:
+                    # Наличие товара неизвестно — без LLM и создания (см. ProcessingPipeline)
+                    decision = {"action": "error", "reason": catalog_error_reason(lookup_error)}
+                elif found:
+                    # Товар найден в каталоге
+                    decision = {"action": "skip", "reason": "already_present"}
+                else:
+                    # 2. Классификация: таблица категорий, семейство партномера, для остальных — LLM
+                    text = f"{part} {brand}".strip()
+                    mapped = self.gn_vn_mapping.lookup(category, brand) if self.gn_vn_mapping else None
+                    family = None
+                    if not mapped and self.part_families is not None:
+                        family_key, family = self.part_families.lookup(part, brand)
+                    if mapped:
+                        enriched, attrs_norm, gn_vn_source = mapped, None, SOURCE_MAPPING
+                    elif family is not None:
+                        enriched = {"gn": family["gn"], "vn": family["vn"]}
+                        attrs_norm, confidence_val, gn_vn_source = None, family["confidence"], SOURCE_FAMILY
+                    else:
+                        async with self.limiters["llm"].slot():
+                            enriched, attrs_norm, confidence_val = await self._classify_llm_async(session, text, errors, category)
+                        gn_vn_source = SOURCE_LLM if enriched else ""
+                        if self.part_families is not None:
+                            self.part_families.record(family_key, part, enriched, confidence_val)
+
+                    if confidence_val is not None and confidence_val < self.cfg.confidence_threshold:
+                        decision = {"action": "skip", "reason": "low_confidence"}
+                        if attrs_norm is None:
+                            # Нормализация не понадобилась: строка не создается
+                            get_runtime_counters().incr("llm.normalize_avoided")
+                    else:
+                        decision = {"action": "create", "reason": "not_found"}
+                        if attrs_norm is None:
+                            async with self.limiters["llm"].slot():
+                                attrs_norm = await self._normalize_llm_async(session, text, errors)
+            except LLMBudgetExhaustedError as e:
+                decision = {"action": "skip", "reason": LLM_BUDGET_REASON}
+                errors.append(f"llm_budget:{e.resource}")
+            except DeadlineExceededError as e:
+                decision = {"action": "error", "reason": DEADLINE_REASON}
+                errors.append(f"deadline:{e.scope}:{e.stage}")
+
+        # Формирование результата
+        row.update({
+            "status": decision["action"],
+            "action": decision["action"],
+            "reason": decision["reason"],
+            "found_in_catalog": found_flag,
+            "category": category,
+            "gn_vn_source": gn_vn_source,
+            "part_family": family_key,
+            "confidence": confidence_val if confidence_val is not None else "",
+            "attrs_norm": dumps_report(attrs_norm) if attrs_norm else "",
+            "errors": ";".join(errors) if errors else "",
+            **enriched,
+        })
+        
+        return row
+
     async def process_batch_async(self, rows: List[dict]) -> List[dict]:
         """Асинхронная обработка пакета строк."""
         if not rows:
             return []
         
-        self.log.info("[async_pipeline] Starting async processing of %d rows with max_concurrent=%d", 
-                     len(rows), self.max_concurrent)
+        self.log.info(
+            "[async_pipeline] Starting async processing of %d rows with limits %s",
+            len(rows), {name: lim.limit for name, lim in self.limiters.items()},
+        )
         
         start_time = time.time()
         
-        async with aiohttp.ClientSession() as session:
-            # Создаем задачи для всех строк
+        session_ctx = open_async_session(
+            self.http_transport, max_connections=getattr(self.cfg, "http2_max_connections", 4)
+        )
+        async with session_ctx as session:
+            if not self.cfg.use_mocks:
+                batchers = {
+                    "catalog": MicroBatcher.from_config(
+                        self.cfg, "catalog", functools.partial(self._search_catalog_batch_async, session)
+                    ),
+                    # LLM_BATCH_SIZE > 1: промахи кэша уходят в /classify/batch и /normalize/batch
+                    **{
+                        f"llm_{operation}": MicroBatcher.from_config(
+                            self.cfg, "llm", functools.partial(self._llm_batch_async, session, operation),
+                            name=f"llm_{operation}",
+                        )
+                        for operation in ("classify", "normalize")
+                    },
+                }
+                self.batchers = {name: b for name, b in batchers.items() if b is not None}
+            # Создаем задачи для всех строк; при бюджете LLM ценные строки встают в очередь первыми
+            order = prioritize(rows) if self.llm_budget is not None else list(range(len(rows)))
             tasks = [
-                self._process_single_row_async(session, row.copy()) 
-                for row in rows
+                self._process_single_row_async(session, rows[i].copy()) 
+                for i in order
             ]
             
             # Выполняем все задачи параллельно
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+            results = [None] * len(rows)
+            for i, result in zip(order, await asyncio.gather(*tasks, return_exceptions=True), strict=True):
+                results[i] = result
+            for name, batcher in self.batchers.items():
+                await batcher.drain()
+                self.log.info(
+                    "[async_pipeline] %s batching: batches=%d items=%d fill=%.2f",
+                    name, batcher.batches, batcher.items, batcher.fill_ratio(),
+                )
+            self.batchers = {}
             
             # Обрабатываем результаты и исключения
             processed_results = []
@@ -223,6 +564,13 @@ class AsyncProcessingPipeline:
         elapsed = time.time() - start_time
         self.log.info("[async_pipeline] Completed processing %d rows in %.2f seconds (%.4f sec/row)", 
                      len(rows), elapsed, elapsed / len(rows))
+        for name, limiter in self.limiters.items():
+            stats = limiter.get_stats()
+            if stats["acquired"]:
+                self.log.info(
+                    "[async_pipeline] %s: limit=%d calls=%d queue_wait avg=%.1fms max=%.1fms",
+                    name, stats["limit"], stats["acquired"], stats["wait_avg_ms"], stats["wait_max_ms"],
+                )
         
         return processed_results
 
@@ -232,6 +580,8 @@ async def process_rows_async(data: list, cfg: Config, max_concurrent: int = 10)
     if not data:
         return []
     
+    # Бюджет повторов — на запуск: в долгоживущем процессе (UI) не наследуется от прошлого запуска
+    reset_retry_budget(cfg)
     pipeline = AsyncProcessingPipeline(cfg, max_concurrent)
     return await pipeline.process_batch_async(data)
 
@@ -0,0 +1,211 @@
+"""Балансировка запросов между репликами сервиса (LLM- и LCSC-прокси).
+
+``EndpointPool`` выбирает реплику по числу запросов в полете (least outstanding) или по
+взвешенной задержке (``latency``: EWMA задержки × (запросов в полете + 1)). Реплика, не
+ответившая ``eject_failures`` раз подряд (транспортные ошибки и 5xx), временно исключается
+на ``eject_sec``. Исключенную реплику фоновый таймер проверяет запросом ``probe`` и
+возвращает в пул после успешной проверки; без ``probe`` по истечении ``eject_sec`` реплика
+получает одну пробную заявку (half-open).
+
+Пул потокобезопасен и не блокирует: один и тот же ``use()`` годится и для синхронных
+клиентов, и вокруг ``await`` в асинхронном пайплайне.
+"""
+from __future__ import annotations
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Sequence
+
+import requests
+
+from exceptions import DeadlineExceededError
+from logger import get_logger
+from metrics import RuntimeCounters, get_runtime_counters
+
+VALID_STRATEGIES = ("least_outstanding", "latency")
+
+# Вес нового наблюдения в EWMA задержки реплики
+_EWMA_ALPHA = 0.3
+
+
+def split_urls(value: str | Sequence[str] | None) -> list[str]:
+    """Список адресов реплик из строки через запятую или последовательности."""
+    if not value:
+        return []
+    items = value.split(",") if isinstance(value, str) else value
+    return [u.strip().rstrip("/") for u in items if u and u.strip()]
+
+
+class Endpoint:
+    """Реплика сервиса и ее текущее состояние."""
+
+    def __init__(self, url: str, index: int):
+        self.url = url
+        self.index = index
+        self.outstanding = 0
+        self.latency_ewma: float | None = None
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.probing = False
+        self.requests = 0
+
+    def healthy(self, now: float) -> bool:
+        return self.ejected_until <= now and not self.probing
+
+    def score(self, strategy: str) -> float:
+        if strategy == "latency":
+            # Без наблюдений реплика считается быстрой, чтобы получить первые запросы
+            return (self.latency_ewma or 0.0) * (self.outstanding + 1)
+        return float(self.outstanding)
+
+
+class EndpointPool:
+    """Пул реплик одного сервиса с выбором реплики и временным исключением сбойных."""
+
+    def __init__(
+        self,
+        name: str,
+        urls: str | Sequence[str],
+        *,
+        strategy: str = "least_outstanding",
+        eject_failures: int = 3,
+        eject_sec: float = 30.0,
+        probe: Callable[[str], bool] | None = None,
+        counters: RuntimeCounters | None = None,
+    ):
+        urls = split_urls(urls)
+        if not urls:
+            raise ValueError(f"{name}: at least one endpoint URL is required")
+        if strategy not in VALID_STRATEGIES:
+            raise ValueError(f"{name}: unknown balancing strategy {strategy!r}")
+        self.name = name
+        self.endpoints = [Endpoint(url, i) for i, url in enumerate(urls)]
+        self.strategy = strategy
+        self.eject_failures = max(1, int(eject_failures))
+        self.eject_sec = max(0.0, float(eject_sec))
+        self.probe = probe
+        self.counters = counters or get_runtime_counters()
+        self.log = get_logger("balancer")
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, cfg, service: str, urls: str | Sequence[str], http=None) -> "EndpointPool":
+        """Пул по ``LB_*``; проверка реплик — GET ``<url><LB_PROBE_PATH>`` (пустой путь — half-open)."""
+        probe_path = getattr(cfg, "lb_probe_path", "/health")
+        probe = None
+        if probe_path:
+            client = http or requests
+
+            def probe(url: str) -> bool:
+                # Любой ответ кроме 5xx — реплика принимает соединения
+                return client.get(f"{url}{probe_path}", timeout=2.0).status_code < 500
+
+        return cls(
+            service,
+            urls,
+            strategy=getattr(cfg, "lb_strategy", "least_outstanding"),
+            eject_failures=getattr(cfg, "lb_eject_failures", 3),
+            eject_sec=getattr(cfg, "lb_eject_sec", 30.0),
+            probe=probe,
+        )
+
+    @property
+    def urls(self) -> list[str]:
+        return [ep.url for ep in self.endpoints]
+
+    def choose(self) -> Endpoint:
+        """Выбрать реплику (без учета запроса в полете; см. ``use``)."""
+        with self._lock:
+            return self._choose_locked(time.monotonic())
+
+    def _choose_locked(self, now: float) -> Endpoint:
+        candidates = [ep for ep in self.endpoints if ep.healthy(now)]
+        if not candidates:
+            # Все реплики исключены — лучше попытаться, чем отказать: берем ту, что вернется раньше
+            return min(self.endpoints, key=lambda ep: ep.ejected_until)
+        best = min(ep.score(self.strategy) for ep in candidates)
+        return random.choice([ep for ep in candidates if ep.score(self.strategy) == best])
+
+    @contextmanager
+    def use(self) -> Iterator[Endpoint]:
+        """Занять реплику на время запроса; исход и задержка учитываются при выходе из блока.
+
+        Ошибки с ``retryable = False`` (отказ 4xx) не считаются сбоем реплики. Дедлайн и отмена
+        вызывающей стороной (``CancelledError``, ``GeneratorExit``) нейтральны: реплика просто
+        освобождается, без учета задержки и сбоя.
+        """
+        with self._lock:
+            ep = self._choose_locked(time.monotonic())
+            ep.outstanding += 1
+            ep.requests += 1
+        self.counters.incr(f"lb.{self.name}.ep{ep.index}.requests")
+        started = time.perf_counter()
+        try:
+            yield ep
+        except DeadlineExceededError:
+            self._release(ep, None, ok=None)
+            raise
+        except Exception as e:
+            self._release(ep, time.perf_counter() - started, ok=getattr(e, "retryable", True) is False)
+            raise
+        except BaseException:
+            self._release(ep, None, ok=None)
+            raise
+        self._release(ep, time.perf_counter() - started, ok=True)
+
+    def _release(self, ep: Endpoint, latency: float | None, ok: bool | None) -> None:
+        """Освободить реплику; ``ok=None`` — исход нейтральный (задержка и сбой не учитываются)."""
+        with self._lock:
+            ep.outstanding -= 1
+            if ok is None:
+                return
+            ep.latency_ewma = latency if ep.latency_ewma is None else (
+                _EWMA_ALPHA * latency + (1 - _EWMA_ALPHA) * ep.latency_ewma
+            )
+            if ok:
+                ep.consecutive_failures = 0
+                return
+            ep.consecutive_failures += 1
+            if ep.consecutive_failures < self.eject_failures or ep.ejected_until > time.monotonic():
+                return
+            ep.ejected_until = time.monotonic() + self.eject_sec
+            ep.probing = self.probe is not None
+        self.counters.incr(f"lb.{self.name}.ejections")
+        self.log.warning("[lb] %s: ejected %s for %.0fs", self.name, ep.url, self.eject_sec)
+        if self.probe is not None:
+            self._schedule_probe(ep)
+
+    def _schedule_probe(self, ep: Endpoint) -> None:
+        timer = threading.Timer(self.eject_sec, self._run_probe, args=(ep,))
+        timer.daemon = True
+        timer.start()
+
+    def _run_probe(self, ep: Endpoint) -> None:
+        try:
+            alive = bool(self.probe(ep.url))
+        except Exception:
+            alive = False
+        if not alive:
+            self._schedule_probe(ep)
+            return
+        with self._lock:
+            ep.probing = False
+            ep.ejected_until = 0.0
+            ep.consecutive_failures = 0
+        self.counters.incr(f"lb.{self.name}.readmitted")
+        self.log.info("[lb] %s: readmitted %s", self.name, ep.url)
+
+    def get_stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                ep.url: {
+                    "requests": ep.requests,
+                    "outstanding": ep.outstanding,
+                    "latency_ewma_ms": (ep.latency_ewma or 0.0) * 1000.0,
+                    "healthy": ep.healthy(now),
+                }
+                for ep in self.endpoints
+            }
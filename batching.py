@@ -0,0 +1,119 @@
+"""Микро-пакетирование поштучных вызовов внешних сервисов.
+
+Код строк по-прежнему вызывает ``await batcher.submit(item)`` и получает свой результат;
+``MicroBatcher`` копит заявки в течение ``window_ms`` или до ``max_batch`` штук и
+отправляет их одним пакетным вызовом ``batch_fn(items)``, затем раздает результаты.
+
+``batch_fn`` возвращает список результатов в порядке заявок. Элемент-исключение — сбой
+только этой заявки; исключение самого ``batch_fn`` получают все заявки пакета.
+Заполнение пакетов пишется в счетчики запуска (``batch.<name>.*``).
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Sequence
+
+from metrics import RuntimeCounters, get_runtime_counters
+
+BatchFn = Callable[[list], Awaitable[Sequence[Any]]]
+
+
+class MicroBatcher:
+    """Асинхронный сборщик заявок в пакеты по окну времени и размеру."""
+
+    def __init__(
+        self,
+        name: str,
+        batch_fn: BatchFn,
+        *,
+        window_ms: float = 20.0,
+        max_batch: int = 50,
+        counters: RuntimeCounters | None = None,
+    ):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.window_sec = max(0.0, float(window_ms)) / 1000.0
+        self.max_batch = max(1, int(max_batch))
+        self.counters = counters or get_runtime_counters()
+        self._pending: list[tuple[Any, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self.batches = 0
+        self.items = 0
+
+    @classmethod
+    def from_config(cls, cfg, service: str, batch_fn: BatchFn, name: str = "") -> "MicroBatcher | None":
+        """Сборщик по ``<service>_batch_size``/``<service>_batch_window_ms``; None — пакетирование выключено.
+
+        ``name`` — имя сборщика в счетчиках (по умолчанию — имя сервиса), если у сервиса их несколько.
+        """
+        size = getattr(cfg, f"{service}_batch_size", 0)
+        if not size or size <= 1:
+            return None
+        window_ms = getattr(cfg, f"{service}_batch_window_ms", 20.0)
+        return cls(name or service, batch_fn, window_ms=window_ms, max_batch=size)
+
+    async def submit(self, item: Any) -> Any:
+        """Поставить заявку в текущий пакет и дождаться ее результата."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_sec, self._flush)
+        return await future
+
+    async def drain(self) -> None:
+        """Отправить накопленное и дождаться завершения всех пакетов."""
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending[: self.max_batch], self._pending[self.max_batch:]
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        if self._pending:
+            self._flush()
+
+    async def _run(self, batch: list[tuple[Any, asyncio.Future]]) -> None:
+        self._on_batch(len(batch))
+        try:
+            results = await self.batch_fn([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        if len(results) != len(batch):
+            error = ValueError(f"{self.name}: batch returned {len(results)} results for {len(batch)} items")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for (_, future), result in zip(batch, results, strict=True):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def _on_batch(self, size: int) -> None:
+        self.batches += 1
+        self.items += size
+        prefix = f"batch.{self.name}"
+        self.counters.incr(f"{prefix}.batches")
+        self.counters.incr(f"{prefix}.items", size)
+        self.counters.set(f"{prefix}.fill_ratio", self.fill_ratio())
+
+    def fill_ratio(self) -> float:
+        """Средняя заполненность пакетов относительно ``max_batch`` (0..1)."""
+        return self.items / (self.batches * self.max_batch) if self.batches else 0.0
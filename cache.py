@@ -3,11 +3,28 @@ from __future__ import annotations
 
 import hashlib
 import pickle
+import threading
 import time
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Sequence
 
 from logger import get_logger
+from metrics import RuntimeCounters, get_runtime_counters
+from serialization import dumps_bytes, loads
+
+# Первый байт pickle-потока (протокол >= 2); JSON-записи начинаются с печатного символа
+_PICKLE_MARKER = b"\x80"
+
+
+def _is_json_native(value: Any) -> bool:
+    """Значение без потерь представимо в JSON (dict со str-ключами, list, скаляры)."""
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return True
+    if isinstance(value, list):
+        return all(_is_json_native(v) for v in value)
+    if isinstance(value, dict):
+        return all(isinstance(k, str) and _is_json_native(v) for k, v in value.items())
+    return False
 
 
 class LRUCache:
@@ -56,8 +73,8 @@ class PersistentCache:
         self.max_age_seconds = max_age_hours * 3600
         self.log = get_logger("cache")
         
-        # Создаем директорию кэша
-        self.cache_dir.mkdir(exist_ok=True)
+        # Создаем директорию кэша (вместе с родительскими: по умолчанию cache/llm)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
     
     def _get_cache_path(self, key: str) -> Path:
         """Получить путь к файлу кэша для ключа."""
@@ -82,9 +99,11 @@ class PersistentCache:
         
         try:
             with open(cache_path, 'rb') as f:
-                data = pickle.load(f)
-                self.log.debug("[cache] Hit for key: %s", key[:50])
-                return data
+                raw = f.read()
+            # JSON-записи (быстрый путь) или pickle для произвольных объектов
+            data = pickle.loads(raw) if raw[:1] == _PICKLE_MARKER else loads(raw)
+            self.log.debug("[cache] Hit for key: %s", key[:50])
+            return data
         except Exception as e:
             self.log.warning("[cache] Failed to load cache for key %s: %s", key[:50], e)
             return None
@@ -94,9 +113,10 @@ class PersistentCache:
         cache_path = self._get_cache_path(key)
         
         try:
+            raw = dumps_bytes(value) if _is_json_native(value) else pickle.dumps(value)
             with open(cache_path, 'wb') as f:
-                pickle.dump(value, f)
-                self.log.debug("[cache] Stored key: %s", key[:50])
+                f.write(raw)
+            self.log.debug("[cache] Stored key: %s", key[:50])
         except Exception as e:
             self.log.warning("[cache] Failed to store cache for key %s: %s", key[:50], e)
     
@@ -131,72 +151,117 @@ class PersistentCache:
 
 
 class LLMCache:
-    """Специализированный кэш для LLM результатов."""
+    """Специализированный кэш для LLM результатов.
+
+    Ключ — нормализованный текст, операция, версия модели/промптов (``version``) и, для
+    классификации, набор кандидатов ГН/ВН: смена модели или справочника не отдает старые ответы.
+    Попадания, промахи и время поиска пишутся в счетчики запуска (``llm_cache.*``).
+    """
     
-    def __init__(self, memory_cache_size: int = 500, cache_dir: str = "cache/llm", max_age_hours: int = 168):
+    def __init__(
+        self,
+        memory_cache_size: int = 500,
+        cache_dir: str = "cache/llm",
+        max_age_hours: int = 168,
+        version: str = "",
+        counters: RuntimeCounters | None = None,
+    ):
         self.memory_cache = LRUCache(memory_cache_size)
         self.disk_cache = PersistentCache(cache_dir, max_age_hours)  # 7 дней по умолчанию
+        self.version = version
+        self.counters = counters or get_runtime_counters()
         self.log = get_logger("llm_cache")
+        self._lock = threading.Lock()
     
-    def _normalize_key(self, text: str, operation: str = "classify") -> str:
+    def _normalize_key(self, text: str, operation: str = "classify", context: str = "") -> str:
         """Нормализовать ключ для кэширования."""
         # Приводим к нижнему регистру и убираем лишние пробелы
         normalized_text = " ".join(text.lower().split())
-        return f"{operation}:{normalized_text}"
+        key = f"{operation}:{normalized_text}"
+        if self.version:
+            key += f"|v={self.version}"
+        return f"{key}|{context}" if context else key
     
-    def get_classification(self, text: str) -> Optional[Dict[str, Any]]:
-        """Получить результат классификации из кэша."""
-        key = self._normalize_key(text, "classify")
-        
+    @staticmethod
+    def _candidates_context(gn_candidates: Optional[Sequence[str]], vn_candidates: Optional[Sequence[str]]) -> str:
+        """Отпечаток набора кандидатов ГН/ВН (порядок не важен)."""
+        if not gn_candidates and not vn_candidates:
+            return ""
+        raw = "\x1f".join(sorted(gn_candidates or ())) + "\x1e" + "\x1f".join(sorted(vn_candidates or ()))
+        return "c=" + hashlib.sha1(raw.encode()).hexdigest()[:16]
+    
+    def _get(self, key: str, operation: str) -> Optional[Dict[str, Any]]:
+        started = time.perf_counter()
         # Сначала проверяем память
-        result = self.memory_cache.get(key)
-        if result is not None:
-            self.log.debug("[llm_cache] Memory hit for text: %s", text[:50])
-            return result
-        
-        # Затем проверяем диск
-        result = self.disk_cache.get(key)
-        if result is not None:
-            # Загружаем в память для быстрого доступа
-            self.memory_cache.put(key, result)
-            self.log.debug("[llm_cache] Disk hit for text: %s", text[:50])
-            return result
-        
-        self.log.debug("[llm_cache] Miss for text: %s", text[:50])
-        return None
+        with self._lock:
+            result = self.memory_cache.get(key)
+        if result is None:
+            # Затем проверяем диск и загружаем в память для быстрого доступа
+            result = self.disk_cache.get(key)
+            if result is not None:
+                with self._lock:
+                    self.memory_cache.put(key, result)
+        self.counters.incr("llm_cache.lookup_ms", (time.perf_counter() - started) * 1000.0)
+        outcome = "hits" if result is not None else "misses"
+        self.counters.incr(f"llm_cache.{outcome}")
+        self.counters.incr(f"llm_cache.{operation}.{outcome}")
+        self.log.debug("[llm_cache] %s %s for key: %s", operation, outcome[:-1], key[:50])
+        return result
     
-    def put_classification(self, text: str, result: Dict[str, Any]) -> None:
-        """Сохранить результат классификации в кэш."""
-        key = self._normalize_key(text, "classify")
-        
+    def _put(self, key: str, result: Dict[str, Any]) -> None:
         # Сохраняем в оба кэша
-        self.memory_cache.put(key, result)
+        with self._lock:
+            self.memory_cache.put(key, result)
         self.disk_cache.put(key, result)
-        
+    
+    def get_classification(
+        self,
+        text: str,
+        gn_candidates: Optional[Sequence[str]] = None,
+        vn_candidates: Optional[Sequence[str]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Получить результат классификации из кэша."""
+        key = self._normalize_key(text, "classify", self._candidates_context(gn_candidates, vn_candidates))
+        return self._get(key, "classify")
+    
+    def put_classification(
+        self,
+        text: str,
+        result: Dict[str, Any],
+        gn_candidates: Optional[Sequence[str]] = None,
+        vn_candidates: Optional[Sequence[str]] = None,
+    ) -> None:
+        """Сохранить результат классификации в кэш."""
+        self._put(self._normalize_key(text, "classify", self._candidates_context(gn_candidates, vn_candidates)), result)
         self.log.debug("[llm_cache] Stored classification for text: %s", text[:50])
     
+    def get_analysis(
+        self,
+        text: str,
+        gn_candidates: Optional[Sequence[str]] = None,
+        vn_candidates: Optional[Sequence[str]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Получить результат совмещенного вызова analyze из кэша."""
+        key = self._normalize_key(text, "analyze", self._candidates_context(gn_candidates, vn_candidates))
+        return self._get(key, "analyze")
+    
+    def put_analysis(
+        self,
+        text: str,
+        result: Dict[str, Any],
+        gn_candidates: Optional[Sequence[str]] = None,
+        vn_candidates: Optional[Sequence[str]] = None,
+    ) -> None:
+        """Сохранить результат analyze в кэш."""
+        self._put(self._normalize_key(text, "analyze", self._candidates_context(gn_candidates, vn_candidates)), result)
+    
     def get_normalization(self, text: str) -> Optional[Dict[str, Any]]:
         """Получить результат нормализации из кэша."""
-        key = self._normalize_key(text, "normalize")
-        
-        result = self.memory_cache.get(key)
-        if result is not None:
-            return result
-        
-        result = self.disk_cache.get(key)
-        if result is not None:
-            self.memory_cache.put(key, result)
-            return result
-        
-        return None
+        return self._get(self._normalize_key(text, "normalize"), "normalize")
     
     def put_normalization(self, text: str, result: Dict[str, Any]) -> None:
         """Сохранить результат нормализации в кэш."""
-        key = self._normalize_key(text, "normalize")
-        
-        self.memory_cache.put(key, result)
-        self.disk_cache.put(key, result)
-        
+        self._put(self._normalize_key(text, "normalize"), result)
         self.log.debug("[llm_cache] Stored normalization for text: %s", text[:50])
     
     def get_stats(self) -> Dict[str, Any]:
@@ -219,13 +284,103 @@ class LLMCache:
         self.log.info("[llm_cache] Cleared all caches")
 
 
-# Глобальный экземпляр кэша
+class CachedLLMClient:
+    """LLM-клиент с кэшем ответов ``normalize``/``classify``/``analyze``; прочие атрибуты — от исходного клиента.
+
+    Время вызовов LLM при промахах копится в ``llm_cache.llm_ms``: по нему видно, сколько
+    стоил бы каждый промах, превращенный в попадание.
+    """
+
+    def __init__(self, client: Any, cache: LLMCache):
+        self._client = client
+        self.cache = cache
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+    def _call(self, fn, *args) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.cache.counters.incr("llm_cache.llm_ms", (time.perf_counter() - started) * 1000.0)
+
+    def normalize(self, text: str) -> Dict[str, Any]:
+        cached = self.cache.get_normalization(text)
+        if cached is not None:
+            return cached
+        result = self._call(self._client.normalize, text)
+        self.cache.put_normalization(text, result)
+        return result
+
+    def classify(self, gn_candidates: list[str], vn_candidates: list[str], text: str) -> Dict[str, Any]:
+        cached = self.cache.get_classification(text, gn_candidates, vn_candidates)
+        if cached is not None:
+            return cached
+        result = self._call(self._client.classify, gn_candidates, vn_candidates, text)
+        self.cache.put_classification(text, result, gn_candidates, vn_candidates)
+        return result
+
+    def analyze(self, text: str, gn_candidates: list[str], vn_candidates: list[str]) -> Dict[str, Any]:
+        cached = self.cache.get_analysis(text, gn_candidates, vn_candidates)
+        if cached is not None:
+            return cached
+        result = self._call(self._client.analyze, text, gn_candidates, vn_candidates)
+        self.cache.put_analysis(text, result, gn_candidates, vn_candidates)
+        return result
+
+    def _batch(self, texts: Sequence[str], lookup, call, store) -> list:
+        """Пакетный вызов только для промахов; ответы кэша и LLM собираются в исходном порядке."""
+        results: list = [lookup(text) for text in texts]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            fresh = self._call(call, [texts[i] for i in missing])
+            for i, result in zip(missing, fresh, strict=True):
+                results[i] = result
+                if not isinstance(result, Exception):
+                    store(texts[i], result)
+        return results
+
+    def normalize_batch(self, texts: Sequence[str]) -> list:
+        return self._batch(
+            texts, self.cache.get_normalization, self._client.normalize_batch, self.cache.put_normalization
+        )
+
+    def classify_batch(self, items: Sequence[str], gn_candidates: list[str], vn_candidates: list[str]) -> list:
+        return self._batch(
+            items,
+            lambda text: self.cache.get_classification(text, gn_candidates, vn_candidates),
+            lambda texts: self._client.classify_batch(texts, gn_candidates, vn_candidates),
+            lambda text, result: self.cache.put_classification(text, result, gn_candidates, vn_candidates),
+        )
+
+
+# Глобальный экземпляр кэша и параметры, с которыми он создан
 _llm_cache: Optional[LLMCache] = None
+_llm_cache_params: Optional[tuple] = None
 
 
-def get_llm_cache() -> LLMCache:
-    """Получить глобальный экземпляр LLM кэша."""
-    global _llm_cache
-    if _llm_cache is None:
-        _llm_cache = LLMCache()
+def get_llm_cache(cfg=None) -> LLMCache:
+    """Получить глобальный экземпляр LLM кэша (с параметрами ``LLM_CACHE_*`` из cfg, если задан)."""
+    global _llm_cache, _llm_cache_params
+    params = None
+    if cfg is not None:
+        params = (
+            getattr(cfg, "llm_cache_dir", "cache/llm"),
+            getattr(cfg, "llm_cache_ttl_hours", 168),
+            getattr(cfg, "llm_cache_version", ""),
+        )
+    if _llm_cache is None or (params is not None and params != _llm_cache_params):
+        if params is None:
+            _llm_cache = LLMCache()
+        else:
+            _llm_cache = LLMCache(cache_dir=params[0], max_age_hours=params[1], version=params[2])
+        _llm_cache_params = params
     return _llm_cache
+
+
+def cached_llm_client(client: Any, cfg) -> Any:
+    """Обернуть LLM-клиента кэшем ответов, если включен ``LLM_CACHE``."""
+    if client is None or not getattr(cfg, "llm_cache", False):
+        return client
+    return CachedLLMClient(client, get_llm_cache(cfg))
@@ -1,8 +1,19 @@
-import random
-import time
+import functools
+from typing import Sequence
 
 import requests
 
+from concurrency import ThreadServiceLimiter, attempt_slot
+from deadline import timeout_for
+from hedging import Hedger
+from idempotency import IDEMPOTENCY_HEADER, create_key, update_key
+from latency import AdaptiveTimeouts
+from partnumbers import SearchSelector, order_exact_first
+from retry import RetryPolicy
+from scheduler import LaneScheduler
+from serialization import response_json
+from transport import RETRYABLE_ERRORS, status_error, stream_get
+
 
 class CatalogAPI:
     def __init__(
@@ -15,63 +26,169 @@ class CatalogAPI:
         backoff_base_ms: int = 100,
         backoff_max_ms: int = 2000,
         backoff_jitter_ms: int = 100,
+        hedger: Hedger | None = None,
+        http=None,
+        search_fields: Sequence[str] | None = None,
+        stream_search: bool = False,
+        stream_max_items: int = 0,
+        run_id: str | None = None,
+        idempotency_keys: bool = True,
+        write_hedger: Hedger | None = None,
+        retry_policy: RetryPolicy | None = None,
+        timeouts: AdaptiveTimeouts | None = None,
+        limiter: ThreadServiceLimiter | None = None,
+        scheduler: LaneScheduler | None = None,
     ):
         self.base_url = base_url
         self.headers = {"Authorization": f"Bearer {api_key}"}
         self.timeout_sec = timeout_sec
+        # Таймауты эндпоинтов по наблюдаемым задержкам; без настройки — фиксированный timeout_sec
+        self.timeouts = timeouts or AdaptiveTimeouts("catalog", timeout_sec, enabled=False)
+        # Адаптивный лимит сервиса (ADAPTIVE_CONCURRENCY): слот на каждую HTTP-попытку, см. concurrency.py
+        self.limiter = limiter
+        # Квота сервиса по полосам (<SERVICE>_RATE_LIMIT): разрешение на каждую HTTP-попытку, см. scheduler.py
+        self.scheduler = scheduler
         self.retries = max(1, int(retries))
         self.backoff_base_ms = max(0, int(backoff_base_ms))
         self.backoff_max_ms = max(0, int(backoff_max_ms))
         self.backoff_jitter_ms = max(0, int(backoff_jitter_ms))
+        # Повторы транспортных ошибок; под политикой уровнем выше (пайплайн) — одна попытка, см. retry.py
+        self.retry = retry_policy or RetryPolicy(
+            self.retries, self.backoff_base_ms, self.backoff_max_ms, self.backoff_jitter_ms
+        )
+        # Поиск идемпотентен — допускает хеджирование медленных запросов
+        self.hedger = hedger
+        # HTTP-транспорт: модуль requests (HTTP/1.1) или общий httpx.Client (HTTP/2), см. transport.py
+        self.http = http or requests
+        # Проекция полей ответа поиска (fields=id,brand,...); None — полные объекты
+        self.search_fields = tuple(search_fields) if search_fields else None
+        # Потоковый разбор поиска: остановка на точном партномере или после stream_max_items (0 — без лимита)
+        self.stream_search = stream_search
+        self.stream_max_items = max(0, int(stream_max_items))
+        # Записи несут Idempotency-Key (товар + запуск): повтор после таймаута не создает дубликат,
+        # поэтому для них допустимо и хеджирование (write_hedger)
+        self.run_id = run_id
+        self.idempotency_keys = idempotency_keys
+        self.write_hedger = write_hedger if idempotency_keys else None
+
+    def _check_status(self, status: int, headers=None) -> bool:
+        """True — ответ 200; 404 — пустой результат поиска (False); иначе исключение по классу статуса."""
+        if status == 200:
+            return True
+        if status == 404:
+            return False
+        raise status_error("catalog", status, headers)
+
+    def _timeout(self, endpoint: str) -> float:
+        return timeout_for(self.timeouts.current(endpoint), f"catalog_{endpoint}")
+
+    def _fetch(self, url: str, params: dict, partnumber: str):
+        with attempt_slot(self.limiter, self.scheduler), self.timeouts.observe("search"):
+            resp = self.http.get(url, params=params, headers=self.headers, timeout=self._timeout("search"))
+            # Статус проверяется внутри блока: 429/503 видит регулятор параллелизма
+            if not self._check_status(resp.status_code, getattr(resp, "headers", None)):
+                return []
+        data = response_json(resp)
+        return order_exact_first(data, partnumber) if isinstance(data, list) else data
 
-    def search_product(self, partnumber: str):
-        url = f"{self.base_url}/products?partnumber={partnumber}"
-        for attempt in range(1, self.retries + 1):
-            try:
-                resp = requests.get(url, headers=self.headers, timeout=self.timeout_sec)
-                if resp.status_code == 200:
-                    return resp.json()
-                # Non-200 treated as empty result (no raise)
+    def _fetch_streaming(self, url: str, params: dict, partnumber: str):
+        selector = SearchSelector(partnumber, self.stream_max_items)
+        with attempt_slot(self.limiter, self.scheduler), self.timeouts.observe("search"), stream_get(
+            self.http, url, params=params, headers=self.headers, timeout=self._timeout("search")
+        ) as (status, headers, chunks):
+            if not self._check_status(status, headers):
                 return []
-            except (requests.Timeout, requests.RequestException):  # transient categories
-                if attempt < self.retries:
-                    # exponential backoff with jitter
-                    delay_ms = min(self.backoff_max_ms, self.backoff_base_ms * (2 ** (attempt - 1)))
-                    delay_ms += random.randint(0, self.backoff_jitter_ms) if self.backoff_jitter_ms > 0 else 0
-                    time.sleep(delay_ms / 1000.0)
-                continue
-        # After retries, degrade gracefully with empty list
-        return []
-
-    def create_product(self, payload: dict):
+            return selector.consume(chunks)
+
+    def search_product(self, partnumber: str, fields: Sequence[str] | None = None):
+        url = f"{self.base_url}/products"
+        params = {"partnumber": partnumber}
+        fields = fields or self.search_fields
+        if fields:
+            params["fields"] = ",".join(fields)
+        fetch = self._fetch_streaming if self.stream_search else self._fetch
+        send = functools.partial(fetch, url, params, partnumber)
+        # 404 — пустой результат; прочие неуспешные статусы — ServiceHTTPError (5xx/408/429 повторяются)
+        return self.retry.call(
+            lambda: self.hedger.call(send) if self.hedger else send(),
+            tag="catalog_search", retry_on=RETRYABLE_ERRORS,
+        )
+
+    def _fetch_batch(self, partnumbers: list[str], fields: Sequence[str] | None) -> list[list]:
+        body: dict = {"partnumbers": partnumbers}
+        if fields:
+            body["fields"] = list(fields)
+        with attempt_slot(self.limiter, self.scheduler), self.timeouts.observe("search_batch"):
+            resp = self.http.post(
+                f"{self.base_url}/products/search", json=body, headers=self.headers, timeout=self._timeout("search_batch")
+            )
+            if resp.status_code != 200:
+                raise status_error("catalog", resp.status_code, getattr(resp, "headers", None))
+        data = response_json(resp)
+        data = data if isinstance(data, dict) else {}
+        return [order_exact_first(data.get(pn) or [], pn) for pn in partnumbers]
+
+    def search_products(self, partnumbers: Sequence[str], fields: Sequence[str] | None = None) -> list[list]:
+        """Пакетный поиск: POST {base_url}/products/search {"partnumbers": [...], "fields": [...]}
+        -> 200 {partnumber: [items]}; результаты — в порядке ``partnumbers`` (нет ключа — пустой список).
+        """
+        return self.retry.call(
+            self._fetch_batch, list(partnumbers), fields or self.search_fields,
+            tag="catalog_search_batch", retry_on=RETRYABLE_ERRORS,
+        )
+
+    def _fetch_taxonomy(self) -> dict:
+        with attempt_slot(self.limiter, self.scheduler), self.timeouts.observe("taxonomy"):
+            resp = self.http.get(f"{self.base_url}/taxonomy", headers=self.headers, timeout=self._timeout("taxonomy"))
+            if resp.status_code != 200:
+                raise status_error("catalog", resp.status_code, getattr(resp, "headers", None))
+        data = response_json(resp)
+        return data if isinstance(data, dict) else {}
+
+    def get_taxonomy(self) -> dict:
+        """Справочник ГН/ВН: GET {base_url}/taxonomy -> 200 {"gn": [...], "vn": [...]};
+        элемент — {"code", "name", "keywords", "categories"} (см. taxonomy.py).
+        """
+        return self.retry.call(self._fetch_taxonomy, tag="catalog_taxonomy", retry_on=RETRYABLE_ERRORS)
+
+    def _write_headers(self, key: str | None) -> dict:
+        if not key:
+            return self.headers
+        return {**self.headers, IDEMPOTENCY_HEADER: key}
+
+    def _send_write(self, endpoint: str, method, url: str, body: dict, headers: dict):
+        def send():
+            # Разрешение квоты — на каждую отправку, включая хеджированный дубликат записи
+            with attempt_slot(None, self.scheduler), self.timeouts.observe(endpoint):
+                return method(url, json=body, headers=headers, timeout=self._timeout(endpoint))
+
+        return self.write_hedger.call(send) if self.write_hedger else send()
+
+    def _create_once(self, url: str, payload: dict, headers: dict):
+        with attempt_slot(self.limiter):
+            resp = self._send_write("create", self.http.post, url, payload, headers)
+            if resp.status_code not in (200, 201):
+                raise status_error("catalog", resp.status_code, getattr(resp, "headers", None))
+        return response_json(resp) if resp.headers.get("Content-Type", "").startswith("application/json") else {"status": "ok"}
+
+    def create_product(self, payload: dict, idempotency_key: str | None = None):
         url = f"{self.base_url}/products"
-        for attempt in range(1, self.retries + 1):
-            try:
-                resp = requests.post(url, json=payload, headers=self.headers, timeout=self.timeout_sec)
-                if resp.status_code in (200, 201):
-                    return resp.json() if resp.headers.get("Content-Type", "").startswith("application/json") else {"status": "ok"}
-                # treat as failure but no raise
-                return None
-            except (requests.Timeout, requests.RequestException):
-                if attempt < self.retries:
-                    delay_ms = min(self.backoff_max_ms, self.backoff_base_ms * (2 ** (attempt - 1)))
-                    delay_ms += random.randint(0, self.backoff_jitter_ms) if self.backoff_jitter_ms > 0 else 0
-                    time.sleep(delay_ms / 1000.0)
-                continue
-        return None
-
-    def update_product(self, product_id: str | int, patch: dict):
+        if idempotency_key is None and self.idempotency_keys:
+            idempotency_key = create_key(payload, self.run_id)
+        headers = self._write_headers(idempotency_key)
+        # Повтор безопасен: тот же Idempotency-Key на всех попытках
+        return self.retry.call(self._create_once, url, payload, headers, tag="catalog_create", retry_on=RETRYABLE_ERRORS)
+
+    def _update_once(self, url: str, patch: dict, headers: dict) -> bool:
+        with attempt_slot(self.limiter):
+            resp = self._send_write("update", self.http.patch, url, patch, headers)
+            if resp.status_code not in (200, 204):
+                raise status_error("catalog", resp.status_code, getattr(resp, "headers", None))
+        return True
+
+    def update_product(self, product_id: str | int, patch: dict, idempotency_key: str | None = None):
         url = f"{self.base_url}/products/{product_id}"
-        for attempt in range(1, self.retries + 1):
-            try:
-                resp = requests.patch(url, json=patch, headers=self.headers, timeout=self.timeout_sec)
-                if resp.status_code in (200, 204):
-                    return True
-                return False
-            except (requests.Timeout, requests.RequestException):
-                if attempt < self.retries:
-                    delay_ms = min(self.backoff_max_ms, self.backoff_base_ms * (2 ** (attempt - 1)))
-                    delay_ms += random.randint(0, self.backoff_jitter_ms) if self.backoff_jitter_ms > 0 else 0
-                    time.sleep(delay_ms / 1000.0)
-                continue
-        return False
+        if idempotency_key is None and self.idempotency_keys:
+            idempotency_key = update_key(product_id, patch, self.run_id)
+        headers = self._write_headers(idempotency_key)
+        return self.retry.call(self._update_once, url, patch, headers, tag="catalog_update", retry_on=RETRYABLE_ERRORS)
@@ -0,0 +1,272 @@
+"""Ограничение параллелизма по внешним сервисам.
+
+Каждый сервис (catalog, lcsc, llm) получает собственный лимит одновременных вызовов,
+поэтому строки, застрявшие в медленном этапе, не занимают слоты быстрых этапов.
+Время ожидания слота учитывается в счетчиках запуска (``queue.<service>.*``).
+
+С ``ADAPTIVE_CONCURRENCY`` лимит сервиса подбирается на ходу (``AIMDController``): пока
+задержка вызовов близка к базовой, лимит растет аддитивно (примерно +1 за «окно» из
+``limit`` успешных вызовов); при задержке выше ``tolerance * baseline`` он снижается
+пропорционально превышению, а на таймаутах и 429/503 — мультипликативно (``* backoff``).
+Снижение — не чаще раза за окно: ответы на вызовы, начатые до предыдущего снижения,
+лимит повторно не уменьшают. Один регулятор на сервис в процессе используется и
+асинхронным пайплайном (``ServiceLimiter``), и синхронными клиентами, которые вызываются
+из пулов потоков (``ThreadServiceLimiter``, ``get_thread_limiter``). Регулятор видит каждую
+HTTP-попытку отдельно (``attempt_slot`` рядом с ``timeouts.observe`` в клиентах): повторы и
+паузы бэкоффа не попадают в задержку и слот не занимают. Текущий лимит — в счетчике
+``concurrency.<service>.limit``.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from typing import AsyncIterator, ContextManager, Iterator
+
+import requests
+
+from exceptions import RetryExhaustedError, ThrottledError, TransientServiceError
+from logger import get_logger
+from metrics import RuntimeCounters, get_runtime_counters
+from scheduler import LaneScheduler
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - optional dependency
+    httpx = None  # type: ignore
+
+# Таймауты транспорта — признак перегрузки сервиса
+OVERLOAD_TIMEOUTS: tuple[type[BaseException], ...] = (TimeoutError, requests.Timeout)
+if httpx is not None:
+    OVERLOAD_TIMEOUTS += (httpx.TimeoutException,)
+# Статусы ответа, после которых лимит снижается мультипликативно
+OVERLOAD_STATUSES = frozenset({408, 429, 503})
+# Скорость, с которой базовая задержка подтягивается вверх (вниз — сразу)
+BASELINE_DRIFT = 0.01
+
+
+def is_overload(exc: BaseException) -> bool:
+    """Сбой говорит о перегрузке сервиса (таймаут, 429, 503), а не об ошибке запроса."""
+    if isinstance(exc, RetryExhaustedError):
+        exc = exc.last_error
+    if isinstance(exc, ThrottledError):
+        return True
+    if isinstance(exc, TransientServiceError):
+        return exc.status in OVERLOAD_STATUSES
+    return isinstance(exc, OVERLOAD_TIMEOUTS)
+
+
+class AIMDController:
+    """Адаптивный лимит параллелизма сервиса по задержке и перегрузке (AIMD)."""
+
+    def __init__(
+        self,
+        name: str,
+        initial: int,
+        *,
+        min_limit: int = 1,
+        max_limit: int = 200,
+        tolerance: float = 2.0,
+        backoff: float = 0.5,
+        counters: RuntimeCounters | None = None,
+    ):
+        self.name = name
+        self.min_limit = max(1, int(min_limit))
+        self.max_limit = max(self.min_limit, int(max_limit))
+        self.tolerance = max(1.0, float(tolerance))
+        self.backoff = min(max(float(backoff), 0.05), 0.95)
+        self.counters = counters or get_runtime_counters()
+        self.log = get_logger("concurrency")
+        self._lock = threading.Lock()
+        self._limit = float(min(max(int(initial), self.min_limit), self.max_limit))
+        self._last_decrease = float("-inf")
+        self.baseline: float | None = None
+        self.backoffs = 0
+        self._publish()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @contextmanager
+    def observe(self) -> Iterator[None]:
+        """Учесть вызов внутри блока: задержку успешного или перегрузку по исключению."""
+        started = time.monotonic()
+        try:
+            yield
+        except BaseException as e:
+            if is_overload(e):
+                self._decrease(started, self.backoff, type(e).__name__)
+            raise
+        self.on_success(started, time.monotonic() - started)
+
+    def on_success(self, started: float, latency: float) -> None:
+        with self._lock:
+            if self.baseline is None or latency < self.baseline:
+                self.baseline = latency
+            else:
+                self.baseline += (latency - self.baseline) * BASELINE_DRIFT
+            threshold = self.baseline * self.tolerance
+        if latency <= threshold:
+            with self._lock:
+                before = self.limit
+                self._limit = min(float(self.max_limit), self._limit + 1.0 / self._limit)
+                changed = self.limit != before
+            if changed:
+                self._publish()
+        else:
+            # Градиент: задержка выросла в k раз сверх допуска — лимит меньше примерно в k раз
+            self._decrease(started, max(self.backoff, threshold / latency), "latency")
+
+    def _decrease(self, started: float, factor: float, cause: str) -> None:
+        with self._lock:
+            if started < self._last_decrease:
+                return
+            before = self.limit
+            self._limit = max(float(self.min_limit), self._limit * factor)
+            self._last_decrease = time.monotonic()
+            self.backoffs += 1
+        self.counters.incr(f"concurrency.{self.name}.backoffs")
+        self.log.info("[concurrency] %s limit %d -> %d (%s)", self.name, before, self.limit, cause)
+        self._publish()
+
+    def _publish(self) -> None:
+        self.counters.set(f"concurrency.{self.name}.limit", self.limit)
+
+
+class ServiceLimiter:
+    """Асинхронный лимит одновременных вызовов одного сервиса с учетом ожидания в очереди.
+
+    С ``controller`` лимит читается из регулятора при каждом входе в слот.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        limit: int,
+        counters: RuntimeCounters | None = None,
+        controller: AIMDController | None = None,
+    ):
+        self.name = name
+        self._static_limit = max(1, int(limit))
+        self.controller = controller
+        self.counters = counters or get_runtime_counters()
+        self._cond = asyncio.Condition()
+        self.in_flight = 0
+        self.acquired = 0
+        self.wait_total_sec = 0.0
+        self.wait_max_sec = 0.0
+
+    @property
+    def limit(self) -> int:
+        return self.controller.limit if self.controller is not None else self._static_limit
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Занять слот сервиса на время блока."""
+        started = time.perf_counter()
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+        self._on_acquired(time.perf_counter() - started)
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self.in_flight -= 1
+                # Лимит мог вырасти — будим всех ожидающих, а не одного
+                self._cond.notify_all()
+
+    def observe(self) -> ContextManager[None]:
+        """Учесть попытку вызова сервиса в регуляторе (без регулятора — ничего)."""
+        return self.controller.observe() if self.controller is not None else nullcontext()
+
+    def _on_acquired(self, waited: float) -> None:
+        self.acquired += 1
+        self.wait_total_sec += waited
+        self.wait_max_sec = max(self.wait_max_sec, waited)
+        prefix = f"queue.{self.name}"
+        self.counters.incr(f"{prefix}.acquired")
+        self.counters.incr(f"{prefix}.wait_ms", waited * 1000.0)
+        self.counters.set(f"{prefix}.wait_avg_ms", self.wait_total_sec / self.acquired * 1000.0)
+        self.counters.set(f"{prefix}.wait_max_ms", self.wait_max_sec * 1000.0)
+
+    def get_stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "acquired": self.acquired,
+            "wait_avg_ms": (self.wait_total_sec / self.acquired * 1000.0) if self.acquired else 0.0,
+            "wait_max_ms": self.wait_max_sec * 1000.0,
+        }
+
+
+class ThreadServiceLimiter:
+    """Адаптивный лимит одновременных вызовов сервиса для вызовов из разных потоков."""
+
+    def __init__(self, controller: AIMDController):
+        self.controller = controller
+        self._cond = threading.Condition()
+        self.in_flight = 0
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Занять слот на время вызова; вызов учитывается регулятором."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.in_flight < self.controller.limit)
+            self.in_flight += 1
+        try:
+            with self.controller.observe():
+                yield
+        finally:
+            with self._cond:
+                self.in_flight -= 1
+                self._cond.notify_all()
+
+
+_controllers: dict[tuple, AIMDController] = {}
+_thread_limiters: dict[int, ThreadServiceLimiter] = {}
+_controllers_lock = threading.Lock()
+
+
+def get_concurrency_controller(cfg, service: str, initial: int | None = None) -> AIMDController | None:
+    """Регулятор сервиса по ``ADAPTIVE_CONCURRENCY_*`` (общий в процессе); None — лимит статический."""
+    if not getattr(cfg, "adaptive_concurrency", False):
+        return None
+    start = initial if initial is not None else getattr(cfg, f"{service}_concurrency", 10)
+    key = (
+        service,
+        getattr(cfg, "adaptive_concurrency_min", 1),
+        getattr(cfg, "adaptive_concurrency_max", 200),
+        getattr(cfg, "adaptive_concurrency_tolerance", 2.0),
+        getattr(cfg, "adaptive_concurrency_backoff", 0.5),
+    )
+    with _controllers_lock:
+        if key not in _controllers:
+            _controllers[key] = AIMDController(
+                service, start, min_limit=key[1], max_limit=key[2], tolerance=key[3], backoff=key[4]
+            )
+        return _controllers[key]
+
+
+def get_thread_limiter(cfg, service: str) -> ThreadServiceLimiter | None:
+    """Лимит сервиса для синхронных клиентов по ``ADAPTIVE_CONCURRENCY``; None — лимит статический."""
+    controller = get_concurrency_controller(cfg, service)
+    if controller is None:
+        return None
+    with _controllers_lock:
+        return _thread_limiters.setdefault(id(controller), ThreadServiceLimiter(controller))
+
+
+@contextmanager
+def attempt_slot(limiter: ThreadServiceLimiter | None, scheduler: LaneScheduler | None = None) -> Iterator[None]:
+    """Слот одной HTTP-попытки синхронного клиента (без лимита — ничего).
+
+    С ``scheduler`` попытка сначала получает разрешение квоты своей полосы (см. scheduler.py):
+    повторы и хеджированные дубликаты расходуют квоту так же, как первая попытка.
+    """
+    if scheduler is not None:
+        scheduler.acquire()
+    with limiter.slot() if limiter is not None else nullcontext():
+        yield
@@ -8,6 +8,10 @@ from typing import Optional
 from dotenv import load_dotenv
 
 VALID_MOCK_PROFILES = {"happy", "conflict", "missing", "errorrate10", "timeout"}
+VALID_HTTP_TRANSPORTS = {"http1", "http2"}
+VALID_LB_STRATEGIES = {"least_outstanding", "latency"}
+VALID_REFERENCE_SOURCES = {"digikey", "mouser"}
+VALID_REFERENCE_MODES = {"first", "quorum"}
 
 
 @dataclass(frozen=True)
@@ -58,6 +62,124 @@ class Config:
     backoff_max_ms: int
     backoff_jitter_ms: int
 
+    # Request hedging for idempotent reads (catalog search, LCSC search)
+    hedge_enabled: bool
+    hedge_percentile: float
+    hedge_min_samples: int
+    hedge_budget_pct: float
+
+    # HTTP transport of real clients: http1 (requests/aiohttp) | http2 (httpx, multiplexed)
+    http_transport: str
+    http2_max_connections: int
+
+    # Field projection (fields=) for catalog/LCSC search responses
+    field_projection: bool
+
+    # Streaming parse of search responses: stop at exact partnumber match or after N items (0 = no cap)
+    stream_search: bool
+    stream_search_max_items: int
+
+    # Idempotency-Key on catalog writes (create/update); with HEDGE_ENABLED also hedges writes.
+    # Off by default until catalogApp confirms it deduplicates on the header
+    idempotency_keys: bool
+
+    # Per-service concurrency limits of the async pipeline (calls in flight)
+    catalog_concurrency: int
+    lcsc_concurrency: int
+    llm_concurrency: int
+
+    # Per-run retry budget shared by all services: min + ratio * calls retries
+    retry_budget_ratio: float
+    retry_budget_min: int
+
+    # Time budgets (seconds, 0 = unlimited): per row and per run; the run stops
+    # taking new rows run_deadline_reserve_sec before its deadline to write the report
+    row_deadline_sec: float
+    run_deadline_sec: float
+    run_deadline_reserve_sec: float
+
+    # Adaptive per-endpoint timeouts: multiplier x observed percentile latency,
+    # clamped to [adaptive_timeout_min_sec, <service>_timeout_sec]
+    adaptive_timeouts: bool
+    adaptive_timeout_multiplier: float
+    adaptive_timeout_percentile: float
+    adaptive_timeout_min_sec: float
+    adaptive_timeout_min_samples: int
+
+    # Load balancing across replicas listed in LCSC_API_URL / COZE_API_URL (comma-separated)
+    lb_strategy: str
+    lb_eject_failures: int
+    lb_eject_sec: float
+    lb_probe_path: str
+
+    # Per-service request rate limits (req/s, 0 = unlimited) shared by the interactive
+    # (UI) and batch (cron) lanes by weight; lanes of other processes are seen via scheduler_dir
+    catalog_rate_limit: float
+    lcsc_rate_limit: float
+    llm_rate_limit: float
+    lane_weight_interactive: float
+    lane_weight_batch: float
+    scheduler_dir: str
+
+    # Micro-batching of per-row catalog searches in the async pipeline (size <= 1 = off)
+    catalog_batch_size: int
+    catalog_batch_window_ms: float
+
+    # Deferred retries: one attempt per call, failed rows are re-queued after backoff
+    # instead of sleeping inline (up to deferred_retry_attempts attempts per row)
+    deferred_retries: bool
+    deferred_retry_attempts: int
+
+    # Extra reference sources queried concurrently with LCSC (comma-separated, empty = LCSC only);
+    # "first" takes the first exact match, "quorum" waits for reference_quorum exact matches
+    reference_sources: tuple[str, ...]
+    reference_mode: str
+    reference_quorum: int
+    reference_mock_delay_ms: int
+
+    # LLM answer cache (memory + disk); bump llm_cache_version when the model or prompts change
+    llm_cache: bool
+    llm_cache_dir: str
+    llm_cache_ttl_hours: float
+    llm_cache_version: str
+
+    # Batched LLM calls (normalize_batch/classify_batch): chunk limits by items and estimated tokens;
+    # llm_batch_size > 1 also micro-batches per-row classify/normalize in the async pipeline
+    llm_batch_size: int
+    llm_batch_max_tokens: int
+    llm_batch_window_ms: float
+
+    # One combined /analyze call (normalize + classify) per missing row instead of two
+    llm_analyze: bool
+
+    # Versioned LCSC category (+ brand/attrs) -> GN/VN table consulted before the LLM
+    gn_vn_mapping: bool
+    gn_vn_mapping_file: str
+
+    # GN/VN taxonomy fetched from the catalog (file cache with TTL); classify gets the top-K per item
+    taxonomy: bool
+    taxonomy_cache_file: str
+    taxonomy_ttl_hours: float
+    taxonomy_top_k: int
+
+    # Per-run LLM budget (0 = unlimited): calls, estimated tokens, seconds since run start
+    llm_budget_calls: int
+    llm_budget_tokens: int
+    llm_budget_wall_sec: float
+
+    # Adaptive (AIMD) per-service concurrency: *_CONCURRENCY is the starting limit
+    adaptive_concurrency: bool
+    adaptive_concurrency_min: int
+    adaptive_concurrency_max: int
+    adaptive_concurrency_tolerance: float
+    adaptive_concurrency_backoff: float
+
+    # Part-family reuse: GN/VN of a confident family member is reused for its siblings
+    part_family: bool
+    part_family_rules_file: str
+    part_family_min_confidence: float
+    part_family_spot_check: float
+
     @property
     def is_catalog_required(self) -> bool:
         return not self.use_mocks
@@ -80,6 +202,11 @@ def _get_int(name: str, default: int) -> int:
         raise ValueError(f"Env {name} must be integer, got: {raw}") from exc
 
 
+def _get_list(name: str) -> tuple[str, ...]:
+    raw = os.getenv(name, "")
+    return tuple(item.strip().lower() for item in raw.split(",") if item.strip())
+
+
 def _get_float(name: str, default: float) -> float:
     raw = os.getenv(name)
     if raw is None or raw.strip() == "":
@@ -125,6 +252,97 @@ def _validate(cfg: Config) -> None:
     if not (0.0 <= cfg.confidence_threshold <= 1.0):
         raise ValueError("CONFIDENCE_THRESHOLD must be between 0.0 and 1.0")
 
+    if cfg.http_transport not in VALID_HTTP_TRANSPORTS:
+        raise ValueError(
+            f"HTTP_TRANSPORT must be one of {sorted(VALID_HTTP_TRANSPORTS)}, got: {cfg.http_transport}"
+        )
+    if cfg.http2_max_connections < 1:
+        raise ValueError("HTTP2_MAX_CONNECTIONS must be >= 1")
+
+    # Hedging: percentile 0..100 (exclusive), budget share of requests 0..100 %
+    if not (0.0 < cfg.hedge_percentile < 100.0):
+        raise ValueError("HEDGE_PERCENTILE must be between 0 and 100 (exclusive)")
+    if not (0.0 <= cfg.hedge_budget_pct <= 100.0):
+        raise ValueError("HEDGE_BUDGET_PCT must be between 0 and 100")
+
+    for name in ("catalog_concurrency", "lcsc_concurrency", "llm_concurrency"):
+        if getattr(cfg, name) < 1:
+            raise ValueError(f"{name.upper()} must be >= 1")
+
+    if cfg.retry_budget_ratio < 0 or cfg.retry_budget_min < 0:
+        raise ValueError("RETRY_BUDGET_RATIO and RETRY_BUDGET_MIN must be >= 0")
+
+    if cfg.row_deadline_sec < 0 or cfg.run_deadline_sec < 0 or cfg.run_deadline_reserve_sec < 0:
+        raise ValueError("ROW_DEADLINE_SEC, RUN_DEADLINE_SEC and RUN_DEADLINE_RESERVE_SEC must be >= 0")
+    if cfg.run_deadline_sec and cfg.run_deadline_reserve_sec >= cfg.run_deadline_sec:
+        raise ValueError("RUN_DEADLINE_RESERVE_SEC must be less than RUN_DEADLINE_SEC")
+
+    if cfg.adaptive_timeout_multiplier < 1.0:
+        raise ValueError("ADAPTIVE_TIMEOUT_MULTIPLIER must be >= 1")
+    if not (0.0 < cfg.adaptive_timeout_percentile <= 100.0):
+        raise ValueError("ADAPTIVE_TIMEOUT_PERCENTILE must be in (0, 100]")
+    if cfg.adaptive_timeout_min_sec <= 0 or cfg.adaptive_timeout_min_samples < 1:
+        raise ValueError("ADAPTIVE_TIMEOUT_MIN_SEC must be > 0 and ADAPTIVE_TIMEOUT_MIN_SAMPLES >= 1")
+
+    if cfg.lb_strategy not in VALID_LB_STRATEGIES:
+        raise ValueError(f"LB_STRATEGY must be one of {sorted(VALID_LB_STRATEGIES)}, got: {cfg.lb_strategy}")
+    if cfg.lb_eject_failures < 1 or cfg.lb_eject_sec < 0:
+        raise ValueError("LB_EJECT_FAILURES must be >= 1 and LB_EJECT_SEC >= 0")
+
+    for name in ("catalog_rate_limit", "lcsc_rate_limit", "llm_rate_limit"):
+        if getattr(cfg, name) < 0:
+            raise ValueError(f"{name.upper()} must be >= 0")
+    if cfg.lane_weight_interactive <= 0 or cfg.lane_weight_batch <= 0:
+        raise ValueError("LANE_WEIGHT_INTERACTIVE and LANE_WEIGHT_BATCH must be > 0")
+
+    if cfg.catalog_batch_size < 0 or cfg.catalog_batch_window_ms < 0:
+        raise ValueError("CATALOG_BATCH_SIZE and CATALOG_BATCH_WINDOW_MS must be >= 0")
+
+    if cfg.deferred_retry_attempts < 1:
+        raise ValueError("DEFERRED_RETRY_ATTEMPTS must be >= 1")
+
+    unknown_sources = set(cfg.reference_sources) - VALID_REFERENCE_SOURCES
+    if unknown_sources:
+        raise ValueError(
+            f"REFERENCE_SOURCES must be a subset of {sorted(VALID_REFERENCE_SOURCES)}, got: {sorted(unknown_sources)}"
+        )
+    if cfg.reference_mode not in VALID_REFERENCE_MODES:
+        raise ValueError(f"REFERENCE_MODE must be one of {sorted(VALID_REFERENCE_MODES)}, got: {cfg.reference_mode}")
+    if cfg.reference_quorum < 1 or cfg.reference_mock_delay_ms < 0:
+        raise ValueError("REFERENCE_QUORUM must be >= 1 and REFERENCE_MOCK_DELAY_MS >= 0")
+
+    if cfg.llm_cache and (not cfg.llm_cache_dir or cfg.llm_cache_ttl_hours <= 0):
+        raise ValueError("LLM_CACHE requires LLM_CACHE_DIR and LLM_CACHE_TTL_HOURS > 0")
+
+    if cfg.llm_batch_size < 1 or cfg.llm_batch_max_tokens < 1:
+        raise ValueError("LLM_BATCH_SIZE and LLM_BATCH_MAX_TOKENS must be >= 1")
+    if cfg.llm_batch_window_ms < 0:
+        raise ValueError("LLM_BATCH_WINDOW_MS must be >= 0")
+
+    if cfg.gn_vn_mapping and not cfg.gn_vn_mapping_file:
+        raise ValueError("GN_VN_MAPPING requires GN_VN_MAPPING_FILE")
+
+    if cfg.taxonomy and (not cfg.taxonomy_cache_file or cfg.taxonomy_ttl_hours <= 0 or cfg.taxonomy_top_k < 1):
+        raise ValueError("TAXONOMY requires TAXONOMY_CACHE_FILE, TAXONOMY_TTL_HOURS > 0 and TAXONOMY_TOP_K >= 1")
+
+    if cfg.llm_budget_calls < 0 or cfg.llm_budget_tokens < 0 or cfg.llm_budget_wall_sec < 0:
+        raise ValueError("LLM_BUDGET_CALLS, LLM_BUDGET_TOKENS and LLM_BUDGET_WALL_SEC must be >= 0")
+
+    if cfg.adaptive_concurrency:
+        if cfg.adaptive_concurrency_min < 1 or cfg.adaptive_concurrency_max < cfg.adaptive_concurrency_min:
+            raise ValueError("ADAPTIVE_CONCURRENCY_MIN must be >= 1 and ADAPTIVE_CONCURRENCY_MAX >= MIN")
+        if cfg.adaptive_concurrency_tolerance < 1 or not 0 < cfg.adaptive_concurrency_backoff < 1:
+            raise ValueError("ADAPTIVE_CONCURRENCY_TOLERANCE must be >= 1 and ADAPTIVE_CONCURRENCY_BACKOFF in (0, 1)")
+
+    if cfg.part_family:
+        if not cfg.part_family_rules_file:
+            raise ValueError("PART_FAMILY requires PART_FAMILY_RULES_FILE")
+        if not 0 <= cfg.part_family_min_confidence <= 1 or not 0 <= cfg.part_family_spot_check <= 1:
+            raise ValueError("PART_FAMILY_MIN_CONFIDENCE and PART_FAMILY_SPOT_CHECK must be in [0, 1]")
+
+    if cfg.stream_search_max_items < 0:
+        raise ValueError("STREAM_SEARCH_MAX_ITEMS must be >= 0")
+
     # Agent schedule HH:MM basic validation
     if not re.fullmatch(r"\d{2}:\d{2}", cfg.agent_schedule or ""):
         raise ValueError("AGENT_SCHEDULE must be in HH:MM format, e.g. 03:00")
@@ -189,6 +407,75 @@ def load_config(override_dotenv_path: Optional[str] = None) -> Config:
         backoff_base_ms=_get_int("BACKOFF_BASE_MS", 100),
         backoff_max_ms=_get_int("BACKOFF_MAX_MS", 2000),
         backoff_jitter_ms=_get_int("BACKOFF_JITTER_MS", 100),
+        # Hedging
+        hedge_enabled=_get_bool("HEDGE_ENABLED", False),
+        hedge_percentile=_get_float("HEDGE_PERCENTILE", 95.0),
+        hedge_min_samples=_get_int("HEDGE_MIN_SAMPLES", 20),
+        hedge_budget_pct=_get_float("HEDGE_BUDGET_PCT", 10.0),
+        # HTTP transport
+        http_transport=os.getenv("HTTP_TRANSPORT", "http1").strip().lower(),
+        http2_max_connections=_get_int("HTTP2_MAX_CONNECTIONS", 4),
+        field_projection=_get_bool("FIELD_PROJECTION", False),
+        stream_search=_get_bool("STREAM_SEARCH", False),
+        stream_search_max_items=_get_int("STREAM_SEARCH_MAX_ITEMS", 50),
+        idempotency_keys=_get_bool("IDEMPOTENCY_KEYS", False),
+        catalog_concurrency=_get_int("CATALOG_CONCURRENCY", 100),
+        lcsc_concurrency=_get_int("LCSC_CONCURRENCY", 20),
+        llm_concurrency=_get_int("LLM_CONCURRENCY", 8),
+        retry_budget_ratio=_get_float("RETRY_BUDGET_RATIO", 0.2),
+        retry_budget_min=_get_int("RETRY_BUDGET_MIN", 20),
+        row_deadline_sec=_get_float("ROW_DEADLINE_SEC", 0.0),
+        run_deadline_sec=_get_float("RUN_DEADLINE_SEC", 0.0),
+        run_deadline_reserve_sec=_get_float("RUN_DEADLINE_RESERVE_SEC", 30.0),
+        adaptive_timeouts=_get_bool("ADAPTIVE_TIMEOUTS", False),
+        adaptive_timeout_multiplier=_get_float("ADAPTIVE_TIMEOUT_MULTIPLIER", 3.0),
+        adaptive_timeout_percentile=_get_float("ADAPTIVE_TIMEOUT_PERCENTILE", 99.0),
+        adaptive_timeout_min_sec=_get_float("ADAPTIVE_TIMEOUT_MIN_SEC", 0.5),
+        adaptive_timeout_min_samples=_get_int("ADAPTIVE_TIMEOUT_MIN_SAMPLES", 20),
+        lb_strategy=os.getenv("LB_STRATEGY", "least_outstanding").strip().lower(),
+        lb_eject_failures=_get_int("LB_EJECT_FAILURES", 3),
+        lb_eject_sec=_get_float("LB_EJECT_SEC", 30.0),
+        lb_probe_path=os.getenv("LB_PROBE_PATH", "/health").strip(),
+        catalog_rate_limit=_get_float("CATALOG_RATE_LIMIT", 0.0),
+        lcsc_rate_limit=_get_float("LCSC_RATE_LIMIT", 0.0),
+        llm_rate_limit=_get_float("LLM_RATE_LIMIT", 0.0),
+        lane_weight_interactive=_get_float("LANE_WEIGHT_INTERACTIVE", 4.0),
+        lane_weight_batch=_get_float("LANE_WEIGHT_BATCH", 1.0),
+        scheduler_dir=os.getenv("SCHEDULER_DIR", "logs/lanes").strip(),
+        catalog_batch_size=_get_int("CATALOG_BATCH_SIZE", 0),
+        catalog_batch_window_ms=_get_float("CATALOG_BATCH_WINDOW_MS", 20.0),
+        deferred_retries=_get_bool("DEFERRED_RETRIES", False),
+        deferred_retry_attempts=_get_int("DEFERRED_RETRY_ATTEMPTS", 3),
+        reference_sources=_get_list("REFERENCE_SOURCES"),
+        reference_mode=os.getenv("REFERENCE_MODE", "first").strip().lower(),
+        reference_quorum=_get_int("REFERENCE_QUORUM", 2),
+        reference_mock_delay_ms=_get_int("REFERENCE_MOCK_DELAY_MS", 0),
+        llm_cache=_get_bool("LLM_CACHE", False),
+        llm_cache_dir=os.getenv("LLM_CACHE_DIR", "cache/llm").strip(),
+        llm_cache_ttl_hours=_get_float("LLM_CACHE_TTL_HOURS", 168.0),
+        llm_cache_version=os.getenv("LLM_CACHE_VERSION", "v1").strip(),
+        llm_batch_size=_get_int("LLM_BATCH_SIZE", 1),
+        llm_batch_max_tokens=_get_int("LLM_BATCH_MAX_TOKENS", 4000),
+        llm_batch_window_ms=_get_float("LLM_BATCH_WINDOW_MS", 20.0),
+        llm_analyze=_get_bool("LLM_ANALYZE", False),
+        gn_vn_mapping=_get_bool("GN_VN_MAPPING", False),
+        gn_vn_mapping_file=os.getenv("GN_VN_MAPPING_FILE", "data/gn_vn_mapping.json").strip(),
+        taxonomy=_get_bool("TAXONOMY", False),
+        taxonomy_cache_file=os.getenv("TAXONOMY_CACHE_FILE", "cache/taxonomy.json").strip(),
+        taxonomy_ttl_hours=_get_float("TAXONOMY_TTL_HOURS", 24.0),
+        taxonomy_top_k=_get_int("TAXONOMY_TOP_K", 10),
+        llm_budget_calls=_get_int("LLM_BUDGET_CALLS", 0),
+        llm_budget_tokens=_get_int("LLM_BUDGET_TOKENS", 0),
+        llm_budget_wall_sec=_get_float("LLM_BUDGET_WALL_SEC", 0.0),
+        adaptive_concurrency=_get_bool("ADAPTIVE_CONCURRENCY", False),
+        adaptive_concurrency_min=_get_int("ADAPTIVE_CONCURRENCY_MIN", 1),
+        adaptive_concurrency_max=_get_int("ADAPTIVE_CONCURRENCY_MAX", 200),
+        adaptive_concurrency_tolerance=_get_float("ADAPTIVE_CONCURRENCY_TOLERANCE", 2.0),
+        adaptive_concurrency_backoff=_get_float("ADAPTIVE_CONCURRENCY_BACKOFF", 0.5),
+        part_family=_get_bool("PART_FAMILY", False),
+        part_family_rules_file=os.getenv("PART_FAMILY_RULES_FILE", "data/part_families.json").strip(),
+        part_family_min_confidence=_get_float("PART_FAMILY_MIN_CONFIDENCE", 0.9),
+        part_family_spot_check=_get_float("PART_FAMILY_SPOT_CHECK", 0.0),
     )
 
     _validate(cfg)
@@ -0,0 +1,85 @@
+"""Дедлайны строки и запуска, распространяемые через contextvars.
+
+Текущий дедлайн виден всем этапам и клиентам в том же контексте (включая потоки
+хеджирования, которые копируют контекст). Вложенная область берет более ранний
+из двух сроков: дедлайн строки не может пережить дедлайн запуска.
+"""
+from __future__ import annotations
+
+import contextvars
+import math
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from exceptions import DeadlineExceededError
+
+# Этап не начинается, если до дедлайна осталось меньше этого времени
+MIN_STAGE_SEC = 0.05
+
+
+class Deadline:
+    """Момент времени (monotonic), к которому работа должна завершиться."""
+
+    def __init__(self, budget_sec: float | None, scope: str = "row"):
+        self.scope = scope
+        self.expires_at = time.monotonic() + budget_sec if budget_sec and budget_sec > 0 else math.inf
+
+    def remaining(self) -> float:
+        """Оставшееся время в секундах (inf — без ограничения)."""
+        return self.expires_at - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+_current: contextvars.ContextVar[Deadline | None] = contextvars.ContextVar("deadline", default=None)
+
+
+def current_deadline() -> Deadline | None:
+    return _current.get()
+
+
+@contextmanager
+def deadline_scope(budget_sec: float | None, scope: str = "row") -> Iterator[Deadline]:
+    """Установить дедлайн на время блока; ``budget_sec`` <= 0 или None — без собственного лимита."""
+    deadline = Deadline(budget_sec, scope)
+    outer = _current.get()
+    if outer is not None and outer.expires_at <= deadline.expires_at:
+        deadline = outer
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def no_deadline() -> Iterator[None]:
+    """Выполнить блок без текущего дедлайна (общая работа нескольких строк, например пакетный вызов)."""
+    token = _current.set(None)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def remaining() -> float:
+    """Оставшееся время текущего дедлайна (inf, если дедлайна нет)."""
+    deadline = _current.get()
+    return deadline.remaining() if deadline is not None else math.inf
+
+
+def check_deadline(stage: str, min_remaining: float = 0.0) -> None:
+    """Бросить DeadlineExceededError, если до дедлайна осталось не больше ``min_remaining``."""
+    deadline = _current.get()
+    if deadline is not None and deadline.remaining() <= min_remaining:
+        raise DeadlineExceededError(stage, deadline.scope)
+
+
+def timeout_for(default_sec: float, stage: str = "request") -> float:
+    """Таймаут вызова: не больше ``default_sec`` и не больше остатка дедлайна."""
+    left = remaining()
+    if left <= 0:
+        check_deadline(stage)
+    return min(float(default_sec), left)
@@ -0,0 +1,68 @@
+"""Отложенные повторы строк вместо ожидания бэкоффа внутри вызова.
+
+В режиме ``DEFERRED_RETRIES`` пайплайн делает по одной попытке на вызов. Строка с
+временным сбоем (``pipeline.RETRYABLE_REASONS``) попадает в очередь с моментом
+«не раньше» (бэкофф политики повторов), а цикл запуска обрабатывает другие строки.
+Созревшие строки берутся из очереди в первую очередь, остаток дорабатывается проходом
+в конце запуска. Повторы расходуют общий бюджет повторов запуска (retry.py).
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import time
+from typing import Any
+
+from metrics import RuntimeCounters, get_runtime_counters
+from retry import RetryPolicy
+
+
+class DeferredRetryQueue:
+    """Очередь отложенных повторов: элемент выдается не раньше своего ``not_before``."""
+
+    def __init__(self, policy: RetryPolicy, max_attempts: int = 3, counters: RuntimeCounters | None = None):
+        self.policy = policy
+        self.max_attempts = max(1, int(max_attempts))
+        self.counters = counters or get_runtime_counters()
+        self._heap: list[tuple[float, int, Any, int]] = []
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, item: Any, attempt: int) -> bool:
+        """Отложить повтор после неудачной попытки ``attempt`` (1-based).
+
+        False — попытки или бюджет повторов исчерпаны, результат попытки окончательный.
+        """
+        if attempt >= self.max_attempts:
+            self.counters.incr("deferred.exhausted")
+            return False
+        budget = self.policy.budget
+        if budget is not None and not budget.try_spend():
+            self.counters.incr("retry.budget_denied")
+            self.counters.incr("deferred.exhausted")
+            return False
+        not_before = time.monotonic() + self.policy.backoff_sec(attempt)
+        heapq.heappush(self._heap, (not_before, next(self._seq), item, attempt))
+        self.counters.incr("deferred.queued")
+        return True
+
+    def pop_ready(self) -> tuple[Any, int] | None:
+        """Созревший элемент и номер его следующей попытки, либо None."""
+        if not self._heap or self._heap[0][0] > time.monotonic():
+            return None
+        _, _, item, attempt = heapq.heappop(self._heap)
+        return item, attempt + 1
+
+    def next_ready_in(self) -> float:
+        """Секунд до созревания ближайшего элемента (0 — уже готов или очередь пуста)."""
+        if not self._heap:
+            return 0.0
+        return max(0.0, self._heap[0][0] - time.monotonic())
+
+    def drain(self) -> list[Any]:
+        """Забрать все оставшиеся элементы (например, при наступлении дедлайна запуска)."""
+        items = [item for _, _, item, _ in sorted(self._heap)]
+        self._heap.clear()
+        return items
@@ -55,3 +55,75 @@ class RetryExhaustedError(BotIspravitelError):
         self.attempts = attempts
         self.last_error = last_error
         super().__init__(f"Retry exhausted for {operation} after {attempts} attempts: {last_error}")
+
+
+class ServiceHTTPError(ExternalServiceError):
+    """Внешний сервис ответил статусом, отличным от успешного.
+
+    ``retryable`` — имеет ли смысл повторять запрос (см. retry.RetryPolicy).
+    """
+
+    retryable = False
+
+    def __init__(self, service_name: str, status: int, message: str = "", retry_after: float | None = None):
+        self.status = status
+        self.retry_after = retry_after
+        super().__init__(service_name, f"HTTP {status}" + (f": {message}" if message else ""))
+
+
+class TransientServiceError(ServiceHTTPError):
+    """Временный сбой сервиса (5xx, 408) — запрос можно повторить."""
+
+    retryable = True
+
+
+class ThrottledError(TransientServiceError):
+    """Сервис ограничил частоту запросов (429) — повтор после Retry-After."""
+
+
+class ClientRequestError(ServiceHTTPError):
+    """Запрос отклонен сервисом (4xx) — повтор не поможет."""
+
+
+class NotFoundError(ClientRequestError):
+    """Ресурс не найден (404)."""
+
+
+def error_for_status(
+    service_name: str, status: int, message: str = "", retry_after: float | None = None
+) -> ServiceHTTPError:
+    """Исключение, соответствующее HTTP-статусу неуспешного ответа."""
+    if status == 429:
+        cls = ThrottledError
+    elif status == 404:
+        cls = NotFoundError
+    elif status == 408 or status >= 500:
+        cls = TransientServiceError
+    elif 400 <= status < 500:
+        cls = ClientRequestError
+    else:
+        cls = ServiceHTTPError
+    return cls(service_name, status, message, retry_after)
+
+
+class DeadlineExceededError(BotIspravitelError):
+    """Исчерпан бюджет времени строки или запуска (см. deadline.py)."""
+
+    # Повтор в пределах того же дедлайна бессмыслен
+    retryable = False
+
+    def __init__(self, stage: str, scope: str = "row"):
+        self.stage = stage
+        self.scope = scope
+        super().__init__(f"{scope} deadline exceeded at {stage}")
+
+
+class LLMBudgetExhaustedError(BotIspravitelError):
+    """Исчерпан бюджет LLM на запуск (вызовы, токены или время)."""
+
+    # Бюджет не вернется до конца запуска — повтор вызова бессмыслен
+    retryable = False
+
+    def __init__(self, resource: str):
+        self.resource = resource
+        super().__init__(f"LLM budget exhausted: {resource}")
@@ -0,0 +1,189 @@
+"""Детерминированное сопоставление категории LCSC с ГН/ВН без вызова LLM.
+
+Таблица хранится в версионируемом JSON-файле (``GN_VN_MAPPING_FILE``)::
+
+    {"version": 3, "rules": [
+        {"category": "Resistor", "gn": "ГН1", "vn": "ВН2", "support": 41},
+        {"category": "IC", "brand": "TI", "attrs": {"package": "SOT-23"}, "gn": "ГН3", "vn": "ВН1"}
+    ]}
+
+Правило подходит, если совпадает категория (без учета регистра) и, если заданы, бренд и
+значения атрибутов; из подходящих выбирается самое специфичное (бренд + число атрибутов),
+при равенстве — первое в файле. Строки без правила уходят в LLM.
+
+Таблица пополняется офлайн из отчетов прошлых запусков: ``learn_rules`` берет уверенные
+решения LLM (``gn_vn_source=llm``) и добавляет правило для категории, если решения
+согласованы, иначе — для пар категория + бренд (``scripts/learn_gn_vn_mapping.py``).
+"""
+from __future__ import annotations
+
+import json
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Iterable
+
+from logger import get_logger
+from metrics import RuntimeCounters, get_runtime_counters
+from serialization import loads
+
+# Источник ГН/ВН строки (колонка отчета gn_vn_source)
+SOURCE_MAPPING = "mapping"
+SOURCE_LLM = "llm"
+
+
+def _norm(value: Any) -> str:
+    return str(value or "").strip().casefold()
+
+
+class GnVnMapping:
+    """Таблица правил «категория LCSC (+ бренд/атрибуты) → ГН/ВН»."""
+
+    def __init__(self, rules: Iterable[dict] = (), version: int = 0, counters: RuntimeCounters | None = None):
+        self.version = int(version)
+        self.rules: list[dict] = []
+        self._by_category: dict[str, list[dict]] = defaultdict(list)
+        self.counters = counters or get_runtime_counters()
+        for rule in rules:
+            self.add_rule(rule)
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    @staticmethod
+    def rule_key(rule: dict) -> tuple:
+        """Ключ правила: категория, бренд и условия по атрибутам (без учета регистра)."""
+        attrs = tuple(sorted((_norm(k), _norm(v)) for k, v in (rule.get("attrs") or {}).items()))
+        return _norm(rule.get("category")), _norm(rule.get("brand")), attrs
+
+    def add_rule(self, rule: dict) -> None:
+        if not rule.get("category") or not rule.get("gn") or not rule.get("vn"):
+            raise ValueError(f"mapping rule requires category, gn and vn: {rule!r}")
+        self.rules.append(rule)
+        self._by_category[_norm(rule["category"])].append(rule)
+
+    def lookup(self, category: str, brand: str = "", attrs: dict | None = None) -> dict | None:
+        """ГН/ВН по категории (``{"gn", "vn"}``) или None; попадания и промахи пишутся в счетчики."""
+        match = self._match(category, brand, attrs or {}) if category else None
+        # Доля попаданий за запуск считается в метриках (metrics.get_summary)
+        self.counters.incr("gn_vn_mapping.hits" if match is not None else "gn_vn_mapping.misses")
+        if match is None:
+            return None
+        return {"gn": match["gn"], "vn": match["vn"]}
+
+    def _match(self, category: str, brand: str, attrs: dict) -> dict | None:
+        brand_n = _norm(brand)
+        attrs_n = {_norm(k): _norm(v) for k, v in attrs.items()}
+        best, best_score = None, -1
+        for rule in self._by_category.get(_norm(category), ()):
+            _, rule_brand, rule_attrs = self.rule_key(rule)
+            if rule_brand and rule_brand != brand_n:
+                continue
+            if any(attrs_n.get(k) != v for k, v in rule_attrs):
+                continue
+            score = (1 if rule_brand else 0) + len(rule_attrs)
+            if score > best_score:
+                best, best_score = rule, score
+        return best
+
+    def merged(self, rules: Iterable[dict]) -> "GnVnMapping":
+        """Новая версия таблицы: существующие правила сохраняются, добавляются правила с новыми ключами."""
+        known = {self.rule_key(rule) for rule in self.rules}
+        added = [rule for rule in rules if self.rule_key(rule) not in known]
+        return GnVnMapping([*self.rules, *added], version=self.version + 1, counters=self.counters)
+
+    def to_dict(self) -> dict:
+        return {"version": self.version, "rules": self.rules}
+
+
+def load_mapping(path: str | Path) -> GnVnMapping:
+    """Загрузить таблицу из файла; отсутствующий файл — пустая таблица версии 0."""
+    path = Path(path)
+    if not path.exists():
+        get_logger("gn_vn_mapping").warning("[mapping] file not found: %s, all rows go to LLM", path)
+        return GnVnMapping()
+    data = loads(path.read_bytes())
+    return GnVnMapping(data.get("rules") or [], version=data.get("version", 0))
+
+
+def save_mapping(mapping: GnVnMapping, path: str | Path) -> None:
+    """Записать таблицу в файл (атомарно, через временный файл; с отступами — файл правят руками)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(mapping.to_dict(), ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    tmp.replace(path)
+
+
+def learn_rules(
+    rows: Iterable[dict],
+    *,
+    min_confidence: float = 0.9,
+    min_support: int = 5,
+    min_agreement: float = 0.95,
+) -> list[dict]:
+    """Правила из уверенных решений LLM в строках отчетов.
+
+    Категория получает правило, если среди ее решений не меньше ``min_support`` строк и доля
+    самой частой пары ГН/ВН не ниже ``min_agreement``; иначе так же проверяются пары
+    категория + бренд. Строки, классифицированные самой таблицей, не учитываются.
+    """
+    by_category: dict[str, Counter] = defaultdict(Counter)
+    by_brand: dict[tuple[str, str], Counter] = defaultdict(Counter)
+    names: dict[str, str] = {}
+    for row in rows:
+        category = str(row.get("category") or "").strip()
+        gn, vn = str(row.get("gn") or "").strip(), str(row.get("vn") or "").strip()
+        if not category or not gn or not vn or row.get("gn_vn_source") != SOURCE_LLM:
+            continue
+        try:
+            confidence = float(row.get("confidence"))
+        except (TypeError, ValueError):
+            continue
+        if confidence < min_confidence:
+            continue
+        key = _norm(category)
+        names.setdefault(key, category)
+        by_category[key][(gn, vn)] += 1
+        brand = str(row.get("brand") or "").strip()
+        if brand:
+            by_brand[(key, brand)][(gn, vn)] += 1
+
+    def _agreed(votes: Counter) -> tuple[str, str, int] | None:
+        total = sum(votes.values())
+        (gn, vn), top = votes.most_common(1)[0]
+        if total >= min_support and top / total >= min_agreement:
+            return gn, vn, total
+        return None
+
+    rules = []
+    for key, votes in by_category.items():
+        agreed = _agreed(votes)
+        if agreed:
+            gn, vn, support = agreed
+            rules.append({"category": names[key], "gn": gn, "vn": vn, "support": support})
+            continue
+        for (brand_key, brand), brand_votes in by_brand.items():
+            if brand_key != key:
+                continue
+            agreed = _agreed(brand_votes)
+            if agreed:
+                gn, vn, support = agreed
+                rules.append({"category": names[key], "brand": brand, "gn": gn, "vn": vn, "support": support})
+    return rules
+
+
+# Глобальная таблица и путь, из которого она загружена
+_mapping: GnVnMapping | None = None
+_mapping_path: str | None = None
+
+
+def get_gn_vn_mapping(cfg) -> GnVnMapping | None:
+    """Таблица ``GN_VN_MAPPING_FILE``, если включен ``GN_VN_MAPPING``; загружается один раз на путь."""
+    global _mapping, _mapping_path
+    if not getattr(cfg, "gn_vn_mapping", False):
+        return None
+    path = getattr(cfg, "gn_vn_mapping_file", "data/gn_vn_mapping.json")
+    if _mapping is None or path != _mapping_path:
+        _mapping, _mapping_path = load_mapping(path), path
+        get_logger("gn_vn_mapping").info("[mapping] loaded %s: version=%s rules=%d", path, _mapping.version, len(_mapping))
+    return _mapping
@@ -0,0 +1,140 @@
+"""Хеджирование идемпотентных запросов для сокращения хвостовых задержек.
+
+Если запрос не ответил за время, равное заданному перцентилю наблюдаемых задержек,
+запускается дубликат; побеждает первый полученный ответ. Число дубликатов ограничено
+бюджетом (токены начисляются долей от каждого запроса), чтобы дополнительная нагрузка
+на сервис оставалась ограниченной.
+"""
+from __future__ import annotations
+
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable
+
+from latency import LatencyTracker
+from logger import get_logger
+from metrics import RuntimeCounters, get_runtime_counters
+
+
+class Hedger:
+    """Исполнитель хеджированных вызовов для одного сервиса/эндпоинта."""
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        percentile: float = 95.0,
+        min_samples: int = 20,
+        budget_ratio: float = 0.1,
+        budget_burst: float = 10.0,
+        max_workers: int = 16,
+        tracker: LatencyTracker | None = None,
+        counters: RuntimeCounters | None = None,
+    ):
+        self.name = name
+        self.percentile = percentile
+        self.min_samples = max(1, int(min_samples))
+        self.budget_ratio = max(0.0, float(budget_ratio))
+        self.budget_burst = max(1.0, float(budget_burst))
+        self.tracker = tracker or LatencyTracker()
+        self.counters = counters or get_runtime_counters()
+        self.log = get_logger("hedging")
+        self._tokens = self.budget_burst
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"hedge-{name}")
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def hedge_delay(self) -> float | None:
+        """Задержка перед запуском дубликата; None — статистики пока недостаточно."""
+        if self.tracker.count() < self.min_samples:
+            return None
+        return self.tracker.percentile(self.percentile)
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Выполнить fn с хеджированием; возвращает первый успешный результат."""
+        self._on_request()
+        delay = self.hedge_delay()
+        if delay is None:
+            return self._timed(fn, args, kwargs)
+
+        primary = self._submit(fn, args, kwargs)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._take_token():
+            return primary.result()
+
+        hedge = self._submit(fn, args, kwargs)
+        self._on_hedge()
+        self.log.debug("[hedge] %s fired after %.3fs", self.name, delay)
+
+        pending = {primary, hedge}
+        first_exc: BaseException | None = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                exc = fut.exception()
+                if exc is None:
+                    if fut is hedge:
+                        self._on_hedge_win()
+                    for other in pending:
+                        other.cancel()
+                    return fut.result()
+                first_exc = first_exc or exc
+        raise first_exc  # type: ignore[misc]
+
+    def get_stats(self) -> dict:
+        """Сводка по хеджированию."""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "hedge_rate": round(self.hedged / self.requests, 4) if self.requests else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        """Остановить пул потоков, не дожидаясь проигравших запросов."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # --- helpers ---
+    def _submit(self, fn, args, kwargs):
+        # Копия контекста на каждый запуск: contextvars (дедлайны, приоритеты) доступны в потоке
+        ctx = contextvars.copy_context()
+        return self._executor.submit(ctx.run, self._timed, fn, args, kwargs)
+
+    def _timed(self, fn, args, kwargs):
+        start = time.monotonic()
+        result = fn(*args, **kwargs)
+        self.tracker.record(time.monotonic() - start)
+        return result
+
+    def _take_token(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+        self.counters.incr(f"hedge.{self.name}.budget_denied")
+        return False
+
+    def _on_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+            self._tokens = min(self.budget_burst, self._tokens + self.budget_ratio)
+            rate = self.hedged / self.requests
+        self.counters.incr(f"hedge.{self.name}.requests")
+        self.counters.set(f"hedge.{self.name}.rate", round(rate, 4))
+
+    def _on_hedge(self) -> None:
+        with self._lock:
+            self.hedged += 1
+            rate = self.hedged / self.requests
+        self.counters.incr(f"hedge.{self.name}.hedged")
+        self.counters.set(f"hedge.{self.name}.rate", round(rate, 4))
+
+    def _on_hedge_win(self) -> None:
+        with self._lock:
+            self.hedge_wins += 1
+        self.counters.incr(f"hedge.{self.name}.wins")
@@ -0,0 +1,71 @@
+"""Ключи идемпотентности для записей в catalogApp.
+
+Ключ детерминирован: один и тот же товар в рамках одного запуска всегда дает один ключ,
+поэтому повтор POST/PATCH после таймаута (ретраи клиента и пайплайна, хеджирование,
+повторная отправка пачки) не создает дубликат карточки — сервер возвращает первый ответ.
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable
+
+from partnumbers import canonicalize_partnumber
+from serialization import dumps
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def create_key(payload: dict, run_id: str | None) -> str:
+    """Ключ создания: канонический партномер + бренд + запуск."""
+    return _digest(
+        "create",
+        run_id or "",
+        canonicalize_partnumber(payload.get("partnumber")),
+        str(payload.get("brand") or "").strip().upper(),
+    )
+
+
+def update_key(product_id: str | int, patch: dict, run_id: str | None) -> str:
+    """Ключ обновления: карточка + содержимое патча + запуск.
+
+    В патче партномера может не быть, поэтому товар идентифицируется по id карточки;
+    разные патчи одной карточки в одном запуске получают разные ключи.
+    """
+    body = dumps({k: patch[k] for k in sorted(patch)})
+    brand = str(patch.get("brand") or "").strip().upper()
+    return _digest("update", run_id or "", str(product_id), brand, body)
+
+
+class IdempotencyStore:
+    """Серверная сторона: первый ответ на ключ запоминается и возвращается на повторы.
+
+    Используется моками и локальным stand-in сервером; хранит не более ``max_keys`` ключей (LRU).
+    """
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max(1, int(max_keys))
+        self._responses: OrderedDict[str, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self.replays = 0
+
+    def run(self, key: str | None, fn: Callable[[], Any]) -> Any:
+        """Выполнить запись или вернуть сохраненный ответ для уже виденного ключа."""
+        if not key:
+            return fn()
+        # Запись выполняется под блокировкой: параллельные повторы с тем же ключом ждут первый ответ
+        with self._lock:
+            if key in self._responses:
+                self._responses.move_to_end(key)
+                self.replays += 1
+                return self._responses[key]
+            result = fn()
+            self._responses[key] = result
+            while len(self._responses) > self.max_keys:
+                self._responses.popitem(last=False)
+        return result
@@ -0,0 +1,134 @@
+"""Скользящая статистика задержек внешних вызовов и адаптивные таймауты."""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Iterator
+
+from metrics import RuntimeCounters, get_runtime_counters
+
+
+class LatencyTracker:
+    """Потокобезопасное окно последних задержек (в секундах) с оценкой перцентилей."""
+
+    def __init__(self, window: int = 200):
+        self.window = max(1, int(window))
+        self._samples: Deque[float] = deque(maxlen=self.window)
+        self._lock = threading.Lock()
+
+    def record(self, latency_sec: float) -> None:
+        """Добавить наблюдение."""
+        with self._lock:
+            self._samples.append(max(0.0, float(latency_sec)))
+
+    def count(self) -> int:
+        """Количество наблюдений в окне."""
+        with self._lock:
+            return len(self._samples)
+
+    def percentile(self, p: float) -> float | None:
+        """Перцентиль p (0..100) по методу nearest-rank; None, если окно пусто."""
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        rank = max(1, math.ceil(p / 100.0 * len(ordered)))
+        return ordered[min(rank, len(ordered)) - 1]
+
+
+class AdaptiveTimeout:
+    """Таймаут одного эндпоинта: ``multiplier`` × перцентиль наблюдаемых задержек.
+
+    Значение ограничено снизу ``min_sec`` и сверху ``max_sec`` (фиксированный таймаут сервиса);
+    пока наблюдений меньше ``min_samples`` (или адаптация выключена), действует ``max_sec``.
+    Учитываются и неудачные вызовы: серия таймаутов поднимает перцентиль и возвращает
+    таймаут к верхней границе, а не загоняет его вниз.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_sec: float,
+        *,
+        enabled: bool = True,
+        min_sec: float = 0.5,
+        multiplier: float = 3.0,
+        percentile: float = 99.0,
+        min_samples: int = 20,
+        tracker: LatencyTracker | None = None,
+        counters: RuntimeCounters | None = None,
+    ):
+        self.name = name
+        self.max_sec = float(max_sec)
+        self.min_sec = min(float(min_sec), self.max_sec)
+        self.enabled = enabled
+        self.multiplier = float(multiplier)
+        self.percentile = percentile
+        self.min_samples = max(1, int(min_samples))
+        self.tracker = tracker or LatencyTracker()
+        self.counters = counters or get_runtime_counters()
+
+    def current(self) -> float:
+        """Действующий таймаут в секундах (пишется в метрики ``timeout.<name>.effective_ms``)."""
+        timeout = self.max_sec
+        if self.enabled and self.tracker.count() >= self.min_samples:
+            observed = self.tracker.percentile(self.percentile)
+            timeout = min(self.max_sec, max(self.min_sec, observed * self.multiplier))
+        self.counters.set(f"timeout.{self.name}.effective_ms", timeout * 1000.0)
+        return timeout
+
+    @contextmanager
+    def observe(self) -> Iterator[None]:
+        """Замерить вызов внутри блока (и успешный, и завершившийся ошибкой)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.tracker.record(time.perf_counter() - started)
+
+
+class AdaptiveTimeouts:
+    """Адаптивные таймауты эндпоинтов одного сервиса (распределения задержек раздельные)."""
+
+    def __init__(self, service: str, max_sec: float, **kwargs):
+        self.service = service
+        self.max_sec = max_sec
+        self._kwargs = kwargs
+        self._endpoints: dict[str, AdaptiveTimeout] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, cfg, service: str) -> "AdaptiveTimeouts":
+        """Параметры из ``ADAPTIVE_TIMEOUT_*``; верхняя граница — ``<service>_timeout_sec``."""
+        return cls(
+            service,
+            getattr(cfg, f"{service}_timeout_sec", 10.0),
+            enabled=getattr(cfg, "adaptive_timeouts", False),
+            min_sec=getattr(cfg, "adaptive_timeout_min_sec", 0.5),
+            multiplier=getattr(cfg, "adaptive_timeout_multiplier", 3.0),
+            percentile=getattr(cfg, "adaptive_timeout_percentile", 99.0),
+            min_samples=getattr(cfg, "adaptive_timeout_min_samples", 20),
+        )
+
+    def endpoint(self, name: str) -> AdaptiveTimeout:
+        with self._lock:
+            timeout = self._endpoints.get(name)
+            if timeout is None:
+                timeout = AdaptiveTimeout(f"{self.service}.{name}", self.max_sec, **self._kwargs)
+                self._endpoints[name] = timeout
+            return timeout
+
+    def current(self, name: str) -> float:
+        return self.endpoint(name).current()
+
+    def observe(self, name: str):
+        return self.endpoint(name).observe()
+
+    def snapshot(self) -> dict[str, float]:
+        """Текущие таймауты по эндпоинтам (секунды)."""
+        with self._lock:
+            endpoints = dict(self._endpoints)
+        return {name: timeout.current() for name, timeout in endpoints.items()}
@@ -1,24 +1,40 @@
-import random
-import time
-from typing import Any
+import functools
+from typing import Any, Sequence
 
 import requests
 
+from balancer import EndpointPool
+from concurrency import ThreadServiceLimiter, attempt_slot
+from deadline import timeout_for
+from hedging import Hedger
+from latency import AdaptiveTimeouts
+from partnumbers import SearchSelector, order_exact_first
+from retry import RetryPolicy
+from scheduler import LaneScheduler
+from serialization import response_json
+from transport import RETRYABLE_ERRORS, status_error, stream_get
+
 
 class LCSCClientReal:
     """
     Простой HTTP‑клиент для LCSC через настраиваемый REST‑ендпоинт.
     Предполагается, что бизнес предоставит прокси‑API к LCSC.
 
+    ``base_url`` — адрес прокси или несколько реплик (список либо строка через запятую):
+    каждая попытка уходит на реплику, выбранную ``EndpointPool`` (см. balancer.py).
+
     Ожидаемый контракт поиска:
-    GET {base_url}/search?q={partnumber}
+    GET {base_url}/search?q={partnumber}[&fields=brand,...]
       -> 200 OK: [{"partnumber": str, "brand": str, "category": str, "attrs": {..}, "datasheet_url": str}]
-      -> иначе: []
+      -> 404: []
+      -> иначе: ServiceHTTPError по классу статуса (см. exceptions.error_for_status)
+    Транспортные и временные ошибки (5xx, 408, 429) повторяются политикой ``retry_policy``; после исчерпания попыток —
+    ``RetryExhaustedError`` (под политикой уровнем выше — одна попытка, ошибка уходит наружу).
     """
 
     def __init__(
         self,
-        base_url: str,
+        base_url: str | Sequence[str],
         *,
         api_key: str | None = None,
         timeout_sec: float = 10.0,
@@ -26,33 +42,78 @@ class LCSCClientReal:
         backoff_base_ms: int = 100,
         backoff_max_ms: int = 2000,
         backoff_jitter_ms: int = 100,
+        hedger: Hedger | None = None,
+        http=None,
+        search_fields: Sequence[str] | None = None,
+        stream_search: bool = False,
+        stream_max_items: int = 0,
+        retry_policy: RetryPolicy | None = None,
+        timeouts: AdaptiveTimeouts | None = None,
+        endpoints: EndpointPool | None = None,
+        limiter: ThreadServiceLimiter | None = None,
+        scheduler: LaneScheduler | None = None,
     ) -> None:
-        self.base_url = base_url.rstrip("/")
+        self.endpoints = endpoints or EndpointPool("lcsc", base_url)
+        self.base_url = self.endpoints.urls[0]
         self.timeout_sec = timeout_sec
+        self.timeouts = timeouts or AdaptiveTimeouts("lcsc", timeout_sec, enabled=False)
+        # Адаптивный лимит сервиса (ADAPTIVE_CONCURRENCY): слот на каждую HTTP-попытку
+        self.limiter = limiter
+        # Квота сервиса по полосам (<SERVICE>_RATE_LIMIT): разрешение на каждую HTTP-попытку, см. scheduler.py
+        self.scheduler = scheduler
         self.retries = max(1, int(retries))
         self.backoff_base_ms = max(0, int(backoff_base_ms))
         self.backoff_max_ms = max(0, int(backoff_max_ms))
         self.backoff_jitter_ms = max(0, int(backoff_jitter_ms))
+        self.retry = retry_policy or RetryPolicy(
+            self.retries, self.backoff_base_ms, self.backoff_max_ms, self.backoff_jitter_ms
+        )
+        self.hedger = hedger
+        self.http = http or requests
+        self.search_fields = tuple(search_fields) if search_fields else None
+        self.stream_search = stream_search
+        self.stream_max_items = max(0, int(stream_max_items))
         self.headers = {}
         if api_key:
             self.headers["Authorization"] = f"Bearer {api_key}"
 
-    def search(self, partnumber: str) -> list[dict[str, Any]]:
-        url = f"{self.base_url}/search"
-        params = {"q": partnumber}
-        for attempt in range(1, self.retries + 1):
-            try:
-                resp = requests.get(url, params=params, headers=self.headers, timeout=self.timeout_sec)
-                if resp.status_code == 200:
-                    data = resp.json()
-                    if isinstance(data, list):
-                        return data
-                    return []
+    def _check_status(self, status: int, headers=None) -> bool:
+        """True — ответ 200; 404 — пустой результат поиска (False); иначе исключение по классу статуса."""
+        if status == 200:
+            return True
+        if status == 404:
+            return False
+        raise status_error("lcsc", status, headers)
+
+    def _timeout(self) -> float:
+        return timeout_for(self.timeouts.current("search"), "lcsc_search")
+
+    def _fetch(self, path: str, params: dict, partnumber: str):
+        with attempt_slot(self.limiter, self.scheduler), self.endpoints.use() as ep, self.timeouts.observe("search"):
+            resp = self.http.get(f"{ep.url}{path}", params=params, headers=self.headers, timeout=self._timeout())
+            # Статус проверяется внутри блока: 5xx засчитывается реплике как сбой
+            if not self._check_status(resp.status_code, getattr(resp, "headers", None)):
                 return []
-            except (requests.Timeout, requests.RequestException):
-                if attempt < self.retries:
-                    delay_ms = min(self.backoff_max_ms, self.backoff_base_ms * (2 ** (attempt - 1)))
-                    delay_ms += random.randint(0, self.backoff_jitter_ms) if self.backoff_jitter_ms > 0 else 0
-                    time.sleep(delay_ms / 1000.0)
-                continue
-        return []
+        data = response_json(resp)
+        return order_exact_first(data, partnumber) if isinstance(data, list) else []
+
+    def _fetch_streaming(self, path: str, params: dict, partnumber: str):
+        selector = SearchSelector(partnumber, self.stream_max_items)
+        with attempt_slot(self.limiter, self.scheduler), self.endpoints.use() as ep, self.timeouts.observe("search"), stream_get(
+            self.http, f"{ep.url}{path}", params=params, headers=self.headers, timeout=self._timeout()
+        ) as (status, headers, chunks):
+            if not self._check_status(status, headers):
+                return []
+            return selector.consume(chunks)
+
+    def search(self, partnumber: str, fields: Sequence[str] | None = None) -> list[dict[str, Any]]:
+        params = {"q": partnumber}
+        fields = fields or self.search_fields
+        if fields:
+            params["fields"] = ",".join(fields)
+        fetch = self._fetch_streaming if self.stream_search else self._fetch
+        send = functools.partial(fetch, "/search", params, partnumber)
+        return self.retry.call(
+            lambda: self.hedger.call(send) if self.hedger else send(),
+            tag="lcsc_search", retry_on=RETRYABLE_ERRORS,
+        )
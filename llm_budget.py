@@ -0,0 +1,191 @@
+"""Бюджет вызовов LLM на запуск.
+
+Ограничивает число вызовов (``LLM_BUDGET_CALLS``), оценку токенов (``LLM_BUDGET_TOKENS``,
+см. ``llm_client.estimate_tokens``) и время от начала запуска (``LLM_BUDGET_WALL_SEC``);
+0 — без ограничения. Каждый запрос к LLM списывается из бюджета до отправки; ответы из
+кэша (``LLM_CACHE``) бюджет не тратят. Когда бюджет исчерпан, строка получает причину
+``llm_budget_exhausted`` и остается до следующего запуска.
+
+Синхронный путь списывает бюджет в ``BudgetedLLMClient`` (под кэшем ответов, см.
+``services.get_llm_client``); бюджет общий на запуск и начинается ``reset_llm_budget``.
+
+Чтобы бюджет доставался ценным строкам, запуск обрабатывает их в порядке ``row_value``:
+сначала строки с ``external_id``, затем по сумме ``quantity * price``.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Sequence
+
+from exceptions import LLMBudgetExhaustedError
+from llm_client import estimate_tokens
+from metrics import RuntimeCounters, get_runtime_counters
+
+# Причина строки, отложенной до следующего запуска из-за исчерпанного бюджета
+LLM_BUDGET_REASON = "llm_budget_exhausted"
+
+
+def _number(value: Any) -> float:
+    try:
+        return float(str(value).replace(",", ".").replace(" ", "")) if value not in (None, "") else 0.0
+    except ValueError:
+        return 0.0
+
+
+def row_value(row: dict) -> tuple[int, float]:
+    """Ценность строки для очередности: (есть external_id, quantity * price)."""
+    quantity, price = _number(row.get("quantity")), _number(row.get("price"))
+    amount = quantity * price if quantity and price else quantity or price
+    return (1 if str(row.get("external_id") or "").strip() else 0), amount
+
+
+def prioritize(rows: Sequence[dict]) -> list[int]:
+    """Индексы строк по убыванию ценности; при равенстве сохраняется исходный порядок."""
+    return sorted(range(len(rows)), key=lambda i: row_value(rows[i]), reverse=True)
+
+
+class LLMBudget:
+    """Потокобезопасный бюджет LLM: вызовы, оценка токенов и время запуска."""
+
+    def __init__(
+        self,
+        max_calls: int = 0,
+        max_tokens: int = 0,
+        max_wall_sec: float = 0.0,
+        counters: RuntimeCounters | None = None,
+    ):
+        self.max_calls = max(0, int(max_calls))
+        self.max_tokens = max(0, int(max_tokens))
+        self.max_wall_sec = max(0.0, float(max_wall_sec))
+        self.counters = counters or get_runtime_counters()
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self.calls = 0
+        self.tokens = 0
+        self.denied = 0
+        self.counters.set("llm_budget.max_calls", self.max_calls)
+        self.counters.set("llm_budget.max_tokens", self.max_tokens)
+
+    @classmethod
+    def from_config(cls, cfg) -> "LLMBudget | None":
+        """Бюджет по ``LLM_BUDGET_*``; None — ни одно ограничение не задано."""
+        budget = cls(
+            getattr(cfg, "llm_budget_calls", 0),
+            getattr(cfg, "llm_budget_tokens", 0),
+            getattr(cfg, "llm_budget_wall_sec", 0.0),
+        )
+        return budget if budget.max_calls or budget.max_tokens or budget.max_wall_sec else None
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self._started
+
+    def spend(self, text: str, *candidates: Sequence[str]) -> None:
+        """Списать один вызов с промптом ``text`` (+ кандидаты ГН/ВН) или поднять LLMBudgetExhaustedError."""
+        tokens = estimate_tokens(" ".join([text, *(" ".join(c) for c in candidates)]))
+        with self._lock:
+            if self.max_wall_sec and self.elapsed() >= self.max_wall_sec:
+                resource = "wall_time"
+            elif self.max_calls and self.calls + 1 > self.max_calls:
+                resource = "calls"
+            elif self.max_tokens and self.tokens + tokens > self.max_tokens:
+                resource = "tokens"
+            else:
+                resource = None
+                self.calls += 1
+                self.tokens += tokens
+            if resource is not None:
+                self.denied += 1
+        if resource is not None:
+            self.counters.incr("llm_budget.denied")
+            raise LLMBudgetExhaustedError(resource)
+        self.counters.incr("llm_budget.calls")
+        self.counters.incr("llm_budget.tokens", tokens)
+        self.counters.set("llm_budget.elapsed_sec", round(self.elapsed(), 3))
+
+
+class BudgetedLLMClient:
+    """Прокси LLM-клиента: запросы ``normalize``/``classify``/``analyze`` списываются из бюджета запуска.
+
+    Пакетные ``normalize_batch``/``classify_batch`` списывают каждый элемент как отдельный вызов;
+    под кэшем ответов (``CachedLLMClient``) сюда доходят только промахи.
+
+    Бюджет берется при каждом вызове (``get_llm_budget``), поэтому долгоживущий клиент
+    тратит бюджет текущего запуска. Прочие атрибуты — от исходного клиента.
+    """
+
+    def __init__(self, client: Any):
+        self._client = client
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+    @staticmethod
+    def _spend(text: str, *candidates: Sequence[str]) -> None:
+        budget = get_llm_budget()
+        if budget is not None:
+            budget.spend(text, *candidates)
+
+    def normalize(self, text: str) -> dict:
+        self._spend(text)
+        return self._client.normalize(text)
+
+    def classify(self, gn_candidates: list[str], vn_candidates: list[str], text: str) -> dict:
+        self._spend(text, gn_candidates, vn_candidates)
+        return self._client.classify(gn_candidates, vn_candidates, text)
+
+    def analyze(self, text: str, gn_candidates: list[str], vn_candidates: list[str]) -> dict:
+        self._spend(text, gn_candidates, vn_candidates)
+        return self._client.analyze(text, gn_candidates, vn_candidates)
+
+    def normalize_batch(self, texts: Sequence[str]) -> list:
+        return self._batch(texts, (), self._client.normalize_batch)
+
+    def classify_batch(self, items: Sequence[str], gn_candidates: list[str], vn_candidates: list[str]) -> list:
+        return self._batch(
+            items, (gn_candidates, vn_candidates),
+            lambda texts: self._client.classify_batch(texts, gn_candidates, vn_candidates),
+        )
+
+    def _batch(self, texts: Sequence[str], candidates: tuple, call) -> list:
+        """Списать каждый элемент пакета как отдельный вызов; не уместившиеся в бюджет получают
+        LLMBudgetExhaustedError в своей позиции, в LLM уходят только оплаченные элементы."""
+        results: list = []
+        paid: list[int] = []
+        for i, text in enumerate(texts):
+            try:
+                self._spend(text, *candidates)
+            except LLMBudgetExhaustedError as e:
+                results.append(e)
+            else:
+                results.append(None)
+                paid.append(i)
+        if paid:
+            answers = call([texts[i] for i in paid])
+            for i, answer in zip(paid, answers, strict=True):
+                results[i] = answer
+        return results
+
+
+def budget_llm_client(client: Any, cfg) -> Any:
+    """Обернуть LLM-клиента бюджетом запуска, если задано хотя бы одно ограничение ``LLM_BUDGET_*``."""
+    limits = (getattr(cfg, name, 0) for name in ("llm_budget_calls", "llm_budget_tokens", "llm_budget_wall_sec"))
+    if client is None or not any(limits):
+        return client
+    return BudgetedLLMClient(client)
+
+
+# Бюджет LLM текущего запуска
+_llm_budget: LLMBudget | None = None
+
+
+def get_llm_budget() -> LLMBudget | None:
+    """Бюджет LLM текущего запуска; None — без ограничений или запуск еще не начат."""
+    return _llm_budget
+
+
+def reset_llm_budget(cfg) -> LLMBudget | None:
+    """Начать бюджет LLM нового запуска по ``LLM_BUDGET_*``: лимиты и время считаются заново."""
+    global _llm_budget
+    _llm_budget = LLMBudget.from_config(cfg)
+    return _llm_budget
@@ -1,9 +1,46 @@
-import random
-import time
-from typing import Any
+from typing import Any, Callable, Sequence
 
 import requests
 
+from balancer import EndpointPool
+from concurrency import ThreadServiceLimiter, attempt_slot
+from deadline import timeout_for
+from exceptions import ExternalServiceError, LLMError, RetryExhaustedError
+from latency import AdaptiveTimeouts
+from retry import RetryPolicy
+from scheduler import LaneScheduler
+from serialization import response_json
+from transport import RETRYABLE_ERRORS, status_error
+
+# Грубая оценка токенов промпта: ~4 символа на токен
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Оценка числа токенов текста (без токенизатора модели)."""
+    return max(1, len(text or "") // CHARS_PER_TOKEN)
+
+
+def chunk_by_budget(items: Sequence[str], max_items: int, max_tokens: int, overhead: int = 0) -> list[list[int]]:
+    """Индексы элементов, разбитые на пакеты не длиннее ``max_items`` и ``max_tokens`` токенов.
+
+    ``overhead`` — токены общей части запроса (кандидаты ГН/ВН). Элемент, который один
+    превышает бюджет, уходит отдельным пакетом.
+    """
+    chunks: list[list[int]] = []
+    current: list[int] = []
+    tokens = overhead
+    for i, text in enumerate(items):
+        cost = estimate_tokens(text)
+        if current and (len(current) >= max_items or tokens + cost > max_tokens):
+            chunks.append(current)
+            current, tokens = [], overhead
+        current.append(i)
+        tokens += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
 
 class LLMClientReal:
     """
@@ -14,11 +51,20 @@ class LLMClientReal:
       -> 200 OK: {"local_name": str, "attrs": {..}}
     POST {base_url}/classify {"text": str, "gn_candidates": [..], "vn_candidates": [..]}
       -> 200 OK: {"gn": str, "vn": str, "confidence": float}
+    POST {base_url}/analyze {"text": str, "gn_candidates": [..], "vn_candidates": [..]}
+      -> 200 OK: {"local_name": str, "attrs": {..}, "gn": str, "vn": str, "confidence": float}
+    POST {base_url}/normalize/batch {"texts": [..]}
+    POST {base_url}/classify/batch {"texts": [..], "gn_candidates": [..], "vn_candidates": [..]}
+      -> 200 OK: {"results": [<ответ одиночного эндпоинта> | {"error": str}, ...]} в порядке texts
+    Неуспешный статус — ServiceHTTPError по классу статуса (см. exceptions.error_for_status).
+
+    ``base_url`` — адрес прокси или список реплик (строка через запятую): каждая попытка уходит
+    на реплику, выбранную ``EndpointPool`` (см. balancer.py); сбойные реплики временно исключаются.
     """
 
     def __init__(
         self,
-        base_url: str,
+        base_url: str | Sequence[str],
         *,
         api_key: str | None = None,
         timeout_sec: float = 15.0,
@@ -26,35 +72,52 @@ class LLMClientReal:
         backoff_base_ms: int = 100,
         backoff_max_ms: int = 2000,
         backoff_jitter_ms: int = 100,
+        http=None,
+        retry_policy: RetryPolicy | None = None,
+        timeouts: AdaptiveTimeouts | None = None,
+        endpoints: EndpointPool | None = None,
+        limiter: ThreadServiceLimiter | None = None,
+        scheduler: LaneScheduler | None = None,
+        batch_size: int = 20,
+        batch_max_tokens: int = 4000,
     ) -> None:
-        self.base_url = base_url.rstrip("/")
+        self.endpoints = endpoints or EndpointPool("llm", base_url)
+        self.base_url = self.endpoints.urls[0]
         self.timeout_sec = timeout_sec
+        # Раздельные таймауты /normalize и /classify: у них разные распределения задержек
+        self.timeouts = timeouts or AdaptiveTimeouts("llm", timeout_sec, enabled=False)
+        # Адаптивный лимит сервиса (ADAPTIVE_CONCURRENCY): слот на каждую HTTP-попытку
+        self.limiter = limiter
+        # Квота сервиса по полосам (<SERVICE>_RATE_LIMIT): разрешение на каждую HTTP-попытку, см. scheduler.py
+        self.scheduler = scheduler
         self.retries = max(1, int(retries))
         self.backoff_base_ms = max(0, int(backoff_base_ms))
         self.backoff_max_ms = max(0, int(backoff_max_ms))
         self.backoff_jitter_ms = max(0, int(backoff_jitter_ms))
+        self.retry = retry_policy or RetryPolicy(
+            self.retries, self.backoff_base_ms, self.backoff_max_ms, self.backoff_jitter_ms
+        )
+        self.batch_size = max(1, int(batch_size))
+        self.batch_max_tokens = max(1, int(batch_max_tokens))
+        self.http = http or requests
         self.headers = {"Content-Type": "application/json"}
         if api_key:
             self.headers["Authorization"] = f"Bearer {api_key}"
 
+    def _post_once(self, path: str, payload: dict[str, Any], endpoint: str = "post") -> dict[str, Any]:
+        with attempt_slot(self.limiter, self.scheduler), self.endpoints.use() as ep, self.timeouts.observe(endpoint):
+            timeout = timeout_for(self.timeouts.current(endpoint), f"llm_{endpoint}")
+            resp = self.http.post(f"{ep.url}{path}", json=payload, headers=self.headers, timeout=timeout)
+            if resp.status_code != 200:
+                raise status_error("llm", resp.status_code, getattr(resp, "headers", None))
+        data = response_json(resp)
+        return data if isinstance(data, dict) else {}
+
     def _post(self, path: str, payload: dict[str, Any]) -> dict[str, Any]:
-        url = f"{self.base_url}{path}"
-        for attempt in range(1, self.retries + 1):
-            try:
-                resp = requests.post(url, json=payload, headers=self.headers, timeout=self.timeout_sec)
-                if resp.status_code == 200:
-                    data = resp.json()
-                    if isinstance(data, dict):
-                        return data
-                    return {}
-                return {}
-            except (requests.Timeout, requests.RequestException):
-                if attempt < self.retries:
-                    delay_ms = min(self.backoff_max_ms, self.backoff_base_ms * (2 ** (attempt - 1)))
-                    delay_ms += random.randint(0, self.backoff_jitter_ms) if self.backoff_jitter_ms > 0 else 0
-                    time.sleep(delay_ms / 1000.0)
-                continue
-        return {}
+        endpoint = path.strip("/").replace("/", "_")
+        return self.retry.call(
+            self._post_once, path, payload, endpoint, tag=f"llm_{endpoint}", retry_on=RETRYABLE_ERRORS
+        )
 
     def normalize(self, text: str) -> dict[str, Any]:
         return self._post("/normalize", {"text": text})
@@ -65,3 +128,52 @@ class LLMClientReal:
             "gn_candidates": gn_candidates,
             "vn_candidates": vn_candidates,
         })
+
+    def analyze(self, text: str, gn_candidates: list[str], vn_candidates: list[str]) -> dict[str, Any]:
+        """Нормализация и классификация одним запросом."""
+        return self._post("/analyze", {
+            "text": text,
+            "gn_candidates": gn_candidates,
+            "vn_candidates": vn_candidates,
+        })
+
+    def normalize_batch(self, texts: Sequence[str]) -> list[dict[str, Any] | Exception]:
+        """Нормализация пакета текстов; результат по позициям — ответ или исключение этого элемента."""
+        return self._batch("/normalize/batch", list(texts), lambda chunk: {"texts": chunk})
+
+    def classify_batch(
+        self, items: Sequence[str], gn_candidates: list[str], vn_candidates: list[str]
+    ) -> list[dict[str, Any] | Exception]:
+        """Классификация пакета текстов по общему набору кандидатов ГН/ВН."""
+        overhead = sum(estimate_tokens(c) for c in [*gn_candidates, *vn_candidates])
+        return self._batch(
+            "/classify/batch", list(items),
+            lambda chunk: {"texts": chunk, "gn_candidates": gn_candidates, "vn_candidates": vn_candidates},
+            overhead,
+        )
+
+    def _batch(
+        self, path: str, texts: list[str], payload: Callable[[list[str]], dict], overhead: int = 0
+    ) -> list[dict[str, Any] | Exception]:
+        """Разбить на пакеты и отправить; сбой пакета или элемента не роняет остальные.
+
+        Дедлайн (DeadlineExceededError) пробрасывается: следующие пакеты все равно не успеют.
+        """
+        results: list[dict[str, Any] | Exception] = [LLMError("not processed")] * len(texts)
+        for chunk in chunk_by_budget(texts, self.batch_size, self.batch_max_tokens, overhead):
+            try:
+                data = self._post(path, payload([texts[i] for i in chunk]))
+                answers = data.get("results")
+                if not isinstance(answers, list) or len(answers) != len(chunk):
+                    raise LLMError(f"{path}: expected {len(chunk)} results")
+            except (RetryExhaustedError, ExternalServiceError) as e:
+                for i in chunk:
+                    results[i] = e
+                continue
+            for i, answer in zip(chunk, answers, strict=True):
+                if isinstance(answer, dict) and "error" not in answer:
+                    results[i] = answer
+                else:
+                    error = answer.get("error") if isinstance(answer, dict) else "malformed result"
+                    results[i] = LLMError(f"{path}: {error}")
+        return results
@@ -1,20 +1,39 @@
+import time
+
 from config import load_config
+from deadline import deadline_scope
+from deferred import DeferredRetryQueue
 from import_excel import load_excel
+from llm_budget import prioritize, reset_llm_budget
 from logger import get_logger, init_logging
-from metrics import MetricsCollector
-from pipeline import ProcessingPipeline
+from metrics import MetricsCollector, get_runtime_counters
+from pipeline import DEADLINE_REASON, RETRYABLE_REASONS, ProcessingPipeline
 from reporter import save_report
-from services import get_catalog_client, get_lcsc_client, get_llm_client
+from retry import reset_retry_budget
+from scheduler import DEFAULT_LANE, lane_scope
+from services import close_hedgers, get_catalog_client, get_lcsc_client, get_llm_client
+from transport import close_sync_transports
 from validators import DataValidator, SchemaValidator
 
 
-def process_rows(data, cfg):
+def process_rows(data, cfg, lane: str = DEFAULT_LANE):
     """Общий поток обработки строк данных. Возвращает список результатов.
 
     Использует рефакторированный ProcessingPipeline с метриками для мониторинга.
+    ``lane`` — полоса планировщика запросов: ``batch`` (cron-агент) или ``interactive`` (UI).
     """
+    with lane_scope(lane):
+        return _process_rows(data, cfg)
+
+
+def _process_rows(data, cfg):
     log = get_logger("main")
     metrics = MetricsCollector()
+    runtime_counters = get_runtime_counters()
+    runtime_counters.reset()
+    # Бюджеты повторов и LLM — на запуск
+    reset_retry_budget(cfg)
+    llm_budget = reset_llm_budget(cfg)
     
     # Валидация схемы данных
     if data:
@@ -61,21 +80,92 @@ def process_rows(data, cfg):
     # Уже аннотированные невалидные строки просто переносим в отчет
     results.extend(invalid_rows)
 
-    # Обработка валидных строк через пайплайн с метриками
-    with metrics.processing_timer():
-        for row in valid_rows:
-            try:
-                processed_row = pipeline.process_single_row(row)
-                metrics.add_result(processed_row)
-                results.append(processed_row)
-            except Exception as e:
-                # Любая непредвиденная ошибка — не блокировать партию
-                log.error("[main] Unexpected error processing row: %s", e)
-                row.update({"status": "error", "reason": f"row_failed: {type(e).__name__}"})
-                metrics.add_result(row)
-                results.append(row)
+    # Отложенные повторы: строка с временным сбоем ждет бэкофф в очереди, а не в time.sleep,
+    # пока обрабатываются другие строки. Итоги собираются по индексу — порядок отчета сохраняется.
+    deferred = None
+    if pipeline.deferred_retries:
+        deferred = DeferredRetryQueue(
+            pipeline.retry_policies["default"], getattr(cfg, "deferred_retry_attempts", 3)
+        )
+    finished: dict[int, dict] = {}
+    # Бюджет LLM: ценные строки обрабатываются первыми, итоги все равно собираются по индексу
+    order = prioritize(valid_rows) if llm_budget is not None else list(range(len(valid_rows)))
+
+    def finish(index: int, row: dict) -> None:
+        metrics.add_result(row)
+        finished[index] = row
+
+    def attempt(index: int, source: dict, number: int, last: dict | None = None, write: tuple | None = None) -> None:
+        previous_errors = last.get("errors", "") if last is not None else ""
+        if write is not None:
+            # Поиск и классификация уже выполнены — повторяется только запись в каталог
+            row = dict(last)
+        else:
+            # Повтор начинается с исходной строки: итог прошлой попытки не влияет на решения пайплайна
+            row = dict(source) if deferred is not None else source
+        try:
+            row = pipeline.retry_write(row, write) if write is not None else pipeline.process_single_row(row)
+        except Exception as e:
+            # Любая непредвиденная ошибка — не блокировать партию
+            log.error("[main] Unexpected error processing row: %s", e)
+            row.update({"status": "error", "reason": f"row_failed: {type(e).__name__}"})
+        # Несостоявшаяся запись едет в очереди, а не в отчете
+        write = row.pop("_write", None)
+        if previous_errors:
+            row["errors"] = ";".join(filter(None, (previous_errors, row.get("errors", ""))))
+        retry_later = (
+            deferred is not None
+            and row.get("reason") in RETRYABLE_REASONS
+            and not run_deadline.expired()
+            and deferred.push((index, source, row, write), number)
+        )
+        if retry_later:
+            return
+        if number > 1 and row.get("reason") not in RETRYABLE_REASONS:
+            runtime_counters.incr("deferred.recovered")
+        finish(index, row)
+
+    # Обработка валидных строк через пайплайн с метриками.
+    # Дедлайн запуска наступает за run_deadline_reserve_sec до RUN_DEADLINE_SEC: оставшегося
+    # времени хватает, чтобы записать отчет до того, как процесс остановит cron.
+    run_budget = getattr(cfg, "run_deadline_sec", 0)
+    if run_budget:
+        run_budget -= getattr(cfg, "run_deadline_reserve_sec", 0)
+    with metrics.processing_timer(), deadline_scope(run_budget, scope="run") as run_deadline:
+        next_index = 0
+        while True:
+            if run_deadline.expired():
+                unfinished = order[next_index:]
+                log.warning("[deadline] run deadline reached, %d rows left unprocessed", len(unfinished))
+                runtime_counters.incr("deadline.run_unfinished_rows", len(unfinished))
+                for i in unfinished:
+                    rest = valid_rows[i]
+                    rest.update({"status": "error", "action": "error", "reason": DEADLINE_REASON, "errors": "deadline:run"})
+                    finish(i, rest)
+                # Отложенные строки остаются с итогом последней попытки
+                for index, _, row, _ in deferred.drain() if deferred is not None else ():
+                    finish(index, row)
+                break
+            ready = deferred.pop_ready() if deferred is not None else None
+            if ready is not None:
+                (index, source, last, write), number = ready
+                runtime_counters.incr("deferred.retried")
+                attempt(index, source, number, last, write)
+            elif next_index < len(order):
+                index = order[next_index]
+                next_index += 1
+                attempt(index, valid_rows[index], 1)
+            elif deferred:
+                # Новых строк нет — проход повторов в конце запуска ждет ближайшую готовую строку
+                wait = min(deferred.next_ready_in(), run_deadline.remaining())
+                runtime_counters.incr("deferred.wait_ms", wait * 1000.0)
+                time.sleep(wait)
+            else:
+                break
+    results.extend(finished[i] for i in sorted(finished))
     
     # Логирование сводки метрик
+    metrics.get_metrics().merge_runtime(runtime_counters.snapshot())
     metrics.log_summary()
 
     return results
@@ -95,12 +185,16 @@ def main():
     for result in results:
         if result.get("status") != "skip" or result.get("reason", "").startswith("invalid_input"):
             metrics_collector.add_result(result)
+    metrics_collector.get_metrics().merge_runtime(get_runtime_counters().snapshot())
     
     report = save_report(results, metrics=metrics_collector.get_metrics())
     if report:
         logger.info("[report] saved to %s", report)
     else:
         logger.error("[report] failed to save")
+    # Общие HTTP/2-клиенты и пулы хеджирования живут до конца запуска
+    close_sync_transports()
+    close_hedgers()
 
 if __name__ == "__main__":
     main()
@@ -1,6 +1,7 @@
 """Система метрик и мониторинга для bot_ispravitel."""
 from __future__ import annotations
 
+import threading
 import time
 from collections import defaultdict
 from contextlib import contextmanager
@@ -36,6 +37,28 @@ class ProcessingMetrics:
     reasons: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
     confidence_stats: List[float] = field(default_factory=list)
     
+    # Кэш ответов LLM (LLM_CACHE): попадания, промахи, время поиска и время вызовов LLM при промахах
+    llm_cache_hits: int = 0
+    llm_cache_misses: int = 0
+    llm_cache_lookup_ms: float = 0.0
+    llm_cache_llm_ms: float = 0.0
+    
+    # Таблица «категория → ГН/ВН» (GN_VN_MAPPING): строки, классифицированные без LLM
+    mapping_hits: int = 0
+    mapping_misses: int = 0
+    
+    # Бюджет LLM на запуск (LLM_BUDGET_*): израсходовано и отказано
+    llm_budget_calls: int = 0
+    llm_budget_tokens: int = 0
+    llm_budget_denied: int = 0
+    
+    # Семейства партномеров (PART_FAMILY): ГН/ВН от другого члена семейства вместо вызова LLM
+    family_hits: int = 0
+    family_llm_calls_saved: int = 0
+    
+    # Счетчики времени выполнения от клиентов/планировщиков (см. RuntimeCounters)
+    runtime: Dict[str, float] = field(default_factory=dict)
+    
     def add_result(self, row: dict):
         """Добавить результат обработки строки."""
         self.processed_rows += 1
@@ -68,6 +91,21 @@ class ProcessingMetrics:
             if "llm" in errors:
                 self.llm_errors += 1
     
+    def merge_runtime(self, snapshot: Dict[str, float]):
+        """Добавить снимок счетчиков времени выполнения."""
+        self.runtime.update(snapshot)
+        self.llm_cache_hits = int(self.runtime.get("llm_cache.hits", 0))
+        self.llm_cache_misses = int(self.runtime.get("llm_cache.misses", 0))
+        self.llm_cache_lookup_ms = self.runtime.get("llm_cache.lookup_ms", 0.0)
+        self.llm_cache_llm_ms = self.runtime.get("llm_cache.llm_ms", 0.0)
+        self.mapping_hits = int(self.runtime.get("gn_vn_mapping.hits", 0))
+        self.mapping_misses = int(self.runtime.get("gn_vn_mapping.misses", 0))
+        self.llm_budget_calls = int(self.runtime.get("llm_budget.calls", 0))
+        self.llm_budget_tokens = int(self.runtime.get("llm_budget.tokens", 0))
+        self.llm_budget_denied = int(self.runtime.get("llm_budget.denied", 0))
+        self.family_hits = int(self.runtime.get("part_family.hits", 0))
+        self.family_llm_calls_saved = int(self.runtime.get("part_family.llm_calls_saved", 0))
+    
     def finalize(self, processing_time: float):
         """Финализация метрик."""
         self.processing_time = processing_time
@@ -79,6 +117,8 @@ class ProcessingMetrics:
         success_rate = (self.processed_rows - self.failed_rows) / max(self.total_rows, 1) * 100
         
         confidence_avg = sum(self.confidence_stats) / len(self.confidence_stats) if self.confidence_stats else 0
+        cache_lookups = self.llm_cache_hits + self.llm_cache_misses
+        mapping_lookups = self.mapping_hits + self.mapping_misses
         
         return {
             "total_rows": self.total_rows,
@@ -101,7 +141,34 @@ class ProcessingMetrics:
                 "average": round(confidence_avg, 3),
                 "count": len(self.confidence_stats),
             },
-            "top_reasons": dict(sorted(self.reasons.items(), key=lambda x: x[1], reverse=True)[:5])
+            "llm_cache": {
+                "hits": self.llm_cache_hits,
+                "misses": self.llm_cache_misses,
+                "hit_rate": round(self.llm_cache_hits / cache_lookups, 4) if cache_lookups else 0.0,
+                "lookup_ms": round(self.llm_cache_lookup_ms, 2),
+                "llm_ms": round(self.llm_cache_llm_ms, 2),
+            },
+            "gn_vn_mapping": {
+                "hits": self.mapping_hits,
+                "misses": self.mapping_misses,
+                "hit_rate": round(self.mapping_hits / mapping_lookups, 4) if mapping_lookups else 0.0,
+            },
+            "llm_budget": {
+                "calls": self.llm_budget_calls,
+                "max_calls": int(self.runtime.get("llm_budget.max_calls", 0)),
+                "tokens": self.llm_budget_tokens,
+                "max_tokens": int(self.runtime.get("llm_budget.max_tokens", 0)),
+                "denied": self.llm_budget_denied,
+            },
+            "part_family": {
+                "hits": self.family_hits,
+                "misses": int(self.runtime.get("part_family.misses", 0)),
+                "spot_checks": int(self.runtime.get("part_family.spot_checks", 0)),
+                "spot_check_mismatches": int(self.runtime.get("part_family.spot_check_mismatches", 0)),
+                "llm_calls_saved": self.family_llm_calls_saved,
+            },
+            "top_reasons": dict(sorted(self.reasons.items(), key=lambda x: x[1], reverse=True)[:5]),
+            "runtime": dict(sorted(self.runtime.items())),
         }
 
 
@@ -153,7 +220,77 @@ class MetricsCollector:
             self.log.warning("[metrics] Service errors - Catalog: %d, LCSC: %d, LLM: %d",
                            summary["errors"]["catalog"], summary["errors"]["lcsc"], 
                            summary["errors"]["llm"])
+        
+        cache = summary["llm_cache"]
+        if cache["hits"] or cache["misses"]:
+            self.log.info("[metrics] LLM cache - hits: %d, misses: %d, hit rate: %.1f%%, lookup %.1fms, LLM %.1fms",
+                         cache["hits"], cache["misses"], cache["hit_rate"] * 100, cache["lookup_ms"], cache["llm_ms"])
+        
+        mapping = summary["gn_vn_mapping"]
+        if mapping["hits"] or mapping["misses"]:
+            self.log.info("[metrics] GN/VN mapping - hits: %d, misses (sent to LLM): %d, hit rate: %.1f%%",
+                         mapping["hits"], mapping["misses"], mapping["hit_rate"] * 100)
+        
+        budget = summary["llm_budget"]
+        if budget["calls"] or budget["denied"]:
+            self.log.info("[metrics] LLM budget - calls: %d/%s, tokens: %d/%s, deferred rows: %d",
+                         budget["calls"], budget["max_calls"] or "-", budget["tokens"], budget["max_tokens"] or "-",
+                         budget["denied"])
+        
+        family = summary["part_family"]
+        if family["hits"] or family["misses"]:
+            self.log.info("[metrics] Part families - hits: %d, misses: %d, spot checks: %d (mismatches: %d), "
+                         "LLM calls saved: %d", family["hits"], family["misses"], family["spot_checks"],
+                         family["spot_check_mismatches"], family["llm_calls_saved"])
+        
+        for name, value in summary["runtime"].items():
+            self.log.info("[metrics] %s=%s", name, value)
     
     def get_metrics(self) -> ProcessingMetrics:
         """Получить объект метрик."""
         return self.metrics
+
+
+class RuntimeCounters:
+    """Потокобезопасные счетчики и показатели (gauge) клиентов и планировщиков за запуск."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[str, float] = defaultdict(float)
+    
+    def incr(self, name: str, value: float = 1.0):
+        """Увеличить счетчик."""
+        with self._lock:
+            self._values[name] += value
+    
+    def set(self, name: str, value: float):
+        """Установить текущее значение показателя."""
+        with self._lock:
+            self._values[name] = value
+    
+    def get(self, name: str, default: float = 0.0) -> float:
+        """Текущее значение счетчика."""
+        with self._lock:
+            return self._values.get(name, default)
+    
+    def snapshot(self) -> Dict[str, float]:
+        """Копия всех значений."""
+        with self._lock:
+            return dict(self._values)
+    
+    def reset(self):
+        """Сбросить все значения (начало нового запуска)."""
+        with self._lock:
+            self._values.clear()
+
+
+# Глобальный экземпляр счетчиков
+_runtime_counters: RuntimeCounters | None = None
+
+
+def get_runtime_counters() -> RuntimeCounters:
+    """Получить глобальный экземпляр счетчиков времени выполнения."""
+    global _runtime_counters
+    if _runtime_counters is None:
+        _runtime_counters = RuntimeCounters()
+    return _runtime_counters
@@ -3,7 +3,9 @@ from __future__ import annotations
 import hashlib
 import random
 from dataclasses import dataclass
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Sequence
+
+from idempotency import IdempotencyStore, create_key, update_key
 
 
 @dataclass
@@ -22,6 +24,18 @@ class _Product:
         }
 
 
+TAXONOMY_GN = (
+    {"code": "ГН1", "name": "Резисторы", "keywords": ["resistor", "ohm"], "categories": ["Resistor"]},
+    {"code": "ГН2", "name": "Конденсаторы", "keywords": ["capacitor", "farad"], "categories": ["Capacitor"]},
+    {"code": "ГН3", "name": "Полупроводники", "keywords": ["ic", "transistor"], "categories": ["IC", "Transistor"]},
+)
+TAXONOMY_VN = (
+    {"code": "ВН1", "name": "Поверхностный монтаж", "keywords": ["smd", "0603", "0805"], "categories": ["Resistor", "Capacitor"]},
+    {"code": "ВН2", "name": "Выводной монтаж", "keywords": ["tht", "dip"], "categories": []},
+    {"code": "ВН3", "name": "Микросхемы", "keywords": ["ic", "mcu"], "categories": ["IC", "Transistor"]},
+)
+
+
 class CatalogAPIMock:
     """
     Deterministic mock for catalogApp API with simple profiles:
@@ -30,14 +44,44 @@ class CatalogAPIMock:
     - conflict: returns 2 candidates with slight differences
     - errorrate10: ~10% requests raise error; otherwise like 'happy'
     - timeout: always raises TimeoutError on any operation
+
+    Field projection (`fields`) is honored like the real API: only requested keys are returned.
+    Writes are deduplicated by idempotency key (explicit or derived from payload + run_id):
+    a repeated create/update returns the first response instead of writing again.
     """
 
-    def __init__(self, profile: str = "happy", seed: int = 42):
+    def __init__(
+        self,
+        profile: str = "happy",
+        seed: int = 42,
+        fields: Optional[Sequence[str]] = None,
+        run_id: Optional[str] = None,
+    ):
         self.profile = profile
         self._rand = random.Random(seed)
+        self.search_fields = tuple(fields) if fields else None
+        self.run_id = run_id
+        self.idempotency = IdempotencyStore()
+        self.writes = 0
 
     # --- Public API (to match real client minimal surface) ---
-    def search_product(self, partnumber: str) -> List[Dict[str, Any]]:
+    def search_product(self, partnumber: str, fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        found = self._search(partnumber)
+        return project_fields(found, fields or self.search_fields)
+
+    def search_products(
+        self, partnumbers: Sequence[str], fields: Optional[Sequence[str]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Batch search: one result list per partnumber, in input order."""
+        return [self.search_product(pn, fields=fields) for pn in partnumbers]
+
+    def get_taxonomy(self) -> Dict[str, List[Dict[str, Any]]]:
+        """GN/VN taxonomy; codes match the built-in pipeline candidates."""
+        if self.profile == "timeout":
+            raise TimeoutError("catalog taxonomy timeout (simulated)")
+        return {"gn": [dict(item) for item in TAXONOMY_GN], "vn": [dict(item) for item in TAXONOMY_VN]}
+
+    def _search(self, partnumber: str) -> List[Dict[str, Any]]:
         if self.profile == "timeout":
             raise TimeoutError("catalog search timeout (simulated)")
         if self.profile == "missing":
@@ -60,21 +104,33 @@ class CatalogAPIMock:
         # default: happy
         return [self._with_id(self._mk_product(partnumber).to_dict(), partnumber)]
 
-    def create_product(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+    def create_product(self, payload: Dict[str, Any], idempotency_key: Optional[str] = None) -> Dict[str, Any]:
         if self.profile == "timeout":
             raise TimeoutError("catalog create timeout (simulated)")
         if self.profile == "errorrate10" and self._should_error(str(payload), rate=0.10):
             raise RuntimeError("Transient create error (simulated)")
-        created = dict(payload)
-        created.setdefault("id", self._stable_id(payload.get("partnumber", "new")))
-        created.setdefault("status", "created")
-        return created
+        key = idempotency_key or create_key(payload, self.run_id)
+        return self.idempotency.run(key, lambda: self._create(payload))
 
-    def update_product(self, product_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    def update_product(
+        self, product_id: str, payload: Dict[str, Any], idempotency_key: Optional[str] = None
+    ) -> Dict[str, Any]:
         if self.profile == "timeout":
             raise TimeoutError("catalog update timeout (simulated)")
         if self.profile == "errorrate10" and self._should_error(product_id + str(payload), rate=0.10):
             raise RuntimeError("Transient update error (simulated)")
+        key = idempotency_key or update_key(product_id, payload, self.run_id)
+        return self.idempotency.run(key, lambda: self._update(product_id, payload))
+
+    def _create(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        self.writes += 1
+        created = dict(payload)
+        created.setdefault("id", self._stable_id(payload.get("partnumber", "new")))
+        created.setdefault("status", "created")
+        return created
+
+    def _update(self, product_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        self.writes += 1
         updated = dict(payload)
         updated.setdefault("id", product_id)
         updated.setdefault("status", "updated")
@@ -113,3 +169,10 @@ class CatalogAPIMock:
         enriched = dict(d)
         enriched.setdefault("id", self._stable_id(partnumber))
         return enriched
+
+
+def project_fields(items: List[Dict[str, Any]], fields: Optional[Sequence[str]]) -> List[Dict[str, Any]]:
+    """Keep only requested keys of each item (field projection); no fields — items as is."""
+    if not fields:
+        return items
+    return [{k: item[k] for k in fields if k in item} for item in items]
@@ -0,0 +1,130 @@
+"""Локальный HTTP stand-in для catalogApp / LCSC-прокси / LLM-прокси.
+
+Минимальное ASGI-приложение поверх детерминированных моков. Работает под любым
+ASGI-сервером; с Hypercorn поддерживает HTTP/2 (в т.ч. h2c prior knowledge):
+
+    hypercorn mocks.http_stub_server:app --bind 127.0.0.1:8700
+
+Эндпоинты повторяют контракты реальных клиентов:
+- GET  /products?partnumber=...[&fields=...]   (CatalogAPI.search_product)
+- GET  /taxonomy                                (CatalogAPI.get_taxonomy)
+- POST /products, PATCH /products/{id}        (дедупликация по заголовку Idempotency-Key)
+- GET  /search?q=...[&fields=...]              (LCSCClientReal.search)
+- POST /normalize, POST /classify (LLMClientReal)
+- POST /analyze                                (LLMClientReal.analyze)
+- POST /normalize/batch, POST /classify/batch  (LLMClientReal.normalize_batch/classify_batch)
+
+Искусственная задержка ответа задается переменной окружения STUB_LATENCY_MS.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from typing import Any
+from urllib.parse import parse_qs
+
+from mocks.catalog_api_mock import CatalogAPIMock
+from mocks.lcsc_mock import LCSCMock
+from mocks.llm_mock import LLMMock
+
+
+class StubServer:
+    """ASGI-приложение stand-in сервера."""
+
+    def __init__(self, profile: str = "happy", seed: int = 42, latency_ms: int | None = None):
+        self.catalog = CatalogAPIMock(profile=profile, seed=seed)
+        self.lcsc = LCSCMock(profile=profile, seed=seed)
+        self.llm = LLMMock(seed=seed)
+        if latency_ms is None:
+            latency_ms = int(os.getenv("STUB_LATENCY_MS", "0") or 0)
+        self.latency_sec = max(0, latency_ms) / 1000.0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        if self.latency_sec:
+            await asyncio.sleep(self.latency_sec)
+
+        query = {k: v[0] for k, v in parse_qs(scope.get("query_string", b"").decode()).items()}
+        try:
+            status, payload = self.handle(scope["method"], scope["path"], query, body, _headers(scope))
+        except Exception as exc:  # simulated mock errors -> 503
+            status, payload = 503, {"error": type(exc).__name__}
+        await _send_json(send, status, payload)
+
+    def handle(self, method: str, path: str, query: dict[str, str], body: bytes,
+               headers: dict[str, str]) -> tuple[int, Any]:
+        """Маршрутизация запроса; возвращает (status, json-payload)."""
+        data = json.loads(body) if body else {}
+        fields = [f for f in query.get("fields", "").split(",") if f] or None
+        if method == "GET" and path.endswith("/products"):
+            return 200, self.catalog.search_product(query.get("partnumber", ""), fields=fields)
+        if method == "GET" and path.endswith("/taxonomy"):
+            return 200, self.catalog.get_taxonomy()
+        if method == "POST" and path.endswith("/products/search"):
+            pns = data.get("partnumbers", [])
+            found = self.catalog.search_products(pns, fields=data.get("fields") or fields)
+            return 200, {pn: items for pn, items in zip(pns, found, strict=True) if items}
+        idempotency_key = headers.get("idempotency-key")
+        if method == "POST" and path.endswith("/products"):
+            return 201, self.catalog.create_product(data, idempotency_key=idempotency_key)
+        if method == "PATCH" and "/products/" in path:
+            return 200, self.catalog.update_product(path.rsplit("/", 1)[-1], data, idempotency_key=idempotency_key)
+        if method == "GET" and path.endswith("/search"):
+            return 200, self.lcsc.search(query.get("q", ""), fields=fields)
+        if method == "POST" and path.endswith("/normalize/batch"):
+            return 200, {"results": _batch_results(self.llm.normalize_batch(data.get("texts", [])))}
+        if method == "POST" and path.endswith("/classify/batch"):
+            return 200, {"results": _batch_results(self.llm.classify_batch(
+                data.get("texts", []), data.get("gn_candidates", []), data.get("vn_candidates", [])
+            ))}
+        if method == "POST" and path.endswith("/analyze"):
+            return 200, self.llm.analyze(
+                data.get("text", ""), data.get("gn_candidates", []), data.get("vn_candidates", [])
+            )
+        if method == "POST" and path.endswith("/normalize"):
+            return 200, self.llm.normalize(data.get("text", ""))
+        if method == "POST" and path.endswith("/classify"):
+            return 200, self.llm.classify(
+                data.get("gn_candidates", []), data.get("vn_candidates", []), data.get("text", "")
+            )
+        return 404, {"error": "not_found"}
+
+
+def _batch_results(results: list) -> list:
+    """Ошибки отдельных элементов пакета — объектами {"error": ...} на их позициях."""
+    return [{"error": str(r)} if isinstance(r, Exception) else r for r in results]
+
+
+def _headers(scope) -> dict[str, str]:
+    return {k.decode().lower(): v.decode() for k, v in scope.get("headers", [])}
+
+
+async def _send_json(send, status: int, payload: Any) -> None:
+    raw = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(raw)).encode())],
+    })
+    await send({"type": "http.response.body", "body": raw})
+
+
+app = StubServer()
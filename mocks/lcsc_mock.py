@@ -3,7 +3,9 @@ from __future__ import annotations
 import hashlib
 import random
 from dataclasses import dataclass
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Sequence
+
+from mocks.catalog_api_mock import project_fields
 
 
 @dataclass
@@ -33,13 +35,18 @@ class LCSCMock:
       - conflict: returns two candidates with slightly different brand/category
       - errorrate10: ~10% raises, otherwise like 'happy'
       - timeout: always raises TimeoutError
+    Field projection (`fields`) is honored like the real proxy.
     """
 
-    def __init__(self, profile: str = "happy", seed: int = 42):
+    def __init__(self, profile: str = "happy", seed: int = 42, fields: Optional[Sequence[str]] = None):
         self.profile = profile
         self._rand = random.Random(seed)
+        self.search_fields = tuple(fields) if fields else None
+
+    def search(self, partnumber: str, fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        return project_fields(self._search(partnumber), fields or self.search_fields)
 
-    def search(self, partnumber: str) -> List[Dict[str, Any]]:
+    def _search(self, partnumber: str) -> List[Dict[str, Any]]:
         if self.profile == "timeout":
             raise TimeoutError("LCSC search timeout (simulated)")
         if self.profile == "missing":
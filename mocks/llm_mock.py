@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import hashlib
 from dataclasses import dataclass
-from typing import Any, Dict
+from typing import Any, Dict, List, Sequence, Union
 
 
 @dataclass
@@ -26,6 +26,9 @@ class LLMMock:
     Deterministic mock for LLM normalization/classification.
     - normalize(text): returns normalized names/category/attrs deterministically from input
     - classify(gn_candidates, vn_candidates, text): returns (gn, vn, confidence)
+    - analyze(text, gn_candidates, vn_candidates): normalize and classify merged in one answer
+    - normalize_batch / classify_batch: per-item results in input order, same values as the
+      single calls; a blank text yields a ValueError in its slot instead of failing the batch
     """
 
     def __init__(self, seed: int = 42):
@@ -50,7 +53,23 @@ class LLMMock:
         confidence = round(int(h[4:6], 16) / 255, 3)
         return {"gn": gn, "vn": vn, "confidence": confidence}
 
+    def analyze(self, text: str, gn_candidates: list[str], vn_candidates: list[str]) -> Dict[str, Any]:
+        return {**self.normalize(text), **self.classify(gn_candidates, vn_candidates, text)}
+
+    def normalize_batch(self, texts: Sequence[str]) -> List[Union[Dict[str, Any], Exception]]:
+        return [self._item(self.normalize, text) for text in texts]
+
+    def classify_batch(
+        self, items: Sequence[str], gn_candidates: list[str], vn_candidates: list[str]
+    ) -> List[Union[Dict[str, Any], Exception]]:
+        return [self._item(lambda t: self.classify(gn_candidates, vn_candidates, t), text) for text in items]
+
     # --- helpers ---
+    def _item(self, fn, text: str) -> Union[Dict[str, Any], Exception]:
+        if not text or not text.strip():
+            return ValueError("empty text")
+        return fn(text)
+
     def _pick_from(self, items: list[str], key: str) -> str:
         idx = int(key[:2], 16) % len(items)
         return items[idx]
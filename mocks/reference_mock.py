@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from mocks.lcsc_mock import LCSCMock, _LCSCItem
+
+
+class ReferenceSourceMock(LCSCMock):
+    """
+    Deterministic mock for an extra reference source (distributor search by partnumber).
+    Shares the profiles of LCSCMock; each source has its own brand catalogue and a
+    deterministic per-partnumber latency in [0, max_delay_ms], so concurrent races
+    between sources have stable winners in tests.
+    """
+
+    name = "reference"
+    brands: Sequence[str] = ("TI", "ST", "NXP", "Microchip")
+
+    def __init__(
+        self,
+        profile: str = "happy",
+        seed: int = 42,
+        fields: Optional[Sequence[str]] = None,
+        max_delay_ms: int = 0,
+    ):
+        super().__init__(profile=profile, seed=seed, fields=fields)
+        self.max_delay_ms = max(0, int(max_delay_ms))
+
+    def search(self, partnumber: str, fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        if self.max_delay_ms:
+            time.sleep(self.delay_ms(partnumber) / 1000.0)
+        return super().search(partnumber, fields)
+
+    def delay_ms(self, partnumber: str) -> int:
+        h = int(self._stable_id(self.name + partnumber), 16)
+        return h % (self.max_delay_ms + 1)
+
+    def _mk_item(self, partnumber: str, alt: bool = False) -> _LCSCItem:
+        item = super()._mk_item(partnumber, alt=alt)
+        item.brand = self._pick_from(list(self.brands), partnumber, salt=self.name, alt=alt)
+        item.datasheet_url = f"https://{self.name}.example/ds/{self._stable_id(partnumber)}.pdf"
+        return item
+
+
+class DigikeyMock(ReferenceSourceMock):
+    name = "digikey"
+    brands = ("TI", "ST", "Microchip", "onsemi")
+
+
+class MouserMock(ReferenceSourceMock):
+    name = "mouser"
+    brands = ("TI", "NXP", "Vishay", "Microchip")
@@ -0,0 +1,188 @@
+"""Повторное использование классификации ГН/ВН внутри семейства партномеров.
+
+В выгрузках десятки вариантов одной серии отличаются только корпусом, допуском или
+упаковкой (``RC0603FR-0710KL``, ``RC0603JR-07100RL``...), а ГН/ВН у них общие. Ключ
+семейства строится по правилам бренда из ``PART_FAMILY_RULES_FILE``::
+
+    {"default": {"strip_suffixes": ["PBF", "TR"], "min_length": 5},
+     "brands": {"Yageo": {"prefix": "^(RC\\\\d{4})"}}}
+
+``prefix`` — регулярное выражение по канонизированному партномеру (без разделителей, в
+верхнем регистре, см. partnumbers.py); ключом становится первая группа (или все
+совпадение). Если префикс не задан или не совпал, с конца партномера по очереди
+срезаются ``strip_suffixes``. Ключ короче ``min_length`` семейства не образует. Правила
+бренда заменяют ``default`` целиком.
+
+``PartFamilyCache`` запоминает ГН/ВН первого члена семейства, классифицированного LLM с
+уверенностью не ниже ``PART_FAMILY_MIN_CONFIDENCE``, и отдает их остальным членам без
+вызова LLM. Доля ``PART_FAMILY_SPOT_CHECK`` попаданий все равно классифицируется LLM
+(выборочная проверка); при расхождении запись семейства удаляется. Кэш живет один запуск.
+"""
+from __future__ import annotations
+
+import random
+import re
+import threading
+from pathlib import Path
+from typing import Any
+
+from logger import get_logger
+from metrics import RuntimeCounters, get_runtime_counters
+from partnumbers import canonicalize_partnumber
+from serialization import loads
+
+# Источник ГН/ВН строки (колонка отчета gn_vn_source), см. также gn_vn_mapping.SOURCE_*
+SOURCE_FAMILY = "family"
+
+# Правила без файла: суффиксы упаковки и RoHS
+DEFAULT_RULES = {"default": {"strip_suffixes": ["#?PBF", "NOPB", "TR", "REEL", "CT"], "min_length": 5}}
+
+
+def _norm(value: Any) -> str:
+    return str(value or "").strip().casefold()
+
+
+class FamilyRule:
+    """Правило построения ключа семейства для одного бренда."""
+
+    def __init__(self, prefix: str = "", strip_suffixes: list[str] | tuple[str, ...] = (), min_length: int = 4):
+        self.prefix = re.compile(prefix, re.IGNORECASE) if prefix else None
+        self.suffixes = [re.compile(f"(?:{suffix})$", re.IGNORECASE) for suffix in strip_suffixes]
+        self.min_length = max(1, int(min_length))
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FamilyRule":
+        return cls(data.get("prefix", ""), data.get("strip_suffixes") or (), data.get("min_length", 4))
+
+    def stem(self, partnumber: str) -> str:
+        """Основа семейства партномера или пустая строка."""
+        canonical = canonicalize_partnumber(partnumber)
+        if self.prefix is not None:
+            m = self.prefix.match(canonical)
+            if m:
+                stem = m.group(1) if m.re.groups else m.group(0)
+                return stem.upper() if len(stem) >= self.min_length else ""
+        stem, changed = canonical, True
+        while changed:
+            changed = False
+            for suffix in self.suffixes:
+                stripped = suffix.sub("", stem)
+                if stripped != stem:
+                    stem, changed = stripped, True
+        return stem if len(stem) >= self.min_length else ""
+
+
+class FamilyRules:
+    """Правила ключей семейств: по бренду (без учета регистра) или ``default``."""
+
+    def __init__(self, data: dict | None = None):
+        data = data if data is not None else DEFAULT_RULES
+        self.default = FamilyRule.from_dict(data.get("default") or {})
+        self.brands = {_norm(brand): FamilyRule.from_dict(rule) for brand, rule in (data.get("brands") or {}).items()}
+
+    def key(self, partnumber: str, brand: str = "") -> str:
+        """Ключ семейства ``<бренд>|<основа>``; пустая строка — партномер семейства не образует."""
+        brand_n = _norm(brand)
+        stem = self.brands.get(brand_n, self.default).stem(partnumber)
+        return f"{brand_n}|{stem}" if stem else ""
+
+
+def load_family_rules(path: str | Path) -> FamilyRules:
+    """Правила из файла; отсутствующий файл — встроенные ``DEFAULT_RULES``."""
+    path = Path(path)
+    if not path.exists():
+        get_logger("part_family").warning("[family] rules file not found: %s, using built-in rules", path)
+        return FamilyRules()
+    return FamilyRules(loads(path.read_bytes()))
+
+
+class PartFamilyCache:
+    """ГН/ВН уверенно классифицированных семейств на время запуска."""
+
+    def __init__(
+        self,
+        rules: FamilyRules,
+        min_confidence: float = 0.9,
+        spot_check: float = 0.0,
+        seed: int | None = None,
+        saves_llm_call: bool = True,
+        counters: RuntimeCounters | None = None,
+    ):
+        self.rules = rules
+        self.min_confidence = float(min_confidence)
+        self.spot_check = float(spot_check)
+        self.saves_llm_call = saves_llm_call
+        self.counters = counters or get_runtime_counters()
+        self.log = get_logger("part_family")
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._families: dict[str, dict] = {}
+
+    @classmethod
+    def from_config(cls, cfg) -> "PartFamilyCache | None":
+        """Кэш по ``PART_FAMILY_*``; None — если ``PART_FAMILY`` выключен."""
+        if not getattr(cfg, "part_family", False):
+            return None
+        return cls(
+            load_family_rules(getattr(cfg, "part_family_rules_file", "data/part_families.json")),
+            min_confidence=getattr(cfg, "part_family_min_confidence", 0.9),
+            spot_check=getattr(cfg, "part_family_spot_check", 0.0),
+            seed=getattr(cfg, "seed", None),
+            # В режиме LLM_ANALYZE попадание заменяет analyze на normalize — вызовов не меньше
+            saves_llm_call=not getattr(cfg, "llm_analyze", False),
+        )
+
+    def __len__(self) -> int:
+        return len(self._families)
+
+    def lookup(self, partnumber: str, brand: str = "") -> tuple[str, dict | None]:
+        """Ключ семейства и ``{"gn", "vn", "confidence", "partnumber"}`` его члена.
+
+        None — семейство еще не классифицировано или попадание выбрано для выборочной
+        проверки (строку классифицирует LLM, результат передается в ``record``).
+        """
+        key = self.rules.key(partnumber, brand)
+        if not key:
+            return key, None
+        with self._lock:
+            entry = self._families.get(key)
+            checked = entry is not None and self.spot_check > 0 and self._rng.random() < self.spot_check
+        if entry is None:
+            self.counters.incr("part_family.misses")
+            return key, None
+        if checked:
+            self.counters.incr("part_family.spot_checks")
+            return key, None
+        self.counters.incr("part_family.hits")
+        if self.saves_llm_call:
+            self.counters.incr("part_family.llm_calls_saved")
+        self.log.info("[family] %s -> %s gn=%s vn=%s", partnumber, entry["partnumber"], entry["gn"], entry["vn"])
+        return key, entry
+
+    def record(self, key: str, partnumber: str, enriched: dict, confidence: float | None) -> None:
+        """Учесть решение LLM для члена семейства: запомнить или сверить с записью семейства."""
+        if not key or not enriched.get("gn") or not enriched.get("vn"):
+            return
+        with self._lock:
+            entry = self._families.get(key)
+            if entry is None:
+                if (confidence or 0.0) < self.min_confidence:
+                    return
+                self._families[key] = {
+                    "gn": enriched["gn"], "vn": enriched["vn"], "confidence": confidence, "partnumber": partnumber,
+                }
+                stored, mismatch = True, False
+            else:
+                stored = False
+                mismatch = (entry["gn"], entry["vn"]) != (enriched["gn"], enriched["vn"])
+                if mismatch:
+                    # Семейство неоднородно — дальше его члены классифицирует LLM, пока запись не появится снова
+                    del self._families[key]
+        if stored:
+            self.counters.incr("part_family.stored")
+        elif mismatch:
+            self.counters.incr("part_family.spot_check_mismatches")
+            self.log.warning(
+                "[family] spot check mismatch family=%s %s: %s/%s vs %s %s/%s", key, entry["partnumber"],
+                entry["gn"], entry["vn"], partnumber, enriched["gn"], enriched["vn"],
+            )
@@ -0,0 +1,87 @@
+"""Канонизация партномеров и отбор результатов поиска.
+
+Поиск каталога и LCSC — подстрочный: на популярный префикс возвращаются сотни позиций.
+``SearchSelector`` разбирает ответ потоково и прекращает чтение, как только найдено точное
+совпадение партномера (после канонизации) или достигнут лимит элементов.
+"""
+from __future__ import annotations
+
+import re
+from typing import Any, AsyncIterable, Iterable
+
+from serialization import JSONArrayStream
+
+# Разделители, не влияющие на идентичность партномера: "RC0603-FR 07" == "rc0603fr07"
+_SEPARATORS_RE = re.compile(r"[\s\-_./]+")
+
+
+def canonicalize_partnumber(value: Any) -> str:
+    """Каноническая форма партномера: без разделителей, в верхнем регистре."""
+    if value is None:
+        return ""
+    return _SEPARATORS_RE.sub("", str(value)).upper()
+
+
+def is_exact_match(item: Any, canonical: str) -> bool:
+    """Совпадает ли партномер элемента поиска с уже канонизированным значением."""
+    return bool(canonical) and isinstance(item, dict) and canonicalize_partnumber(item.get("partnumber")) == canonical
+
+
+def order_exact_first(items: list, partnumber: str) -> list:
+    """Точные совпадения партномера — в начало списка; прочий порядок сохраняется."""
+    canonical = canonicalize_partnumber(partnumber)
+    if not canonical or not items:
+        return items
+    exact = [it for it in items if is_exact_match(it, canonical)]
+    if not exact:
+        return items
+    return exact + [it for it in items if not is_exact_match(it, canonical)]
+
+
+class SearchSelector:
+    """Накопитель результатов поиска с ранним выходом.
+
+    ``offer`` возвращает True, когда дальше читать не нужно: найден точный партномер
+    или набрано ``max_items`` элементов (0 — без лимита).
+    """
+
+    def __init__(self, partnumber: str, max_items: int = 0):
+        self.canonical = canonicalize_partnumber(partnumber)
+        self.max_items = max(0, int(max_items))
+        self.items: list = []
+        self.exact_found = False
+        self.stopped_early = False
+
+    def offer(self, item: Any) -> bool:
+        self.items.append(item)
+        if is_exact_match(item, self.canonical):
+            self.exact_found = True
+        return self.exact_found or (self.max_items > 0 and len(self.items) >= self.max_items)
+
+    def _offer_all(self, items: list) -> bool:
+        return any(self.offer(item) for item in items)
+
+    def consume(self, chunks: Iterable[bytes]) -> list:
+        """Разобрать тело-массив из кусков байтов; вернуть упорядоченные результаты."""
+        parser = JSONArrayStream()
+        for chunk in chunks:
+            if self._offer_all(parser.feed(chunk)):
+                self.stopped_early = True
+                return self.results()
+        self._offer_all(parser.close())
+        return self.results()
+
+    async def aconsume(self, chunks: AsyncIterable[bytes]) -> list:
+        """Асинхронный вариант ``consume``."""
+        parser = JSONArrayStream()
+        async for chunk in chunks:
+            if self._offer_all(parser.feed(chunk)):
+                self.stopped_early = True
+                return self.results()
+        self._offer_all(parser.close())
+        return self.results()
+
+    def results(self) -> list:
+        if not self.exact_found:
+            return self.items
+        return order_exact_first(self.items, self.canonical)
@@ -1,12 +1,67 @@
 """Модуль пайплайна обработки строк данных."""
 from __future__ import annotations
 
-import json
-import random
-import time
 from config import Config
-from exceptions import RetryExhaustedError
+from deadline import MIN_STAGE_SEC, check_deadline, deadline_scope
+from exceptions import (
+    ClientRequestError,
+    DeadlineExceededError,
+    ExternalServiceError,
+    LLMBudgetExhaustedError,
+    RetryExhaustedError,
+    ThrottledError,
+)
+from gn_vn_mapping import SOURCE_LLM, SOURCE_MAPPING, get_gn_vn_mapping
+from llm_budget import LLM_BUDGET_REASON
 from logger import get_logger
+from metrics import get_runtime_counters
+from part_family import SOURCE_FAMILY, PartFamilyCache
+from partnumbers import order_exact_first
+from retry import SERVICES, RetryPolicy
+from serialization import dumps_report
+from taxonomy import get_taxonomy
+
+# Поля ответов поиска, которые читает пайплайн (field projection: fields=...)
+# partnumber нужен для выбора точного совпадения среди результатов подстрочного поиска
+CATALOG_SEARCH_FIELDS = ("id", "partnumber", "brand", "external_id", "gn", "vn")
+# category и attrs — ключ таблицы ГН/ВН (gn_vn_mapping.py)
+LCSC_SEARCH_FIELDS = ("partnumber", "brand", "category", "attrs")
+
+# Кандидаты ГН/ВН для классификации LLM без справочника каталога (TAXONOMY, см. taxonomy.py)
+GN_CANDIDATES = ["ГН1", "ГН2", "ГН3"]
+VN_CANDIDATES = ["ВН1", "ВН2", "ВН3"]
+
+# Исходы строки при сбое поиска в каталоге; retryable — строку имеет смысл обработать повторно.
+# deadline_exceeded не повторяется: медленная строка снова заняла бы весь дедлайн
+CATALOG_ERROR_REASONS = ("catalog_unavailable", "catalog_throttled", "catalog_rejected")
+RETRYABLE_REASONS = frozenset({
+    "catalog_unavailable", "catalog_throttled",
+    "update_failed", "create_failed", "llm_unavailable",
+})
+# Исход строки, не уложившейся в бюджет времени строки или запуска
+DEADLINE_REASON = "deadline_exceeded"
+# Исход строки при временном сбое LLM в режиме отложенных повторов (см. deferred.py)
+LLM_UNAVAILABLE_REASON = "llm_unavailable"
+
+
+def catalog_error_reason(exc: Exception) -> str:
+    """Причина ошибки строки по исключению поиска в каталоге."""
+    if isinstance(exc, RetryExhaustedError):
+        exc = exc.last_error
+    if isinstance(exc, ThrottledError):
+        return "catalog_throttled"
+    if isinstance(exc, ClientRequestError):
+        return "catalog_rejected"
+    return "catalog_unavailable"
+
+
+def write_error_reason(exc: Exception, operation: str) -> str:
+    """Причина ошибки записи в каталог: отказ 4xx (``<op>_rejected``) или временный сбой (``<op>_failed``)."""
+    if isinstance(exc, RetryExhaustedError):
+        exc = exc.last_error
+    if isinstance(exc, ClientRequestError):
+        return f"{operation}_rejected"
+    return f"{operation}_failed"
 
 
 class ProcessingPipeline:
@@ -18,40 +73,54 @@ class ProcessingPipeline:
         self.lcsc = lcsc_client
         self.llm = llm_client
         self.log = get_logger("pipeline")
+        # Единственный уровень повторов: вызовы клиентов внутри выполняются одной попыткой
+        self.retry_policies = {service: RetryPolicy.from_config(cfg, service) for service in SERVICES}
+        self.retry_policies["default"] = RetryPolicy.from_config(cfg)
+        # Отложенные повторы: одна попытка на вызов, повтор строки планирует main.process_rows
+        self.deferred_retries = bool(getattr(cfg, "deferred_retries", False))
+        # Один вызов analyze вместо normalize + classify (LLM_ANALYZE)
+        self.llm_analyze = bool(getattr(cfg, "llm_analyze", False))
+        # Таблица «категория LCSC → ГН/ВН» (GN_VN_MAPPING); None — все строки классифицирует LLM
+        self.gn_vn_mapping = get_gn_vn_mapping(cfg)
+        # Справочник ГН/ВН каталога (TAXONOMY): загружается один раз за запуск
+        self.taxonomy = get_taxonomy(cfg, (GN_CANDIDATES, VN_CANDIDATES), catalog_client)
+        self.taxonomy_top_k = getattr(cfg, "taxonomy_top_k", 10)
+        # ГН/ВН семейств партномеров (PART_FAMILY); None — каждый вариант серии классифицирует LLM
+        self.part_families = PartFamilyCache.from_config(cfg)
     
-    def _retry(self, callable_, *args, attempts: int = 3, errors_list: list | None = None, tag: str = ""):
-        """Универсальная функция retry с exponential backoff."""
-        last_exc = None
-        for i in range(1, attempts + 1):
-            try:
-                return callable_(*args)
-            except Exception as e:
-                last_exc = e
-                if errors_list is not None:
-                    errors_list.append(f"{tag}:{type(e).__name__}:attempt{i}")
-                if i < attempts:
-                    base = getattr(self.cfg, "backoff_base_ms", 100)
-                    max_ms = getattr(self.cfg, "backoff_max_ms", 2000)
-                    jitter = getattr(self.cfg, "backoff_jitter_ms", 100)
-                    delay_ms = min(max_ms, base * (2 ** (i - 1)))
-                    delay_ms += random.randint(0, jitter) if jitter > 0 else 0
-                    time.sleep(delay_ms / 1000.0)
-        if last_exc:
-            raise RetryExhaustedError(tag, attempts, last_exc) from last_exc
+    def _retry(
+        self, callable_, *args, attempts: int | None = None, errors_list: list | None = None, tag: str = "",
+        deferrable: bool = True,
+    ):
+        """Вызов с повторами по политике сервиса (определяется префиксом тега: catalog_/lcsc_/llm_).
+
+        Этап не начинается, если до дедлайна строки почти не осталось времени (DeadlineExceededError).
+        В режиме отложенных повторов вызов выполняется одной попыткой, без паузы бэкоффа;
+        ``deferrable=False`` — этап гасит свои ошибки, и отложенного повтора строки для него не будет.
+        """
+        check_deadline(tag, MIN_STAGE_SEC)
+        if self.deferred_retries and deferrable:
+            attempts = 1
+        return self._policy(tag).call(callable_, *args, attempts=attempts, errors_list=errors_list, tag=tag)
+
+    def _policy(self, tag: str) -> RetryPolicy:
+        return self.retry_policies.get(tag.split("_", 1)[0], self.retry_policies["default"])
     
     def _search_in_catalog(self, partnumber: str, errors: list[str]) -> tuple[list, bool]:
-        """Поиск товара в каталоге."""
-        try:
-            found = self._retry(
-                self.catalog.search_product, 
-                partnumber, 
-                attempts=3, 
-                errors_list=errors, 
-                tag="catalog_search"
-            )
-            return found, bool(found)
-        except RetryExhaustedError:
-            return [], False
+        """Поиск товара в каталоге.
+
+        Сбой поиска (исчерпанные повторы, отказ сервиса) не маскируется пустым результатом:
+        исключение уходит в process_single_row, иначе строка ушла бы в дорогой путь создания.
+        """
+        found = self._retry(
+            self.catalog.search_product, 
+            partnumber, 
+            errors_list=errors, 
+            tag="catalog_search"
+        )
+        # Подстрочный поиск: точное совпадение партномера важнее порядка выдачи
+        found = order_exact_first(found, partnumber)
+        return found, bool(found)
     
     def _update_catalog_product(self, product_id: str | int, patch: dict, errors: list[str]) -> dict:
         """Обновление товара в каталоге."""
@@ -63,14 +132,13 @@ class ProcessingPipeline:
                 self.catalog.update_product, 
                 product_id, 
                 patch, 
-                attempts=3, 
                 errors_list=errors, 
                 tag="catalog_update"
             )
             self.log.info("[catalog] update id=%s patch=%s", product_id, list(patch.keys()))
             return {"action": "update", "reason": "fields_mismatch"}
-        except RetryExhaustedError:
-            return {"action": "conflict", "reason": "update_failed"}
+        except (RetryExhaustedError, ExternalServiceError) as e:
+            return {"action": "conflict", "reason": write_error_reason(e, "update"), "write": ("update", product_id, patch)}
     
     def _search_in_lcsc(self, partnumber: str, errors: list[str]) -> list:
         """Поиск товара в LCSC."""
@@ -81,25 +149,65 @@ class ProcessingPipeline:
             candidates = self._retry(
                 self.lcsc.search, 
                 partnumber, 
-                attempts=3, 
                 errors_list=errors, 
-                tag="lcsc_search"
+                tag="lcsc_search",
+                # Сбой LCSC не откладывает строку (кандидатов просто нет) — повторы по обычной политике
+                deferrable=False,
             )
             self.log.info("[lcsc] candidates=%s for part=%s", len(candidates), partnumber)
-            return candidates
-        except RetryExhaustedError:
+            return order_exact_first(candidates, partnumber)
+        except (RetryExhaustedError, ExternalServiceError):
             return []
     
-    def _classify_with_llm(self, text: str, errors: list[str]) -> tuple[dict, dict, float | None]:
-        """Классификация и нормализация через LLM."""
+    def _map_gn_vn(self, row: dict, candidates: list, brand: str) -> tuple[str, dict | None]:
+        """Категория строки и ГН/ВН по таблице категорий (None — правила нет, нужен LLM)."""
+        best = candidates[0] if candidates else {}
+        category = str(best.get("category") or row.get("category") or "").strip()
+        if self.gn_vn_mapping is None:
+            return category, None
+        mapped = self.gn_vn_mapping.lookup(category, brand or best.get("brand", ""), best.get("attrs") or {})
+        if mapped:
+            self.log.info("[mapping] category=%s gn=%s vn=%s", category, mapped["gn"], mapped["vn"])
+        return category, mapped
+    
+    def _family_lookup(self, part: str, brand: str) -> tuple[str, dict | None]:
+        """Ключ семейства партномера и ГН/ВН уже классифицированного члена (None — нужен LLM)."""
+        if self.part_families is None:
+            return "", None
+        return self.part_families.lookup(part, brand)
+    
+    def _candidates(self, text: str, category: str) -> tuple[list[str], list[str]]:
+        """Кандидаты ГН/ВН для строки: top-K из справочника или встроенные."""
+        if self.taxonomy is None:
+            return GN_CANDIDATES, VN_CANDIDATES
+        return self.taxonomy.candidates(text, category, self.taxonomy_top_k)
+    
+    def _classify_with_llm(
+        self, text: str, errors: list[str], category: str = ""
+    ) -> tuple[dict, dict | None, float | None]:
+        """Классификация через LLM: (enriched, norm, confidence).
+
+        Нормализация нужна только для создания товара, поэтому здесь не выполняется
+        (``norm`` — None, см. ``_normalize_with_llm``); в режиме analyze она приходит
+        тем же ответом. В режиме отложенных повторов временный сбой пробрасывается:
+        строку лучше повторить позже, чем создать товар без классификации.
+        """
         if self.llm is None:
-            return {}, {}, None
+            return {}, None, None
         
+        gn_candidates, vn_candidates = self._candidates(text, category)
         try:
-            norm = self.llm.normalize(text)
-            attrs_norm = norm.get("attrs") or {}
-            
-            classif = self.llm.classify(["ГН1", "ГН2", "ГН3"], ["ВН1", "ВН2", "ВН3"], text)
+            if self.llm_analyze:
+                # Нормализация и классификация одним запросом
+                classif = norm = self._retry(
+                    self.llm.analyze, text, gn_candidates, vn_candidates, errors_list=errors, tag="llm_analyze"
+                )
+            else:
+                norm = None
+                classif = self._retry(
+                    self.llm.classify, gn_candidates, vn_candidates, text,
+                    errors_list=errors, tag="llm_classify"
+                )
             confidence = classif.get("confidence")
             
             if (confidence or 0.0) < self.cfg.confidence_threshold:
@@ -107,18 +215,35 @@ class ProcessingPipeline:
                     "[llm] low_confidence=%.3f threshold=%.3f part=%s", 
                     confidence or 0.0, self.cfg.confidence_threshold, text
                 )
-                return {}, attrs_norm, confidence
+                return {}, norm, confidence
             
             enriched = {"gn": classif.get("gn"), "vn": classif.get("vn")}
             self.log.info(
                 "[llm] ok gn=%s vn=%s conf=%.3f", 
                 classif.get("gn"), classif.get("vn"), confidence or 0.0
             )
-            return enriched, attrs_norm, confidence
+            return enriched, norm, confidence
             
-        except RetryExhaustedError as e:
-            errors.append(f"llm:{type(e).__name__}")
-            return {}, {}, None
+        except (RetryExhaustedError, ExternalServiceError) as e:
+            self._on_llm_error(e, errors)
+            return {}, None, None
+    
+    def _normalize_with_llm(self, text: str, errors: list[str]) -> dict:
+        """Нормализация через LLM — только на пути создания товара."""
+        if self.llm is None:
+            return {}
+        try:
+            return self._retry(self.llm.normalize, text, errors_list=errors, tag="llm_normalize")
+        except (RetryExhaustedError, ExternalServiceError) as e:
+            self._on_llm_error(e, errors)
+            return {}
+    
+    def _on_llm_error(self, exc: Exception, errors: list[str]) -> None:
+        """Учесть сбой LLM; в режиме отложенных повторов временный сбой пробрасывается."""
+        errors.append(f"llm:{type(exc).__name__}")
+        last_error = exc.last_error if isinstance(exc, RetryExhaustedError) else exc
+        if self.deferred_retries and not isinstance(last_error, ClientRequestError):
+            raise exc
     
     def _create_catalog_product(self, partnumber: str, brand: str, norm: dict, 
                                attrs_norm: dict, enriched: dict, row: dict, errors: list[str]) -> dict:
@@ -126,35 +251,67 @@ class ProcessingPipeline:
         if not hasattr(self.catalog, "create_product"):
             return {"action": "skip", "reason": "not_found"}
         
+        payload = {
+            "partnumber": partnumber,
+            "name": norm.get("local_name") or partnumber,
+            "brand": brand,
+            "attrs": attrs_norm or {},
+        }
+        
+        # Добавляем дополнительные поля если есть
+        ext_in = str(row.get("external_id", "")).strip()
+        if ext_in:
+            payload["external_id"] = ext_in
+        if enriched.get("gn"):
+            payload["gn"] = enriched.get("gn")
+        if enriched.get("vn"):
+            payload["vn"] = enriched.get("vn")
+        
+        return self._create_product(payload, errors)
+    
+    def _create_product(self, payload: dict, errors: list[str]) -> dict:
+        """Запись нового товара в каталог по готовому payload."""
         try:
-            payload = {
-                "partnumber": partnumber,
-                "name": norm.get("local_name") or partnumber,
-                "brand": brand,
-                "attrs": attrs_norm or {},
-            }
-            
-            # Добавляем дополнительные поля если есть
-            ext_in = str(row.get("external_id", "")).strip()
-            if ext_in:
-                payload["external_id"] = ext_in
-            if enriched.get("gn"):
-                payload["gn"] = enriched.get("gn")
-            if enriched.get("vn"):
-                payload["vn"] = enriched.get("vn")
-            
             self._retry(
                 self.catalog.create_product, 
                 payload, 
-                attempts=3, 
                 errors_list=errors, 
                 tag="catalog_create"
             )
-            self.log.info("[catalog] create part=%s brand=%s", partnumber, payload.get("brand"))
+            self.log.info("[catalog] create part=%s brand=%s", payload.get("partnumber"), payload.get("brand"))
             return {"action": "create", "reason": "not_found"}
-            
-        except RetryExhaustedError:
-            return {"action": "conflict", "reason": "create_failed"}
+        except (RetryExhaustedError, ExternalServiceError) as e:
+            return {"action": "conflict", "reason": write_error_reason(e, "create"), "write": ("create", payload)}
+    
+    def retry_write(self, row: dict, write: tuple) -> dict:
+        """Повторить только запись в каталог, не удавшуюся в прошлой попытке строки.
+
+        ``write`` — отложенная запись из ``row["_write"]`` (см. process_single_row): поиск, LCSC,
+        LLM и бюджет LLM уже потрачены на ее вычисление и не повторяются.
+        """
+        errors: list[str] = []
+        with deadline_scope(getattr(self.cfg, "row_deadline_sec", 0)):
+            try:
+                if write[0] == "update":
+                    decision = self._update_catalog_product(write[1], write[2], errors)
+                else:
+                    decision = self._create_product(write[1], errors)
+            except DeadlineExceededError as e:
+                decision = {"action": "error", "reason": DEADLINE_REASON}
+                errors.append(f"deadline:{e.scope}:{e.stage}")
+        row.update({
+            "status": decision["action"],
+            "action": decision["action"],
+            "reason": decision["reason"],
+            "errors": ";".join(errors) if errors else "",
+        })
+        self._keep_write(row, decision)
+        return row
+    
+    def _keep_write(self, row: dict, decision: dict) -> None:
+        """Сохранить неудавшуюся запись для отложенного повтора (только режим DEFERRED_RETRIES)."""
+        if self.deferred_retries and decision.get("write") and decision["reason"] in RETRYABLE_REASONS:
+            row["_write"] = decision["write"]
     
     def process_single_row(self, row: dict) -> dict:
         """Обработка одной строки данных."""
@@ -170,50 +327,97 @@ class ProcessingPipeline:
         found_flag = False
         confidence_val = None
         attrs_norm: dict = {}
+        category = gn_vn_source = family_key = ""
         errors: list[str] = []
         
-        # 1. Поиск в каталоге
-        found, found_flag = self._search_in_catalog(part, errors)
+        # Бюджет строки; вложен в дедлайн запуска, если он задан (см. main.process_rows)
+        with deadline_scope(getattr(self.cfg, "row_deadline_sec", 0)):
+            try:
+                # 1. Поиск в каталоге
+                try:
+                    found, found_flag = self._search_in_catalog(part, errors)
+                    lookup_error = None
+                except (RetryExhaustedError, ExternalServiceError) as e:
+                    found, lookup_error = [], e
         
-        if found:
-            # Обновление существующего товара
-            best = found[0]
-            patch = self._build_update_patch(row, best, brand)
-            
-            if patch:
-                decision = self._update_catalog_product(best.get("id"), patch, errors)
-            else:
-                decision = {"action": "skip", "reason": "already_present"}
-        else:
-            # 2. Поиск в LCSC
-            candidates = self._search_in_lcsc(part, errors)
-            decision = {"action": "skip", "reason": "not_found"}
+                if lookup_error is not None:
+                    # Каталог недоступен/отказал: наличие товара неизвестно — без LCSC, LLM и создания
+                    decision = {"action": "error", "reason": catalog_error_reason(lookup_error)}
+                    self.log.warning("[catalog] search failed part=%s reason=%s", part, decision["reason"])
+                elif found:
+                    # Обновление существующего товара
+                    best = found[0]
+                    patch = self._build_update_patch(row, best, brand)
             
-            # 3. Классификация LLM
-            text = f"{part} {brand}".strip()
-            enriched, attrs_norm, confidence_val = self._classify_with_llm(text, errors)
+                    if patch:
+                        decision = self._update_catalog_product(best.get("id"), patch, errors)
+                    else:
+                        decision = {"action": "skip", "reason": "already_present"}
+                else:
+                    # 2. Поиск в LCSC
+                    candidates = self._search_in_lcsc(part, errors)
             
-            if confidence_val is not None and confidence_val < self.cfg.confidence_threshold:
-                decision = {"action": "skip", "reason": "low_confidence"}
-            elif decision["reason"] == "not_found":
-                # 4. Создание в каталоге
-                norm = {"local_name": part}  # Упрощенная нормализация
-                decision = self._create_catalog_product(
-                    part, brand or (candidates[0]["brand"] if candidates else ""),
-                    norm, attrs_norm, enriched, row, errors
-                )
-        
+                    # 3. Классификация: таблица категорий, семейство партномера, для остальных — LLM
+                    text = f"{part} {brand}".strip()
+                    category, mapped = self._map_gn_vn(row, candidates, brand)
+                    try:
+                        if mapped:
+                            enriched, norm_result = mapped, None
+                            gn_vn_source = SOURCE_MAPPING
+                        else:
+                            family_key, family = self._family_lookup(part, brand)
+                            if family is not None:
+                                enriched = {"gn": family["gn"], "vn": family["vn"]}
+                                norm_result, confidence_val = None, family["confidence"]
+                                gn_vn_source = SOURCE_FAMILY
+                            else:
+                                enriched, norm_result, confidence_val = self._classify_with_llm(text, errors, category)
+                                gn_vn_source = SOURCE_LLM if enriched else ""
+                                if self.part_families is not None:
+                                    self.part_families.record(family_key, part, enriched, confidence_val)
+                        if confidence_val is not None and confidence_val < self.cfg.confidence_threshold:
+                            decision = {"action": "skip", "reason": "low_confidence"}
+                            if self.llm is not None and norm_result is None:
+                                # Нормализация не понадобилась: строка не создается
+                                get_runtime_counters().incr("llm.normalize_avoided")
+                        else:
+                            # 4. Нормализация (лениво, только для создания) и создание в каталоге
+                            if norm_result is None:
+                                norm_result = self._normalize_with_llm(text, errors)
+                            attrs_norm = norm_result.get("attrs") or {}
+                            norm = {"local_name": part}  # Упрощенная нормализация
+                            decision = self._create_catalog_product(
+                                part, brand or (candidates[0]["brand"] if candidates else ""),
+                                norm, attrs_norm, enriched, row, errors
+                            )
+                    except (RetryExhaustedError, ExternalServiceError):
+                        decision = {"action": "error", "reason": LLM_UNAVAILABLE_REASON}
+                        self.log.warning("[llm] unavailable part=%s, row deferred", part)
+                    except LLMBudgetExhaustedError as e:
+                        # Строка остается до следующего запуска
+                        decision = {"action": "skip", "reason": LLM_BUDGET_REASON}
+                        errors.append(f"llm_budget:{e.resource}")
+            except DeadlineExceededError as e:
+                # Оставшиеся этапы не успеют завершиться — строка помечается, а не зависает
+                decision = {"action": "error", "reason": DEADLINE_REASON}
+                errors.append(f"deadline:{e.scope}:{e.stage}")
+                self.log.warning("[deadline] %s deadline exceeded part=%s stage=%s", e.scope, part, e.stage)
+
         # Формирование результата
         row.update({
             "status": decision["action"],
             "action": decision["action"],
             "reason": decision["reason"],
             "found_in_catalog": found_flag,
+            "category": category,
+            "gn_vn_source": gn_vn_source,
+            "part_family": family_key,
             "confidence": confidence_val if confidence_val is not None else "",
-            "attrs_norm": json.dumps(attrs_norm, ensure_ascii=False) if attrs_norm else "",
+            "attrs_norm": dumps_report(attrs_norm) if attrs_norm else "",
             "errors": ";".join(errors) if errors else "",
             **enriched,
         })
+        self._keep_write(row, decision)
         
         return row
     
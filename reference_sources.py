@@ -0,0 +1,182 @@
+"""Параллельный опрос справочных источников (LCSC, Digikey, Mouser) по партномеру.
+
+``ReferenceSources`` — реестр источников с интерфейсом LCSC-клиента (``search``): пайплайн
+не знает, сколько источников за ним стоит. Все источники опрашиваются одновременно.
+
+- ``first``: побеждает первый источник, вернувший точное совпадение партномера; остальные
+  вызовы отменяются (еще не начатые) или их результат отбрасывается.
+- ``quorum``: ждать точных совпадений от ``quorum`` источников; кандидаты упорядочиваются
+  по числу источников, согласных с брендом.
+
+Без точных совпадений возвращается объединение ответов в порядке реестра (LCSC первым);
+исключение — только если упали все источники. Задержка, ошибки и победы каждого источника
+пишутся в счетчики запуска (``ref.<source>.*``).
+"""
+from __future__ import annotations
+
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Protocol, Sequence
+
+from deadline import check_deadline, current_deadline
+from latency import LatencyTracker
+from logger import get_logger
+from metrics import RuntimeCounters, get_runtime_counters
+from partnumbers import canonicalize_partnumber, is_exact_match
+
+VALID_MODES = ("first", "quorum")
+
+
+class ReferenceSource(Protocol):
+    def search(self, partnumber: str) -> list[dict[str, Any]]:
+        ...
+
+
+class ReferenceSources:
+    """Реестр справочных источников с конкурентным опросом."""
+
+    def __init__(
+        self,
+        sources: dict[str, ReferenceSource],
+        *,
+        mode: str = "first",
+        quorum: int = 2,
+        counters: RuntimeCounters | None = None,
+    ):
+        if not sources:
+            raise ValueError("at least one reference source is required")
+        if mode not in VALID_MODES:
+            raise ValueError(f"unknown reference mode {mode!r}, expected one of {VALID_MODES}")
+        self.sources = dict(sources)
+        self.mode = mode
+        self.quorum = max(1, min(int(quorum), len(self.sources))) if mode == "quorum" else 1
+        self.counters = counters or get_runtime_counters()
+        self.log = get_logger("reference")
+        self.trackers = {name: LatencyTracker() for name in self.sources}
+        self._lock = threading.Lock()
+        self._searches = 0
+        self._wins = {name: 0 for name in self.sources}
+        # Поток на источник и параллельные строки (хеджирование LCSC внутри — свой пул)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(4, 4 * len(self.sources)), thread_name_prefix="reference"
+        )
+
+    @property
+    def names(self) -> list[str]:
+        return list(self.sources)
+
+    def search(self, partnumber: str) -> list[dict[str, Any]]:
+        """Опросить все источники; кандидаты с полем ``source``, точные совпадения первыми."""
+        canonical = canonicalize_partnumber(partnumber)
+        futures = {self._submit(name, partnumber): name for name in self.sources}
+        answers: dict[str, list] = {}
+        errors: list[BaseException] = []
+        exact: list[str] = []
+        pending: set[Future] = set(futures)
+        while pending and len(exact) < self.quorum:
+            deadline = current_deadline()
+            done, pending = wait(
+                pending, timeout=deadline.remaining() if deadline else None, return_when=FIRST_COMPLETED
+            )
+            if not done:
+                self._cancel(pending)
+                pending = set()
+                check_deadline("reference_search")
+            for future in done:
+                name = futures[future]
+                try:
+                    answers[name] = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                if any(is_exact_match(item, canonical) for item in answers[name]):
+                    exact.append(name)
+        self._cancel(pending)
+        if not answers and errors:
+            raise errors[0]
+        if exact:
+            self.log.debug("[reference] %s: exact match from %s", partnumber, ", ".join(exact))
+        self._on_search(exact[0] if exact else None)
+        return self._merge(answers, exact, canonical)
+
+    def _submit(self, name: str, partnumber: str) -> Future:
+        # Копия контекста: дедлайн строки, полоса планировщика и уровень повторов видны в потоке
+        ctx = contextvars.copy_context()
+        return self._executor.submit(ctx.run, self._timed, name, partnumber)
+
+    def _timed(self, name: str, partnumber: str) -> list:
+        self.counters.incr(f"ref.{name}.calls")
+        started = time.perf_counter()
+        try:
+            result = self.sources[name].search(partnumber)
+        except Exception:
+            self.counters.incr(f"ref.{name}.errors")
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.trackers[name].record(elapsed)
+            self.counters.incr(f"ref.{name}.latency_ms", elapsed * 1000.0)
+        return [{**item, "source": name} for item in result or []]
+
+    def _cancel(self, pending: set[Future]) -> None:
+        for future in pending:
+            # Начатые вызовы не прерываются: их ответ просто не ждут
+            future.cancel()
+        if pending:
+            self.counters.incr("ref.cancelled", len(pending))
+
+    def _merge(self, answers: dict[str, list], exact: list[str], canonical: str) -> list:
+        if not exact:
+            return [item for name in self.sources for item in answers.get(name, [])]
+        matches = [item for name in exact for item in answers[name] if is_exact_match(item, canonical)]
+        if self.mode == "quorum":
+            votes: dict[str, int] = {}
+            for item in matches:
+                votes[item.get("brand", "")] = votes.get(item.get("brand", ""), 0) + 1
+            # sorted устойчива: при равенстве голосов сохраняется порядок ответов
+            matches = sorted(matches, key=lambda item: -votes[item.get("brand", "")])
+        rest = [item for name in exact for item in answers[name] if not is_exact_match(item, canonical)]
+        return matches + rest
+
+    def _on_search(self, winner: str | None) -> None:
+        with self._lock:
+            self._searches += 1
+            if winner is not None:
+                self._wins[winner] += 1
+            rates = {name: wins / self._searches for name, wins in self._wins.items()}
+        if winner is not None:
+            self.counters.incr(f"ref.{winner}.wins")
+        for name, rate in rates.items():
+            self.counters.set(f"ref.{name}.win_rate", round(rate, 4))
+
+    def get_stats(self) -> dict:
+        """Сводка по источникам: победы, доля побед и перцентили задержки."""
+        with self._lock:
+            searches, wins = self._searches, dict(self._wins)
+        stats = {}
+        for name, tracker in self.trackers.items():
+            p50, p95 = tracker.percentile(50), tracker.percentile(95)
+            stats[name] = {
+                "wins": wins[name],
+                "win_rate": round(wins[name] / searches, 4) if searches else 0.0,
+                "latency_p50_ms": (p50 or 0.0) * 1000.0,
+                "latency_p95_ms": (p95 or 0.0) * 1000.0,
+            }
+        return stats
+
+    def shutdown(self) -> None:
+        """Остановить пул потоков, не дожидаясь проигравших вызовов."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def with_reference_sources(primary: ReferenceSource, extras: Sequence[tuple[str, ReferenceSource]], cfg) -> Any:
+    """LCSC-клиент, дополненный источниками ``extras``; без дополнительных — сам ``primary``."""
+    if not extras:
+        return primary
+    return ReferenceSources(
+        {"lcsc": primary, **dict(extras)},
+        mode=getattr(cfg, "reference_mode", "first"),
+        quorum=getattr(cfg, "reference_quorum", 2),
+    )
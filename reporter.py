@@ -1,10 +1,10 @@
-import json
 from pathlib import Path
 
 import pandas as pd
 
 from logger import generate_run_id, get_logger
 from metrics import ProcessingMetrics
+from serialization import dumps_report
 
 
 def save_report(data: list, filename: str = None, metrics: ProcessingMetrics = None):
@@ -27,7 +27,7 @@ def save_report(data: list, filename: str = None, metrics: ProcessingMetrics = N
                 if isinstance(v, str):
                     return v
                 try:
-                    return json.dumps(v if v is not None else {}, ensure_ascii=False)
+                    return dumps_report(v if v is not None else {})
                 except Exception:
                     return ""
             df["attrs_norm"] = df["attrs_norm"].map(_to_json)
@@ -39,6 +39,9 @@ def save_report(data: list, filename: str = None, metrics: ProcessingMetrics = N
             "brand",
             "gn",
             "vn",
+            "category",
+            "gn_vn_source",
+            "part_family",
             "found_in_catalog",
             "action",
             "status",
@@ -100,6 +103,53 @@ def save_report(data: list, filename: str = None, metrics: ProcessingMetrics = N
                         })
                         sections.append(conf_metrics)
 
+                    # LLM cache metrics
+                    cache = summary.get("llm_cache") or {}
+                    if cache.get("hits") or cache.get("misses"):
+                        cache_metrics = pd.DataFrame({
+                            "metric": ["llm_cache_hits", "llm_cache_misses", "llm_cache_hit_rate",
+                                       "llm_cache_lookup_ms", "llm_cache_llm_ms"],
+                            "value": [cache["hits"], cache["misses"], cache["hit_rate"],
+                                      cache["lookup_ms"], cache["llm_ms"]]
+                        })
+                        sections.append(cache_metrics)
+
+                    # GN/VN mapping table metrics
+                    mapping = summary.get("gn_vn_mapping") or {}
+                    if mapping.get("hits") or mapping.get("misses"):
+                        sections.append(pd.DataFrame({
+                            "metric": ["gn_vn_mapping_hits", "gn_vn_mapping_misses", "gn_vn_mapping_hit_rate"],
+                            "value": [mapping["hits"], mapping["misses"], mapping["hit_rate"]]
+                        }))
+
+                    # LLM budget usage
+                    budget = summary.get("llm_budget") or {}
+                    if budget.get("calls") or budget.get("denied"):
+                        sections.append(pd.DataFrame({
+                            "metric": ["llm_budget_calls", "llm_budget_max_calls", "llm_budget_tokens",
+                                       "llm_budget_max_tokens", "llm_budget_denied"],
+                            "value": [budget["calls"], budget["max_calls"], budget["tokens"],
+                                      budget["max_tokens"], budget["denied"]]
+                        }))
+
+                    # Part-family reuse: LLM calls saved by family hits
+                    family = summary.get("part_family") or {}
+                    if family.get("hits") or family.get("misses"):
+                        sections.append(pd.DataFrame({
+                            "metric": ["part_family_hits", "part_family_misses", "part_family_spot_checks",
+                                       "part_family_spot_check_mismatches", "part_family_llm_calls_saved"],
+                            "value": [family["hits"], family["misses"], family["spot_checks"],
+                                      family["spot_check_mismatches"], family["llm_calls_saved"]]
+                        }))
+
+                    # Runtime counters from clients/schedulers (hedging, retries, caches...)
+                    if summary.get("runtime"):
+                        runtime_metrics = pd.DataFrame({
+                            "metric": list(summary["runtime"].keys()),
+                            "value": list(summary["runtime"].values()),
+                        })
+                        sections.append(runtime_metrics)
+
                 # Standard counts from data
                 if "status" in df.columns:
                     status_counts = df["status"].value_counts(dropna=False).rename_axis("status").reset_index(name="count")
@@ -0,0 +1,227 @@
+"""Единая политика повторов для пайплайнов и HTTP-клиентов.
+
+- Повторяет только самый внешний уровень: вызов ``RetryPolicy.call`` внутри другого
+  (пайплайн -> клиент) выполняется одной попыткой, ошибка уходит наружу. Так один сбойный
+  вызов дает не более ``attempts`` попыток, а не произведение попыток всех уровней.
+- Бюджет повторов на запуск (``RetryBudget``) ограничивает общий объем повторов долей от
+  числа вызовов: во время инцидента сервис не получает кратную нагрузку.
+- Каждая попытка, повтор, исчерпание и отказ бюджета учитываются в счетчиках запуска
+  (``retry.<tag>.*``, ``retry.budget_denied``).
+- Повтор не начинается, если пауза перед ним не укладывается в текущий дедлайн (deadline.py):
+  вместо него сразу DeadlineExceededError.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import random
+import threading
+import time
+from typing import Any, Callable
+
+from deadline import check_deadline, current_deadline
+from exceptions import DeadlineExceededError, RetryExhaustedError
+from logger import get_logger
+from metrics import RuntimeCounters, get_runtime_counters
+
+# Признак того, что текущий вызов уже выполняется под политикой повторов уровнем выше
+_retry_scope: contextvars.ContextVar[bool] = contextvars.ContextVar("retry_scope", default=False)
+
+SERVICES = ("catalog", "lcsc", "llm")
+
+# Верхняя граница ожидания по заголовку Retry-After
+MAX_RETRY_AFTER_SEC = 30.0
+
+
+class RetryBudget:
+    """Бюджет повторов на запуск: ``min_retries + ratio * calls`` повторов на все сервисы."""
+
+    def __init__(self, ratio: float = 0.2, min_retries: int = 20):
+        self._lock = threading.Lock()
+        self.ratio = max(0.0, float(ratio))
+        self.min_retries = max(0, int(min_retries))
+        self.calls = 0
+        self.retries = 0
+        self.denied = 0
+
+    def record_call(self) -> None:
+        with self._lock:
+            self.calls += 1
+
+    def try_spend(self) -> bool:
+        """Разрешить один повтор, если бюджет не исчерпан."""
+        with self._lock:
+            if self.retries < self.min_retries + self.ratio * self.calls:
+                self.retries += 1
+                return True
+            self.denied += 1
+            return False
+
+    def reset(self, ratio: float | None = None, min_retries: int | None = None) -> None:
+        """Начало нового запуска (опционально с новыми параметрами)."""
+        with self._lock:
+            if ratio is not None:
+                self.ratio = max(0.0, float(ratio))
+            if min_retries is not None:
+                self.min_retries = max(0, int(min_retries))
+            self.calls = 0
+            self.retries = 0
+            self.denied = 0
+
+
+class RetryPolicy:
+    """Повторы с экспоненциальной задержкой и джиттером."""
+
+    def __init__(
+        self,
+        attempts: int = 3,
+        backoff_base_ms: int = 100,
+        backoff_max_ms: int = 2000,
+        backoff_jitter_ms: int = 100,
+        *,
+        budget: RetryBudget | None = None,
+        counters: RuntimeCounters | None = None,
+        retry_on: tuple[type[BaseException], ...] = (Exception,),
+    ):
+        self.attempts = max(1, int(attempts))
+        self.backoff_base_ms = max(0, int(backoff_base_ms))
+        self.backoff_max_ms = max(0, int(backoff_max_ms))
+        self.backoff_jitter_ms = max(0, int(backoff_jitter_ms))
+        self.budget = budget
+        self.counters = counters or get_runtime_counters()
+        self.retry_on = retry_on
+        self.log = get_logger("retry")
+
+    @classmethod
+    def from_config(cls, cfg, service: str | None = None, **kwargs) -> "RetryPolicy":
+        """Политика сервиса (``<service>_retries``/``<service>_backoff_*``) или общая (``backoff_*``).
+
+        Использует общий бюджет запуска ``get_retry_budget()``.
+        """
+        prefix = f"{service}_" if service else ""
+        kwargs.setdefault("budget", get_retry_budget())
+        return cls(
+            attempts=getattr(cfg, f"{service}_retries", 3) if service else 3,
+            backoff_base_ms=getattr(cfg, f"{prefix}backoff_base_ms", 100),
+            backoff_max_ms=getattr(cfg, f"{prefix}backoff_max_ms", 2000),
+            backoff_jitter_ms=getattr(cfg, f"{prefix}backoff_jitter_ms", 100),
+            **kwargs,
+        )
+
+    def backoff_sec(self, attempt: int) -> float:
+        """Задержка после неудачной попытки ``attempt`` (1-based)."""
+        delay_ms = min(self.backoff_max_ms, self.backoff_base_ms * (2 ** (attempt - 1)))
+        if self.backoff_jitter_ms > 0:
+            delay_ms += random.randint(0, self.backoff_jitter_ms)
+        return delay_ms / 1000.0
+
+    def call(
+        self,
+        fn: Callable[..., Any],
+        *args,
+        tag: str = "",
+        attempts: int | None = None,
+        errors_list: list | None = None,
+        retry_on: tuple[type[BaseException], ...] | None = None,
+        **kwargs,
+    ) -> Any:
+        """Вызвать fn с повторами; после исчерпания попыток — RetryExhaustedError."""
+        if _retry_scope.get():
+            return fn(*args, **kwargs)
+        token = _retry_scope.set(True)
+        try:
+            attempts = attempts or self.attempts
+            retryable = retry_on or self.retry_on
+            self._on_call(tag)
+            for i in range(1, attempts + 1):
+                check_deadline(tag)
+                self.counters.incr(f"retry.{tag}.attempts")
+                try:
+                    return fn(*args, **kwargs)
+                except retryable as e:
+                    time.sleep(self._on_failure(tag, e, i, attempts, errors_list))
+        finally:
+            _retry_scope.reset(token)
+
+    async def call_async(
+        self,
+        coro_fn: Callable[..., Any],
+        *args,
+        tag: str = "",
+        attempts: int | None = None,
+        errors_list: list | None = None,
+        retry_on: tuple[type[BaseException], ...] | None = None,
+        **kwargs,
+    ) -> Any:
+        """Асинхронный вариант ``call`` для корутинных функций."""
+        if _retry_scope.get():
+            return await coro_fn(*args, **kwargs)
+        token = _retry_scope.set(True)
+        try:
+            attempts = attempts or self.attempts
+            retryable = retry_on or self.retry_on
+            self._on_call(tag)
+            for i in range(1, attempts + 1):
+                check_deadline(tag)
+                self.counters.incr(f"retry.{tag}.attempts")
+                try:
+                    return await coro_fn(*args, **kwargs)
+                except retryable as e:
+                    await asyncio.sleep(self._on_failure(tag, e, i, attempts, errors_list))
+        finally:
+            _retry_scope.reset(token)
+
+    def _on_call(self, tag: str) -> None:
+        self.counters.incr(f"retry.{tag}.calls")
+        if self.budget is not None:
+            self.budget.record_call()
+
+    def _on_failure(self, tag: str, exc: BaseException, attempt: int, attempts: int, errors_list: list | None) -> float:
+        """Учесть неудачную попытку и вернуть паузу перед повтором.
+
+        Ошибки с ``retryable = False`` (отказ 4xx, дедлайн) пробрасываются как есть; после
+        исчерпания попыток или бюджета — RetryExhaustedError; если пауза не укладывается в
+        дедлайн — DeadlineExceededError.
+        """
+        if errors_list is not None:
+            errors_list.append(f"{tag}:{type(exc).__name__}:attempt{attempt}")
+        if getattr(exc, "retryable", True) is False:
+            self.counters.incr(f"retry.{tag}.non_retryable")
+            raise exc
+        if attempt >= attempts:
+            self.counters.incr(f"retry.{tag}.exhausted")
+            raise RetryExhaustedError(tag, attempt, exc) from exc
+        if self.budget is not None and not self.budget.try_spend():
+            self.counters.incr("retry.budget_denied")
+            self.counters.incr(f"retry.{tag}.exhausted")
+            self.log.warning("[retry] budget exhausted, not retrying %s after attempt %d", tag, attempt)
+            raise RetryExhaustedError(tag, attempt, exc) from exc
+        self.counters.incr(f"retry.{tag}.retries")
+        delay = self.backoff_sec(attempt)
+        retry_after = getattr(exc, "retry_after", None)
+        if retry_after:
+            delay = max(delay, min(float(retry_after), MAX_RETRY_AFTER_SEC))
+        deadline = current_deadline()
+        if deadline is not None and deadline.remaining() <= delay:
+            self.counters.incr(f"retry.{tag}.deadline")
+            raise DeadlineExceededError(tag, deadline.scope) from exc
+        return delay
+
+
+# Глобальный бюджет повторов запуска
+_retry_budget: RetryBudget | None = None
+
+
+def get_retry_budget() -> RetryBudget:
+    """Получить глобальный бюджет повторов (сбрасывается в начале запуска)."""
+    global _retry_budget
+    if _retry_budget is None:
+        _retry_budget = RetryBudget()
+    return _retry_budget
+
+
+def reset_retry_budget(cfg) -> RetryBudget:
+    """Начать бюджет повторов нового запуска по ``RETRY_BUDGET_*`` (синхронный и асинхронный пути)."""
+    budget = get_retry_budget()
+    budget.reset(ratio=getattr(cfg, "retry_budget_ratio", 0.2), min_retries=getattr(cfg, "retry_budget_min", 20))
+    return budget
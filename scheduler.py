@@ -0,0 +1,314 @@
+"""Приоритетные полосы запросов к внешним сервисам.
+
+Интерактивные запуски из UI и ночной пакет делят одни квоты API. ``LaneScheduler`` —
+token bucket сервиса (``<SERVICE>_RATE_LIMIT`` запросов в секунду), который делит
+пропускную способность между полосами ``interactive`` и ``batch`` по весам
+(weighted fair queuing): при наличии ожидающих в обеих полосах интерактивная получает
+``LANE_WEIGHT_INTERACTIVE`` разрешений на каждые ``LANE_WEIGHT_BATCH`` пакетных.
+
+UI и cron-агент — разные процессы, поэтому активные полосы публикуются файлами-пульсами в
+``SCHEDULER_DIR``: процесс, видящий свежий пульс чужой полосы, сокращает свою долю квоты
+пропорционально весам. Так загрузка на 50 строк не ждет за 100 тыс. строк ночного запуска.
+
+Полоса вызова берется из contextvar (``lane_scope``); по умолчанию — ``batch``.
+"""
+from __future__ import annotations
+
+import asyncio
+import atexit
+import contextvars
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+from logger import get_logger
+from metrics import RuntimeCounters, get_runtime_counters
+
+LANES = ("interactive", "batch")
+DEFAULT_LANE = "batch"
+
+# Пульс полосы обновляется не чаще раза в секунду и считается свежим HEARTBEAT_TTL_SEC
+HEARTBEAT_INTERVAL_SEC = 1.0
+HEARTBEAT_TTL_SEC = 5.0
+# Пульс старше этого удаляется при чтении каталога (процесс завершился, не убрав файл)
+HEARTBEAT_STALE_SEC = 300.0
+
+# Шаг опроса для заявки, чья очередь еще не подошла
+_POLL_SEC = 0.005
+
+_lane: contextvars.ContextVar[str] = contextvars.ContextVar("lane", default=DEFAULT_LANE)
+
+
+def current_lane() -> str:
+    return _lane.get()
+
+
+@contextmanager
+def lane_scope(lane: str) -> Iterator[str]:
+    """Выполнить блок в указанной полосе (наследуется задачами asyncio и потоками хеджирования)."""
+    if lane not in LANES:
+        raise ValueError(f"unknown lane {lane!r}, expected one of {LANES}")
+    token = _lane.set(lane)
+    try:
+        yield lane
+    finally:
+        _lane.reset(token)
+
+
+class LaneScheduler:
+    """Token bucket одного сервиса с взвешенным разделением между полосами."""
+
+    def __init__(
+        self,
+        service: str,
+        rate_per_sec: float,
+        weights: dict[str, float] | None = None,
+        *,
+        burst: float | None = None,
+        heartbeat_dir: str | None = None,
+        counters: RuntimeCounters | None = None,
+    ):
+        if rate_per_sec <= 0:
+            raise ValueError(f"{service}: rate limit must be > 0")
+        self.service = service
+        self.rate = float(rate_per_sec)
+        self.weights = {lane: float((weights or {}).get(lane, 1.0)) for lane in LANES}
+        self.burst = float(burst) if burst is not None else max(1.0, self.rate)
+        self.heartbeat_dir = heartbeat_dir or None
+        self.counters = counters or get_runtime_counters()
+        self.log = get_logger("scheduler")
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._refilled_at = time.monotonic()
+        self._queues: dict[str, deque] = {lane: deque() for lane in LANES}
+        self._vtime = {lane: 0.0 for lane in LANES}
+        self._active_at = {lane: -math.inf for lane in LANES}
+        self._beat_at = {lane: -math.inf for lane in LANES}
+        self._peers: dict[str, float] = {}
+        self._peers_at = -math.inf
+        self._pid = os.getpid()
+        self._beat_files: set[str] = set()
+        # Файловый ввод-вывод пульсов — под отдельной блокировкой, не под блокировкой очереди
+        self._io_lock = threading.Lock()
+
+    # --- доля квоты процесса ---
+
+    def share(self, now: float | None = None) -> float:
+        """Доля квоты сервиса, доступная этому процессу (1.0 — других активных полос нет)."""
+        now = time.monotonic() if now is None else now
+        return self._share(now, self._read_peers(now))
+
+    def _share(self, now: float, peers: dict[str, float]) -> float:
+        own = sum(w for lane, w in self.weights.items() if now - self._active_at[lane] < HEARTBEAT_TTL_SEC)
+        peer_weight = sum(peers.values())
+        if own <= 0 or peer_weight <= 0:
+            return 1.0
+        return own / (own + peer_weight)
+
+    def _heartbeat_due(self, lane: str) -> bool:
+        now = time.monotonic()
+        return bool(self.heartbeat_dir) and (
+            now - self._beat_at[lane] >= HEARTBEAT_INTERVAL_SEC or now - self._peers_at >= HEARTBEAT_INTERVAL_SEC
+        )
+
+    def _refresh(self, lane: str) -> None:
+        """Обновить свой пульс и прочитать чужие (не чаще HEARTBEAT_INTERVAL_SEC).
+
+        Обновляет один поток; остальные тем временем выдают разрешения по прошлой доле.
+        """
+        if not self._io_lock.acquire(blocking=False):
+            return
+        try:
+            now = time.monotonic()
+            self._beat(lane, now)
+            self._read_peers(now)
+        finally:
+            self._io_lock.release()
+
+    def _beat(self, lane: str, now: float) -> None:
+        if not self.heartbeat_dir or now - self._beat_at[lane] < HEARTBEAT_INTERVAL_SEC:
+            return
+        self._beat_at[lane] = now
+        path = os.path.join(self.heartbeat_dir, f"{self.service}.{lane}.{self._pid}")
+        try:
+            os.makedirs(self.heartbeat_dir, exist_ok=True)
+            with open(path, "a"):
+                os.utime(path, None)
+        except OSError as e:  # pragma: no cover - файловая система только для чтения и т.п.
+            self.log.debug("[scheduler] heartbeat failed: %s", e)
+            return
+        if not self._beat_files:
+            atexit.register(self.remove_heartbeats)
+        self._beat_files.add(path)
+
+    def remove_heartbeats(self) -> None:
+        """Удалить файлы-пульсы этого процесса (при выходе процесса)."""
+        for path in list(self._beat_files):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self._beat_files.discard(path)
+
+    def _read_peers(self, now: float) -> dict[str, float]:
+        """Веса полос других процессов со свежим пульсом (кэш на HEARTBEAT_INTERVAL_SEC)."""
+        if not self.heartbeat_dir:
+            return {}
+        if now - self._peers_at < HEARTBEAT_INTERVAL_SEC:
+            return self._peers
+        self._peers_at = now
+        peers: dict[str, float] = {}
+        wall = time.time()
+        try:
+            names = os.listdir(self.heartbeat_dir)
+        except OSError:
+            names = []
+        for name in names:
+            service, _, rest = name.partition(".")
+            lane, _, pid = rest.partition(".")
+            if service != self.service or lane not in LANES or pid == str(self._pid):
+                continue
+            path = os.path.join(self.heartbeat_dir, name)
+            try:
+                age = wall - os.path.getmtime(path)
+            except OSError:
+                continue
+            if age < HEARTBEAT_TTL_SEC:
+                peers[f"{lane}.{pid}"] = self.weights[lane]
+            elif age > HEARTBEAT_STALE_SEC:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        self._peers = peers
+        return peers
+
+    # --- выдача разрешений ---
+
+    def _enqueue(self, lane: str) -> object:
+        ticket = object()
+        with self._lock:
+            queue = self._queues[lane]
+            if not queue:
+                # Полоса, простаивавшая долго, не копит кредит: догоняет текущее виртуальное время
+                busy = [self._vtime[other] for other in LANES if self._queues[other]]
+                if busy:
+                    self._vtime[lane] = max(self._vtime[lane], min(busy))
+            queue.append(ticket)
+        return ticket
+
+    def _dequeue(self, lane: str, ticket: object) -> None:
+        with self._lock:
+            try:
+                self._queues[lane].remove(ticket)
+            except ValueError:
+                pass
+
+    def _poll(self, lane: str, ticket: object) -> float:
+        """0 — разрешение выдано; иначе — сколько подождать до следующей проверки."""
+        with self._lock:
+            now = time.monotonic()
+            self._active_at[lane] = now
+            # Доля — по последним прочитанным пульсам: файлы читает _refresh вне блокировки
+            rate = self.rate * self._share(now, self._peers)
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * rate)
+            self._refilled_at = now
+            waiting = [other for other in LANES if self._queues[other]]
+            turn = min(waiting, key=lambda other: (self._vtime[other], -self.weights[other]))
+            if turn != lane or self._queues[lane][0] is not ticket:
+                return _POLL_SEC
+            if self._tokens < 1.0:
+                return (1.0 - self._tokens) / rate
+            self._tokens -= 1.0
+            self._queues[lane].popleft()
+            self._vtime[lane] += 1.0 / self.weights[lane]
+        self.counters.incr(f"sched.{self.service}.{lane}.granted")
+        return 0.0
+
+    def _on_granted(self, lane: str, waited: float) -> None:
+        self.counters.incr(f"sched.{self.service}.{lane}.wait_ms", waited * 1000.0)
+
+    def acquire(self, lane: str | None = None) -> None:
+        """Дождаться разрешения на один запрос в полосе ``lane`` (по умолчанию — текущей)."""
+        lane = lane or current_lane()
+        started = time.perf_counter()
+        if self._heartbeat_due(lane):
+            self._refresh(lane)
+        ticket = self._enqueue(lane)
+        try:
+            while (wait := self._poll(lane, ticket)) > 0:
+                time.sleep(wait)
+        except BaseException:
+            self._dequeue(lane, ticket)
+            raise
+        self._on_granted(lane, time.perf_counter() - started)
+
+    async def acquire_async(self, lane: str | None = None) -> None:
+        """Асинхронный вариант ``acquire``; файлы пульсов читаются и пишутся в потоке, не в цикле событий."""
+        lane = lane or current_lane()
+        started = time.perf_counter()
+        if self._heartbeat_due(lane):
+            await asyncio.to_thread(self._refresh, lane)
+        ticket = self._enqueue(lane)
+        try:
+            while (wait := self._poll(lane, ticket)) > 0:
+                await asyncio.sleep(wait)
+        except BaseException:
+            self._dequeue(lane, ticket)
+            raise
+        self._on_granted(lane, time.perf_counter() - started)
+
+
+class ScheduledClient:
+    """Прокси клиента сервиса: каждый вызов метода сначала получает разрешение планировщика.
+
+    Для клиентов без HTTP-попыток (моки). Реальные клиенты получают планировщик сами
+    (``scheduler=``) и берут разрешение на каждую HTTP-попытку, включая повторы и
+    хеджированные дубликаты (``concurrency.attempt_slot``).
+    """
+
+    def __init__(self, client: Any, scheduler: LaneScheduler):
+        self._client = client
+        self._scheduler = scheduler
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+
+        def scheduled(*args, **kwargs):
+            self._scheduler.acquire()
+            return attr(*args, **kwargs)
+
+        return scheduled
+
+
+_schedulers: dict[tuple, LaneScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(cfg, service: str) -> LaneScheduler | None:
+    """Планировщик сервиса по ``<SERVICE>_RATE_LIMIT`` (общий в процессе); None — лимит не задан."""
+    rate = getattr(cfg, f"{service}_rate_limit", 0.0)
+    if not rate or rate <= 0:
+        return None
+    weights = {
+        "interactive": getattr(cfg, "lane_weight_interactive", 4.0),
+        "batch": getattr(cfg, "lane_weight_batch", 1.0),
+    }
+    heartbeat_dir = getattr(cfg, "scheduler_dir", "") or None
+    key = (service, rate, weights["interactive"], weights["batch"], heartbeat_dir)
+    with _schedulers_lock:
+        if key not in _schedulers:
+            _schedulers[key] = LaneScheduler(service, rate, weights, heartbeat_dir=heartbeat_dir)
+        return _schedulers[key]
+
+
+def schedule_client(client: Any, cfg, service: str) -> Any:
+    """Обернуть клиента планировщиком сервиса, если для него задан лимит запросов."""
+    scheduler = get_scheduler(cfg, service)
+    return ScheduledClient(client, scheduler) if scheduler is not None else client
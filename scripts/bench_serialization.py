@@ -0,0 +1,66 @@
+"""Микробенчмарк JSON-сериализации на горячих путях пайплайна.
+
+Сравнивает стандартный json и orjson (если установлен) на типичных операциях одной строки:
+- сборка ``attrs_norm`` (dumps словаря атрибутов);
+- разбор ответа поиска каталога из сырых байтов (loads);
+- запись строки алерта в JSONL.
+
+    python scripts/bench_serialization.py --rows 20000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import serialization  # noqa: E402
+
+ATTRS = {"voltage": "3.3В", "package": "SMD 0603", "tolerance": "1%", "power": "0.25W", "tokens": 4}
+SEARCH_BODY = json.dumps([
+    {"id": f"id{i}", "partnumber": f"RC0603FR-07{i}KL", "brand": "Yageo", "name": f"Резистор {i} кОм",
+     "attrs": ATTRS, "gn": "ГН1", "vn": "ВН1", "external_id": f"EXT-{i}"}
+    for i in range(20)
+], ensure_ascii=False).encode("utf-8")
+ALERT = {"level": "error", "title": "Высокий процент ошибок", "message": "x" * 120,
+         "timestamp": 1_700_000_000.0, "source": "processing", "metadata": {"error_rate": 0.12}}
+
+
+def _per_row_us(stmt, rows: int) -> float:
+    return min(timeit.repeat(stmt, number=rows, repeat=3)) / rows * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    cases = {
+        "attrs_norm dumps": (
+            lambda: json.dumps(ATTRS, ensure_ascii=False),
+            lambda: serialization.dumps(ATTRS),
+        ),
+        "search loads(bytes)": (
+            lambda: json.loads(SEARCH_BODY.decode("utf-8")),
+            lambda: serialization.loads(SEARCH_BODY),
+        ),
+        "alert jsonl line": (
+            lambda: json.dumps(ALERT, ensure_ascii=False) + "\n",
+            lambda: serialization.dumps(ALERT) + "\n",
+        ),
+    }
+    print(f"backend={serialization.backend()} rows={args.rows}")
+    print(f"{'case':<22}{'stdlib us/row':>15}{'serialization us/row':>22}{'speedup':>10}")
+    for name, (std, fast) in cases.items():
+        t_std = _per_row_us(std, args.rows)
+        t_fast = _per_row_us(fast, args.rows)
+        print(f"{name:<22}{t_std:>15.2f}{t_fast:>22.2f}{t_std / t_fast:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
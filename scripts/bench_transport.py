@@ -0,0 +1,117 @@
+"""Бенчмарк HTTP-транспортов реальных клиентов на локальном stand-in сервере.
+
+Сравнивает HTTP/1.1 (requests / aiohttp) и HTTP/2 (httpx) при высокой параллельности.
+Сервер — mocks/http_stub_server.py под Hypercorn (HTTP/2 h2c prior knowledge).
+
+    pip install "httpx[http2]" hypercorn
+    python scripts/bench_transport.py --requests 2000 --concurrency 100 --latency-ms 20
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from catalog_api import CatalogAPI  # noqa: E402
+from transport import async_request, get_sync_transport, open_async_session  # noqa: E402
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(port: int, latency_ms: int) -> subprocess.Popen:
+    env = dict(os.environ, STUB_LATENCY_MS=str(latency_ms), PYTHONPATH=ROOT)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "hypercorn", "mocks.http_stub_server:app", "--bind", f"127.0.0.1:{port}"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("stub server did not start")
+
+
+def _report(name: str, latencies: list[float], elapsed: float) -> None:
+    ordered = sorted(latencies)
+    p99 = ordered[max(0, int(len(ordered) * 0.99) - 1)]
+    print(f"{name:<16} n={len(ordered):>6}  {len(ordered) / elapsed:>8.0f} req/s  "
+          f"p50={statistics.median(ordered) * 1000:>7.1f}ms  p99={p99 * 1000:>7.1f}ms")
+
+
+def bench_sync(name: str, base_url: str, http, n: int, concurrency: int) -> None:
+    api = CatalogAPI(base_url=base_url, api_key="bench", retries=1, http=http)
+
+    def one(i: int) -> float:
+        start = time.perf_counter()
+        api.search_product(f"PN{i}")
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(one, range(n)))
+    _report(name, latencies, time.perf_counter() - start)
+
+
+async def _bench_async(kind: str, base_url: str, n: int, concurrency: int, max_connections: int) -> tuple[list, float]:
+    sem = asyncio.Semaphore(concurrency)
+    async with open_async_session(kind, max_connections=max_connections) as session:
+        async def one(i: int) -> float:
+            async with sem:
+                start = time.perf_counter()
+                await async_request(session, "GET", f"{base_url}/products", params={"partnumber": f"PN{i}"})
+                return time.perf_counter() - start
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(one(i) for i in range(n)))
+        return list(latencies), time.perf_counter() - start
+
+
+def bench_async(name: str, kind: str, base_url: str, n: int, concurrency: int, max_connections: int) -> None:
+    latencies, elapsed = asyncio.run(_bench_async(kind, base_url, n, concurrency, max_connections))
+    _report(name, latencies, elapsed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--latency-ms", type=int, default=20)
+    parser.add_argument("--max-connections", type=int, default=4, help="HTTP/2 connections")
+    args = parser.parse_args()
+
+    port = _free_port()
+    proc = _start_server(port, args.latency_ms)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        print(f"stub latency={args.latency_ms}ms concurrency={args.concurrency} "
+              f"http2_connections={args.max_connections}")
+        bench_sync("requests/http1", base_url, get_sync_transport("http1"), args.requests, args.concurrency)
+        bench_sync("httpx/http2", base_url, get_sync_transport("http2", max_connections=args.max_connections),
+                   args.requests, args.concurrency)
+        bench_async("aiohttp/http1", "http1", base_url, args.requests, args.concurrency, args.max_connections)
+        bench_async("httpx-async/h2", "http2", base_url, args.requests, args.concurrency, args.max_connections)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=5)
+
+
+if __name__ == "__main__":
+    main()
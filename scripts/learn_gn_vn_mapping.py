@@ -0,0 +1,58 @@
+"""Пополнение таблицы ГН/ВН (``GN_VN_MAPPING_FILE``) из отчетов прошлых запусков.
+
+Читает лист ``data`` отчетов (xlsx или csv), отбирает уверенные решения LLM и добавляет
+в таблицу правила для новых категорий; существующие правила не меняются, версия
+увеличивается на 1.
+
+    python scripts/learn_gn_vn_mapping.py reports/report_*.xlsx --min-support 5
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from gn_vn_mapping import learn_rules, load_mapping, save_mapping  # noqa: E402
+
+
+def _read_rows(path: str) -> list[dict]:
+    if path.lower().endswith(".csv"):
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    else:
+        df = pd.read_excel(path, sheet_name="data", dtype=str, keep_default_na=False)
+    return df.to_dict(orient="records")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("reports", nargs="+", help="report files (xlsx/csv)")
+    parser.add_argument("--mapping", default=os.getenv("GN_VN_MAPPING_FILE", "data/gn_vn_mapping.json"))
+    parser.add_argument("--min-confidence", type=float, default=0.9)
+    parser.add_argument("--min-support", type=int, default=5)
+    parser.add_argument("--min-agreement", type=float, default=0.95)
+    parser.add_argument("--dry-run", action="store_true", help="print learned rules without saving")
+    args = parser.parse_args()
+
+    rows = [row for path in args.reports for row in _read_rows(path)]
+    rules = learn_rules(
+        rows, min_confidence=args.min_confidence, min_support=args.min_support, min_agreement=args.min_agreement
+    )
+    mapping = load_mapping(args.mapping)
+    updated = mapping.merged(rules)
+    added = len(updated) - len(mapping)
+    print(f"rows={len(rows)} learned={len(rules)} added={added} version={mapping.version}->{updated.version}")
+    for rule in updated.rules[len(mapping):]:
+        print(f"  {rule}")
+    if added and not args.dry_run:
+        save_mapping(updated, args.mapping)
+        print(f"saved {args.mapping}")
+
+
+if __name__ == "__main__":
+    main()
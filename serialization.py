@@ -0,0 +1,144 @@
+"""Единая точка JSON-сериализации.
+
+Использует orjson, если он установлен, иначе стандартный json. Вывод в обоих случаях
+одинаковый: UTF-8 без экранирования не-ASCII (как ``ensure_ascii=False``) и без пробелов.
+"""
+from __future__ import annotations
+
+import codecs
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore
+
+# orjson.JSONDecodeError наследуется от json.JSONDecodeError — достаточно ловить его
+JSONDecodeError = json.JSONDecodeError
+
+_SEPARATORS = (",", ":")
+
+
+def backend() -> str:
+    """Имя используемой JSON-библиотеки."""
+    return "orjson" if orjson is not None else "json"
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """Сериализовать в UTF-8 байты."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            # Неподдерживаемые orjson типы/ключи — стандартный путь
+            pass
+    return json.dumps(obj, ensure_ascii=False, separators=_SEPARATORS).encode("utf-8")
+
+
+def dumps(obj: Any) -> str:
+    """Сериализовать в компактную строку (``json.dumps(obj, ensure_ascii=False, separators=(",", ":"))``)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj).decode("utf-8")
+        except TypeError:
+            pass
+    return json.dumps(obj, ensure_ascii=False, separators=_SEPARATORS)
+
+
+def dumps_report(obj: Any) -> str:
+    """Сериализовать в прежнем формате ``json.dumps(obj, ensure_ascii=False)``.
+
+    Колонки отчета и JSONL алертов читают люди и внешние скрипты — разделители с пробелами сохраняются.
+    """
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def loads(data: bytes | bytearray | memoryview | str) -> Any:
+    """Разобрать JSON из байтов или строки (байты разбираются без промежуточного str)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+
+def response_json(resp) -> Any:
+    """Тело HTTP-ответа (requests/httpx) как JSON, напрямую из сырых байтов."""
+    raw = getattr(resp, "content", None)
+    if isinstance(raw, (bytes, bytearray, memoryview)):
+        return loads(raw)
+    return resp.json()
+
+
+class JSONArrayStream:
+    """Инкрементальный разбор JSON-массива верхнего уровня, поступающего кусками байтов.
+
+    ``feed`` возвращает элементы, полностью полученные к этому моменту; потребитель может
+    прекратить чтение тела в любой момент, не дожидаясь конца массива.
+    """
+
+    def __init__(self):
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._started = False
+        # После '[' — элемент или ']'; после элемента — ',' или ']'; после ',' — только элемент
+        self._expect_value = True
+        self._allow_end = True
+        self.finished = False
+
+    def feed(self, chunk: bytes) -> list:
+        """Добавить кусок тела; вернуть новые завершенные элементы."""
+        self._buf += self._utf8.decode(chunk)
+        return self._drain(final=False)
+
+    def close(self) -> list:
+        """Конец тела: вернуть оставшиеся элементы или бросить JSONDecodeError."""
+        self._buf += self._utf8.decode(b"", final=True)
+        items = self._drain(final=True)
+        if not self.finished:
+            raise JSONDecodeError("Unterminated JSON array", self._buf, len(self._buf))
+        return items
+
+    def _drain(self, final: bool) -> list:
+        items = []
+        buf, pos = self._buf, 0
+        while not self.finished:
+            while pos < len(buf) and buf[pos] in " \t\r\n":
+                pos += 1
+            if pos >= len(buf):
+                break
+            ch = buf[pos]
+            if not self._started:
+                if ch != "[":
+                    raise JSONDecodeError("Expecting '['", buf, pos)
+                self._started = True
+                pos += 1
+            elif ch == "]":
+                if not self._allow_end:
+                    raise JSONDecodeError("Expecting value", buf, pos)
+                self.finished = True
+                pos += 1
+            elif ch == ",":
+                if self._expect_value:
+                    raise JSONDecodeError("Expecting value", buf, pos)
+                self._expect_value, self._allow_end = True, False
+                pos += 1
+            elif not self._expect_value:
+                raise JSONDecodeError("Expecting ',' delimiter", buf, pos)
+            else:
+                try:
+                    item, end = self._decoder.raw_decode(buf, pos)
+                except JSONDecodeError:
+                    if final:
+                        raise
+                    break
+                # Скаляр в конце буфера может быть обрезан (например, число) — ждем продолжения
+                if end >= len(buf) and not final:
+                    break
+                items.append(item)
+                pos = end
+                self._expect_value, self._allow_end = False, True
+        self._buf = buf[pos:]
+        return items
@@ -1,11 +1,24 @@
 from __future__ import annotations
 
-from typing import Any, Protocol
+import threading
+from typing import Any, Protocol, Sequence
 
+from balancer import EndpointPool
+from cache import cached_llm_client
 from catalog_api import CatalogAPI
+from concurrency import get_thread_limiter
 from config import Config, load_config
+from hedging import Hedger
+from latency import AdaptiveTimeouts
 from lcsc_client import LCSCClientReal
+from llm_budget import budget_llm_client
 from llm_client import LLMClientReal
+from logger import generate_run_id, get_logger
+from pipeline import CATALOG_SEARCH_FIELDS, LCSC_SEARCH_FIELDS
+from reference_sources import with_reference_sources
+from retry import RetryPolicy
+from scheduler import get_scheduler, schedule_client
+from transport import get_sync_transport
 
 try:
     from mocks.catalog_api_mock import CatalogAPIMock
@@ -17,14 +30,53 @@ try:
 except ImportError:  # pragma: no cover - may not exist until Iteration 4
     LCSCMock = None  # type: ignore
 
+try:
+    from mocks.reference_mock import DigikeyMock, MouserMock
+except ImportError:  # pragma: no cover
+    DigikeyMock = MouserMock = None  # type: ignore
+
 try:
     from mocks.llm_mock import LLMMock
 except ImportError:  # pragma: no cover - may not exist until Iteration 5
     LLMMock = None  # type: ignore
 
 
+# Hedgers shared per (service, settings): each owns a thread pool, so clients reuse them
+_hedgers: dict[tuple, Hedger] = {}
+_hedgers_lock = threading.Lock()
+
+
+def _make_hedger(cfg: Config, name: str) -> Hedger | None:
+    """Shared hedger for idempotent calls of a service, or None when hedging is disabled."""
+    if not cfg.hedge_enabled:
+        return None
+    key = (name, cfg.hedge_percentile, cfg.hedge_min_samples, cfg.hedge_budget_pct)
+    with _hedgers_lock:
+        if key not in _hedgers:
+            _hedgers[key] = Hedger(
+                name,
+                percentile=cfg.hedge_percentile,
+                min_samples=cfg.hedge_min_samples,
+                budget_ratio=cfg.hedge_budget_pct / 100.0,
+            )
+        return _hedgers[key]
+
+
+def close_hedgers() -> None:
+    """Shut down the shared hedgers' thread pools (end of run/tests)."""
+    with _hedgers_lock:
+        for hedger in _hedgers.values():
+            hedger.shutdown()
+        _hedgers.clear()
+
+
+def _make_http(cfg: Config):
+    """HTTP transport shared by real clients (requests for http1, httpx.Client for http2)."""
+    return get_sync_transport(cfg.http_transport, max_connections=cfg.http2_max_connections)
+
+
 class CatalogClient(Protocol):
-    def search_product(self, partnumber: str):
+    def search_product(self, partnumber: str, fields: Sequence[str] | None = None):
         ...
 
 
@@ -35,8 +87,13 @@ def get_catalog_client(cfg: Config | None = None) -> CatalogClient:
     """
     cfg = cfg or load_config()
 
+    fields = CATALOG_SEARCH_FIELDS if cfg.field_projection else None
+    # Writes are keyed by run: retries within a run dedupe, a new run writes again
+    run_id = generate_run_id()
     if cfg.use_mocks and CatalogAPIMock is not None:
-        return CatalogAPIMock(profile=cfg.mock_profile, seed=cfg.seed)
+        return schedule_client(
+            CatalogAPIMock(profile=cfg.mock_profile, seed=cfg.seed, fields=fields, run_id=run_id), cfg, "catalog"
+        )
 
     # Real client (or fallback until mocks are implemented)
     base_url = cfg.catalog_api_url or "https://catalogapp/api"
@@ -49,21 +106,43 @@ def get_catalog_client(cfg: Config | None = None) -> CatalogClient:
         backoff_base_ms=cfg.catalog_backoff_base_ms,
         backoff_max_ms=cfg.catalog_backoff_max_ms,
         backoff_jitter_ms=cfg.catalog_backoff_jitter_ms,
+        hedger=_make_hedger(cfg, "catalog_search"),
+        http=_make_http(cfg),
+        search_fields=fields,
+        stream_search=cfg.stream_search,
+        stream_max_items=cfg.stream_search_max_items,
+        run_id=run_id,
+        idempotency_keys=cfg.idempotency_keys,
+        # Keyed writes are safe to hedge
+        write_hedger=_make_hedger(cfg, "catalog_write") if cfg.idempotency_keys else None,
+        retry_policy=RetryPolicy.from_config(cfg, "catalog"),
+        timeouts=AdaptiveTimeouts.from_config(cfg, "catalog"),
+        # ADAPTIVE_CONCURRENCY bounds in-flight HTTP attempts of pool threads by the service's AIMD limit
+        limiter=get_thread_limiter(cfg, "catalog"),
+        # Rate-limited services share their quota between interactive and batch lanes;
+        # every HTTP attempt (retries and hedges included) takes a permit
+        scheduler=get_scheduler(cfg, "catalog"),
     )
 
 
 class LCSCClient(Protocol):
-    def search(self, partnumber: str) -> list[dict[str, Any]]:
+    def search(self, partnumber: str, fields: Sequence[str] | None = None) -> list[dict[str, Any]]:
         ...
 
 
 def get_lcsc_client(cfg: Config | None = None) -> LCSCClient:
-    """Return an LCSC client according to config (mock or real)."""
+    """Return an LCSC client according to config (mock or real).
+
+    With REFERENCE_SOURCES the client is a registry racing LCSC against the extra sources.
+    """
     cfg = cfg or load_config()
+    fields = LCSC_SEARCH_FIELDS if cfg.field_projection else None
     if cfg.use_mocks and LCSCMock is not None:
-        return LCSCMock(profile=cfg.mock_profile, seed=cfg.seed)
-    # Real client
-    return LCSCClientReal(
+        client = LCSCMock(profile=cfg.mock_profile, seed=cfg.seed, fields=fields)
+        return with_reference_sources(schedule_client(client, cfg, "lcsc"), _reference_extras(cfg), cfg)
+    # Real client; LCSC_API_URL may list several proxy replicas separated by commas
+    http = _make_http(cfg)
+    client = LCSCClientReal(
         base_url=cfg.lcsc_api_url or "",
         api_key=cfg.lcsc_api_key,
         timeout_sec=cfg.lcsc_timeout_sec,
@@ -71,7 +150,42 @@ def get_lcsc_client(cfg: Config | None = None) -> LCSCClient:
         backoff_base_ms=cfg.lcsc_backoff_base_ms,
         backoff_max_ms=cfg.lcsc_backoff_max_ms,
         backoff_jitter_ms=cfg.lcsc_backoff_jitter_ms,
+        hedger=_make_hedger(cfg, "lcsc_search"),
+        http=http,
+        search_fields=fields,
+        stream_search=cfg.stream_search,
+        stream_max_items=cfg.stream_search_max_items,
+        retry_policy=RetryPolicy.from_config(cfg, "lcsc"),
+        timeouts=AdaptiveTimeouts.from_config(cfg, "lcsc"),
+        endpoints=EndpointPool.from_config(cfg, "lcsc", cfg.lcsc_api_url or "", http=http),
+        limiter=get_thread_limiter(cfg, "lcsc"),
+        scheduler=get_scheduler(cfg, "lcsc"),
     )
+    return with_reference_sources(client, _reference_extras(cfg), cfg)
+
+
+# Extra reference sources raced against LCSC (REFERENCE_SOURCES); real clients plug in here
+REFERENCE_SOURCE_MOCKS = {"digikey": DigikeyMock, "mouser": MouserMock}
+REFERENCE_SOURCE_CLIENTS: dict[str, Any] = {}
+
+
+def _reference_extras(cfg: Config) -> list[tuple[str, Any]]:
+    """Clients of the extra reference sources enabled in config (mock or registered real)."""
+    fields = LCSC_SEARCH_FIELDS if cfg.field_projection else None
+    extras = []
+    for name in getattr(cfg, "reference_sources", ()):
+        if cfg.use_mocks and REFERENCE_SOURCE_MOCKS.get(name) is not None:
+            client = REFERENCE_SOURCE_MOCKS[name](
+                profile=cfg.mock_profile, seed=cfg.seed, fields=fields,
+                max_delay_ms=getattr(cfg, "reference_mock_delay_ms", 0),
+            )
+        elif not cfg.use_mocks and name in REFERENCE_SOURCE_CLIENTS:
+            client = REFERENCE_SOURCE_CLIENTS[name](cfg)
+        else:
+            get_logger("services").warning("[reference] no client for source %s, skipped", name)
+            continue
+        extras.append((name, client))
+    return extras
 
 
 class LLMClient(Protocol):
@@ -81,14 +195,28 @@ class LLMClient(Protocol):
     def classify(self, gn_candidates: list[str], vn_candidates: list[str], text: str) -> dict[str, Any]:
         ...
 
+    # Combined normalize + classify in one call (LLM_ANALYZE)
+    def analyze(self, text: str, gn_candidates: list[str], vn_candidates: list[str]) -> dict[str, Any]:
+        ...
+
+    # Batched variants: results in input order, an Exception in the slot of a failed item
+    def normalize_batch(self, texts: Sequence[str]) -> list[dict[str, Any] | Exception]:
+        ...
+
+    def classify_batch(
+        self, items: Sequence[str], gn_candidates: list[str], vn_candidates: list[str]
+    ) -> list[dict[str, Any] | Exception]:
+        ...
+
 
 def get_llm_client(cfg: Config | None = None) -> LLMClient:
-    """Return an LLM client according to config (mock or real)."""
+    """Return an LLM client according to config (mock or real), cached when LLM_CACHE is on."""
     cfg = cfg or load_config()
     if cfg.use_mocks and LLMMock is not None:
-        return LLMMock(seed=cfg.seed)
-    # Real client
-    return LLMClientReal(
+        return cached_llm_client(budget_llm_client(schedule_client(LLMMock(seed=cfg.seed), cfg, "llm"), cfg), cfg)
+    # Real client; COZE_API_URL may list several proxy replicas separated by commas
+    http = _make_http(cfg)
+    client = LLMClientReal(
         base_url=cfg.coze_api_url or "",
         api_key=cfg.coze_api_key,
         timeout_sec=cfg.llm_timeout_sec,
@@ -96,4 +224,14 @@ def get_llm_client(cfg: Config | None = None) -> LLMClient:
         backoff_base_ms=cfg.llm_backoff_base_ms,
         backoff_max_ms=cfg.llm_backoff_max_ms,
         backoff_jitter_ms=cfg.llm_backoff_jitter_ms,
+        http=http,
+        retry_policy=RetryPolicy.from_config(cfg, "llm"),
+        timeouts=AdaptiveTimeouts.from_config(cfg, "llm"),
+        endpoints=EndpointPool.from_config(cfg, "llm", cfg.coze_api_url or "", http=http),
+        limiter=get_thread_limiter(cfg, "llm"),
+        scheduler=get_scheduler(cfg, "llm"),
+        batch_size=cfg.llm_batch_size,
+        batch_max_tokens=cfg.llm_batch_max_tokens,
     )
+    # Cache hits skip the LLM budget and the rate-limit scheduler: only real calls spend them
+    return cached_llm_client(budget_llm_client(client, cfg), cfg)
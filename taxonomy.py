@@ -0,0 +1,166 @@
+"""Справочник ГН/ВН из каталога и отбор кандидатов для классификации.
+
+Справочник загружается из каталога (``CatalogAPI.get_taxonomy``, ``GET /taxonomy``) один раз
+за запуск и кэшируется в файле ``TAXONOMY_CACHE_FILE`` на ``TAXONOMY_TTL_HOURS``: пока кэш
+свежий, каталог не запрашивается. При сбое загрузки используется устаревший кэш, а без
+него — встроенные кандидаты пайплайна.
+
+Элемент справочника::
+
+    {"code": "ГН1", "name": "Резисторы", "keywords": ["resistor", "ohm"], "categories": ["Resistor"]}
+
+Для каждой строки ``Taxonomy.candidates`` отбирает не более ``TAXONOMY_TOP_K`` кандидатов
+ГН и ВН по инвертированному индексу (совпадение категории LCSC весит больше совпадения
+слова из текста строки) и дополняет их первыми элементами справочника, если совпадений
+мало. Размер промпта и задержка LLM не растут вместе со справочником.
+"""
+from __future__ import annotations
+
+import re
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Callable, Sequence
+
+from logger import get_logger
+from metrics import RuntimeCounters, get_runtime_counters
+from serialization import dumps, loads
+
+KINDS = ("gn", "vn")
+# Вес совпадения категории LCSC относительно одного совпавшего слова
+CATEGORY_WEIGHT = 3
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> set[str]:
+    """Слова текста в нижнем регистре (не короче двух символов)."""
+    return {token for token in _TOKEN_RE.findall(str(text or "").casefold()) if len(token) >= 2}
+
+
+def _entry(item: Any) -> dict:
+    return {"code": item} if isinstance(item, str) else dict(item)
+
+
+class Taxonomy:
+    """Справочник ГН/ВН с индексом по словам и категориям LCSC."""
+
+    def __init__(self, gn: Sequence[Any], vn: Sequence[Any], counters: RuntimeCounters | None = None):
+        self.entries = {"gn": [_entry(item) for item in gn], "vn": [_entry(item) for item in vn]}
+        self.counters = counters or get_runtime_counters()
+        self._by_token: dict[str, dict[str, list[int]]] = {kind: defaultdict(list) for kind in KINDS}
+        self._by_category: dict[str, dict[str, list[int]]] = {kind: defaultdict(list) for kind in KINDS}
+        for kind in KINDS:
+            for i, entry in enumerate(self.entries[kind]):
+                words = tokenize(entry.get("name", ""))
+                for keyword in entry.get("keywords") or ():
+                    words |= tokenize(keyword)
+                for word in words:
+                    self._by_token[kind][word].append(i)
+                for category in entry.get("categories") or ():
+                    self._by_category[kind][str(category).strip().casefold()].append(i)
+
+    @classmethod
+    def from_dict(cls, data: dict, counters: RuntimeCounters | None = None) -> "Taxonomy":
+        return cls(data.get("gn") or [], data.get("vn") or [], counters=counters)
+
+    def to_dict(self) -> dict:
+        return {"gn": self.entries["gn"], "vn": self.entries["vn"]}
+
+    def codes(self, kind: str) -> list[str]:
+        return [entry["code"] for entry in self.entries[kind]]
+
+    def candidates(self, text: str, category: str = "", top_k: int = 10) -> tuple[list[str], list[str]]:
+        """Кандидаты ГН и ВН для строки: не более ``top_k`` каждого, самые релевантные первыми."""
+        tokens = tokenize(text)
+        gn = self._rank("gn", tokens, category, top_k)
+        vn = self._rank("vn", tokens, category, top_k)
+        self.counters.incr("taxonomy.lookups")
+        self.counters.incr("taxonomy.candidates", len(gn) + len(vn))
+        return gn, vn
+
+    def _rank(self, kind: str, tokens: set[str], category: str, top_k: int) -> list[str]:
+        entries = self.entries[kind]
+        if len(entries) <= top_k:
+            return [entry["code"] for entry in entries]
+        scores: Counter = Counter()
+        for i in self._by_category[kind].get(str(category or "").strip().casefold(), ()):
+            scores[i] += CATEGORY_WEIGHT
+        for token in tokens:
+            for i in self._by_token[kind].get(token, ()):
+                scores[i] += 1
+        ranked = sorted(scores, key=lambda i: (-scores[i], i))[:top_k]
+        if len(ranked) < top_k:
+            # Совпадений мало — дополняем первыми элементами справочника
+            chosen = set(ranked)
+            for i in range(len(entries)):
+                if len(ranked) >= top_k:
+                    break
+                if i not in chosen:
+                    ranked.append(i)
+        return [entries[i]["code"] for i in ranked]
+
+
+def load_taxonomy(
+    fetch: Callable[[], dict],
+    cache_file: str | Path,
+    ttl_hours: float,
+    fallback: tuple[Sequence[str], Sequence[str]],
+    counters: RuntimeCounters | None = None,
+) -> Taxonomy:
+    """Справочник из свежего файлового кэша, иначе из ``fetch()`` (с обновлением кэша).
+
+    Сбой ``fetch`` не останавливает запуск: берется устаревший кэш или ``fallback``.
+    """
+    log = get_logger("taxonomy")
+    counters = counters or get_runtime_counters()
+    path = Path(cache_file)
+    cached = None
+    if path.exists():
+        try:
+            cached = loads(path.read_bytes())
+        except Exception as e:
+            log.warning("[taxonomy] cache unreadable %s: %s", path, e)
+    if cached and time.time() - float(cached.get("fetched_at", 0)) < ttl_hours * 3600:
+        counters.incr("taxonomy.cache_hits")
+        data = cached
+    else:
+        try:
+            data = {**fetch(), "fetched_at": time.time()}
+            counters.incr("taxonomy.fetches")
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text(dumps(data), encoding="utf-8")
+            except OSError as e:
+                log.warning("[taxonomy] cache write failed %s: %s", path, e)
+        except Exception as e:
+            counters.incr("taxonomy.fetch_errors")
+            log.warning("[taxonomy] fetch failed (%s), using %s", e, "stale cache" if cached else "built-in candidates")
+            data = cached or {"gn": list(fallback[0]), "vn": list(fallback[1])}
+    taxonomy = Taxonomy.from_dict(data, counters=counters)
+    counters.set("taxonomy.gn_total", len(taxonomy.entries["gn"]))
+    counters.set("taxonomy.vn_total", len(taxonomy.entries["vn"]))
+    log.info("[taxonomy] gn=%d vn=%d", len(taxonomy.entries["gn"]), len(taxonomy.entries["vn"]))
+    return taxonomy
+
+
+def get_taxonomy(cfg, fallback: tuple[Sequence[str], Sequence[str]], catalog=None) -> Taxonomy | None:
+    """Справочник запуска, если включен ``TAXONOMY``; каталог запрашивается только при устаревшем кэше."""
+    if not getattr(cfg, "taxonomy", False):
+        return None
+
+    def fetch() -> dict:
+        client = catalog
+        if client is None:
+            # Импорт здесь: services импортирует пайплайн, а пайплайн — этот модуль
+            from services import get_catalog_client
+
+            client = get_catalog_client(cfg)
+        return client.get_taxonomy()
+
+    return load_taxonomy(
+        fetch,
+        getattr(cfg, "taxonomy_cache_file", "cache/taxonomy.json"),
+        getattr(cfg, "taxonomy_ttl_hours", 24.0),
+        fallback,
+    )
@@ -143,6 +143,8 @@ class TestAlertManager:
                 data = json.loads(line)
                 assert data["title"] == "Test Alert"
                 assert data["level"] == "error"
+                # Формат строки прежний: читают внешние скрипты
+                assert line == json.dumps(data, ensure_ascii=False)
 
     @patch('smtplib.SMTP')
     def test_send_email_alert(self, mock_smtp):
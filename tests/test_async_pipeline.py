@@ -39,7 +39,46 @@ class TestAsyncProcessingPipeline:
         pipeline = AsyncProcessingPipeline(mock_config, max_concurrent=5)
         assert pipeline.cfg == mock_config
         assert pipeline.max_concurrent == 5
-        assert pipeline.semaphore._value == 5
+        # Лимиты сервисов не заданы в конфигурации — используется max_concurrent
+        assert {name: lim.limit for name, lim in pipeline.limiters.items()} == {"catalog": 5, "lcsc": 5, "llm": 5}
+
+    def test_init_per_service_limits(self, mock_config):
+        """Лимиты сервисов берутся из конфигурации."""
+        mock_config.catalog_concurrency = 100
+        mock_config.lcsc_concurrency = 20
+        mock_config.llm_concurrency = 8
+        pipeline = AsyncProcessingPipeline(mock_config, max_concurrent=5)
+        assert pipeline.limiters["catalog"].limit == 100
+        assert pipeline.limiters["llm"].limit == 8
+
+    @pytest.mark.asyncio
+    async def test_slow_llm_stage_does_not_block_catalog(self, mock_config, sample_rows):
+        """Строки в медленном LLM-этапе не занимают слоты поиска в каталоге."""
+        mock_config.catalog_concurrency = 10
+        mock_config.llm_concurrency = 1
+        pipeline = AsyncProcessingPipeline(mock_config)
+        llm_release = asyncio.Event()
+        searched = []
+
+        async def search(session, part, errors):
+            searched.append(part)
+            return [], False
+
+        async def classify(session, text, errors, category=""):
+            await llm_release.wait()
+            return {}, {}, 0.9
+
+        pipeline._search_catalog_async = search
+        pipeline._classify_llm_async = classify
+        rows = [{"partnumber": f"P{i}"} for i in range(5)]
+        task = asyncio.ensure_future(asyncio.gather(*(pipeline._process_single_row_async(None, r) for r in rows)))
+        await asyncio.sleep(0.05)
+        # Все поиски завершились, хотя LLM занят первой строкой
+        assert len(searched) == 5
+        assert pipeline.limiters["llm"].in_flight == 1
+        llm_release.set()
+        await task
+        assert pipeline.limiters["llm"].acquired == 5
 
     @pytest.mark.asyncio
     async def test_async_retry_success(self, mock_config):
@@ -152,8 +191,235 @@ class TestAsyncFunctions:
             results = await process_rows_async(sample_rows, mock_config)
             assert len(results) == len(sample_rows)
 
+    @pytest.mark.asyncio
+    async def test_process_rows_async_resets_retry_budget(self, mock_config, sample_rows):
+        """Бюджет повторов прошлого запуска не переходит в новый."""
+        from retry import get_retry_budget
+
+        budget = get_retry_budget()
+        budget.calls, budget.retries, budget.denied = 100, 50, 7
+        with patch('aiohttp.ClientSession'):
+            await process_rows_async(sample_rows, mock_config)
+        assert budget.denied == 0
+        assert budget.retries < 50
+
     def test_run_async_processing(self, mock_config, sample_rows):
         """Тест синхронной обертки."""
         with patch('aiohttp.ClientSession'):
             results = run_async_processing(sample_rows, mock_config)
             assert len(results) == len(sample_rows)
+
+
+def test_catalog_searches_are_micro_batched(mock_config):
+    httpx = pytest.importorskip("httpx")
+    from mocks.http_stub_server import StubServer
+
+    server = StubServer(profile="happy")
+    posts = []
+
+    def handler(request):
+        if request.url.path.endswith("/products/search"):
+            posts.append(request.url.path)
+        query = dict(request.url.params.items())
+        status, payload = server.handle(request.method, request.url.path, query, request.content, dict(request.headers))
+        return httpx.Response(status, json=payload)
+
+    mock_config.use_mocks = False
+    mock_config.catalog_api_url = "http://stub"
+    mock_config.catalog_api_key = "k"
+    mock_config.catalog_batch_size = 10
+    mock_config.catalog_batch_window_ms = 20
+    pipeline = AsyncProcessingPipeline(mock_config, max_concurrent=10)
+    session = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    rows = [{"partnumber": f"PN{i}", "brand": ""} for i in range(6)]
+
+    with patch("async_pipeline.open_async_session", return_value=session):
+        results = asyncio.run(pipeline.process_batch_async(rows))
+
+    assert len(posts) == 1
+    assert all(r["reason"] == "already_present" for r in results)
+
+
+def test_catalog_batch_endpoint_404_is_an_error_not_not_found(mock_config):
+    """404 пакетного поиска не превращает строки пакета в «не найдено» (без LLM и создания)."""
+    httpx = pytest.importorskip("httpx")
+
+    paths = []
+
+    def handler(request):
+        paths.append(request.url.path)
+        return httpx.Response(404, json={"error": "no such endpoint"})
+
+    mock_config.use_mocks = False
+    mock_config.catalog_api_url = "http://stub"
+    mock_config.catalog_api_key = "k"
+    mock_config.catalog_batch_size = 10
+    mock_config.catalog_batch_window_ms = 20
+    pipeline = AsyncProcessingPipeline(mock_config, max_concurrent=10)
+    session = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    rows = [{"partnumber": f"PN{i}", "brand": ""} for i in range(3)]
+
+    with patch("async_pipeline.open_async_session", return_value=session):
+        results = asyncio.run(pipeline.process_batch_async(rows))
+
+    assert paths == ["/products/search"]
+    assert all((r["action"], r["reason"]) == ("error", "catalog_rejected") for r in results)
+    assert all("catalog_search_batch:endpoint_not_found" in r["errors"] for r in results)
+
+
+def test_catalog_batch_records_errors_per_row_outside_row_deadline(mock_config):
+    """Сбой пакетного поиска попадает в errors каждой строки; дедлайн строки пакет не ограничивает."""
+    httpx = pytest.importorskip("httpx")
+    from deadline import deadline_scope
+    from mocks.http_stub_server import StubServer
+
+    server = StubServer(profile="happy")
+    posts = []
+
+    def handler(request):
+        posts.append(request.url.path)
+        if len(posts) == 1:
+            return httpx.Response(503, json={"error": "busy"})
+        status, payload = server.handle(request.method, request.url.path, {}, request.content, dict(request.headers))
+        return httpx.Response(status, json=payload)
+
+    mock_config.use_mocks = False
+    mock_config.catalog_api_url = "http://stub"
+    mock_config.catalog_api_key = "k"
+    mock_config.backoff_base_ms = 1
+    mock_config.backoff_jitter_ms = 0
+    pipeline = AsyncProcessingPipeline(mock_config, max_concurrent=2)
+    items = [("PN1", []), ("PN2", [])]
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as session:
+            # Дедлайн строки, начавшей пакет, уже истек
+            with deadline_scope(0.001):
+                await asyncio.sleep(0.01)
+                return await pipeline._search_catalog_batch_async(session, items)
+
+    results = asyncio.run(run())
+
+    assert len(posts) == 2
+    assert all(results)
+    for _, errors in items:
+        assert len(errors) == 1
+        assert errors[0].startswith("catalog_search_batch")
+
+
+def test_llm_cache_hit_leaves_budget_unchanged(mock_config, tmp_path):
+    """Бюджет LLM тратят только промахи кэша."""
+    from cache import LLMCache
+    from metrics import RuntimeCounters
+
+    mock_config.use_mocks = False
+    mock_config.llm_budget_calls = 5
+    mock_config.coze_api_key = "k"
+    mock_config.confidence_threshold = 0.0
+    pipeline = AsyncProcessingPipeline(mock_config, max_concurrent=2)
+    pipeline.llm_cache = LLMCache(cache_dir=str(tmp_path), counters=RuntimeCounters())
+    pipeline._llm_request = AsyncMock(return_value={"gn": "ГН1", "vn": "ВН1", "confidence": 0.9})
+
+    async def run():
+        for _ in range(2):
+            await pipeline._classify_llm_async(None, "PN1", [])
+            await pipeline._normalize_llm_async(None, "PN1", [])
+
+    asyncio.run(run())
+
+    assert pipeline._llm_request.await_count == 2
+    assert pipeline.llm_budget.calls == 2
+
+
+def test_mock_mode_normalizes_mapping_and_family_rows(mock_config):
+    """Строки из таблицы категорий и семейства в режиме моков нормализуются моком, а не реальным /normalize."""
+    from gn_vn_mapping import GnVnMapping
+    from metrics import RuntimeCounters
+    from part_family import FamilyRules, PartFamilyCache
+
+    pipeline = AsyncProcessingPipeline(mock_config, max_concurrent=2)
+    pipeline.gn_vn_mapping = GnVnMapping(
+        [{"category": "Resistors", "gn": "ГН1", "vn": "ВН1"}], version=1, counters=RuntimeCounters()
+    )
+    pipeline.part_families = PartFamilyCache(
+        FamilyRules({"brands": {"Yageo": {"prefix": "^(RC\\d{4})"}}}), counters=RuntimeCounters()
+    )
+    pipeline.part_families.record("yageo|RC0603", "RC0603FR-0710KL", {"gn": "ГН2", "vn": "ВН2"}, 0.95)
+    rows = [
+        {"partnumber": "R1", "brand": "", "category": "Resistors"},
+        {"partnumber": "RC0603JR-07100RL", "brand": "Yageo"},
+    ]
+
+    results = asyncio.run(pipeline.process_batch_async(rows))
+
+    assert [r["gn_vn_source"] for r in results] == ["mapping", "family"]
+    for row in results:
+        assert (row["action"], row["reason"]) == ("create", "not_found")
+        assert row["attrs_norm"]
+        assert row["errors"] == ""
+
+
+def test_analyze_mode_uses_single_llm_request(mock_config):
+    httpx = pytest.importorskip("httpx")
+    from mocks.http_stub_server import StubServer
+
+    server = StubServer(profile="happy")
+    paths = []
+
+    def handler(request):
+        paths.append(request.url.path)
+        status, payload = server.handle(request.method, request.url.path, {}, request.content, dict(request.headers))
+        return httpx.Response(status, json=payload)
+
+    mock_config.use_mocks = False
+    mock_config.coze_api_url = "http://llm"
+    mock_config.coze_api_key = "k"
+    mock_config.confidence_threshold = 0.0
+    mock_config.llm_analyze = True
+    pipeline = AsyncProcessingPipeline(mock_config)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as session:
+            return await pipeline._classify_llm_async(session, "PN1 B", [])
+
+    enriched, attrs_norm, confidence = asyncio.run(run())
+    assert paths == ["/analyze"]
+    assert enriched["gn"].startswith("ГН") and attrs_norm and confidence is not None
+
+
+def test_llm_requests_are_micro_batched(mock_config):
+    """LLM_BATCH_SIZE > 1: промахи кэша соседних строк уходят одним /classify/batch и /normalize/batch."""
+    httpx = pytest.importorskip("httpx")
+    from mocks.http_stub_server import StubServer
+
+    server = StubServer(profile="happy")
+    llm_paths = []
+
+    def handler(request):
+        if request.url.host == "llm":
+            llm_paths.append(request.url.path)
+        query = dict(request.url.params.items())
+        status, payload = server.handle(request.method, request.url.path, query, request.content, dict(request.headers))
+        return httpx.Response(status, json=payload)
+
+    mock_config.use_mocks = False
+    mock_config.catalog_api_url = "http://stub"
+    mock_config.catalog_api_key = "k"
+    mock_config.catalog_batch_size = 1
+    mock_config.coze_api_url = "http://llm"
+    mock_config.coze_api_key = "k"
+    mock_config.confidence_threshold = 0.0
+    mock_config.llm_analyze = False
+    mock_config.llm_batch_size = 10
+    mock_config.llm_batch_window_ms = 20
+    mock_config.llm_batch_max_tokens = 4000
+    pipeline = AsyncProcessingPipeline(mock_config, max_concurrent=10)
+    session = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    rows = [{"partnumber": f"NEW-PN{i}", "brand": "TestBrand"} for i in range(4)]
+
+    with patch("async_pipeline.open_async_session", return_value=session), \
+            patch.object(server.catalog, "search_product", return_value=[]):
+        results = asyncio.run(pipeline.process_batch_async(rows))
+
+    assert sorted(llm_paths) == ["/classify/batch", "/normalize/batch"]
+    assert all((r["action"], r["errors"]) == ("create", "") and r["attrs_norm"] for r in results), results
@@ -0,0 +1,115 @@
+"""Тесты балансировки по репликам."""
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from balancer import EndpointPool, split_urls
+from exceptions import ClientRequestError, DeadlineExceededError
+from llm_client import LLMClientReal
+from metrics import RuntimeCounters
+
+
+def _pool(urls="http://a, http://b/", **kwargs):
+    return EndpointPool("llm", urls, counters=RuntimeCounters(), **kwargs)
+
+
+def test_split_urls():
+    assert split_urls("http://a, http://b/ ,") == ["http://a", "http://b"]
+    assert split_urls(["http://a"]) == ["http://a"]
+    assert split_urls(None) == []
+    with pytest.raises(ValueError):
+        _pool("")
+
+
+def test_least_outstanding_spreads_concurrent_requests():
+    pool = _pool()
+    with pool.use() as first, pool.use() as second:
+        assert {first.url, second.url} == {"http://a", "http://b"}
+        with pool.use() as third:
+            assert third.outstanding == 2
+
+
+def test_latency_strategy_prefers_faster_replica():
+    pool = _pool(strategy="latency")
+    fast, slow = pool.endpoints
+    fast.latency_ewma, slow.latency_ewma = 0.01, 0.5
+    assert all(pool.choose() is fast for _ in range(10))
+
+
+def test_failing_replica_is_ejected_and_half_open_after_timeout():
+    pool = _pool(eject_failures=2, eject_sec=0.05)
+    bad, good = pool.endpoints
+    good.outstanding = 5  # занята — выбор падает на bad
+    for _ in range(2):
+        with pytest.raises(TimeoutError):
+            with pool.use() as ep:
+                assert ep is bad
+                raise TimeoutError
+    assert not bad.healthy(time.monotonic())
+    assert pool.choose() is good
+    assert pool.counters.get("lb.llm.ejections") == 1
+    time.sleep(0.06)
+    # half-open: реплика снова доступна, но следующий сбой исключит ее сразу
+    assert bad.healthy(time.monotonic())
+    with pytest.raises(TimeoutError):
+        with pool.use():
+            raise TimeoutError
+    assert not bad.healthy(time.monotonic())
+
+
+def test_client_errors_do_not_eject():
+    pool = _pool("http://a", eject_failures=1)
+    with pytest.raises(ClientRequestError):
+        with pool.use():
+            raise ClientRequestError("llm", 400)
+    assert pool.endpoints[0].healthy(time.monotonic())
+
+
+@pytest.mark.parametrize("error", [asyncio.CancelledError(), DeadlineExceededError("llm_classify"), GeneratorExit()])
+def test_cancellation_and_deadline_are_neutral(error):
+    pool = _pool("http://a", eject_failures=1)
+    ep = pool.endpoints[0]
+    ep.consecutive_failures = 0
+    with pytest.raises(type(error)):
+        with pool.use():
+            raise error
+    assert ep.healthy(time.monotonic())
+    assert (ep.outstanding, ep.consecutive_failures, ep.latency_ewma) == (0, 0, None)
+
+
+def test_probe_readmits_replica():
+    probes = []
+    pool = _pool(eject_failures=1, eject_sec=0.01, probe=lambda url: probes.append(url) or True)
+    bad = pool.endpoints[0]
+    pool.endpoints[1].outstanding = 5
+    with pytest.raises(TimeoutError):
+        with pool.use():
+            raise TimeoutError
+    assert not bad.healthy(time.monotonic())
+    deadline = time.monotonic() + 1.0
+    while not bad.healthy(time.monotonic()) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert probes == ["http://a"]
+    assert bad.healthy(time.monotonic())
+
+
+def test_llm_client_fails_over_to_healthy_replica():
+    hits = {"a": 0, "b": 0}
+
+    def handler(request):
+        host = request.url.host
+        hits[host] += 1
+        if host == "a":
+            return httpx.Response(503)
+        return httpx.Response(200, json={"gn": "G", "vn": "V", "confidence": 0.9})
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    pool = EndpointPool("llm", ["http://a", "http://b"], eject_failures=1, eject_sec=60, counters=RuntimeCounters())
+    llm = LLMClientReal("http://a,http://b", retries=3, backoff_base_ms=0, backoff_jitter_ms=0, http=client, endpoints=pool)
+    for _ in range(5):
+        assert llm.classify(["G"], ["V"], "text")["gn"] == "G"
+    # Реплика a исключена после первого 503 и больше не получает запросов
+    assert hits["a"] <= 1
+    assert hits["b"] == 5
@@ -0,0 +1,74 @@
+"""Тесты микро-пакетирования."""
+import asyncio
+
+import pytest
+
+from batching import MicroBatcher
+from metrics import RuntimeCounters
+
+
+def _batcher(batch_fn, **kwargs):
+    return MicroBatcher("svc", batch_fn, counters=RuntimeCounters(), **kwargs)
+
+
+def test_requests_in_window_share_one_batch():
+    calls = []
+
+    async def batch_fn(items):
+        calls.append(list(items))
+        return [item * 2 for item in items]
+
+    async def run():
+        batcher = _batcher(batch_fn, window_ms=10, max_batch=10)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(4)))
+        return batcher, results
+
+    batcher, results = asyncio.run(run())
+    assert results == [0, 2, 4, 6]
+    assert calls == [[0, 1, 2, 3]]
+    assert batcher.fill_ratio() == 0.4
+    assert batcher.counters.get("batch.svc.items") == 4
+
+
+def test_size_cap_splits_batches():
+    calls = []
+
+    async def batch_fn(items):
+        calls.append(len(items))
+        return items
+
+    async def run_with_drain():
+        # Полные пакеты уходят сразу, остаток отправляет drain (окно 1 с не дожидаемся)
+        batcher = _batcher(batch_fn, window_ms=1000, max_batch=3)
+        pending = [asyncio.ensure_future(batcher.submit(i)) for i in range(7)]
+        await asyncio.sleep(0)
+        await batcher.drain()
+        return await asyncio.gather(*pending)
+
+    assert asyncio.run(run_with_drain()) == list(range(7))
+    assert calls == [3, 3, 1]
+
+
+def test_per_item_and_batch_failures():
+    async def batch_fn(items):
+        if "boom" in items:
+            raise TimeoutError("batch failed")
+        return [ValueError(item) if item == "bad" else item for item in items]
+
+    async def run(items):
+        batcher = _batcher(batch_fn, window_ms=1, max_batch=10)
+        return await asyncio.gather(*(batcher.submit(i) for i in items), return_exceptions=True)
+
+    ok, bad = asyncio.run(run(["ok", "bad"]))
+    assert ok == "ok" and isinstance(bad, ValueError)
+    assert all(isinstance(r, TimeoutError) for r in asyncio.run(run(["ok", "boom"])))
+
+
+def test_disabled_without_batch_size():
+    class Cfg:
+        catalog_batch_size = 0
+
+    assert MicroBatcher.from_config(Cfg(), "catalog", None) is None
+    Cfg.catalog_batch_size = 20
+    batcher = MicroBatcher.from_config(Cfg(), "catalog", None)
+    assert batcher.max_batch == 20 and batcher.window_sec == pytest.approx(0.02)
@@ -249,3 +249,74 @@ class TestGlobalCache:
             cache2 = get_llm_cache()
             
             assert cache1 is cache2
+
+
+class TestCachedLLMClient:
+    """Тесты для кэширующей обертки LLM-клиента."""
+
+    def _client(self, temp_dir, version="v1"):
+        from cache import CachedLLMClient
+        from metrics import RuntimeCounters
+
+        inner = MagicMock()
+        inner.normalize.return_value = {"attrs": {"k": "v"}}
+        inner.classify.return_value = {"gn": "ГН1", "vn": "ВН1", "confidence": 0.9}
+        cache = LLMCache(cache_dir=temp_dir, version=version, counters=RuntimeCounters())
+        return CachedLLMClient(inner, cache), inner, cache.counters
+
+    def test_repeated_calls_hit_cache(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            client, inner, counters = self._client(temp_dir)
+            for _ in range(2):
+                assert client.normalize("PN1 B") == {"attrs": {"k": "v"}}
+                assert client.classify(["ГН1"], ["ВН1"], "PN1 B")["gn"] == "ГН1"
+            assert inner.normalize.call_count == inner.classify.call_count == 1
+            assert (counters.get("llm_cache.hits"), counters.get("llm_cache.misses")) == (2, 2)
+            assert counters.get("llm_cache.classify.hits") == 1
+            assert counters.get("llm_cache.llm_ms") >= 0
+
+    def test_key_depends_on_candidates_and_version(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            client, inner, _ = self._client(temp_dir)
+            client.classify(["ГН1", "ГН2"], ["ВН1"], "PN1")
+            client.classify(["ГН2", "ГН1"], ["ВН1"], "PN1")
+            assert inner.classify.call_count == 1
+            client.classify(["ГН3"], ["ВН1"], "PN1")
+            assert inner.classify.call_count == 2
+
+            other, other_inner, _ = self._client(temp_dir, version="v2")
+            other.classify(["ГН1", "ГН2"], ["ВН1"], "PN1")
+            other_inner.classify.assert_called_once()
+
+    def test_errors_are_not_cached(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            client, inner, _ = self._client(temp_dir)
+            inner.normalize.side_effect = [TimeoutError("down"), {"attrs": {}}]
+            with pytest.raises(TimeoutError):
+                client.normalize("PN1")
+            assert client.normalize("PN1") == {"attrs": {}}
+
+    def test_nested_cache_dir_is_created(self, tmp_path):
+        cache = LLMCache(cache_dir=str(tmp_path / "cache" / "llm"))
+        assert cache.disk_cache.cache_dir.is_dir()
+
+
+class TestCachedLLMBatch:
+    """Пакетные вызовы через кэш: в LLM уходят только промахи."""
+
+    def test_batch_sends_only_misses(self):
+        from cache import CachedLLMClient
+        from metrics import RuntimeCounters
+        from mocks.llm_mock import LLMMock
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            inner = LLMMock()
+            spy = MagicMock(wraps=inner)
+            client = CachedLLMClient(spy, LLMCache(cache_dir=temp_dir, counters=RuntimeCounters()))
+            client.normalize("PN1")
+            out = client.normalize_batch(["PN1", "PN2", ""])
+            spy.normalize_batch.assert_called_once_with(["PN2", ""])
+            assert out[:2] == [inner.normalize("PN1"), inner.normalize("PN2")]
+            assert isinstance(out[2], ValueError)
+            # Ошибка элемента не кэшируется
+            assert client.cache.get_normalization("") is None
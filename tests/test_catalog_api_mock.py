@@ -54,3 +54,35 @@ def test_timeout_profile_raises_on_create_update():
         mock.create_product({"partnumber": "NEW1"})
     with pytest.raises(TimeoutError):
         mock.update_product("id-1", {"brand": "B"})
+
+
+def test_search_honors_field_projection():
+    mock = CatalogAPIMock(profile="conflict", seed=1, fields=("id", "brand"))
+    res = mock.search_product("ABC123")
+    assert len(res) == 2
+    assert all(set(item) == {"id", "brand"} for item in res)
+    # Per-call fields override the default projection
+    assert set(mock.search_product("ABC123", fields=["partnumber"])[0]) == {"partnumber"}
+
+
+def test_writes_are_deduplicated_by_idempotency_key():
+    api = CatalogAPIMock(profile="happy", seed=1, run_id="run-1")
+    first = api.create_product({"partnumber": "lm-317", "brand": "TI"})
+    again = api.create_product({"partnumber": "LM317", "brand": "TI"})
+    assert again is first
+    api.update_product("p1", {"brand": "ST"})
+    api.update_product("p1", {"brand": "ST"})
+    assert api.writes == 2
+    assert api.idempotency.replays == 2
+    api.create_product({"partnumber": "LM317", "brand": "TI"}, idempotency_key="explicit")
+    assert api.writes == 3
+
+
+def test_taxonomy_matches_builtin_candidates():
+    from pipeline import GN_CANDIDATES, VN_CANDIDATES
+
+    taxonomy = CatalogAPIMock(profile="happy").get_taxonomy()
+    assert [item["code"] for item in taxonomy["gn"]] == GN_CANDIDATES
+    assert [item["code"] for item in taxonomy["vn"]] == VN_CANDIDATES
+    with pytest.raises(TimeoutError):
+        CatalogAPIMock(profile="timeout").get_taxonomy()
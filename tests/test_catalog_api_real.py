@@ -1,9 +1,12 @@
 import types
 from unittest.mock import patch
 
+import pytest
 import requests
 
 from catalog_api import CatalogAPI
+from exceptions import ClientRequestError, RetryExhaustedError, TransientServiceError
+from retry import RetryPolicy
 
 
 def make_response(status_code=200, json_data=None):
@@ -28,20 +31,64 @@ def test_search_product_retries_on_timeout_then_succeeds():
         assert res and res[0]["partnumber"] == part
 
 
-def test_search_product_returns_empty_on_non_200():
-    api = CatalogAPI(base_url="https://example", api_key="k", timeout_sec=0.01, retries=2)
+def test_search_product_raises_on_server_error_after_retries():
+    # 5xx больше не маскируется пустым результатом: иначе строка уходит в путь создания
+    api = CatalogAPI(base_url="https://example", api_key="k", timeout_sec=0.01, retries=2, backoff_base_ms=0, backoff_jitter_ms=0)
     with patch("requests.get") as mget:
         mget.return_value = make_response(500, json_data=None)
-        res = api.search_product("ANY")
-        assert res == []
+        with pytest.raises(RetryExhaustedError) as exc:
+            api.search_product("ANY")
+        assert isinstance(exc.value.last_error, TransientServiceError)
+        assert mget.call_count == 2
+
+
+def test_search_product_returns_empty_on_404():
+    api = CatalogAPI(base_url="https://example", api_key="k", retries=2)
+    with patch("requests.get") as mget:
+        mget.return_value = make_response(404)
+        assert api.search_product("ANY") == []
+
+
+def test_client_errors_are_not_retried():
+    api = CatalogAPI(base_url="https://example", api_key="k", retries=3)
+    with patch("requests.get") as mget:
+        mget.return_value = make_response(400)
+        with pytest.raises(ClientRequestError):
+            api.search_product("ANY")
+        assert mget.call_count == 1
+
+
+def test_throttled_waits_for_retry_after():
+    api = CatalogAPI(base_url="https://example", api_key="k", retries=2, backoff_base_ms=10, backoff_jitter_ms=0)
+    throttled = types.SimpleNamespace(status_code=429, headers={"Retry-After": "2"})
+    with patch("requests.get") as mget, patch("retry.time.sleep") as msleep:
+        mget.side_effect = [throttled, make_response(200, json_data=[])]
+        assert api.search_product("PN") == []
+        assert [c.args[0] for c in msleep.call_args_list] == [2.0]
+
+
+def test_streaming_search_honors_retry_after():
+    api = CatalogAPI(
+        base_url="https://example", api_key="k", retries=2, backoff_base_ms=10, backoff_jitter_ms=0, stream_search=True
+    )
+    throttled = types.SimpleNamespace(
+        status_code=429, headers={"Retry-After": "2"}, iter_content=lambda chunk_size: iter(()), close=lambda: None
+    )
+    ok = types.SimpleNamespace(status_code=200, headers={}, iter_content=lambda chunk_size: iter([b"[]"]), close=lambda: None)
+    with patch("requests.get") as mget, patch("retry.time.sleep") as msleep:
+        mget.side_effect = [throttled, ok]
+        assert api.search_product("PN") == []
+        assert [c.args[0] for c in msleep.call_args_list] == [2.0]
 
 
-def test_search_product_returns_empty_after_retries():
+def test_search_product_raises_after_retries():
+    # Исчерпание повторов больше не маскируется пустым результатом
     api = CatalogAPI(base_url="https://example", api_key="k", timeout_sec=0.01, retries=2)
     with patch("requests.get") as mget:
         mget.side_effect = [requests.Timeout(), requests.Timeout()]
-        res = api.search_product("ANY")
-        assert res == []
+        with pytest.raises(RetryExhaustedError):
+            api.search_product("ANY")
+        assert mget.call_count == 2
 
 
 def test_search_product_backoff_sleeps_between_retries():
@@ -55,10 +102,132 @@ def test_search_product_backoff_sleeps_between_retries():
         backoff_max_ms=40,
         backoff_jitter_ms=0,
     )
-    with patch("requests.get") as mget, patch("catalog_api.time.sleep") as msleep:
+    with patch("requests.get") as mget, patch("retry.time.sleep") as msleep:
         # Two timeouts, then success
         mget.side_effect = [requests.Timeout(), requests.Timeout(), make_response(200, json_data=[])]
         api.search_product("PN")
         # Expect sleeps: 10ms, then 20ms (exponential), both <= max 40ms
         calls = [c.args[0] for c in msleep.call_args_list]
         assert calls == [0.01, 0.02]
+
+
+def test_search_product_sends_fields_projection():
+    api = CatalogAPI(base_url="https://example", api_key="k", retries=1, search_fields=("id", "brand"))
+    with patch("requests.get") as mget:
+        mget.return_value = make_response(200, json_data=[{"id": "p1", "brand": "TI"}])
+        api.search_product("PN 1")
+        params = mget.call_args.kwargs["params"]
+        assert params == {"partnumber": "PN 1", "fields": "id,brand"}
+
+
+def test_search_product_prefers_exact_partnumber():
+    api = CatalogAPI(base_url="https://example", api_key="k", retries=1)
+    with patch("requests.get") as mget:
+        mget.return_value = make_response(200, json_data=[{"id": "p1", "partnumber": "PN10"}, {"id": "p2", "partnumber": "pn-1"}])
+        res = api.search_product("PN1")
+        assert [r["id"] for r in res] == ["p2", "p1"]
+
+
+def test_search_product_streaming_stops_reading_at_exact_match():
+    api = CatalogAPI(base_url="https://example", api_key="k", retries=1, stream_search=True)
+    body = [b'[{"id": "p1", "partnumber": "PN10"},', b'{"id": "p2", "partnumber": "PN1"},', b'{"id": "p3"']
+    read = []
+
+    def iter_content(chunk_size=None):
+        for chunk in body:
+            read.append(chunk)
+            yield chunk
+
+    resp = types.SimpleNamespace(status_code=200, iter_content=iter_content, close=lambda: read.append("closed"))
+    with patch("requests.get", return_value=resp) as mget:
+        res = api.search_product("PN1")
+    assert mget.call_args.kwargs["stream"] is True
+    assert [r["id"] for r in res] == ["p2", "p1"]
+    assert read == body[:2] + ["closed"]
+
+
+def test_create_and_update_send_stable_idempotency_key():
+    api = CatalogAPI(base_url="https://example", api_key="k", retries=2, backoff_base_ms=0, backoff_jitter_ms=0, run_id="run-1")
+    created = types.SimpleNamespace(status_code=201, headers={}, json=lambda: {})
+    with patch("requests.post") as mpost:
+        mpost.side_effect = [requests.Timeout(), created]
+        assert api.create_product({"partnumber": "PN1", "brand": "TI"}) == {"status": "ok"}
+        keys = [c.kwargs["headers"]["Idempotency-Key"] for c in mpost.call_args_list]
+        assert len(keys) == 2 and keys[0] == keys[1]
+        assert mpost.call_args.kwargs["headers"]["Authorization"] == "Bearer k"
+    with patch("requests.patch") as mpatch:
+        mpatch.return_value = types.SimpleNamespace(status_code=204)
+        assert api.update_product("p1", {"brand": "TI"}) is True
+        assert "Idempotency-Key" in mpatch.call_args.kwargs["headers"]
+
+
+def test_idempotency_keys_can_be_disabled():
+    api = CatalogAPI(base_url="https://example", api_key="k", retries=1, idempotency_keys=False)
+    with patch("requests.post") as mpost:
+        mpost.return_value = types.SimpleNamespace(status_code=201, headers={}, json=lambda: {})
+        api.create_product({"partnumber": "PN1"})
+        assert "Idempotency-Key" not in mpost.call_args.kwargs["headers"]
+
+
+def test_client_makes_single_attempt_under_outer_policy():
+    # Повторяет только внешний уровень: 2 внешние попытки x 1 вызов клиента, а не 2 x 3
+    api = CatalogAPI(base_url="https://example", api_key="k", retries=3, backoff_base_ms=0, backoff_jitter_ms=0)
+    outer = RetryPolicy(attempts=2, backoff_base_ms=0, backoff_jitter_ms=0)
+    with patch("requests.get") as mget:
+        mget.side_effect = requests.Timeout()
+        with pytest.raises(RetryExhaustedError):
+            outer.call(api.search_product, "ANY", tag="catalog_search")
+        assert mget.call_count == 2
+
+
+def test_adaptive_timeout_passed_per_endpoint():
+    from latency import AdaptiveTimeouts
+
+    timeouts = AdaptiveTimeouts("catalog", 10.0, min_samples=1, min_sec=0.2)
+    api = CatalogAPI(base_url="https://example", api_key="k", timeouts=timeouts)
+    with patch("requests.get") as mget:
+        mget.return_value = make_response(200, json_data=[])
+        api.search_product("A")
+        assert mget.call_args.kwargs["timeout"] == 10.0
+        api.search_product("B")
+        # Быстрый первый ответ: таймаут опускается к нижней границе
+        assert mget.call_args.kwargs["timeout"] == 0.2
+    assert "create" not in timeouts.snapshot()
+
+
+def test_get_taxonomy_fetches_taxonomy_endpoint():
+    api = CatalogAPI(base_url="https://example", api_key="k", retries=1)
+    with patch("requests.get") as mget:
+        mget.return_value = make_response(200, json_data={"gn": [{"code": "ГН1"}], "vn": []})
+        assert api.get_taxonomy() == {"gn": [{"code": "ГН1"}], "vn": []}
+        assert mget.call_args[0][0] == "https://example/taxonomy"
+
+
+def test_scheduler_permit_is_taken_per_attempt_including_hedges():
+    import threading
+    import time
+
+    from hedging import Hedger
+    from metrics import RuntimeCounters
+    from scheduler import LaneScheduler
+
+    hedger = Hedger("catalog_search", min_samples=1, percentile=50, counters=RuntimeCounters())
+    hedger.tracker.record(0.01)
+    sched = LaneScheduler("catalog", 1000.0, counters=RuntimeCounters())
+    api = CatalogAPI(base_url="https://example", api_key="k", hedger=hedger, scheduler=sched)
+    lock = threading.Lock()
+    calls = []
+
+    def get(*args, **kwargs):
+        with lock:
+            calls.append(1)
+            first = len(calls) == 1
+        if first:
+            time.sleep(0.3)
+        return make_response(200, json_data=[{"id": "p1", "partnumber": "X1"}])
+
+    with patch("requests.get", side_effect=get):
+        assert api.search_product("X1")[0]["id"] == "p1"
+    assert len(calls) == 2
+    assert sched.counters.get("sched.catalog.batch.granted") == 2
+    hedger.shutdown()
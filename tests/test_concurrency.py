@@ -0,0 +1,173 @@
+"""Тесты для модуля concurrency."""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from concurrency import (
+    AIMDController,
+    ServiceLimiter,
+    ThreadServiceLimiter,
+    is_overload,
+)
+from exceptions import (
+    ClientRequestError,
+    RetryExhaustedError,
+    ThrottledError,
+    TransientServiceError,
+)
+from lcsc_client import LCSCClientReal
+from metrics import RuntimeCounters
+from retry import RetryPolicy
+
+
+def test_limiter_caps_in_flight_and_records_queue_wait():
+    counters = RuntimeCounters()
+    limiter = ServiceLimiter("llm", 2, counters=counters)
+    peak = {"n": 0}
+
+    async def call():
+        async with limiter.slot():
+            peak["n"] = max(peak["n"], limiter.in_flight)
+            await asyncio.sleep(0.02)
+
+    async def run():
+        await asyncio.gather(*(call() for _ in range(6)))
+
+    asyncio.run(run())
+    assert peak["n"] == 2
+    assert limiter.in_flight == 0
+    assert counters.get("queue.llm.acquired") == 6
+    # Последние вызовы ждали минимум два "раунда" по 20 мс
+    assert counters.get("queue.llm.wait_max_ms") >= 30
+    stats = limiter.get_stats()
+    assert stats["acquired"] == 6 and stats["wait_avg_ms"] > 0
+
+
+def test_limiter_releases_slot_on_error():
+    limiter = ServiceLimiter("catalog", 1, counters=RuntimeCounters())
+
+    async def run():
+        try:
+            async with limiter.slot():
+                raise ValueError("boom")
+        except ValueError:
+            pass
+        async with limiter.slot():
+            return limiter.in_flight
+
+    assert asyncio.run(run()) == 1
+
+
+def test_is_overload_distinguishes_overload_from_request_errors():
+    assert is_overload(ThrottledError("llm", 429))
+    assert is_overload(TransientServiceError("lcsc", 503))
+    assert is_overload(TimeoutError())
+    assert is_overload(RetryExhaustedError("llm", 3, ThrottledError("llm", 429)))
+    assert not is_overload(TransientServiceError("lcsc", 500))
+    assert not is_overload(ClientRequestError("catalog", 400))
+    assert not is_overload(ValueError("bad json"))
+
+
+def test_aimd_grows_additively_on_fast_calls():
+    counters = RuntimeCounters()
+    ctrl = AIMDController("llm", 4, max_limit=6, counters=counters)
+    start = time.monotonic()
+    for _ in range(5):
+        ctrl.on_success(start, 0.01)
+    # Примерно окно из limit успешных вызовов — лимит +1
+    assert ctrl.limit == 5
+    for _ in range(50):
+        ctrl.on_success(start, 0.01)
+    assert ctrl.limit == 6
+    assert counters.get("concurrency.llm.limit") == 6
+
+
+def test_aimd_backs_off_once_per_window_on_overload():
+    counters = RuntimeCounters()
+    ctrl = AIMDController("lcsc", 16, counters=counters)
+    # Три одновременных вызова получили 429: вызовы, начатые до снижения, лимит повторно не уменьшают
+    with pytest.raises(ThrottledError):
+        with ctrl.observe(), ctrl.observe(), ctrl.observe():
+            raise ThrottledError("lcsc", 429)
+    assert ctrl.limit == 8
+    assert counters.get("concurrency.lcsc.backoffs") == 1
+    # Вызов, начатый после снижения, снижает лимит снова
+    with pytest.raises(TimeoutError):
+        with ctrl.observe():
+            raise TimeoutError()
+    assert ctrl.limit == 4
+    assert counters.get("concurrency.lcsc.limit") == 4
+    with pytest.raises(ValueError):
+        with ctrl.observe():
+            raise ValueError("not an overload")
+    assert ctrl.limit == 4
+
+
+def test_aimd_decreases_in_proportion_to_latency_growth():
+    ctrl = AIMDController("catalog", 40, tolerance=2.0, backoff=0.1, counters=RuntimeCounters())
+    ctrl.on_success(time.monotonic(), 0.1)
+    ctrl.on_success(time.monotonic(), 0.4)
+    # Порог 0.2 с, задержка 0.4 с — лимит примерно вдвое меньше
+    assert ctrl.limit == 20
+    assert ctrl.limit >= ctrl.min_limit
+
+
+def test_service_limiter_follows_controller_limit():
+    ctrl = AIMDController("llm", 3, counters=RuntimeCounters())
+    limiter = ServiceLimiter("llm", 100, counters=RuntimeCounters(), controller=ctrl)
+    peak = {"n": 0}
+
+    async def call():
+        async with limiter.slot():
+            peak["n"] = max(peak["n"], limiter.in_flight)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        await asyncio.gather(*(call() for _ in range(8)))
+
+    asyncio.run(run())
+    assert peak["n"] == 3
+    assert limiter.get_stats()["limit"] == 3
+
+
+def test_client_attempts_are_bounded_and_observed_per_attempt():
+    # Высокий допуск: снижение лимита дает только перегрузка, а не разброс задержки потоков
+    ctrl = AIMDController("lcsc", 2, max_limit=2, tolerance=100.0, counters=RuntimeCounters())
+    state = {"in_flight": 0, "peak": 0, "calls": 0}
+    lock = threading.Lock()
+
+    class Response:
+        def __init__(self, status):
+            self.status_code = status
+            self.headers = {}
+
+        def json(self):
+            return []
+
+    class Http:
+        def get(self, url, params=None, headers=None, timeout=None):
+            with lock:
+                state["in_flight"] += 1
+                state["peak"] = max(state["peak"], state["in_flight"])
+                state["calls"] += 1
+                first = state["calls"] == 1
+            time.sleep(0.01)
+            with lock:
+                state["in_flight"] -= 1
+            # Первая попытка — перегрузка: регулятор видит ее отдельно от успешного повтора
+            return Response(503 if first else 200)
+
+    client = LCSCClientReal(
+        "http://lcsc", http=Http(), limiter=ThreadServiceLimiter(ctrl),
+        retry_policy=RetryPolicy(3, 0, 0, 0, counters=RuntimeCounters()),
+    )
+    threads = [threading.Thread(target=client.search, args=(str(i),)) for i in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert state["peak"] <= 2
+    assert state["calls"] == 7
+    assert ctrl.backoffs == 1
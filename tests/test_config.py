@@ -169,3 +169,232 @@ def test_invalid_integer_env(monkeypatch: pytest.MonkeyPatch):
     })
     with pytest.raises(ValueError):
         mod.load_config()
+
+
+def test_parses_hedge_envs(monkeypatch: pytest.MonkeyPatch):
+    mod = reload_config(monkeypatch, {
+        "USE_MOCKS": "true",
+        "MOCK_PROFILE": "happy",
+        "HEDGE_ENABLED": "1",
+        "HEDGE_PERCENTILE": "90",
+        "HEDGE_MIN_SAMPLES": "50",
+        "HEDGE_BUDGET_PCT": "5",
+    })
+    cfg = mod.load_config()
+    assert cfg.hedge_enabled is True
+    assert (cfg.hedge_percentile, cfg.hedge_min_samples, cfg.hedge_budget_pct) == (90.0, 50, 5.0)
+
+    mod = reload_config(monkeypatch, {
+        "USE_MOCKS": "true",
+        "MOCK_PROFILE": "happy",
+        "HEDGE_PERCENTILE": "100",
+    })
+    with pytest.raises(ValueError):
+        mod.load_config()
+
+
+def test_parses_http_transport(monkeypatch: pytest.MonkeyPatch):
+    mod = reload_config(monkeypatch, {
+        "USE_MOCKS": "true",
+        "MOCK_PROFILE": "happy",
+        "HTTP_TRANSPORT": "HTTP2",
+        "HTTP2_MAX_CONNECTIONS": "2",
+    })
+    cfg = mod.load_config()
+    assert (cfg.http_transport, cfg.http2_max_connections) == ("http2", 2)
+
+    mod = reload_config(monkeypatch, {
+        "USE_MOCKS": "true",
+        "MOCK_PROFILE": "happy",
+        "HTTP_TRANSPORT": "spdy",
+    })
+    with pytest.raises(ValueError):
+        mod.load_config()
+
+
+def test_field_projection_flag(monkeypatch: pytest.MonkeyPatch):
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy"})
+    # Выключено по умолчанию: поддержка fields= в реальных API не подтверждена
+    assert mod.load_config().field_projection is False
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy", "FIELD_PROJECTION": "1"})
+    assert mod.load_config().field_projection is True
+
+
+def test_stream_search_settings(monkeypatch: pytest.MonkeyPatch):
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy"})
+    cfg = mod.load_config()
+    assert cfg.stream_search is False
+    assert cfg.stream_search_max_items == 50
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy", "STREAM_SEARCH_MAX_ITEMS": "-1"})
+    with pytest.raises(ValueError):
+        mod.load_config()
+
+
+def test_idempotency_keys_flag(monkeypatch: pytest.MonkeyPatch):
+    # Выключено по умолчанию: включает и хеджирование записей
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy"})
+    assert mod.load_config().idempotency_keys is False
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy", "IDEMPOTENCY_KEYS": "true"})
+    assert mod.load_config().idempotency_keys is True
+
+
+def test_per_service_concurrency(monkeypatch: pytest.MonkeyPatch):
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy", "LLM_CONCURRENCY": "4"})
+    cfg = mod.load_config()
+    assert (cfg.catalog_concurrency, cfg.lcsc_concurrency, cfg.llm_concurrency) == (100, 20, 4)
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy", "CATALOG_CONCURRENCY": "0"})
+    with pytest.raises(ValueError):
+        mod.load_config()
+
+
+def test_retry_budget_settings(monkeypatch: pytest.MonkeyPatch):
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy"})
+    cfg = mod.load_config()
+    assert (cfg.retry_budget_ratio, cfg.retry_budget_min) == (0.2, 20)
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy", "RETRY_BUDGET_RATIO": "-0.1"})
+    with pytest.raises(ValueError):
+        mod.load_config()
+
+
+def test_deadline_settings(monkeypatch: pytest.MonkeyPatch):
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy"})
+    cfg = mod.load_config()
+    assert (cfg.row_deadline_sec, cfg.run_deadline_sec, cfg.run_deadline_reserve_sec) == (0.0, 0.0, 30.0)
+    mod = reload_config(
+        monkeypatch,
+        {"USE_MOCKS": "true", "MOCK_PROFILE": "happy", "RUN_DEADLINE_SEC": "20", "RUN_DEADLINE_RESERVE_SEC": "30"},
+    )
+    with pytest.raises(ValueError):
+        mod.load_config()
+
+
+def test_adaptive_timeout_settings(monkeypatch: pytest.MonkeyPatch):
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy"})
+    cfg = mod.load_config()
+    assert cfg.adaptive_timeouts is False
+    assert (cfg.adaptive_timeout_multiplier, cfg.adaptive_timeout_percentile) == (3.0, 99.0)
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy", "ADAPTIVE_TIMEOUT_MULTIPLIER": "0.5"})
+    with pytest.raises(ValueError):
+        mod.load_config()
+
+
+def test_load_balancing_settings(monkeypatch: pytest.MonkeyPatch):
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy"})
+    cfg = mod.load_config()
+    assert (cfg.lb_strategy, cfg.lb_eject_failures, cfg.lb_eject_sec, cfg.lb_probe_path) == (
+        "least_outstanding", 3, 30.0, "/health"
+    )
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy", "LB_STRATEGY": "random"})
+    with pytest.raises(ValueError):
+        mod.load_config()
+
+
+def test_lane_scheduler_settings(monkeypatch: pytest.MonkeyPatch):
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy"})
+    cfg = mod.load_config()
+    assert (cfg.catalog_rate_limit, cfg.lcsc_rate_limit, cfg.llm_rate_limit) == (0.0, 0.0, 0.0)
+    assert (cfg.lane_weight_interactive, cfg.lane_weight_batch) == (4.0, 1.0)
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy", "LANE_WEIGHT_BATCH": "0"})
+    with pytest.raises(ValueError):
+        mod.load_config()
+
+
+def test_deferred_retry_settings(monkeypatch: pytest.MonkeyPatch):
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy"})
+    cfg = mod.load_config()
+    assert (cfg.deferred_retries, cfg.deferred_retry_attempts) == (False, 3)
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy", "DEFERRED_RETRY_ATTEMPTS": "0"})
+    with pytest.raises(ValueError):
+        mod.load_config()
+
+
+def test_reference_source_settings(monkeypatch: pytest.MonkeyPatch):
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy"})
+    cfg = mod.load_config()
+    assert (cfg.reference_sources, cfg.reference_mode, cfg.reference_quorum) == ((), "first", 2)
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy", "REFERENCE_SOURCES": " Digikey, mouser "})
+    assert mod.load_config().reference_sources == ("digikey", "mouser")
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy", "REFERENCE_SOURCES": "octopart"})
+    with pytest.raises(ValueError):
+        mod.load_config()
+
+
+def test_llm_cache_settings(monkeypatch: pytest.MonkeyPatch):
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy"})
+    cfg = mod.load_config()
+    assert (cfg.llm_cache, cfg.llm_cache_dir, cfg.llm_cache_ttl_hours, cfg.llm_cache_version) == (
+        False, "cache/llm", 168.0, "v1"
+    )
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy", "LLM_CACHE": "true", "LLM_CACHE_TTL_HOURS": "0"})
+    with pytest.raises(ValueError):
+        mod.load_config()
+
+
+def test_llm_batch_settings(monkeypatch: pytest.MonkeyPatch):
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy"})
+    cfg = mod.load_config()
+    # Пакетирование LLM выключено по умолчанию: поддержка /*/batch сервером не подтверждена
+    assert (cfg.llm_batch_size, cfg.llm_batch_max_tokens, cfg.llm_batch_window_ms) == (1, 4000, 20.0)
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy", "LLM_BATCH_SIZE": "0"})
+    with pytest.raises(ValueError):
+        mod.load_config()
+
+
+def test_llm_analyze_setting(monkeypatch: pytest.MonkeyPatch):
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy"})
+    assert mod.load_config().llm_analyze is False
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy", "LLM_ANALYZE": "1"})
+    assert mod.load_config().llm_analyze is True
+
+
+def test_gn_vn_mapping_settings(monkeypatch: pytest.MonkeyPatch):
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy"})
+    cfg = mod.load_config()
+    assert (cfg.gn_vn_mapping, cfg.gn_vn_mapping_file) == (False, "data/gn_vn_mapping.json")
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy", "GN_VN_MAPPING": "1", "GN_VN_MAPPING_FILE": ""})
+    with pytest.raises(ValueError):
+        mod.load_config()
+
+
+def test_taxonomy_settings(monkeypatch: pytest.MonkeyPatch):
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy"})
+    cfg = mod.load_config()
+    assert (cfg.taxonomy, cfg.taxonomy_cache_file, cfg.taxonomy_ttl_hours, cfg.taxonomy_top_k) == (
+        False, "cache/taxonomy.json", 24.0, 10
+    )
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy", "TAXONOMY": "1", "TAXONOMY_TOP_K": "0"})
+    with pytest.raises(ValueError):
+        mod.load_config()
+
+
+def test_llm_budget_settings(monkeypatch: pytest.MonkeyPatch):
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy"})
+    cfg = mod.load_config()
+    assert (cfg.llm_budget_calls, cfg.llm_budget_tokens, cfg.llm_budget_wall_sec) == (0, 0, 0.0)
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy", "LLM_BUDGET_CALLS": "-1"})
+    with pytest.raises(ValueError):
+        mod.load_config()
+
+
+def test_adaptive_concurrency_settings(monkeypatch: pytest.MonkeyPatch):
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy"})
+    cfg = mod.load_config()
+    assert (cfg.adaptive_concurrency, cfg.adaptive_concurrency_min, cfg.adaptive_concurrency_max) == (False, 1, 200)
+    mod = reload_config(
+        monkeypatch,
+        {"USE_MOCKS": "true", "MOCK_PROFILE": "happy", "ADAPTIVE_CONCURRENCY": "1", "ADAPTIVE_CONCURRENCY_BACKOFF": "1"},
+    )
+    with pytest.raises(ValueError):
+        mod.load_config()
+
+
+def test_part_family_settings(monkeypatch: pytest.MonkeyPatch):
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy"})
+    cfg = mod.load_config()
+    assert (cfg.part_family, cfg.part_family_rules_file, cfg.part_family_min_confidence, cfg.part_family_spot_check) == (
+        False, "data/part_families.json", 0.9, 0.0
+    )
+    mod = reload_config(monkeypatch, {"USE_MOCKS": "true", "MOCK_PROFILE": "happy", "PART_FAMILY": "1",
+                                      "PART_FAMILY_SPOT_CHECK": "1.5"})
+    with pytest.raises(ValueError):
+        mod.load_config()
@@ -0,0 +1,53 @@
+"""Тесты дедлайнов строки и запуска."""
+import math
+import time
+
+import pytest
+
+from deadline import check_deadline, current_deadline, deadline_scope, remaining, timeout_for
+from exceptions import DeadlineExceededError
+
+
+def test_no_deadline_is_unlimited():
+    assert current_deadline() is None
+    assert remaining() == math.inf
+    assert timeout_for(5.0) == 5.0
+    check_deadline("stage")
+
+
+def test_zero_budget_means_no_own_limit():
+    with deadline_scope(0) as deadline:
+        assert deadline.remaining() == math.inf
+
+
+def test_timeout_is_clipped_to_remaining():
+    with deadline_scope(1.0):
+        assert 0 < timeout_for(10.0) <= 1.0
+        assert timeout_for(0.5) == 0.5
+    assert current_deadline() is None
+
+
+def test_nested_scope_keeps_earlier_deadline():
+    with deadline_scope(0.5, scope="run") as run:
+        with deadline_scope(60.0) as row:
+            assert row is run
+            assert row.scope == "run"
+        with deadline_scope(0.1) as row:
+            assert row is not run
+            assert row.remaining() <= 0.1
+
+
+def test_expired_deadline_raises():
+    with deadline_scope(0.01):
+        time.sleep(0.02)
+        with pytest.raises(DeadlineExceededError) as exc:
+            timeout_for(10.0, stage="catalog_search")
+        assert exc.value.stage == "catalog_search"
+        assert exc.value.retryable is False
+
+
+def test_check_deadline_min_remaining():
+    with deadline_scope(1.0):
+        check_deadline("stage", 0.5)
+        with pytest.raises(DeadlineExceededError):
+            check_deadline("stage", 2.0)
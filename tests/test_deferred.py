@@ -0,0 +1,53 @@
+import time
+
+from deferred import DeferredRetryQueue
+from metrics import RuntimeCounters
+from retry import RetryBudget, RetryPolicy
+
+
+def _queue(max_attempts=3, budget=None, base_ms=20):
+    counters = RuntimeCounters()
+    policy = RetryPolicy(backoff_base_ms=base_ms, backoff_jitter_ms=0, budget=budget, counters=counters)
+    return DeferredRetryQueue(policy, max_attempts, counters=counters), counters
+
+
+def test_item_is_ready_only_after_backoff():
+    queue, counters = _queue()
+    assert queue.push("row", attempt=1)
+    assert len(queue) == 1
+    assert queue.pop_ready() is None
+    assert 0 < queue.next_ready_in() <= 0.02
+    time.sleep(0.03)
+    assert queue.pop_ready() == ("row", 2)
+    assert len(queue) == 0
+    assert counters.get("deferred.queued") == 1
+
+
+def test_ready_items_come_out_in_not_before_order():
+    queue, _ = _queue(base_ms=0)
+    queue.push("a", attempt=2)
+    queue.push("b", attempt=1)
+    assert queue.pop_ready() == ("a", 3)
+    assert queue.pop_ready() == ("b", 2)
+
+
+def test_push_refused_when_attempts_exhausted():
+    queue, counters = _queue(max_attempts=2)
+    assert not queue.push("row", attempt=2)
+    assert len(queue) == 0
+    assert counters.get("deferred.exhausted") == 1
+
+
+def test_push_spends_retry_budget():
+    queue, counters = _queue(budget=RetryBudget(ratio=0, min_retries=1))
+    assert queue.push("a", attempt=1)
+    assert not queue.push("b", attempt=1)
+    assert counters.get("retry.budget_denied") == 1
+
+
+def test_drain_returns_pending_items():
+    queue, _ = _queue(base_ms=1000)
+    queue.push("a", attempt=1)
+    queue.push("b", attempt=1)
+    assert queue.drain() == ["a", "b"]
+    assert len(queue) == 0
@@ -0,0 +1,64 @@
+from gn_vn_mapping import GnVnMapping, learn_rules, load_mapping, save_mapping
+from metrics import RuntimeCounters
+
+RULES = [
+    {"category": "Resistor", "gn": "ГН1", "vn": "ВН1"},
+    {"category": "IC", "brand": "TI", "gn": "ГН2", "vn": "ВН1"},
+    {"category": "IC", "brand": "TI", "attrs": {"package": "SOT-23"}, "gn": "ГН3", "vn": "ВН2"},
+]
+
+
+def _mapping(rules=RULES):
+    counters = RuntimeCounters()
+    return GnVnMapping(rules, version=1, counters=counters), counters
+
+
+def test_lookup_prefers_most_specific_rule():
+    mapping, _ = _mapping()
+    assert mapping.lookup("resistor") == {"gn": "ГН1", "vn": "ВН1"}
+    assert mapping.lookup("IC", "ti", {"package": "SOT-23"}) == {"gn": "ГН3", "vn": "ВН2"}
+    assert mapping.lookup("IC", "TI", {"package": "QFN"}) == {"gn": "ГН2", "vn": "ВН1"}
+    assert mapping.lookup("IC", "ST") is None
+
+
+def test_lookup_counts_hits_and_misses():
+    mapping, counters = _mapping()
+    mapping.lookup("Resistor")
+    mapping.lookup("Capacitor")
+    mapping.lookup("")
+    assert counters.get("gn_vn_mapping.hits") == 1
+    assert counters.get("gn_vn_mapping.misses") == 2
+    # Доля попаданий — в сводке метрик запуска, а не в счетчиках таблицы
+    assert counters.get("gn_vn_mapping.hit_rate") == 0
+
+
+def test_learn_rules_from_confident_llm_decisions():
+    rows = [{"category": "Resistor", "brand": "Yageo", "gn": "ГН1", "vn": "ВН1", "confidence": 0.95,
+             "gn_vn_source": "llm"}] * 5
+    rows += [{"category": "IC", "brand": brand, "gn": gn, "vn": "ВН1", "confidence": "0.97", "gn_vn_source": "llm"}
+             for brand, gn in [("TI", "ГН2")] * 5 + [("ST", "ГН3")] * 5]
+    # Неуверенные решения и решения самой таблицы не учитываются
+    rows += [{"category": "Diode", "gn": "ГН1", "vn": "ВН1", "confidence": 0.5, "gn_vn_source": "llm"}] * 5
+    rows += [{"category": "Diode", "gn": "ГН1", "vn": "ВН1", "confidence": "", "gn_vn_source": "mapping"}] * 5
+    rules = learn_rules(rows, min_support=5)
+    assert {"category": "Resistor", "gn": "ГН1", "vn": "ВН1", "support": 5} in rules
+    assert {(r["category"], r.get("brand"), r["gn"]) for r in rules if r["category"] == "IC"} == {
+        ("IC", "TI", "ГН2"), ("IC", "ST", "ГН3"),
+    }
+    assert not [r for r in rules if r["category"] == "Diode"]
+
+
+def test_merged_keeps_existing_rules_and_bumps_version(tmp_path):
+    mapping, _ = _mapping()
+    updated = mapping.merged([
+        {"category": "resistor", "gn": "ГН9", "vn": "ВН9"},
+        {"category": "Capacitor", "gn": "ГН2", "vn": "ВН2"},
+    ])
+    assert (updated.version, len(updated)) == (2, 4)
+    assert updated.lookup("Resistor") == {"gn": "ГН1", "vn": "ВН1"}
+
+    path = tmp_path / "mapping.json"
+    save_mapping(updated, path)
+    loaded = load_mapping(path)
+    assert (loaded.version, loaded.rules) == (2, updated.rules)
+    assert len(load_mapping(tmp_path / "missing.json")) == 0
@@ -0,0 +1,91 @@
+"""Тесты для модулей latency и hedging."""
+import threading
+import time
+
+from hedging import Hedger
+from latency import LatencyTracker
+from metrics import RuntimeCounters
+
+
+def _warm(hedger: Hedger, latency: float, n: int) -> None:
+    for _ in range(n):
+        hedger.tracker.record(latency)
+
+
+def test_latency_tracker_percentile_nearest_rank():
+    tracker = LatencyTracker(window=10)
+    assert tracker.percentile(95) is None
+    for v in range(1, 11):
+        tracker.record(v / 10)
+    assert tracker.count() == 10
+    assert tracker.percentile(50) == 0.5
+    assert tracker.percentile(95) == 1.0
+    # Окно вытесняет старые значения
+    tracker.record(5.0)
+    assert tracker.count() == 10
+    assert tracker.percentile(100) == 5.0
+
+
+def test_no_hedge_until_min_samples():
+    hedger = Hedger("t", min_samples=5, counters=RuntimeCounters())
+    calls = []
+    assert hedger.call(lambda: calls.append(1) or "ok") == "ok"
+    assert calls == [1]
+    assert hedger.get_stats()["hedged"] == 0
+
+
+def test_hedge_fires_and_wins_on_slow_primary():
+    counters = RuntimeCounters()
+    hedger = Hedger("t", min_samples=3, percentile=50, counters=counters)
+    _warm(hedger, 0.01, 5)
+    lock = threading.Lock()
+    state = {"n": 0}
+
+    def fn():
+        with lock:
+            state["n"] += 1
+            n = state["n"]
+        if n == 1:
+            time.sleep(0.5)
+            return "slow"
+        return "fast"
+
+    assert hedger.call(fn) == "fast"
+    stats = hedger.get_stats()
+    assert stats["hedged"] == 1 and stats["hedge_wins"] == 1
+    assert counters.get("hedge.t.wins") == 1
+    assert counters.get("hedge.t.rate") == 1.0
+    hedger.shutdown()
+
+
+def test_hedge_budget_bounds_duplicates():
+    counters = RuntimeCounters()
+    hedger = Hedger("t", min_samples=1, percentile=50, budget_ratio=0.0, budget_burst=1.0, counters=counters)
+    _warm(hedger, 0.001, 3)
+
+    def slow():
+        time.sleep(0.02)
+        return "ok"
+
+    for _ in range(3):
+        assert hedger.call(slow) == "ok"
+    assert hedger.get_stats()["hedged"] == 1
+    assert counters.get("hedge.t.budget_denied") == 2
+    hedger.shutdown()
+
+
+def test_hedge_falls_back_to_other_when_one_fails():
+    hedger = Hedger("t", min_samples=1, percentile=50, counters=RuntimeCounters())
+    _warm(hedger, 0.001, 3)
+    state = {"n": 0}
+
+    def fn():
+        state["n"] += 1
+        if state["n"] == 1:
+            time.sleep(0.05)
+            raise ConnectionError("boom")
+        time.sleep(0.1)
+        return "second"
+
+    assert hedger.call(fn) == "second"
+    hedger.shutdown()
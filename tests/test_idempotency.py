@@ -0,0 +1,52 @@
+"""Тесты для модуля idempotency."""
+import threading
+
+from idempotency import IdempotencyStore, create_key, update_key
+
+
+def test_create_key_is_deterministic_and_canonical():
+    a = create_key({"partnumber": "lm317-t", "brand": "ti "}, "run-1")
+    b = create_key({"partnumber": "LM317T", "brand": "TI", "name": "ignored"}, "run-1")
+    assert a == b
+    assert a != create_key({"partnumber": "LM317T", "brand": "TI"}, "run-2")
+    assert a != create_key({"partnumber": "LM317T", "brand": "ST"}, "run-1")
+
+
+def test_update_key_depends_on_product_and_patch():
+    k = update_key("p1", {"brand": "TI", "gn": "G"}, "run")
+    assert k == update_key("p1", {"gn": "G", "brand": "TI"}, "run")
+    assert k != update_key("p2", {"brand": "TI", "gn": "G"}, "run")
+    assert k != update_key("p1", {"brand": "TI", "gn": "G2"}, "run")
+
+
+def test_store_replays_first_response():
+    store = IdempotencyStore()
+    calls = []
+
+    def write():
+        calls.append(1)
+        return {"id": len(calls)}
+
+    assert store.run("k", write) == {"id": 1}
+    assert store.run("k", write) == {"id": 1}
+    assert store.run(None, write) == {"id": 2}
+    assert len(calls) == 2 and store.replays == 1
+
+
+def test_store_concurrent_duplicates_write_once():
+    store = IdempotencyStore()
+    calls = []
+    threads = [threading.Thread(target=store.run, args=("k", lambda: calls.append(1))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+
+
+def test_store_evicts_oldest_keys():
+    store = IdempotencyStore(max_keys=2)
+    for key in ("a", "b", "c"):
+        store.run(key, lambda k=key: k)
+    store.run("a", lambda: "again")
+    assert store.replays == 0
@@ -3,6 +3,7 @@ from typing import Any, Dict, List
 import pytest
 
 import main as app
+from llm_budget import budget_llm_client
 
 
 class FakeCatalog:
@@ -158,3 +159,118 @@ def test_retry_on_transient_create_errors(monkeypatch):
     errs = report[0].get("errors", "")
     assert "catalog_create:RuntimeError:attempt1" in errs
     assert "catalog_create:RuntimeError:attempt2" in errs
+
+
+def test_run_deadline_reports_unfinished_rows(monkeypatch):
+    import time
+
+    from config import load_config
+
+    class SlowCatalog(FakeCatalog):
+        def search_product(self, part: str):
+            time.sleep(0.3)
+            return [{"id": part, "brand": "B"}]
+
+    monkeypatch.setenv("RUN_DEADLINE_SEC", "0.5")
+    monkeypatch.setenv("RUN_DEADLINE_RESERVE_SEC", "0.1")
+    app.get_catalog_client = lambda cfg: SlowCatalog()  # type: ignore[attr-defined]
+    app.get_lcsc_client = lambda cfg: FakeLCSC()  # type: ignore[attr-defined]
+    app.get_llm_client = lambda cfg: FakeLLM(0.9)  # type: ignore[attr-defined]
+    rows = [{"partnumber": f"PN{i}", "brand": "B"} for i in range(5)]
+
+    results = app.process_rows(rows, load_config())
+
+    assert len(results) == 5
+    assert results[0]["reason"] == "already_present"
+    assert [r["reason"] for r in results[2:]] == ["deadline_exceeded"] * 3
+    assert results[-1]["errors"] == "deadline:run"
+
+
+def test_deferred_retries_keep_healthy_rows_moving(monkeypatch):
+    from config import load_config
+
+    calls: list[str] = []
+
+    class FlakyCatalog(FakeCatalog):
+        def search_product(self, part: str):
+            calls.append(part)
+            if part == "PN0" and calls.count(part) == 1:
+                raise TimeoutError("catalog down")
+            return [{"id": part, "brand": "B"}]
+
+    monkeypatch.setenv("DEFERRED_RETRIES", "true")
+    monkeypatch.setenv("BACKOFF_BASE_MS", "50")
+    monkeypatch.setenv("BACKOFF_JITTER_MS", "0")
+    app.get_catalog_client = lambda cfg: FlakyCatalog()  # type: ignore[attr-defined]
+    app.get_lcsc_client = lambda cfg: FakeLCSC()  # type: ignore[attr-defined]
+    app.get_llm_client = lambda cfg: FakeLLM(0.9)  # type: ignore[attr-defined]
+    rows = [{"partnumber": f"PN{i}", "brand": "B"} for i in range(3)]
+
+    results = app.process_rows(rows, load_config())
+
+    # Сбойная строка не задержала остальные и повторена после них; порядок отчета исходный
+    assert calls == ["PN0", "PN1", "PN2", "PN0"]
+    assert [r["partnumber"] for r in results] == ["PN0", "PN1", "PN2"]
+    assert [r["reason"] for r in results] == ["already_present"] * 3
+    assert "catalog_search:TimeoutError:attempt1" in results[0]["errors"]
+
+
+def test_deferred_write_failure_retries_only_the_write(monkeypatch):
+    from config import load_config
+
+    searches: list[str] = []
+    writes: list[str] = []
+
+    class FlakyWriteCatalog(FakeCatalog):
+        def search_product(self, part: str):
+            searches.append(part)
+            return []
+
+        def create_product(self, payload: Dict[str, Any]) -> None:
+            writes.append(payload["partnumber"])
+            if len(writes) == 1:
+                raise TimeoutError("catalog down")
+            super().create_product(payload)
+
+    class CountingLLM(FakeLLM):
+        calls = 0
+
+        def classify(self, gn_candidates, vn_candidates, _text: str) -> Dict[str, Any]:
+            CountingLLM.calls += 1
+            return super().classify(gn_candidates, vn_candidates, _text)
+
+    catalog = FlakyWriteCatalog()
+    monkeypatch.setenv("DEFERRED_RETRIES", "true")
+    monkeypatch.setenv("BACKOFF_BASE_MS", "10")
+    monkeypatch.setenv("BACKOFF_JITTER_MS", "0")
+    app.get_catalog_client = lambda cfg: catalog  # type: ignore[attr-defined]
+    app.get_lcsc_client = lambda cfg: FakeLCSC()  # type: ignore[attr-defined]
+    app.get_llm_client = lambda cfg: CountingLLM(0.9)  # type: ignore[attr-defined]
+
+    results = app.process_rows([{"partnumber": "PN0", "brand": "B"}], load_config())
+
+    # Повтор записи не повторяет поиск и классификацию
+    assert searches == ["PN0"]
+    assert CountingLLM.calls == 1
+    assert [p["partnumber"] for p in catalog.created] == ["PN0"]
+    assert (results[0]["action"], results[0]["reason"]) == ("create", "not_found")
+    assert "_write" not in results[0]
+    assert "catalog_create:TimeoutError:attempt1" in results[0]["errors"]
+
+
+def test_llm_budget_goes_to_valuable_rows_first(monkeypatch):
+    from config import load_config
+
+    catalog = FakeCatalog()
+    monkeypatch.setenv("LLM_BUDGET_CALLS", "2")
+    app.get_catalog_client = lambda cfg: catalog  # type: ignore[attr-defined]
+    app.get_lcsc_client = lambda cfg: FakeLCSC()  # type: ignore[attr-defined]
+    # Бюджет списывает обертка клиента, как в services.get_llm_client
+    app.get_llm_client = lambda cfg: budget_llm_client(FakeLLM(0.9), cfg)  # type: ignore[attr-defined]
+    rows = [{"partnumber": "PN0", "brand": "B"}, {"partnumber": "PN1", "brand": "B", "external_id": "E1"}]
+
+    results = app.process_rows(rows, load_config())
+
+    assert [r["partnumber"] for r in results] == ["PN0", "PN1"]
+    assert [r["reason"] for r in results] == ["llm_budget_exhausted", "not_found"]
+    assert [p["partnumber"] for p in catalog.created] == ["PN1"]
@@ -0,0 +1,42 @@
+"""Тесты адаптивных таймаутов."""
+from latency import AdaptiveTimeout, AdaptiveTimeouts, LatencyTracker
+from metrics import RuntimeCounters
+
+
+def _timeout(samples, **kwargs):
+    tracker = LatencyTracker(window=100)
+    for s in samples:
+        tracker.record(s)
+    return AdaptiveTimeout("svc.ep", 10.0, tracker=tracker, counters=RuntimeCounters(), **kwargs)
+
+
+def test_uses_max_until_enough_samples():
+    assert _timeout([0.1] * 5, min_samples=20).current() == 10.0
+
+
+def test_multiple_of_percentile():
+    timeout = _timeout([0.1] * 99 + [0.4], min_samples=20, multiplier=3.0, percentile=99.0, min_sec=0.05)
+    assert abs(timeout.current() - 0.3) < 1e-9
+
+
+def test_clamped_to_bounds():
+    assert _timeout([0.01] * 50, min_samples=20, min_sec=0.5).current() == 0.5
+    assert _timeout([8.0] * 50, min_samples=20).current() == 10.0
+
+
+def test_disabled_keeps_fixed_timeout():
+    assert _timeout([0.1] * 50, min_samples=20, enabled=False).current() == 10.0
+
+
+def test_observe_records_failures_and_exposes_metric():
+    counters = RuntimeCounters()
+    timeouts = AdaptiveTimeouts("lcsc", 10.0, min_samples=1, counters=counters)
+    try:
+        with timeouts.observe("search"):
+            raise TimeoutError
+    except TimeoutError:
+        pass
+    assert timeouts.endpoint("search").tracker.count() == 1
+    timeouts.current("search")
+    assert counters.get("timeout.lcsc.search.effective_ms") == 500.0
+    assert set(timeouts.snapshot()) == {"search"}
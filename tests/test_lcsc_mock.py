@@ -37,3 +37,10 @@ def test_lcsc_search_profiles(profile: str):
                 continue
         else:
             pytest.fail("errorrate10 kept failing after retries")
+
+
+def test_lcsc_search_honors_field_projection():
+    mock = LCSCMock(profile="happy", seed=1, fields=("brand",))
+    res = mock.search("ABC123")
+    assert len(res) == 1 and set(res[0]) == {"brand"}
+    assert set(mock.search("ABC123", fields=["brand", "category"])[0]) == {"brand", "category"}
@@ -0,0 +1,111 @@
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+import llm_budget
+from cache import CachedLLMClient, LLMCache
+from exceptions import LLMBudgetExhaustedError
+from llm_budget import LLMBudget, budget_llm_client, prioritize, row_value
+from metrics import RuntimeCounters
+
+
+def _budget(**kwargs):
+    counters = RuntimeCounters()
+    return LLMBudget(counters=counters, **kwargs), counters
+
+
+def test_calls_budget_denies_after_limit():
+    budget, counters = _budget(max_calls=2)
+    budget.spend("PN1")
+    budget.spend("PN2", ["ГН1"], ["ВН1"])
+    with pytest.raises(LLMBudgetExhaustedError) as exc:
+        budget.spend("PN3")
+    assert exc.value.resource == "calls"
+    assert (counters.get("llm_budget.calls"), counters.get("llm_budget.denied")) == (2, 1)
+
+
+def test_tokens_budget_counts_prompt_and_candidates():
+    budget, counters = _budget(max_tokens=10)
+    budget.spend("x" * 20, ["ГН1", "ГН2"])
+    assert counters.get("llm_budget.tokens") == budget.tokens == 7
+    with pytest.raises(LLMBudgetExhaustedError) as exc:
+        budget.spend("x" * 20)
+    assert exc.value.resource == "tokens"
+
+
+def test_wall_time_budget():
+    budget, _ = _budget(max_wall_sec=0.01)
+    budget.spend("PN1")
+    time.sleep(0.02)
+    with pytest.raises(LLMBudgetExhaustedError) as exc:
+        budget.spend("PN2")
+    assert exc.value.resource == "wall_time"
+
+
+def test_from_config_without_limits_is_disabled():
+    class Cfg:
+        llm_budget_calls = 0
+
+    assert LLMBudget.from_config(Cfg()) is None
+    Cfg.llm_budget_calls = 5
+    assert LLMBudget.from_config(Cfg()).max_calls == 5
+
+
+def test_rows_are_prioritized_by_value():
+    rows = [
+        {"partnumber": "A"},
+        {"partnumber": "B", "quantity": "10", "price": "2,5"},
+        {"partnumber": "C", "external_id": "E1"},
+        {"partnumber": "D", "quantity": 100},
+        {"partnumber": "E"},
+    ]
+    assert row_value(rows[1]) == (0, 25.0)
+    assert prioritize(rows) == [2, 3, 1, 0, 4]
+
+
+def test_cache_hit_leaves_budget_unchanged(tmp_path, monkeypatch):
+    class Cfg:
+        llm_budget_calls = 5
+
+    monkeypatch.setattr(llm_budget, "_llm_budget", None)
+    budget = llm_budget.reset_llm_budget(Cfg())
+    llm = MagicMock()
+    llm.classify.return_value = {"gn": "ГН1", "vn": "ВН1", "confidence": 0.9}
+    cache = LLMCache(cache_dir=str(tmp_path), counters=RuntimeCounters())
+    client = CachedLLMClient(budget_llm_client(llm, Cfg()), cache)
+
+    client.classify(["ГН1"], ["ВН1"], "PN1")
+    client.classify(["ГН1"], ["ВН1"], "PN1")
+
+    assert llm.classify.call_count == 1
+    assert budget.calls == 1
+
+
+def test_batch_call_charges_each_cache_miss_and_can_exhaust_budget(tmp_path, monkeypatch):
+    class Cfg:
+        llm_budget_calls = 3
+
+    monkeypatch.setattr(llm_budget, "_llm_budget", None)
+    budget = llm_budget.reset_llm_budget(Cfg())
+    llm = MagicMock()
+    llm.normalize.return_value = {"attrs": {"r": "1k"}}
+    llm.normalize_batch.side_effect = lambda texts: [{"attrs": {"pn": t}} for t in texts]
+    cache = LLMCache(cache_dir=str(tmp_path), counters=RuntimeCounters())
+    client = CachedLLMClient(budget_llm_client(llm, Cfg()), cache)
+    client.normalize("PN1")
+
+    results = client.normalize_batch(["PN1", "PN2", "PN3", "PN4"])
+
+    assert results[:3] == [{"attrs": {"r": "1k"}}, {"attrs": {"pn": "PN2"}}, {"attrs": {"pn": "PN3"}}]
+    assert isinstance(results[3], LLMBudgetExhaustedError)
+    llm.normalize_batch.assert_called_once_with(["PN2", "PN3"])
+    assert (budget.calls, budget.denied) == (3, 1)
+
+
+def test_budget_client_is_skipped_without_limits():
+    class Cfg:
+        llm_budget_calls = 0
+
+    llm = MagicMock()
+    assert budget_llm_client(llm, Cfg()) is llm
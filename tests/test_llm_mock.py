@@ -20,3 +20,26 @@ def test_classify_basic_and_deterministic():
     assert res1 == res2
     assert set(res1).issuperset({"gn", "vn", "confidence"})
     assert 0.0 <= res1["confidence"] <= 1.0
+
+
+def test_batch_methods_match_single_calls_and_isolate_failures():
+    llm = LLMMock()
+    gn, vn = ["ГН1", "ГН2"], ["ВН1", "ВН2"]
+    texts = ["PN1 B", " ", "PN2 B"]
+
+    norm = llm.normalize_batch(texts)
+    assert norm[0] == llm.normalize("PN1 B") and norm[2] == llm.normalize("PN2 B")
+    assert isinstance(norm[1], ValueError)
+
+    classif = llm.classify_batch(texts, gn, vn)
+    assert classif[2] == llm.classify(gn, vn, "PN2 B")
+    assert isinstance(classif[1], ValueError)
+
+
+def test_analyze_combines_normalize_and_classify():
+    llm = LLMMock()
+    gn, vn = ["ГН1", "ГН2"], ["ВН1"]
+    out = llm.analyze("PN1 B", gn, vn)
+    assert out == llm.analyze("PN1 B", gn, vn)
+    assert out["local_name"] == llm.normalize("PN1 B")["local_name"]
+    assert {k: out[k] for k in ("gn", "vn", "confidence")} == llm.classify(gn, vn, "PN1 B")
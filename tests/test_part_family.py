@@ -0,0 +1,59 @@
+from metrics import RuntimeCounters
+from part_family import FamilyRules, PartFamilyCache, load_family_rules
+
+RULES = {
+    "default": {"strip_suffixes": ["#?PBF", "TR"], "min_length": 5},
+    "brands": {"Yageo": {"prefix": "^(RC\\d{4})", "min_length": 6}},
+}
+
+
+def _cache(**kwargs):
+    counters = RuntimeCounters()
+    return PartFamilyCache(FamilyRules(RULES), counters=counters, seed=1, **kwargs), counters
+
+
+def test_family_key_by_brand_prefix_and_suffixes():
+    rules = FamilyRules(RULES)
+    assert rules.key("RC0603FR-0710KL", "yageo") == rules.key("RC0603JR-07100RL", "Yageo") == "yageo|RC0603"
+    assert rules.key("LM358DR-TR#PBF", "ST") == "st|LM358DR"
+    # Другой бренд — другое семейство; слишком короткая основа семейства не образует
+    assert rules.key("LM358DR", "TI") != rules.key("LM358DR", "ST")
+    assert rules.key("BAT#PBF", "ST") == ""
+
+
+def test_confident_member_classifies_siblings():
+    cache, counters = _cache()
+    key, family = cache.lookup("RC0603FR-0710KL", "Yageo")
+    assert family is None
+    cache.record(key, "RC0603FR-0710KL", {"gn": "ГН1", "vn": "ВН1"}, 0.95)
+    key, family = cache.lookup("RC0603JR-07100RL", "Yageo")
+    assert (family["gn"], family["vn"], family["partnumber"]) == ("ГН1", "ВН1", "RC0603FR-0710KL")
+    assert counters.get("part_family.hits") == 1
+    assert counters.get("part_family.misses") == 1
+    assert counters.get("part_family.llm_calls_saved") == 1
+
+
+def test_low_confidence_member_is_not_reused():
+    cache, _ = _cache(min_confidence=0.9)
+    key, _ = cache.lookup("RC0603FR-0710KL", "Yageo")
+    cache.record(key, "RC0603FR-0710KL", {"gn": "ГН1", "vn": "ВН1"}, 0.8)
+    assert cache.lookup("RC0603JR-07100RL", "Yageo")[1] is None
+    assert len(cache) == 0
+
+
+def test_spot_check_mismatch_drops_family():
+    cache, counters = _cache(spot_check=1.0)
+    key, _ = cache.lookup("RC0603FR-0710KL", "Yageo")
+    cache.record(key, "RC0603FR-0710KL", {"gn": "ГН1", "vn": "ВН1"}, 0.95)
+    # Каждое попадание проверяется: строку классифицирует LLM
+    key, family = cache.lookup("RC0603JR-07100RL", "Yageo")
+    assert family is None
+    cache.record(key, "RC0603JR-07100RL", {"gn": "ГН2", "vn": "ВН1"}, 0.95)
+    assert counters.get("part_family.spot_checks") == 1
+    assert counters.get("part_family.spot_check_mismatches") == 1
+    assert len(cache) == 0
+
+
+def test_missing_rules_file_falls_back_to_defaults(tmp_path):
+    rules = load_family_rules(tmp_path / "missing.json")
+    assert rules.key("LM358DR-TR", "ST") == "st|LM358DR"
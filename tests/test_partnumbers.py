@@ -0,0 +1,63 @@
+"""Тесты для модуля partnumbers."""
+import asyncio
+import json
+
+import pytest
+
+from partnumbers import SearchSelector, canonicalize_partnumber, order_exact_first
+
+
+def _chunks(items, consumed):
+    """Тело-массив по одному элементу на кусок; ``consumed`` считает прочитанные куски."""
+    yield b"["
+    for i, item in enumerate(items):
+        consumed.append(i)
+        yield (("," if i else "") + json.dumps(item)).encode("utf-8")
+    yield b"]"
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("rc0603fr-07 10k", "RC0603FR0710K"),
+    ("  LM_317.T/ ", "LM317T"),
+    (None, ""),
+])
+def test_canonicalize_partnumber(raw, expected):
+    assert canonicalize_partnumber(raw) == expected
+
+
+def test_order_exact_first_is_stable():
+    items = [{"id": 1, "partnumber": "LM317TX"}, {"id": 2, "partnumber": "lm-317t"}, {"id": 3}]
+    assert [it["id"] for it in order_exact_first(items, "LM317T")] == [2, 1, 3]
+    assert order_exact_first(items, "NOPE") is items
+
+
+def test_selector_stops_at_exact_match():
+    items = [{"partnumber": f"LM317T{i}"} for i in range(5)] + [{"partnumber": "LM317T"}] + [{"partnumber": "X"}] * 100
+    consumed = []
+    selector = SearchSelector("lm317t")
+    res = selector.consume(_chunks(items, consumed))
+    assert res[0] == {"partnumber": "LM317T"}
+    assert len(res) == 6
+    assert selector.exact_found and selector.stopped_early
+    # Остаток тела не читается (максимум один кусок сверх совпадения)
+    assert len(consumed) <= 7
+
+
+def test_selector_stops_at_cap_and_reads_all_without_cap():
+    items = [{"partnumber": f"A{i}"} for i in range(20)]
+    capped = SearchSelector("A", max_items=5)
+    assert len(capped.consume(_chunks(items, []))) == 5
+    assert capped.stopped_early and not capped.exact_found
+
+    full = SearchSelector("A")
+    assert len(full.consume(_chunks(items, []))) == 20
+    assert not full.stopped_early
+
+
+def test_selector_aconsume():
+    async def agen():
+        for chunk in _chunks([{"partnumber": "B1"}, {"partnumber": "B"}], []):
+            yield chunk
+
+    res = asyncio.run(SearchSelector("B").aconsume(agen()))
+    assert res[0]["partnumber"] == "B"
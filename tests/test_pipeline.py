@@ -0,0 +1,235 @@
+"""Тесты для модуля pipeline."""
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+import llm_budget
+from config import Config
+from exceptions import ClientRequestError, ThrottledError
+from gn_vn_mapping import GnVnMapping
+from metrics import RuntimeCounters, get_runtime_counters
+from pipeline import RETRYABLE_REASONS, ProcessingPipeline
+from taxonomy import Taxonomy
+
+
+@pytest.fixture
+def cfg():
+    config = MagicMock(spec=Config)
+    config.confidence_threshold = 0.7
+    config.backoff_base_ms = 0
+    config.backoff_max_ms = 0
+    config.backoff_jitter_ms = 0
+    return config
+
+
+def _clients(search_error):
+    catalog = MagicMock()
+    catalog.search_product.side_effect = search_error
+    lcsc, llm = MagicMock(), MagicMock()
+    return catalog, lcsc, llm
+
+
+@pytest.mark.parametrize("error, reason", [
+    (TimeoutError("down"), "catalog_unavailable"),
+    (ThrottledError("catalog", 429), "catalog_throttled"),
+    (ClientRequestError("catalog", 400), "catalog_rejected"),
+])
+def test_catalog_failure_short_circuits_to_error(cfg, error, reason):
+    catalog, lcsc, llm = _clients(error)
+    row = ProcessingPipeline(cfg, catalog, lcsc, llm).process_single_row({"partnumber": "PN1", "brand": "B"})
+    assert row["status"] == "error"
+    assert row["reason"] == reason
+    assert (reason in RETRYABLE_REASONS) is (reason != "catalog_rejected")
+    # Ни LCSC, ни LLM, ни создания
+    lcsc.search.assert_not_called()
+    llm.normalize.assert_not_called()
+    catalog.create_product.assert_not_called()
+
+
+def test_empty_search_still_goes_to_create(cfg):
+    catalog, lcsc, llm = _clients(None)
+    catalog.search_product.return_value = []
+    lcsc.search.return_value = [{"brand": "LB"}]
+    llm.normalize.return_value = {"attrs": {}}
+    llm.classify.return_value = {"gn": "G", "vn": "V", "confidence": 0.9}
+    row = ProcessingPipeline(cfg, catalog, lcsc, llm).process_single_row({"partnumber": "PN1", "brand": ""})
+    assert (row["action"], row["reason"]) == ("create", "not_found")
+    assert catalog.create_product.call_args.args[0]["brand"] == "LB"
+
+
+def test_row_deadline_skips_remaining_stages(cfg):
+    catalog, lcsc, llm = _clients(None)
+    catalog.search_product.return_value = []
+    cfg.row_deadline_sec = 0.2
+    lcsc.search.side_effect = lambda pn: time.sleep(0.25) or []
+    row = ProcessingPipeline(cfg, catalog, lcsc, llm).process_single_row({"partnumber": "PN1", "brand": "B"})
+    assert (row["status"], row["reason"]) == ("error", "deadline_exceeded")
+    assert "deadline:row:llm_classify" in row["errors"]
+    # Медленная строка не уходит в отложенные повторы
+    assert row["reason"] not in RETRYABLE_REASONS
+    llm.classify.assert_not_called()
+    catalog.create_product.assert_not_called()
+
+
+def test_retry_not_attempted_past_deadline(cfg):
+    catalog, lcsc, llm = _clients(TimeoutError("slow"))
+    cfg.row_deadline_sec = 0.3
+    cfg.catalog_backoff_base_ms = 1000
+    cfg.catalog_backoff_max_ms = 1000
+    cfg.catalog_backoff_jitter_ms = 0
+    started = time.monotonic()
+    row = ProcessingPipeline(cfg, catalog, lcsc, llm).process_single_row({"partnumber": "PN1", "brand": "B"})
+    assert time.monotonic() - started < 0.3
+    assert row["reason"] == "deadline_exceeded"
+    assert catalog.search_product.call_count == 1
+
+
+@pytest.mark.parametrize("error, reason", [
+    (TimeoutError("down"), "update_failed"),
+    (ClientRequestError("catalog", 422), "update_rejected"),
+])
+def test_update_failure_reason_separates_rejections(cfg, error, reason):
+    catalog, lcsc, llm = _clients(None)
+    catalog.search_product.return_value = [{"id": 1, "partnumber": "PN1", "brand": "OLD"}]
+    catalog.update_product.side_effect = error
+    row = ProcessingPipeline(cfg, catalog, lcsc, llm).process_single_row({"partnumber": "PN1", "brand": "B"})
+    assert row["reason"] == reason
+    assert (reason in RETRYABLE_REASONS) is (reason == "update_failed")
+
+
+def test_deferred_mode_makes_single_attempt_and_defers_llm_outage(cfg):
+    catalog, lcsc, llm = _clients(None)
+    cfg.deferred_retries = True
+    catalog.search_product.return_value = []
+    lcsc.search.return_value = []
+    llm.classify.side_effect = TimeoutError("llm down")
+    row = ProcessingPipeline(cfg, catalog, lcsc, llm).process_single_row({"partnumber": "PN1", "brand": "B"})
+    assert (row["status"], row["reason"]) == ("error", "llm_unavailable")
+    assert row["reason"] in RETRYABLE_REASONS
+    assert llm.classify.call_count == 1
+    catalog.create_product.assert_not_called()
+
+
+def test_deferred_mode_keeps_lcsc_retries(cfg):
+    """Сбой LCSC не откладывает строку, поэтому LCSC повторяется по обычной политике."""
+    catalog, lcsc, llm = _clients(None)
+    cfg.deferred_retries = True
+    catalog.search_product.return_value = []
+    lcsc.search.side_effect = [TimeoutError("lcsc down"), [{"brand": "LB"}]]
+    llm.normalize.return_value = {"attrs": {}}
+    llm.classify.return_value = {"gn": "G", "vn": "V", "confidence": 0.9}
+    row = ProcessingPipeline(cfg, catalog, lcsc, llm).process_single_row({"partnumber": "PN1", "brand": ""})
+    assert row["action"] == "create"
+    assert lcsc.search.call_count == 2
+    assert catalog.create_product.call_args.args[0]["brand"] == "LB"
+
+
+def test_analyze_mode_makes_one_llm_call(cfg):
+    catalog, lcsc, llm = _clients(None)
+    cfg.llm_analyze = True
+    catalog.search_product.return_value = []
+    lcsc.search.return_value = []
+    llm.analyze.return_value = {"local_name": "PN1", "attrs": {"k": "v"}, "gn": "ГН2", "vn": "ВН1", "confidence": 0.9}
+    row = ProcessingPipeline(cfg, catalog, lcsc, llm).process_single_row({"partnumber": "PN1", "brand": "B"})
+    assert (row["action"], row["gn"], row["vn"]) == ("create", "ГН2", "ВН1")
+    assert '"k"' in row["attrs_norm"]
+    llm.analyze.assert_called_once()
+    llm.normalize.assert_not_called()
+    llm.classify.assert_not_called()
+
+
+def test_low_confidence_skips_normalize(cfg):
+    catalog, lcsc, llm = _clients(None)
+    catalog.search_product.return_value = []
+    lcsc.search.return_value = []
+    llm.classify.return_value = {"gn": "ГН1", "vn": "ВН1", "confidence": 0.1}
+    before = get_runtime_counters().get("llm.normalize_avoided")
+    row = ProcessingPipeline(cfg, catalog, lcsc, llm).process_single_row({"partnumber": "PN1", "brand": "B"})
+    assert row["reason"] == "low_confidence"
+    llm.normalize.assert_not_called()
+    assert get_runtime_counters().get("llm.normalize_avoided") == before + 1
+
+
+def test_create_path_normalizes_after_classify(cfg):
+    catalog, lcsc, llm = _clients(None)
+    catalog.search_product.return_value = []
+    lcsc.search.return_value = []
+    llm.classify.return_value = {"gn": "ГН1", "vn": "ВН1", "confidence": 0.9}
+    llm.normalize.return_value = {"local_name": "PN1", "attrs": {"k": "v"}}
+    row = ProcessingPipeline(cfg, catalog, lcsc, llm).process_single_row({"partnumber": "PN1", "brand": "B"})
+    assert row["action"] == "create"
+    assert '"k"' in row["attrs_norm"]
+    llm.normalize.assert_called_once()
+    catalog.create_product.assert_called_once()
+
+
+def test_mapped_category_bypasses_llm_classify(cfg, monkeypatch):
+    import pipeline
+
+    mapping = GnVnMapping([{"category": "Resistor", "gn": "ГН2", "vn": "ВН3"}], counters=RuntimeCounters())
+    monkeypatch.setattr(pipeline, "get_gn_vn_mapping", lambda cfg: mapping)
+    catalog, lcsc, llm = _clients(None)
+    catalog.search_product.return_value = []
+    lcsc.search.return_value = [{"partnumber": "PN1", "brand": "B", "category": "Resistor"}]
+    llm.normalize.return_value = {"attrs": {}}
+    row = ProcessingPipeline(cfg, catalog, lcsc, llm).process_single_row({"partnumber": "PN1", "brand": "B"})
+    assert (row["action"], row["gn"], row["vn"]) == ("create", "ГН2", "ВН3")
+    assert (row["category"], row["gn_vn_source"]) == ("Resistor", "mapping")
+    llm.classify.assert_not_called()
+    assert mapping.counters.get("gn_vn_mapping.hits") == 1
+
+
+def test_taxonomy_prunes_classify_candidates(cfg, monkeypatch):
+    import pipeline
+
+    gn = [{"code": f"ГН{i}", "keywords": [f"kw{i}"]} for i in range(50)]
+    taxonomy = Taxonomy(gn, ["ВН1", "ВН2"], counters=RuntimeCounters())
+    monkeypatch.setattr(pipeline, "get_taxonomy", lambda cfg, fallback, catalog: taxonomy)
+    cfg.taxonomy_top_k = 3
+    catalog, lcsc, llm = _clients(None)
+    catalog.search_product.return_value = []
+    lcsc.search.return_value = []
+    llm.classify.return_value = {"gn": "ГН42", "vn": "ВН1", "confidence": 0.1}
+    ProcessingPipeline(cfg, catalog, lcsc, llm).process_single_row({"partnumber": "PN1", "brand": "kw42"})
+    gn_candidates, vn_candidates, _ = llm.classify.call_args[0]
+    assert gn_candidates == ["ГН42", "ГН0", "ГН1"]
+    assert vn_candidates == ["ВН1", "ВН2"]
+
+
+def test_llm_budget_exhausted_defers_row(cfg, monkeypatch):
+    catalog, lcsc, llm = _clients(None)
+    cfg.llm_budget_calls = 1
+    catalog.search_product.return_value = []
+    lcsc.search.return_value = []
+    llm.classify.return_value = {"gn": "ГН1", "vn": "ВН1", "confidence": 0.9}
+    monkeypatch.setattr(llm_budget, "_llm_budget", None)
+    llm_budget.reset_llm_budget(cfg)
+    pipeline = ProcessingPipeline(cfg, catalog, lcsc, llm_budget.budget_llm_client(llm, cfg))
+    row = pipeline.process_single_row({"partnumber": "PN1", "brand": "B"})
+    assert (row["action"], row["reason"]) == ("skip", "llm_budget_exhausted")
+    # Отказ бюджета не повторяется
+    assert row["errors"] == "llm_normalize:LLMBudgetExhaustedError:attempt1;llm_budget:calls"
+    llm.normalize.assert_not_called()
+    catalog.create_product.assert_not_called()
+
+
+def test_part_family_reuses_classification_for_siblings(cfg, tmp_path):
+    rules = tmp_path / "families.json"
+    rules.write_text('{"brands": {"Yageo": {"prefix": "^(RC\\\\d{4})"}}}', encoding="utf-8")
+    cfg.part_family = True
+    cfg.part_family_rules_file = str(rules)
+    catalog, lcsc, llm = _clients(None)
+    catalog.search_product.return_value = []
+    lcsc.search.return_value = []
+    llm.normalize.return_value = {"attrs": {}}
+    llm.classify.return_value = {"gn": "ГН1", "vn": "ВН2", "confidence": 0.95}
+    pipeline = ProcessingPipeline(cfg, catalog, lcsc, llm)
+    first = pipeline.process_single_row({"partnumber": "RC0603FR-0710KL", "brand": "Yageo"})
+    sibling = pipeline.process_single_row({"partnumber": "RC0603JR-07100RL", "brand": "Yageo"})
+    assert (first["gn_vn_source"], sibling["gn_vn_source"]) == ("llm", "family")
+    assert (sibling["action"], sibling["gn"], sibling["vn"]) == ("create", "ГН1", "ВН2")
+    assert sibling["part_family"] == "yageo|RC0603"
+    assert llm.classify.call_count == 1
+    # Нормализация (атрибуты варианта) нужна каждому создаваемому товару
+    assert llm.normalize.call_count == 2
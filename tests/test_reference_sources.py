@@ -0,0 +1,101 @@
+import threading
+import time
+
+import pytest
+
+from metrics import RuntimeCounters
+from mocks.reference_mock import DigikeyMock, MouserMock
+from reference_sources import ReferenceSources
+
+
+class Source:
+    def __init__(self, items, delay=0.0, error=None):
+        self.items = items
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    def search(self, partnumber):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return [dict(item) for item in self.items]
+
+
+def _registry(sources, **kw):
+    counters = RuntimeCounters()
+    return ReferenceSources(sources, counters=counters, **kw), counters
+
+
+def test_first_exact_match_wins_without_waiting_for_slow_sources():
+    slow = Source([{"partnumber": "PN1", "brand": "SLOW"}], delay=0.5)
+    fast = Source([{"partnumber": "PN1", "brand": "FAST"}], delay=0.01)
+    registry, counters = _registry({"lcsc": slow, "digikey": fast})
+    started = time.monotonic()
+    found = registry.search("PN1")
+    assert time.monotonic() - started < 0.4
+    assert found[0] == {"partnumber": "PN1", "brand": "FAST", "source": "digikey"}
+    assert counters.get("ref.digikey.wins") == 1
+    assert counters.get("ref.digikey.win_rate") == 1.0
+    assert counters.get("ref.cancelled") == 1
+
+
+def test_substring_results_do_not_win():
+    fuzzy = Source([{"partnumber": "PN10", "brand": "A"}])
+    exact = Source([{"partnumber": "pn-1", "brand": "B"}], delay=0.05)
+    registry, _ = _registry({"lcsc": fuzzy, "mouser": exact})
+    assert registry.search("PN1")[0]["source"] == "mouser"
+
+
+def test_without_exact_match_results_are_merged_in_registry_order():
+    registry, counters = _registry({
+        "lcsc": Source([{"partnumber": "PN10", "brand": "A"}], delay=0.05),
+        "digikey": Source([{"partnumber": "PN11", "brand": "B"}]),
+    })
+    assert [item["brand"] for item in registry.search("PN1")] == ["A", "B"]
+    assert counters.get("ref.lcsc.wins") == 0
+
+
+def test_failed_sources_are_ignored_unless_all_fail():
+    registry, counters = _registry({
+        "lcsc": Source([], error=TimeoutError("down")),
+        "digikey": Source([{"partnumber": "PN1", "brand": "B"}], delay=0.02),
+    })
+    assert registry.search("PN1")[0]["brand"] == "B"
+    assert counters.get("ref.lcsc.errors") == 1
+
+    registry, _ = _registry({"lcsc": Source([], error=TimeoutError("down")), "mouser": Source([], error=RuntimeError())})
+    with pytest.raises((TimeoutError, RuntimeError)):
+        registry.search("PN1")
+
+
+def test_quorum_waits_for_agreeing_sources_and_orders_by_votes():
+    registry, _ = _registry({
+        "lcsc": Source([{"partnumber": "PN1", "brand": "ODD"}]),
+        "digikey": Source([{"partnumber": "PN1", "brand": "TI"}], delay=0.03),
+        "mouser": Source([{"partnumber": "PN1", "brand": "TI"}], delay=0.06),
+    }, mode="quorum", quorum=3)
+    found = registry.search("PN1")
+    assert [item["brand"] for item in found] == ["TI", "TI", "ODD"]
+    assert registry.get_stats()["lcsc"]["wins"] == 1
+
+
+def test_calls_run_concurrently():
+    barrier = threading.Barrier(2, timeout=1)
+
+    class Meeting(Source):
+        def search(self, partnumber):
+            barrier.wait()
+            return super().search(partnumber)
+
+    registry, _ = _registry({"lcsc": Meeting([]), "digikey": Meeting([])})
+    assert registry.search("PN1") == []
+
+
+def test_reference_mocks_are_deterministic_per_source():
+    digikey, mouser = DigikeyMock(max_delay_ms=10), MouserMock(max_delay_ms=10)
+    assert digikey.search("PN1") == DigikeyMock(max_delay_ms=10).search("PN1")
+    assert digikey.search("PN1")[0]["datasheet_url"].startswith("https://digikey.example/")
+    assert 0 <= mouser.delay_ms("PN1") <= 10
+    assert MouserMock(profile="missing").search("PN1") == []
@@ -52,3 +52,28 @@ def test_save_report_creates_file_and_columns(tmp_path):
     assert isinstance(v, str)
     parsed = json.loads(v) if v else {}
     assert parsed == {"k": "v"}
+
+
+def test_metrics_sheet_includes_llm_cache(tmp_path):
+    from metrics import ProcessingMetrics
+
+    metrics = ProcessingMetrics()
+    metrics.merge_runtime({"llm_cache.hits": 3, "llm_cache.misses": 1, "llm_cache.lookup_ms": 2.0})
+    fname = save_report([{"partnumber": "PN1", "status": "skip"}], str(tmp_path / "out.xlsx"), metrics=metrics)
+
+    sheet = pd.read_excel(fname, sheet_name="metrics")
+    values = dict(zip(sheet["metric"], sheet["value"], strict=True))
+    assert values["llm_cache_hits"] == 3
+    assert values["llm_cache_hit_rate"] == 0.75
+
+
+def test_metrics_sheet_includes_gn_vn_mapping(tmp_path):
+    from metrics import ProcessingMetrics
+
+    metrics = ProcessingMetrics()
+    metrics.merge_runtime({"gn_vn_mapping.hits": 1, "gn_vn_mapping.misses": 3})
+    fname = save_report([{"partnumber": "PN1", "status": "create"}], str(tmp_path / "out.xlsx"), metrics=metrics)
+
+    sheet = pd.read_excel(fname, sheet_name="metrics")
+    values = dict(zip(sheet["metric"], sheet["value"], strict=True))
+    assert values["gn_vn_mapping_hit_rate"] == 0.25
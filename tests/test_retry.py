@@ -0,0 +1,113 @@
+"""Тесты для модуля retry."""
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from exceptions import RetryExhaustedError
+from metrics import RuntimeCounters
+from retry import RetryBudget, RetryPolicy
+
+
+def _policy(**kwargs):
+    kwargs.setdefault("counters", RuntimeCounters())
+    return RetryPolicy(attempts=3, backoff_base_ms=0, backoff_jitter_ms=0, **kwargs)
+
+
+def _flaky(failures: int):
+    state = {"calls": 0}
+
+    def fn():
+        state["calls"] += 1
+        if state["calls"] <= failures:
+            raise TimeoutError("boom")
+        return "ok"
+
+    return fn, state
+
+
+def test_retries_until_success_and_counts_attempts():
+    policy = _policy()
+    fn, state = _flaky(2)
+    errors = []
+    assert policy.call(fn, tag="catalog_search", errors_list=errors) == "ok"
+    assert state["calls"] == 3
+    assert errors == ["catalog_search:TimeoutError:attempt1", "catalog_search:TimeoutError:attempt2"]
+    assert policy.counters.get("retry.catalog_search.attempts") == 3
+    assert policy.counters.get("retry.catalog_search.retries") == 2
+
+
+def test_exhaustion_raises_and_non_retryable_propagates():
+    policy = _policy()
+    fn, _ = _flaky(10)
+    with pytest.raises(RetryExhaustedError) as exc:
+        policy.call(fn, tag="t")
+    assert exc.value.attempts == 3
+    assert policy.counters.get("retry.t.exhausted") == 1
+
+    fn, state = _flaky(10)
+    with pytest.raises(TimeoutError):
+        policy.call(fn, tag="t", retry_on=(ValueError,))
+    assert state["calls"] == 1
+
+
+def test_nested_policies_do_not_multiply_attempts():
+    outer, inner = _policy(), _policy()
+    fn, state = _flaky(10)
+    with pytest.raises(RetryExhaustedError):
+        outer.call(lambda: inner.call(fn, tag="inner"), tag="outer")
+    assert state["calls"] == 3
+
+
+def test_budget_bounds_retries_per_run():
+    budget = RetryBudget(ratio=0.0, min_retries=1)
+    policy = _policy(budget=budget)
+    fn, state = _flaky(10)
+    with pytest.raises(RetryExhaustedError):
+        policy.call(fn, tag="t")
+    # Одна попытка + единственный повтор из бюджета
+    assert state["calls"] == 2
+    assert policy.counters.get("retry.budget_denied") == 1
+    budget.reset()
+    assert budget.try_spend()
+
+
+def test_budget_grows_with_calls():
+    budget = RetryBudget(ratio=0.5, min_retries=0)
+    for _ in range(4):
+        budget.record_call()
+    assert [budget.try_spend() for _ in range(3)] == [True, True, False]
+
+
+def test_backoff_is_exponential_and_capped():
+    policy = RetryPolicy(backoff_base_ms=100, backoff_max_ms=300, backoff_jitter_ms=0, counters=RuntimeCounters())
+    assert [policy.backoff_sec(i) for i in (1, 2, 3)] == [0.1, 0.2, 0.3]
+    with patch("retry.time.sleep") as msleep:
+        fn, _ = _flaky(2)
+        policy.call(fn, tag="t")
+    assert [c.args[0] for c in msleep.call_args_list] == [0.1, 0.2]
+
+
+def test_from_config_uses_service_settings():
+    cfg = type("Cfg", (), {"llm_retries": 5, "llm_backoff_base_ms": 7, "backoff_base_ms": 50})()
+    assert RetryPolicy.from_config(cfg, "llm").attempts == 5
+    assert RetryPolicy.from_config(cfg, "llm").backoff_base_ms == 7
+    general = RetryPolicy.from_config(cfg)
+    assert general.attempts == 3 and general.backoff_base_ms == 50
+
+
+def test_call_async_retries_and_nests():
+    policy, inner = _policy(), _policy()
+    state = {"calls": 0}
+
+    async def fn():
+        state["calls"] += 1
+        if state["calls"] < 3:
+            raise TimeoutError("boom")
+        return "ok"
+
+    async def wrapped():
+        return await inner.call_async(fn, tag="inner")
+
+    assert asyncio.run(policy.call_async(wrapped, tag="outer")) == "ok"
+    assert state["calls"] == 3
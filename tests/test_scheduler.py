@@ -0,0 +1,126 @@
+"""Тесты планировщика полос interactive/batch."""
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+from metrics import RuntimeCounters
+from scheduler import (
+    HEARTBEAT_STALE_SEC,
+    LaneScheduler,
+    ScheduledClient,
+    current_lane,
+    get_scheduler,
+    lane_scope,
+)
+
+
+def _scheduler(rate=50.0, **kwargs):
+    return LaneScheduler("llm", rate, {"interactive": 4.0, "batch": 1.0}, burst=1.0, counters=RuntimeCounters(), **kwargs)
+
+
+def test_lane_scope():
+    assert current_lane() == "batch"
+    with lane_scope("interactive"):
+        assert current_lane() == "interactive"
+    assert current_lane() == "batch"
+    with pytest.raises(ValueError):
+        with lane_scope("urgent"):
+            pass
+
+
+def test_rate_limit_is_enforced():
+    sched = _scheduler(rate=100.0)
+    started = time.monotonic()
+    for _ in range(11):
+        sched.acquire("batch")
+    # burst=1: 10 разрешений сверх начального — не быстрее 0.1 с
+    assert time.monotonic() - started >= 0.09
+
+
+def test_interactive_lane_gets_weighted_share_under_contention():
+    sched = _scheduler(rate=200.0)
+    order: list[str] = []
+    lock = threading.Lock()
+
+    def worker(lane, n):
+        for _ in range(n):
+            sched.acquire(lane)
+            with lock:
+                order.append(lane)
+
+    threads = [threading.Thread(target=worker, args=("batch", 40)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    interactive = threading.Thread(target=worker, args=("interactive", 10))
+    interactive.start()
+    interactive.join()
+    # 10 интерактивных разрешений выданы, пока пакетные продолжают идти: на каждое пакетное ~4 интерактивных
+    done_at = max(i for i, lane in enumerate(order) if lane == "interactive")
+    first = order.index("interactive")
+    batch_between = order[first:done_at].count("batch")
+    assert batch_between <= 5
+    for t in threads:
+        t.join()
+
+
+def test_peer_heartbeat_reduces_share(tmp_path):
+    peer = tmp_path / f"llm.interactive.{os.getpid() + 1}"
+    peer.touch()
+    sched = _scheduler(heartbeat_dir=str(tmp_path))
+    sched.acquire("batch")
+    # Своя полоса batch (1) против чужой interactive (4)
+    assert abs(sched.share() - 0.2) < 1e-9
+    assert (tmp_path / f"llm.batch.{os.getpid()}").exists()
+
+
+def test_heartbeat_files_are_removed_and_stale_ones_pruned(tmp_path):
+    stale = tmp_path / f"llm.batch.{os.getpid() + 2}"
+    stale.touch()
+    old = time.time() - HEARTBEAT_STALE_SEC - 1
+    os.utime(stale, (old, old))
+    sched = _scheduler(heartbeat_dir=str(tmp_path))
+    sched.acquire("batch")
+    assert sched.share() == 1.0
+    assert not stale.exists()
+    sched.remove_heartbeats()
+    assert not (tmp_path / f"llm.batch.{os.getpid()}").exists()
+
+
+def test_heartbeat_io_runs_outside_the_queue_lock(tmp_path, monkeypatch):
+    sched = _scheduler(heartbeat_dir=str(tmp_path))
+    held = []
+    real_listdir = os.listdir
+
+    def listdir(path):
+        held.append(sched._lock.locked())
+        return real_listdir(path)
+
+    monkeypatch.setattr(os, "listdir", listdir)
+    sched.acquire("batch")
+    asyncio.run(sched.acquire_async("interactive"))
+    assert held and not any(held)
+
+
+def test_scheduled_client_acquires_per_call():
+    class Client:
+        label = "x"
+
+        def search(self, pn):
+            return [pn]
+
+    sched = _scheduler()
+    client = ScheduledClient(Client(), sched)
+    assert client.search("A") == ["A"]
+    assert client.label == "x"
+    assert sched.counters.get("sched.llm.batch.granted") == 1
+
+
+def test_get_scheduler_disabled_without_rate_limit():
+    class Cfg:
+        llm_rate_limit = 0.0
+
+    assert get_scheduler(Cfg(), "llm") is None
@@ -0,0 +1,80 @@
+"""Тесты для модуля serialization."""
+import json
+import types
+
+import pytest
+
+import serialization
+
+
+@pytest.fixture(params=["fast", "stdlib"])
+def backend(request, monkeypatch):
+    if request.param == "stdlib":
+        monkeypatch.setattr(serialization, "orjson", None)
+    elif serialization.orjson is None:
+        pytest.skip("orjson not installed")
+    return request.param
+
+
+def test_dumps_matches_stdlib_unicode_and_compact(backend):
+    data = {"name": "Резистор", "attrs": {"v": "3.3В"}, "n": 1}
+    out = serialization.dumps(data)
+    assert out == json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    assert serialization.dumps_bytes(data) == out.encode("utf-8")
+
+
+def test_loads_bytes_and_str(backend):
+    raw = '[{"brand": "ТИ"}]'
+    assert serialization.loads(raw.encode("utf-8")) == [{"brand": "ТИ"}]
+    assert serialization.loads(raw) == [{"brand": "ТИ"}]
+    with pytest.raises(serialization.JSONDecodeError):
+        serialization.loads(b"")
+
+
+def test_dumps_falls_back_for_unsupported_keys(backend):
+    # orjson не принимает нестроковые ключи — используется стандартный json
+    assert serialization.dumps({1: "a"}) == '{"1":"a"}'
+
+
+def test_dumps_report_keeps_stdlib_separators():
+    assert serialization.dumps_report({"k": "в"}) == '{"k": "в"}'
+
+
+def test_response_json_prefers_raw_content():
+    resp = types.SimpleNamespace(content=b'{"a": 1}', json=lambda: pytest.fail("json() must not be used"))
+    assert serialization.response_json(resp) == {"a": 1}
+    legacy = types.SimpleNamespace(json=lambda: [1])
+    assert serialization.response_json(legacy) == [1]
+
+
+def test_json_array_stream_yields_items_across_chunk_boundaries():
+    raw = '[{"partnumber": "Резистор"}, 12, [1, 2], "x"]'.encode("utf-8")
+    parser = serialization.JSONArrayStream()
+    items = []
+    for i in range(len(raw)):
+        items.extend(parser.feed(raw[i:i + 1]))
+    items.extend(parser.close())
+    assert items == [{"partnumber": "Резистор"}, 12, [1, 2], "x"]
+
+
+def test_json_array_stream_returns_complete_items_before_end():
+    parser = serialization.JSONArrayStream()
+    assert parser.feed(b'[{"a": 1}, {"b": 2}, {"c"') == [{"a": 1}, {"b": 2}]
+    assert not parser.finished
+
+
+def test_json_array_stream_rejects_non_array_and_truncated_body():
+    with pytest.raises(serialization.JSONDecodeError):
+        serialization.JSONArrayStream().feed(b'{"a": 1}')
+    parser = serialization.JSONArrayStream()
+    parser.feed(b'[{"a": 1}, {"b"')
+    with pytest.raises(serialization.JSONDecodeError):
+        parser.close()
+
+
+@pytest.mark.parametrize("raw", [b"[1,,2]", b"[,1]", b"[1,]", b"[1 2]", b'[{"a": 1} {"b": 2}]'])
+def test_json_array_stream_rejects_malformed_separators(raw):
+    parser = serialization.JSONArrayStream()
+    with pytest.raises(serialization.JSONDecodeError):
+        parser.feed(raw)
+        parser.close()
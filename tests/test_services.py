@@ -80,3 +80,43 @@ def test_get_llm_client_raises_when_real(monkeypatch):
     monkeypatch.setenv("USE_MOCKS", "0")
     with pytest.raises(NotImplementedError):
         get_llm_client()
+
+
+def test_get_lcsc_client_races_extra_reference_sources(monkeypatch):
+    monkeypatch.setenv("USE_MOCKS", "1")
+    monkeypatch.setenv("MOCK_PROFILE", "happy")
+    monkeypatch.setenv("REFERENCE_SOURCES", "digikey,mouser")
+    client = get_lcsc_client()
+    assert client.names == ["lcsc", "digikey", "mouser"]
+    res = client.search("ABC123")
+    assert res and res[0]["partnumber"] == "ABC123"
+    assert res[0]["source"] in client.names
+
+
+def test_get_llm_client_is_cached_when_enabled(monkeypatch, tmp_path):
+    from cache import CachedLLMClient
+
+    monkeypatch.setenv("USE_MOCKS", "1")
+    monkeypatch.setenv("MOCK_PROFILE", "happy")
+    monkeypatch.setenv("LLM_CACHE", "1")
+    monkeypatch.setenv("LLM_CACHE_DIR", str(tmp_path / "llm"))
+    client = get_llm_client()
+    assert isinstance(client, CachedLLMClient)
+    assert client.normalize("PN1") == client.normalize("PN1")
+    assert client.cache.version == "v1"
+
+
+def test_hedgers_are_shared_per_service_and_closed(monkeypatch):
+    import services
+
+    monkeypatch.setenv("USE_MOCKS", "1")
+    monkeypatch.setenv("HEDGE_ENABLED", "1")
+    cfg = load_config()
+    hedger = services._make_hedger(cfg, "catalog_search")
+    assert services._make_hedger(cfg, "catalog_search") is hedger
+    assert services._make_hedger(cfg, "lcsc_search") is not hedger
+
+    services.close_hedgers()
+    assert hedger._executor._shutdown
+    assert services._make_hedger(cfg, "catalog_search") is not hedger
+    services.close_hedgers()
@@ -0,0 +1,61 @@
+import time
+
+from metrics import RuntimeCounters
+from serialization import dumps
+from taxonomy import Taxonomy, load_taxonomy, tokenize
+
+FALLBACK = (["ГН1", "ГН2"], ["ВН1"])
+
+
+def _taxonomy(size=200):
+    gn = [{"code": f"ГН{i}", "name": f"Группа {i}", "keywords": [f"kw{i}"]} for i in range(size)]
+    gn.append({"code": "ГН-R", "name": "Резисторы", "keywords": ["resistor"], "categories": ["Resistor"]})
+    vn = [{"code": f"ВН{i}", "keywords": [f"kw{i}"]} for i in range(size)]
+    return Taxonomy(gn, vn, counters=RuntimeCounters())
+
+
+def test_tokenize_is_case_insensitive_and_drops_short_tokens():
+    assert tokenize("RC0603 Yageo / резистор 1 Ом") == {"rc0603", "yageo", "резистор", "ом"}
+
+
+def test_candidates_are_pruned_to_top_k_by_category_and_keywords():
+    taxonomy = _taxonomy()
+    gn, vn = taxonomy.candidates("PN1 kw7", category="resistor", top_k=5)
+    assert gn[:2] == ["ГН-R", "ГН7"]
+    assert len(gn) == len(vn) == 5
+    assert vn[0] == "ВН7"
+    assert taxonomy.counters.get("taxonomy.candidates") == 10
+
+
+def test_small_taxonomy_is_sent_whole():
+    taxonomy = Taxonomy(["ГН1", "ГН2"], ["ВН1"], counters=RuntimeCounters())
+    assert taxonomy.candidates("anything", top_k=5) == (["ГН1", "ГН2"], ["ВН1"])
+
+
+def test_load_uses_fresh_cache_without_fetching(tmp_path):
+    path = tmp_path / "taxonomy.json"
+    path.write_text(dumps({"gn": ["ГН9"], "vn": ["ВН9"], "fetched_at": time.time()}), encoding="utf-8")
+    calls = []
+    taxonomy = load_taxonomy(lambda: calls.append(1) or {}, path, 1.0, FALLBACK, counters=RuntimeCounters())
+    assert (taxonomy.codes("gn"), calls) == (["ГН9"], [])
+
+
+def test_load_fetches_when_stale_and_refreshes_cache(tmp_path):
+    path = tmp_path / "taxonomy.json"
+    path.write_text(dumps({"gn": ["OLD"], "vn": [], "fetched_at": 0}), encoding="utf-8")
+    counters = RuntimeCounters()
+    taxonomy = load_taxonomy(lambda: {"gn": ["ГН5"], "vn": ["ВН5"]}, path, 1.0, FALLBACK, counters=counters)
+    assert taxonomy.codes("gn") == ["ГН5"]
+    assert counters.get("taxonomy.fetches") == 1
+    again = load_taxonomy(lambda: {"gn": ["NEW"]}, path, 1.0, FALLBACK, counters=counters)
+    assert again.codes("gn") == ["ГН5"]
+
+
+def test_load_falls_back_on_fetch_failure(tmp_path):
+    def fail():
+        raise TimeoutError("catalog down")
+
+    path = tmp_path / "taxonomy.json"
+    assert load_taxonomy(fail, path, 1.0, FALLBACK, counters=RuntimeCounters()).codes("gn") == ["ГН1", "ГН2"]
+    path.write_text(dumps({"gn": ["STALE"], "vn": [], "fetched_at": 0}), encoding="utf-8")
+    assert load_taxonomy(fail, path, 1.0, FALLBACK, counters=RuntimeCounters()).codes("gn") == ["STALE"]
@@ -0,0 +1,192 @@
+"""Тесты для модуля transport и HTTP/2-пути реальных клиентов."""
+import asyncio
+import json
+
+import pytest
+import requests
+
+from catalog_api import CatalogAPI
+from llm_client import LLMClientReal
+from mocks.http_stub_server import StubServer
+from partnumbers import SearchSelector
+from transport import (
+    async_request,
+    async_stream_search,
+    close_sync_transports,
+    get_sync_transport,
+    status_error,
+)
+
+httpx = pytest.importorskip("httpx")
+
+
+def _stub_transport(server: StubServer):
+    def handler(request):
+        query = {k: v for k, v in request.url.params.items()}
+        status, payload = server.handle(request.method, request.url.path, query, request.content, dict(request.headers))
+        return httpx.Response(status, json=payload)
+
+    return handler
+
+
+def test_http1_transport_is_requests_module():
+    assert get_sync_transport("http1") is requests
+
+
+def test_http2_transport_is_shared_httpx_client():
+    a = get_sync_transport("http2", max_connections=2)
+    b = get_sync_transport("http2", max_connections=2)
+    assert isinstance(a, httpx.Client)
+    assert a is b
+
+
+def test_close_sync_transports_drops_shared_clients():
+    client = get_sync_transport("http2", max_connections=3)
+    close_sync_transports()
+    assert client.is_closed
+    assert get_sync_transport("http2", max_connections=3) is not client
+
+
+def test_unknown_transport_rejected():
+    with pytest.raises(ValueError):
+        get_sync_transport("http3")
+
+
+def test_catalog_and_llm_clients_over_httpx_client():
+    client = httpx.Client(transport=httpx.MockTransport(_stub_transport(StubServer())))
+    api = CatalogAPI(base_url="http://stub", api_key="k", retries=1, http=client)
+    res = api.search_product("ABC123")
+    assert res and res[0]["partnumber"] == "ABC123"
+
+    llm = LLMClientReal("http://stub", retries=1, http=client)
+    out = llm.classify(["G1"], ["V1"], "text")
+    assert out["gn"] == "G1" and out["vn"] == "V1"
+
+    combined = llm.analyze("text", ["G1"], ["V1"])
+    assert combined["gn"] == "G1" and combined["attrs"] == llm.normalize("text")["attrs"]
+
+
+def test_transport_errors_from_httpx_are_retried():
+    calls = {"n": 0}
+
+    def handler(request):
+        calls["n"] += 1
+        if calls["n"] == 1:
+            raise httpx.ConnectTimeout("boom", request=request)
+        return httpx.Response(200, json=[{"id": "p1", "partnumber": "X"}])
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    api = CatalogAPI(base_url="http://stub", api_key="k", retries=2, backoff_base_ms=0, backoff_jitter_ms=0, http=client)
+    assert api.search_product("X")[0]["id"] == "p1"
+    assert calls["n"] == 2
+
+
+def test_async_request_with_httpx_session():
+    async def run():
+        transport = httpx.MockTransport(_stub_transport(StubServer()))
+        async with httpx.AsyncClient(transport=transport) as session:
+            return await async_request(session, "GET", "http://stub/search", params={"q": "ABC"})
+
+    status, data = asyncio.run(run())
+    assert status == 200
+    assert data[0]["partnumber"] == "ABC"
+
+
+def test_streaming_search_over_httpx_client():
+    client = httpx.Client(transport=httpx.MockTransport(_stub_transport(StubServer(profile="conflict"))))
+    api = CatalogAPI(base_url="http://stub", api_key="k", retries=1, http=client, stream_search=True)
+    res = api.search_product("ABC123")
+    assert res and res[0]["partnumber"] == "ABC123"
+
+
+def test_async_stream_search_with_httpx_session():
+    async def run():
+        transport = httpx.MockTransport(_stub_transport(StubServer()))
+        async with httpx.AsyncClient(transport=transport) as session:
+            return await async_stream_search(
+                session, "http://stub/search", SearchSelector("ABC"), params={"q": "ABC"}
+            )
+
+    status, data = asyncio.run(run())
+    assert status == 200
+    assert data[0]["partnumber"] == "ABC"
+
+
+def test_stub_server_deduplicates_writes_by_idempotency_key():
+    server = StubServer()
+    client = httpx.Client(transport=httpx.MockTransport(_stub_transport(server)))
+    api = CatalogAPI(base_url="http://stub", api_key="k", retries=1, http=client, run_id="run-1")
+    api.create_product({"partnumber": "ABC", "brand": "TI"})
+    api.create_product({"partnumber": "abc", "brand": "TI"})
+    assert server.catalog.writes == 1
+
+
+@pytest.mark.parametrize("status, cls_name, retryable", [
+    (500, "TransientServiceError", True),
+    (408, "TransientServiceError", True),
+    (429, "ThrottledError", True),
+    (404, "NotFoundError", False),
+    (422, "ClientRequestError", False),
+])
+def test_status_error_classes(status, cls_name, retryable):
+    err = status_error("catalog", status, {"Retry-After": "3"})
+    assert type(err).__name__ == cls_name
+    assert err.retryable is retryable
+    assert err.status == status and err.retry_after == 3.0
+    assert err.service_name == "catalog"
+
+
+def test_catalog_batch_search_over_stub():
+    client = httpx.Client(transport=httpx.MockTransport(_stub_transport(StubServer(profile="happy"))))
+    api = CatalogAPI(base_url="http://stub", api_key="k", retries=1, http=client, search_fields=("id", "partnumber"))
+    found = api.search_products(["ABC", "XYZ"])
+    assert [items[0]["partnumber"] for items in found] == ["ABC", "XYZ"]
+    assert set(found[0][0]) == {"id", "partnumber"}
+
+
+def test_chunk_by_budget_limits_items_and_tokens():
+    from llm_client import chunk_by_budget
+
+    assert chunk_by_budget(["a" * 4] * 5, max_items=2, max_tokens=100) == [[0, 1], [2, 3], [4]]
+    # 40 символов ~ 10 токенов; накладные расходы кандидатов считаются на каждый пакет
+    assert chunk_by_budget(["a" * 40] * 3, max_items=10, max_tokens=25, overhead=5) == [[0, 1], [2]]
+    assert chunk_by_budget(["a" * 400, "b"], max_items=10, max_tokens=20) == [[0], [1]]
+
+
+def test_llm_batch_calls_over_stub_report_item_failures():
+    requests_seen = []
+    handler = _stub_transport(StubServer())
+
+    def counting(request):
+        requests_seen.append(request.url.path)
+        return handler(request)
+
+    client = httpx.Client(transport=httpx.MockTransport(counting))
+    llm = LLMClientReal("http://stub", retries=1, http=client, batch_size=2)
+    single = LLMClientReal("http://stub", retries=1, http=client)
+
+    out = llm.classify_batch(["PN1", "", "PN3"], ["G1", "G2"], ["V1"])
+    assert requests_seen == ["/classify/batch", "/classify/batch"]
+    assert out[0] == single.classify(["G1", "G2"], ["V1"], "PN1")
+    assert type(out[1]).__name__ == "LLMError"
+    assert out[2]["vn"] == "V1"
+
+    norm = llm.normalize_batch(["PN1"])
+    assert norm == [single.normalize("PN1")]
+
+
+def test_llm_batch_chunk_failure_does_not_fail_other_chunks():
+    calls = {"n": 0}
+
+    def handler(request):
+        calls["n"] += 1
+        if calls["n"] == 1:
+            return httpx.Response(503, json={})
+        texts = json.loads(request.content)["texts"]
+        return httpx.Response(200, json={"results": [{"local_name": t} for t in texts]})
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    llm = LLMClientReal("http://stub", retries=1, http=client, batch_size=1)
+    out = llm.normalize_batch(["A", "B"])
+    assert isinstance(out[0], Exception)
+    assert out[1] == {"local_name": "B"}
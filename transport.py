@@ -0,0 +1,194 @@
+"""HTTP-транспорт для реальных клиентов.
+
+- ``http1`` (по умолчанию): ``requests`` в синхронных клиентах и ``aiohttp`` в асинхронном пайплайне —
+  HTTP/1.1, один запрос на соединение в каждый момент времени.
+- ``http2``: ``httpx`` с HTTP/2 — множество параллельных запросов мультиплексируется
+  в нескольких соединениях. Для ``http://`` используется HTTP/2 prior knowledge (h2c).
+
+``httpx`` — опциональная зависимость (``pip install "httpx[http2]"``).
+"""
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+import aiohttp
+import requests
+
+from config import VALID_HTTP_TRANSPORTS
+from exceptions import ServiceHTTPError, TransientServiceError, error_for_status
+from serialization import JSONDecodeError, loads
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - optional dependency
+    httpx = None  # type: ignore
+
+# Ошибки транспорта, которые клиенты считают транзиентными
+# (включая обрезанное/битое тело ответа — как requests.JSONDecodeError ранее)
+TRANSPORT_ERRORS: tuple[type[BaseException], ...] = (requests.RequestException, JSONDecodeError)
+if httpx is not None:
+    TRANSPORT_ERRORS += (httpx.HTTPError,)
+
+# Ошибки, которые клиенты повторяют: транспорт + временные ответы сервиса (5xx, 408, 429)
+RETRYABLE_ERRORS: tuple[type[BaseException], ...] = TRANSPORT_ERRORS + (TransientServiceError,)
+
+_lock = threading.Lock()
+_http2_clients: dict[int, Any] = {}
+
+
+def _require_httpx() -> None:
+    if httpx is None:
+        raise RuntimeError('HTTP_TRANSPORT=http2 requires httpx: pip install "httpx[http2]"')
+
+
+def _http2_limits(max_connections: int):
+    return httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+
+
+def _retry_after(headers) -> float | None:
+    value = (headers or {}).get("Retry-After")
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except (TypeError, ValueError):
+        # HTTP-date не поддерживается — используется обычный бэкофф
+        return None
+
+
+def status_error(service_name: str, status: int, headers=None) -> ServiceHTTPError:
+    """Исключение по статусу ответа (с учетом заголовка Retry-After)."""
+    return error_for_status(service_name, status, retry_after=_retry_after(headers))
+
+
+def get_sync_transport(kind: str = "http1", *, max_connections: int = 4):
+    """Объект с методами get/post/patch в стиле requests.
+
+    Для ``http1`` возвращается сам модуль ``requests`` (атрибуты разрешаются в момент вызова),
+    для ``http2`` — общий на процесс ``httpx.Client``, чтобы все клиенты делили соединения.
+    """
+    if kind not in VALID_HTTP_TRANSPORTS:
+        raise ValueError(f"unknown HTTP transport: {kind!r}, expected one of {sorted(VALID_HTTP_TRANSPORTS)}")
+    if kind != "http2":
+        return requests
+    _require_httpx()
+    with _lock:
+        client = _http2_clients.get(max_connections)
+        if client is None:
+            client = httpx.Client(http1=False, http2=True, limits=_http2_limits(max_connections))
+            _http2_clients[max_connections] = client
+        return client
+
+
+@contextmanager
+def stream_get(
+    http,
+    url: str,
+    *,
+    params: dict | None = None,
+    headers: dict | None = None,
+    timeout: float = 10.0,
+    chunk_size: int = 8192,
+) -> Iterator[tuple[int, Any, Iterator[bytes]]]:
+    """GET с потоковым телом: (status, заголовки, итератор кусков байтов).
+
+    Заголовки нужны для ``status_error``: на 429 учитывается ``Retry-After``.
+
+    При выходе из контекста ответ закрывается, даже если тело прочитано не полностью —
+    непрочитанный остаток не скачивается.
+    """
+    if httpx is not None and isinstance(http, httpx.Client):
+        with http.stream("GET", url, params=params, headers=headers, timeout=timeout) as resp:
+            yield resp.status_code, resp.headers, resp.iter_bytes(chunk_size)
+        return
+    resp = http.get(url, params=params, headers=headers, timeout=timeout, stream=True)
+    try:
+        yield resp.status_code, getattr(resp, "headers", None), resp.iter_content(chunk_size=chunk_size)
+    finally:
+        resp.close()
+
+
+def open_async_session(kind: str = "http1", *, max_connections: int = 4):
+    """Асинхронная сессия (контекстный менеджер): aiohttp.ClientSession или httpx.AsyncClient."""
+    if kind != "http2":
+        return aiohttp.ClientSession()
+    _require_httpx()
+    return httpx.AsyncClient(http1=False, http2=True, limits=_http2_limits(max_connections))
+
+
+async def async_request(
+    session,
+    method: str,
+    url: str,
+    *,
+    headers: dict | None = None,
+    json_data: dict | None = None,
+    params: dict | None = None,
+    timeout_sec: float = 10.0,
+    service: str = "http",
+) -> tuple[int, Any]:
+    """Выполнить запрос в любой из асинхронных сессий; возвращает (status, json|None).
+
+    Статус >= 400 — исключение ``ServiceHTTPError`` по классу статуса (см. exceptions.error_for_status).
+    """
+    if httpx is not None and isinstance(session, httpx.AsyncClient):
+        resp = await session.request(
+            method, url, headers=headers or {}, json=json_data, params=params, timeout=timeout_sec
+        )
+        if resp.status_code == 200:
+            return resp.status_code, loads(resp.content)
+        if resp.status_code >= 400:
+            raise status_error(service, resp.status_code, resp.headers)
+        return resp.status_code, None
+
+    timeout = aiohttp.ClientTimeout(total=timeout_sec)
+    async with session.request(
+        method, url, headers=headers or {}, json=json_data, params=params, timeout=timeout
+    ) as response:
+        if response.status == 200:
+            return response.status, loads(await response.read())
+        if response.status >= 400:
+            raise status_error(service, response.status, response.headers)
+        return response.status, None
+
+
+async def async_stream_search(
+    session,
+    url: str,
+    selector,
+    *,
+    headers: dict | None = None,
+    params: dict | None = None,
+    timeout_sec: float = 10.0,
+    chunk_size: int = 8192,
+    service: str = "http",
+) -> tuple[int, list | None]:
+    """Потоковый GET поиска: тело-массив разбирается ``selector`` (см. partnumbers.SearchSelector).
+
+    Возвращает (status, результаты|None); чтение прекращается при раннем выходе селектора.
+    """
+    if httpx is not None and isinstance(session, httpx.AsyncClient):
+        async with session.stream(
+            "GET", url, headers=headers or {}, params=params, timeout=timeout_sec
+        ) as resp:
+            if resp.status_code == 200:
+                return resp.status_code, await selector.aconsume(resp.aiter_bytes(chunk_size))
+            if resp.status_code >= 400:
+                raise status_error(service, resp.status_code, resp.headers)
+            return resp.status_code, None
+
+    timeout = aiohttp.ClientTimeout(total=timeout_sec)
+    async with session.get(url, headers=headers or {}, params=params, timeout=timeout) as response:
+        if response.status == 200:
+            return response.status, await selector.aconsume(response.content.iter_chunked(chunk_size))
+        if response.status >= 400:
+            raise status_error(service, response.status, response.headers)
+        return response.status, None
+
+
+def close_sync_transports() -> None:
+    """Закрыть общие HTTP/2-клиенты (конец запуска/тесты)."""
+    with _lock:
+        for client in _http2_clients.values():
+            client.close()
+        _http2_clients.clear()
@@ -28,7 +28,8 @@ with tab1:
             logger, _ = init_logging(cfg.log_level)
             with st.spinner("Обработка запущена..."):
                 logger.info("[ui] start processing rows=%s", len(data))
-                results = process_rows(data, cfg)
+                # Интерактивная полоса: небольшие загрузки не ждут за ночным пакетом
+                results = process_rows(data, cfg, lane="interactive")
                 report_path = save_report(results)
             if report_path:
                 st.success("Обработка завершена!")